@@ -0,0 +1,38 @@
+"""Composite indexes on action_logs for keyset pagination by user and rule.
+
+Revision ID: 006_action_logs_keyset_indexes
+Revises: 005_mute_system
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "006_action_logs_keyset_indexes"
+down_revision: Union[str, None] = "005_mute_system"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Порядок совпадает с ORDER BY executed_at DESC, id DESC в logs_repo.get_logs
+    op.create_index(
+        "ix_action_logs_discord_id_executed_at",
+        "action_logs",
+        ["discord_id", sa.text("executed_at DESC"), sa.text("id DESC")],
+    )
+    op.create_index(
+        "ix_action_logs_rule_id_executed_at",
+        "action_logs",
+        ["rule_id", sa.text("executed_at DESC"), sa.text("id DESC")],
+    )
+    # Покрывается префиксом нового составного индекса
+    op.drop_index("ix_action_logs_discord_id", table_name="action_logs")
+
+
+def downgrade() -> None:
+    op.create_index("ix_action_logs_discord_id", "action_logs", ["discord_id"])
+    op.drop_index("ix_action_logs_rule_id_executed_at", table_name="action_logs")
+    op.drop_index("ix_action_logs_discord_id_executed_at", table_name="action_logs")
@@ -0,0 +1,45 @@
+"""Statement-level triggers that NOTIFY config_versions on config table writes.
+
+Revision ID: 007_config_version_triggers
+Revises: 006_action_logs_keyset_indexes
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "007_config_version_triggers"
+down_revision: Union[str, None] = "006_action_logs_keyset_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+CONFIG_TABLES = ("rules", "user_lists", "schedules", "kick_targets", "stacking_pairs", "mute_levels")
+
+
+def upgrade() -> None:
+    # Одинаковые NOTIFY в одной транзакции PostgreSQL схлопывает — на пакетную запись придёт одно
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION notify_config_version() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('config_versions', TG_TABLE_NAME);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    for table in CONFIG_TABLES:
+        op.execute(
+            f"""
+            CREATE TRIGGER trg_{table}_config_version
+            AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+            FOR EACH STATEMENT EXECUTE FUNCTION notify_config_version()
+            """
+        )
+
+
+def downgrade() -> None:
+    for table in CONFIG_TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS trg_{table}_config_version ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS notify_config_version()")
@@ -0,0 +1,128 @@
+"""guild_id on per-community tables for multi-guild operation.
+
+Существующие строки относятся к гильдии из DISCORD_GUILD_ID (переменная окружения при
+запуске миграции). Уникальные ключи и индексы получают guild_id первым столбцом.
+
+Revision ID: 009_multi_guild
+Revises: 008_bot_state
+Create Date: 2026-10-19
+
+"""
+import os
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "009_multi_guild"
+down_revision: Union[str, None] = "008_bot_state"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+GUILD_TABLES = (
+    "user_lists",
+    "rules",
+    "action_logs",
+    "voice_sessions",
+    "kick_targets",
+    "stacking_pairs",
+    "mute_xp",
+    "mute_levels",
+    "mute_sessions",
+)
+
+
+def _legacy_guild_id() -> int:
+    value = os.environ.get("DISCORD_GUILD_ID", "").strip()
+    if not value:
+        conn = op.get_bind()
+        for table in GUILD_TABLES:
+            if conn.execute(sa.text(f"SELECT EXISTS (SELECT 1 FROM {table})")).scalar():
+                raise RuntimeError(
+                    "DISCORD_GUILD_ID must be set: existing rows are assigned to that guild",
+                )
+        return 0
+    return int(value)
+
+
+def upgrade() -> None:
+    legacy = _legacy_guild_id()
+    for table in GUILD_TABLES:
+        op.add_column(table, sa.Column("guild_id", sa.BigInteger(), nullable=True))
+        op.execute(sa.text(f"UPDATE {table} SET guild_id = :guild_id").bindparams(guild_id=legacy))
+        op.alter_column(table, "guild_id", nullable=False)
+
+    # Уникальность — в пределах гильдии
+    op.drop_index("uq_user_lists_discord_id_list_type", table_name="user_lists")
+    op.create_index(
+        "uq_user_lists_guild_id_discord_id_list_type",
+        "user_lists",
+        ["guild_id", "discord_id", "list_type"],
+        unique=True,
+    )
+    op.drop_constraint("kick_targets_discord_id_key", "kick_targets", type_="unique")
+    op.create_unique_constraint("uq_kick_targets_guild_id_discord_id", "kick_targets", ["guild_id", "discord_id"])
+    op.drop_constraint("uq_stacking_pairs_user_ids", "stacking_pairs", type_="unique")
+    op.create_unique_constraint(
+        "uq_stacking_pairs_guild_id_user_ids", "stacking_pairs", ["guild_id", "user_id_1", "user_id_2"],
+    )
+    op.drop_constraint("mute_xp_pkey", "mute_xp", type_="primary")
+    op.create_primary_key("mute_xp_pkey", "mute_xp", ["guild_id", "discord_id"])
+    op.drop_constraint("mute_levels_pkey", "mute_levels", type_="primary")
+    op.create_primary_key("mute_levels_pkey", "mute_levels", ["guild_id", "level"])
+
+    # Выборки движка и API фильтруют по гильдии
+    op.create_index("ix_rules_guild_id_priority", "rules", ["guild_id", "priority"])
+    op.create_index(
+        "ix_voice_sessions_guild_id_active",
+        "voice_sessions",
+        ["guild_id", "discord_id"],
+        postgresql_where=sa.text("left_at IS NULL"),
+    )
+    op.create_index("ix_voice_sessions_guild_id_joined_at", "voice_sessions", ["guild_id", "joined_at"])
+    op.create_index("ix_mute_sessions_guild_id_started_at", "mute_sessions", ["guild_id", "started_at"])
+    # Keyset-пагинация логов гильдии (ORDER BY executed_at DESC, id DESC)
+    op.create_index(
+        "ix_action_logs_guild_id_executed_at",
+        "action_logs",
+        ["guild_id", sa.text("executed_at DESC"), sa.text("id DESC")],
+    )
+    op.drop_index("ix_voice_sessions_discord_id_active", table_name="voice_sessions")
+
+
+def downgrade() -> None:
+    op.create_index(
+        "ix_voice_sessions_discord_id_active",
+        "voice_sessions",
+        ["discord_id"],
+        postgresql_where=sa.text("left_at IS NULL"),
+    )
+    op.drop_index("ix_action_logs_guild_id_executed_at", table_name="action_logs")
+    op.drop_index("ix_mute_sessions_guild_id_started_at", table_name="mute_sessions")
+    op.drop_index("ix_voice_sessions_guild_id_joined_at", table_name="voice_sessions")
+    op.drop_index("ix_voice_sessions_guild_id_active", table_name="voice_sessions")
+    op.drop_index("ix_rules_guild_id_priority", table_name="rules")
+
+    # Обратно к одной гильдии: строки других гильдий не помещаются в старые ключи
+    legacy = _legacy_guild_id()
+    for table in GUILD_TABLES:
+        op.execute(sa.text(f"DELETE FROM {table} WHERE guild_id <> :guild_id").bindparams(guild_id=legacy))
+
+    op.drop_constraint("mute_levels_pkey", "mute_levels", type_="primary")
+    op.create_primary_key("mute_levels_pkey", "mute_levels", ["level"])
+    op.drop_constraint("mute_xp_pkey", "mute_xp", type_="primary")
+    op.create_primary_key("mute_xp_pkey", "mute_xp", ["discord_id"])
+    op.drop_constraint("uq_stacking_pairs_guild_id_user_ids", "stacking_pairs", type_="unique")
+    op.create_unique_constraint("uq_stacking_pairs_user_ids", "stacking_pairs", ["user_id_1", "user_id_2"])
+    op.drop_constraint("uq_kick_targets_guild_id_discord_id", "kick_targets", type_="unique")
+    op.create_unique_constraint("kick_targets_discord_id_key", "kick_targets", ["discord_id"])
+    op.drop_index("uq_user_lists_guild_id_discord_id_list_type", table_name="user_lists")
+    op.create_index(
+        "uq_user_lists_discord_id_list_type",
+        "user_lists",
+        ["discord_id", "list_type"],
+        unique=True,
+    )
+
+    for table in GUILD_TABLES:
+        op.drop_column(table, "guild_id")
@@ -0,0 +1,3 @@
+"""
+Бенчмарки производительности. Запуск из корня: python -m benchmarks.<модуль> --help
+"""
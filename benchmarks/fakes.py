@@ -0,0 +1,141 @@
+"""
+Лёгкие подделки Discord-объектов для бенчмарков: гильдия, голосовые каналы, участники, VoiceState.
+
+MagicMock в горячем цикле стоит дороже самого обработчика и искажает замеры, поэтому здесь
+простые классы с теми атрибутами, которые читают voice_manager, evaluator, actions, stacking,
+occupancy и mute_tracker. FakeVoiceChannel — подкласс discord.VoiceChannel: actions и stacking
+проверяют isinstance.
+
+Состояние меняется как в discord.py: кэш (member.voice, channel.members) обновляется до
+вызова on_voice_state_update. REST-вызовы (edit, move_to) ждут rest_latency секунд; move_to
+ещё и порождает событие gateway через FakeGuild.on_gateway_event, как настоящий Discord.
+"""
+import asyncio
+from collections.abc import Callable
+from dataclasses import dataclass, replace
+from types import SimpleNamespace
+from typing import Any, Optional
+
+import discord
+
+# Discord ID подделок: вне диапазона реальных snowflake ближайших лет, не пересекаются с данными БД
+FAKE_ID_BASE = 900_000_000_000_000_000
+
+
+@dataclass(frozen=True)
+class FakeVoiceState:
+    channel: Optional["FakeVoiceChannel"] = None
+    self_mute: bool = False
+    self_deaf: bool = False
+    mute: bool = False
+    deaf: bool = False
+    self_stream: bool = False
+    self_video: bool = False
+
+
+class FakeVoiceChannel(discord.VoiceChannel):
+    # super().__init__ не вызывается: ему нужен ConnectionState и payload канала
+    def __init__(self, guild: "FakeGuild", channel_id: int, name: str) -> None:
+        self.guild = guild
+        self.id = channel_id
+        self.name = name
+        self._members: dict[int, "FakeMember"] = {}
+
+    @property
+    def members(self) -> list["FakeMember"]:  # type: ignore[override]
+        return list(self._members.values())
+
+
+class FakeMember:
+    def __init__(self, guild: "FakeGuild", member_id: int, name: str) -> None:
+        self.guild = guild
+        self.id = member_id
+        self.name = name
+        self.display_name = name
+        self.bot = False
+        self.voice: Optional[FakeVoiceState] = None
+        self.display_avatar = SimpleNamespace(url=f"https://cdn.discordapp.com/embed/avatars/{member_id % 6}.png")
+
+    @property
+    def mention(self) -> str:
+        return f"<@{self.id}>"
+
+    async def edit(self, *, mute: Optional[bool] = None, **_: Any) -> None:
+        await self.guild.rest()
+        if mute is not None and self.voice is not None:
+            self.guild.update_voice(self, replace(self.voice, mute=mute))
+
+    async def move_to(self, channel: Optional[FakeVoiceChannel], *, reason: Optional[str] = None) -> None:
+        await self.guild.rest()
+        if self.voice is None:
+            return
+        self.guild.update_voice(self, replace(self.voice, channel=channel) if channel is not None else None)
+
+    async def add_roles(self, *roles: Any, reason: Optional[str] = None) -> None:
+        await self.guild.rest()
+
+
+GatewayCallback = Callable[[FakeMember, Optional[FakeVoiceState], Optional[FakeVoiceState]], None]
+
+
+class FakeGuild:
+    def __init__(self, members: int, channels: int, rest_latency: float = 0.0, guild_id: int = FAKE_ID_BASE) -> None:
+        self.id = guild_id
+        self.owner_id = guild_id  # не совпадает ни с одним участником
+        self.name = "benchmark"
+        self.chunked = True
+        self.rest_latency = rest_latency
+        self.me = SimpleNamespace(guild_permissions=SimpleNamespace(mute_members=True, move_members=True))
+        self.on_gateway_event: Optional[GatewayCallback] = None
+        self.voice_channels = [
+            FakeVoiceChannel(self, guild_id + 1 + i, f"voice-{i}") for i in range(channels)
+        ]
+        self._channels = {c.id: c for c in self.voice_channels}
+        first_member_id = guild_id + 1 + channels
+        self.members = [FakeMember(self, first_member_id + i, f"user{i}") for i in range(members)]
+        self._members = {m.id: m for m in self.members}
+
+    def ensure_channel(self, channel_id: int) -> FakeVoiceChannel:
+        """Канал с заданным ID (создаётся при первом обращении) — для воспроизведения записей."""
+        channel = self._channels.get(channel_id)
+        if channel is None:
+            channel = FakeVoiceChannel(self, channel_id, f"voice-{len(self.voice_channels)}")
+            self.voice_channels.append(channel)
+            self._channels[channel_id] = channel
+        return channel
+
+    def ensure_member(self, member_id: int) -> FakeMember:
+        member = self._members.get(member_id)
+        if member is None:
+            member = FakeMember(self, member_id, f"user{len(self.members)}")
+            self.members.append(member)
+            self._members[member_id] = member
+        return member
+
+    def get_member(self, member_id: int) -> Optional[FakeMember]:
+        return self._members.get(member_id)
+
+    def get_channel(self, channel_id: int) -> Optional[FakeVoiceChannel]:
+        return self._channels.get(channel_id)
+
+    def get_role(self, role_id: int) -> Optional[Any]:
+        return None
+
+    async def rest(self) -> None:
+        await asyncio.sleep(self.rest_latency)
+
+    def set_voice(self, member: FakeMember, after: Optional[FakeVoiceState]) -> Optional[FakeVoiceState]:
+        """Обновить кэш (member.voice, channel.members) и вернуть прежнее состояние."""
+        before = member.voice
+        if before is not None and before.channel is not None:
+            before.channel._members.pop(member.id, None)
+        if after is not None and after.channel is not None:
+            after.channel._members[member.id] = member
+        member.voice = after
+        return before
+
+    def update_voice(self, member: FakeMember, after: Optional[FakeVoiceState]) -> None:
+        """Изменение от REST-вызова: кэш обновляется, событие уходит в on_gateway_event."""
+        before = self.set_voice(member, after)
+        if self.on_gateway_event is not None:
+            self.on_gateway_event(member, before, after)
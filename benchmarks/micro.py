@@ -0,0 +1,311 @@
+"""
+Микробенчмарки горячих CPU-функций движка с фиксированными seed и базовой линией в репозитории.
+
+Каждый бенчмарк — функция подготовки, которая строит данные и возвращает вызываемый объект
+(обычный или корутинную функцию). Время вызова — минимум по --repeat повторам из number
+вызовов (как timeit: минимум меньше всего зашумлён). Рядом замеряется эталонная нагрузка
+на чистом Python; сравнение с baselines.json идёт по отношению «бенчмарк / эталон», поэтому
+базовая линия, снятая на другой машине, остаётся сопоставимой с точностью до архитектуры.
+
+    python -m benchmarks.micro                    # сравнить с baselines.json, код 1 при регрессии
+    python -m benchmarks.micro --filter stacking  # только совпадающие по имени
+    python -m benchmarks.micro --update-baseline  # записать текущие результаты как базовую линию
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Optional
+
+from benchmarks.fakes import FakeGuild, FakeVoiceState
+
+SEED = 1234
+BASELINE_PATH = Path(__file__).resolve().parent / "baselines.json"
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 0.20
+
+
+@dataclass(frozen=True)
+class Benchmark:
+    name: str
+    setup: Callable[[], Callable[[], Any]]
+    number: int
+
+
+BENCHMARKS: list[Benchmark] = []
+
+
+def bench(name: str, number: int) -> Callable[[Callable[[], Callable[[], Any]]], Callable[[], Callable[[], Any]]]:
+    """Зарегистрировать функцию подготовки: она возвращает то, что замеряется."""
+    def decorator(setup: Callable[[], Callable[[], Any]]) -> Callable[[], Callable[[], Any]]:
+        BENCHMARKS.append(Benchmark(name, setup, number))
+        return setup
+    return decorator
+
+
+# ---------------------------------------------------------------------------
+# Бенчмарки
+# ---------------------------------------------------------------------------
+
+@bench("tracker.get_overtime_users[10k sessions x 50 rules]", number=3)
+def _overtime_users() -> Callable[[], Any]:
+    from src.engine import tracker
+
+    rng = random.Random(SEED)
+    now = datetime.now(timezone.utc)
+    channels = [1000 + i for i in range(30)]
+    sessions = {
+        (10_000 + i, rng.choice(channels)): now - timedelta(seconds=rng.randrange(0, 7200))
+        for i in range(10_000)
+    }
+    rules = [
+        {
+            "id": i,
+            "max_time_sec": rng.choice((600, 1800, 3600)),
+            "channel_ids": rng.sample(channels, 5) if i % 2 else None,
+        }
+        for i in range(50)
+    ]
+
+    guild_id = 0  # не пересекается с реальными гильдиями
+
+    async def run() -> None:
+        tracker._sessions[guild_id] = sessions
+        try:
+            await tracker.get_overtime_users(None, guild_id, rules)
+        finally:
+            tracker._sessions.pop(guild_id, None)
+
+    return run
+
+
+class _InMemoryLists:
+    """users_repo с членством в памяти: замеряется сам evaluator, а не БД."""
+
+    def __init__(self, lists: dict[str, set[int]]) -> None:
+        self._lists = lists
+
+    async def is_in_list(self, pool: Any, guild_id: int, discord_id: int, list_type: str) -> bool:
+        return discord_id in self._lists[list_type]
+
+
+@bench("evaluator.evaluate[50 rules, in-memory lists]", number=2000)
+def _evaluate() -> Callable[[], Any]:
+    from src.engine import evaluator
+    from src.engine.rules import rules_from_dicts
+
+    rng = random.Random(SEED)
+    guild = FakeGuild(members=1000, channels=10)
+    lists = {
+        "blacklist": {m.id for m in rng.sample(guild.members, 100)},
+        "whitelist": {m.id for m in rng.sample(guild.members, 500)},
+    }
+    rules = rules_from_dicts([
+        {
+            "id": i,
+            "name": f"rule {i}",
+            "target_list": ("blacklist", "whitelist", None)[i % 3],
+            "action_type": "kick",
+            "action_params": {"reason": "bench"},
+            "priority": i,
+        }
+        for i in range(50)
+    ])
+    member = guild.members[0]
+    channel = guild.voice_channels[0]
+    users_repo = _InMemoryLists(lists)
+
+    async def run() -> None:
+        await evaluator.evaluate(member, channel, rules, users_repo, None)
+
+    return run
+
+
+@bench("StackingDetector.check_and_move[10k pairs, no match]", number=200)
+def _stacking() -> Callable[[], Any]:
+    from src.engine.stacking import PairRule, StackingDetector
+
+    guild = FakeGuild(members=20_001, channels=5)
+    members = guild.members
+    detector = StackingDetector()
+    # member в паре с последней записью списка: полный проход по парам, партнёр не в войсе
+    detector.load_pairs(
+        [PairRule(members[i].id, members[i + 1].id, guild.voice_channels[0].id, guild.id) for i in range(1, 20_000, 2)]
+        + [PairRule(members[0].id, members[20_000].id, guild.voice_channels[0].id, guild.id)]
+    )
+    member = members[0]
+    guild.set_voice(member, FakeVoiceState(channel=guild.voice_channels[1]))
+
+    async def run() -> None:
+        await detector.check_and_move(member, guild)
+
+    return run
+
+
+@bench("rate_limit.check_action_allowed[at limit 1000/min]", number=20_000)
+def _rate_limit() -> Callable[[], Any]:
+    from src.utils import rate_limit
+
+    guild_id = 0  # не пересекается с реальными гильдиями
+    limit = 1000
+    rate_limit._actions_by_guild[guild_id] = [time.monotonic()] * limit
+
+    def run() -> None:
+        rate_limit.check_action_allowed(guild_id, limit)
+
+    return run
+
+
+@bench("rules_from_dicts[1k rows]", number=200)
+def _rules_from_dicts() -> Callable[[], Any]:
+    from src.engine.rules import rules_from_dicts
+
+    rng = random.Random(SEED)
+    rows = [
+        {
+            "id": i,
+            "name": f"rule {i}",
+            "is_active": True,
+            "is_dry_run": bool(i % 4 == 0),
+            "target_list": rng.choice(("blacklist", "whitelist", None)),
+            "channel_ids": [rng.randrange(10**17, 10**18) for _ in range(rng.randrange(0, 4))] or None,
+            "max_time_sec": rng.choice((None, 600, 3600)),
+            "action_type": rng.choice(("kick", "mute", "move")),
+            "action_params": {"target_channel_id": 1},
+            "priority": i,
+        }
+        for i in range(1000)
+    ]
+
+    def run() -> None:
+        rules_from_dicts(rows)
+
+    return run
+
+
+@bench("member_to_dict[50k members]", number=3)
+def _member_to_dict() -> Callable[[], Any]:
+    from src.api.member_cache import member_to_dict
+
+    members = FakeGuild(members=50_000, channels=1).members
+
+    def run() -> None:
+        for member in members:
+            member_to_dict(member)
+
+    return run
+
+
+# ---------------------------------------------------------------------------
+# Прогон и сравнение
+# ---------------------------------------------------------------------------
+
+def _reference_workload() -> None:
+    """Эталон для нормализации: смесь словарей, строк и арифметики на чистом Python."""
+    data: dict[int, str] = {}
+    for i in range(2000):
+        data[i] = f"{i}:{i * i % 97}"
+    sorted(data.values(), key=len)
+
+
+def _measure(func: Callable[[], Any], number: int, repeat: int) -> float:
+    """Минимальное время одного вызова (сек) по repeat повторам."""
+    if asyncio.iscoroutinefunction(func):
+        async def loop() -> float:
+            start = time.perf_counter()
+            for _ in range(number):
+                await func()
+            return time.perf_counter() - start
+
+        timings = [asyncio.run(loop()) for _ in range(repeat)]
+    else:
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                func()
+            timings.append(time.perf_counter() - start)
+    return min(timings) / number
+
+
+def run(name_filter: Optional[str] = None, repeat: int = DEFAULT_REPEAT) -> dict[str, Any]:
+    _measure(_reference_workload, 50, 1)
+    reference_us = _measure(_reference_workload, 200, max(repeat, 10)) * 1e6
+    results: dict[str, dict[str, float]] = {}
+    for benchmark in BENCHMARKS:
+        if name_filter and name_filter not in benchmark.name:
+            continue
+        func = benchmark.setup()
+        _measure(func, 1, 1)  # прогрев: импорты, кэши
+        time_us = _measure(func, benchmark.number, repeat) * 1e6
+        results[benchmark.name] = {"time_us": time_us, "relative": time_us / reference_us}
+    from benchmarks.voice_load import git_commit
+    return {
+        "commit": git_commit(),
+        "python": sys.version.split()[0],
+        "reference_us": reference_us,
+        "benchmarks": results,
+    }
+
+
+def compare(result: dict[str, Any], baseline: dict[str, Any], threshold: float) -> tuple[list[str], list[str]]:
+    """Строки отчёта и имена бенчмарков, замедлившихся больше чем на threshold (по relative)."""
+    lines = [f"{'benchmark':55} {'time':>12} {'baseline':>12} {'change':>8}"]
+    regressions = []
+    base = baseline.get("benchmarks", {})
+    for name, current in result["benchmarks"].items():
+        before = base.get(name)
+        if before is None:
+            lines.append(f"{name:55} {current['time_us']:10.1f}us {'—':>12} {'new':>8}")
+            continue
+        change = current["relative"] / before["relative"] - 1
+        mark = ""
+        if change > threshold:
+            regressions.append(name)
+            mark = "  REGRESSION"
+        lines.append(f"{name:55} {current['time_us']:10.1f}us {before['time_us']:10.1f}us {change:+8.1%}{mark}")
+    return lines, regressions
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--filter", help="только бенчмарки, в имени которых есть подстрока")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="допустимое замедление (0.2 = 20%%)")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true", help="записать результаты в --baseline")
+    parser.add_argument("--json", type=Path, help="сохранить результаты в файл")
+    args = parser.parse_args(argv)
+
+    from src.utils.logging import setup_logging
+    setup_logging(level="ERROR")
+
+    result = run(args.filter, args.repeat)
+    if args.json:
+        args.json.write_text(json.dumps(result, indent=2) + "\n", encoding="utf-8")
+
+    if args.update_baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8")) if args.baseline.exists() else {}
+        baseline.update({k: v for k, v in result.items() if k != "benchmarks"})
+        baseline.setdefault("benchmarks", {}).update(result["benchmarks"])
+        args.baseline.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        print(f"baseline updated: {args.baseline}")
+        return 0
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8")) if args.baseline.exists() else {}
+    lines, regressions = compare(result, baseline, args.threshold)
+    print("\n".join(lines))
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+"""
+Воспроизведение записи голосовых событий (VOICE_RECORD_PATH, src/bot/recorder.py) через
+настоящий VoiceManager на поддельной гильдии — для разбора инцидентов и бенчмарков на
+реальном трафике.
+
+Участники и каналы создаются с ID из записи; перед каждым событием кэш (member.voice,
+channel.members) приводится к состоянию «после», как это делает discord.py. Ответные события
+на действия бота не порождаются: они уже есть в записи. Прогон — одна гильдия: --guild или,
+без него, гильдия с наибольшим числом событий (у процесса бота их может быть несколько, а
+поддельная гильдия одна). Хранилище — MockPool, правила, чёрный
+список и пары стакинга задаются так же, как в voice_load (--rules, --blacklist-ratio, --pairs).
+
+Темп: --speed 1 — как в записи, --speed 10 — в 10 раз быстрее, --speed 0 — без пауз
+(с ограничением --concurrency, как в voice_load). В отчёте, кроме задержек обработчика,
+schedule_lag — насколько события отставали от расписания записи.
+
+    python -m benchmarks.replay voice.ndjson --speed 0 --output replay.json
+    python -m benchmarks.replay voice.ndjson --speed 1 --rules 4 --blacklist-ratio 0.05
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Optional
+
+from benchmarks.fakes import FakeGuild, FakeMember, FakeVoiceState
+from benchmarks.voice_load import (
+    PLACEHOLDER_ENV,
+    build_voice_manager,
+    drain,
+    git_commit,
+    latency_summary,
+    seed,
+)
+from tests.fakes import MockPool
+
+
+def load_records(paths: list[Path], guild_id: Optional[int] = None) -> tuple[list[dict[str, Any]], int]:
+    """
+    Записи гильдии guild_id (без него — гильдии с наибольшим числом записей) из файлов вместе
+    с ротированными <path>.N, от старых к новым, и число битых строк.
+    """
+    from src.bot.recorder import rotated_paths
+
+    records: list[dict[str, Any]] = []
+    invalid = 0
+    for path in paths:
+        for file in rotated_paths(path):
+            with file.open(encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        record = None
+                    # Обрезанная последняя строка после аварийной остановки — обычное дело
+                    if not isinstance(record, dict) or "t" not in record or "m" not in record:
+                        invalid += 1
+                        continue
+                    records.append(record)
+    if guild_id is None and records:
+        guild_id = Counter(r.get("g") for r in records).most_common(1)[0][0]
+    records = [r for r in records if r.get("g") == guild_id]
+    records.sort(key=lambda r: r["t"])
+    return records, invalid
+
+
+def _state(guild: FakeGuild, snapshot: Optional[list[int]]) -> Optional[FakeVoiceState]:
+    from src.bot.recorder import unpack_flags
+
+    if snapshot is None:
+        return None
+    channel_id, flags = snapshot
+    return FakeVoiceState(channel=guild.ensure_channel(channel_id), **unpack_flags(flags))
+
+
+async def run(args: argparse.Namespace, records: list[dict[str, Any]]) -> dict[str, Any]:
+    from src.engine import tracker
+
+    guild = FakeGuild(0, 0, rest_latency=args.rest_latency / 1000)
+    # Участники и каналы заранее: seed выбирает из guild.members и guild.voice_channels
+    for record in records:
+        guild.ensure_member(record["m"])
+        for snapshot in (record.get("b"), record.get("a")):
+            if snapshot is not None:
+                guild.ensure_channel(snapshot[0])
+    pool = MockPool()
+    pairs = await seed(pool, guild, args, random.Random(args.seed))
+    cog = build_voice_manager(pool, guild, pairs)
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies: list[float] = []
+    schedule_lag: list[float] = []
+    errors: Counter[str] = Counter()
+    handlers: set[asyncio.Task[None]] = set()
+
+    async def handle(member: FakeMember, before: Optional[FakeVoiceState], after: Optional[FakeVoiceState]) -> None:
+        start = time.perf_counter()
+        try:
+            await cog.on_voice_state_update(member, before or FakeVoiceState(), after or FakeVoiceState())
+        except Exception as e:
+            errors[type(e).__name__] += 1
+        finally:
+            latencies.append(time.perf_counter() - start)
+            if not args.speed:
+                semaphore.release()
+
+    try:
+        started = time.perf_counter()
+        t0 = records[0]["t"] if records else 0.0
+        for record in records:
+            if args.speed:
+                delay = started + (record["t"] - t0) / args.speed - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                schedule_lag.append(max(-delay, 0.0))
+            else:
+                await semaphore.acquire()
+            member = guild.ensure_member(record["m"])
+            before = _state(guild, record.get("b"))
+            after = _state(guild, record.get("a"))
+            guild.set_voice(member, after)
+            task = asyncio.get_running_loop().create_task(handle(member, before, after))
+            handlers.add(task)
+            task.add_done_callback(handlers.discard)
+        await drain()
+        duration = time.perf_counter() - started
+    finally:
+        tracker._sessions.clear()
+
+    recorded_sec = records[-1]["t"] - records[0]["t"] if records else 0.0
+    return {
+        "benchmark": "replay",
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "params": {
+            "files": [str(p) for p in args.files],
+            "guild": args.guild,
+            "speed": args.speed,
+            "concurrency": args.concurrency,
+            "rules": args.rules,
+            "blacklist_ratio": args.blacklist_ratio,
+            "pairs": args.pairs,
+            "rate_limit": args.rate_limit,
+            "rest_latency_ms": args.rest_latency,
+            "seed": args.seed,
+        },
+        "members": len(guild.members),
+        "channels": len(guild.voice_channels),
+        "recorded_sec": recorded_sec,
+        "duration_sec": duration,
+        "handled_events": len(latencies),
+        "errors": sum(errors.values()),
+        "error_types": dict(errors),
+        "events_per_sec": len(latencies) / duration if duration else 0.0,
+        "latency": latency_summary(latencies),
+        "schedule_lag": latency_summary(schedule_lag) if schedule_lag else None,
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0], formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", type=Path, nargs="+", help="файлы записи (ротированные <file>.N подхватываются)")
+    parser.add_argument("--guild", type=int, help="гильдия (по умолчанию — с наибольшим числом событий)")
+    parser.add_argument("--speed", type=float, default=0.0, help="1 — темп записи, N — в N раз быстрее, 0 — без пауз")
+    parser.add_argument("--concurrency", type=int, default=50, help="событий в обработке одновременно при --speed 0")
+    parser.add_argument("--rules", type=int, default=0, help="правил по чёрному списку (как в voice_load)")
+    parser.add_argument("--blacklist-ratio", type=float, default=0.0)
+    parser.add_argument("--pairs", type=int, default=0, help="пар стакинга из участников записи")
+    parser.add_argument("--rate-limit", type=int, default=1_000_000, help="RATE_LIMIT_ACTIONS_PER_MINUTE на прогон")
+    parser.add_argument("--rest-latency", type=float, default=0.0, help="задержка поддельного REST Discord, мс")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--log-level", default="ERROR", help="уровень structlog")
+    parser.add_argument("--output", type=Path, help="записать JSON в файл (иначе stdout)")
+    return parser
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    args = build_parser().parse_args(argv)
+    for key, value in PLACEHOLDER_ENV.items():
+        os.environ.setdefault(key, value)
+    os.environ["RATE_LIMIT_ACTIONS_PER_MINUTE"] = str(args.rate_limit)
+
+    from src.utils.logging import setup_logging
+    setup_logging(level=args.log_level)
+
+    records, invalid = load_records(args.files, args.guild)
+    if invalid:
+        print(f"skipped {invalid} invalid line(s)", file=sys.stderr)
+    if not records:
+        sys.exit("no events to replay")
+    if args.guild is None:
+        args.guild = records[0].get("g")
+        print(f"replaying guild {args.guild} (pass --guild to choose another)", file=sys.stderr)
+
+    result = asyncio.run(run(args, records))
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    print(
+        f"{result['handled_events']} events ({result['recorded_sec']:.1f}s recorded) in {result['duration_sec']:.2f}s: "
+        f"{result['events_per_sec']:.0f} ev/s, p50 {result['latency']['p50_ms']:.2f} ms, "
+        f"p99 {result['latency']['p99_ms']:.2f} ms, errors {result['errors']}",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
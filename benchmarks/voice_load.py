@@ -0,0 +1,409 @@
+"""
+Нагрузочный бенчмарк голосовых событий: поток join/move/leave/mute через настоящий
+VoiceManager.on_voice_state_update с настоящими tracker, evaluator, stacking, actions и mute XP.
+
+Гильдия из N участников и M каналов (benchmarks.fakes), события генерируются по весам из
+текущего состояния (join — только тем, кто не в войсе, и т.д.) и отправляются задачами с
+ограничением concurrency — как discord.py диспатчит события. REST-вызовы действий и стакинга
+ждут --rest-latency и порождают ответные события gateway.
+
+Хранилище: --pool mock (MockPool из tests.fakes, без БД) или --pool postgres (DATABASE_URL; нужна
+применённая схема alembic). В postgres бенчмарк создаёт правила/списки с пометкой bench и
+удаляет их вместе с сессиями и логами подделок после прогона — запускайте на локальной БД.
+
+Результат — JSON (events/sec, p50/p90/p99 задержки обработчика, разбивка по типам событий,
+коммит git) в stdout или --output; --compare показывает изменение относительно прошлого файла.
+
+    python -m benchmarks.voice_load --members 2000 --channels 30 --events 20000 --output bench.json
+    python -m benchmarks.voice_load --compare bench.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from collections import Counter
+from dataclasses import replace
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Optional
+
+from benchmarks.fakes import FAKE_ID_BASE, FakeGuild, FakeMember, FakeVoiceState
+from tests.fakes import MockPool
+
+EVENT_TYPES = ("join", "move", "leave", "mute")
+DEFAULT_MIX = "join=4,move=3,leave=3,mute=2"
+BENCH_REASON = "bench"
+# Обязательные поля Settings (actions читает лимит действий) для прогона без .env
+PLACEHOLDER_ENV = {
+    "DISCORD_TOKEN": "benchmark",
+    "DISCORD_GUILD_ID": str(FAKE_ID_BASE),
+    "DATABASE_URL": "postgresql://localhost/benchmark",
+    "API_SECRET_KEY": "benchmark",
+}
+# Сравнение с прошлым прогоном: изменение хуже порога помечается как регрессия
+REGRESSION_THRESHOLD = 0.10
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, cwd=Path(__file__).resolve().parent,
+        ).stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Nearest-rank перцентиль по отсортированному списку (q в 0..1)."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def latency_summary(values_sec: list[float]) -> dict[str, float]:
+    values = sorted(v * 1000 for v in values_sec)
+    return {
+        "count": len(values),
+        "mean_ms": sum(values) / len(values) if values else 0.0,
+        "p50_ms": percentile(values, 0.50),
+        "p90_ms": percentile(values, 0.90),
+        "p99_ms": percentile(values, 0.99),
+        "max_ms": values[-1] if values else 0.0,
+    }
+
+
+def parse_mix(mix: str) -> dict[str, float]:
+    weights = {t: 0.0 for t in EVENT_TYPES}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in weights:
+            raise argparse.ArgumentTypeError(f"unknown event type {name!r} (expected {', '.join(EVENT_TYPES)})")
+        weights[name] = float(weight)
+    if not any(weights.values()):
+        raise argparse.ArgumentTypeError("mix has no positive weights")
+    return weights
+
+
+class _Bag:
+    """Множество участников с O(1) добавлением, удалением и случайным выбором."""
+
+    def __init__(self) -> None:
+        self._items: list[FakeMember] = []
+        self._index: dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def add(self, member: FakeMember) -> None:
+        if member.id not in self._index:
+            self._index[member.id] = len(self._items)
+            self._items.append(member)
+
+    def discard(self, member: FakeMember) -> None:
+        i = self._index.pop(member.id, None)
+        if i is None:
+            return
+        last = self._items.pop()
+        if last.id != member.id:
+            self._items[i] = last
+            self._index[last.id] = i
+
+    def choice(self, rng: random.Random) -> FakeMember:
+        return self._items[rng.randrange(len(self._items))]
+
+
+class EventGenerator:
+    """Следующее событие из текущего состояния гильдии; состояние обновляется сразу (как кэш discord.py)."""
+
+    def __init__(self, guild: FakeGuild, weights: dict[str, float], rng: random.Random) -> None:
+        self.guild = guild
+        self.rng = rng
+        self.types = [t for t in EVENT_TYPES if weights[t] > 0]
+        self.weights = [weights[t] for t in self.types]
+        self.idle = _Bag()
+        self.in_voice = _Bag()
+        for member in guild.members:
+            (self.in_voice if member.voice is not None else self.idle).add(member)
+
+    def track(self, member: FakeMember) -> None:
+        """Учесть изменение состояния, пришедшее не от генератора (REST-вызовы действий)."""
+        if member.voice is None:
+            self.in_voice.discard(member)
+            self.idle.add(member)
+        else:
+            self.idle.discard(member)
+            self.in_voice.add(member)
+
+    def next(self) -> tuple[str, FakeMember, Optional[FakeVoiceState], Optional[FakeVoiceState]]:
+        kind = self.rng.choices(self.types, self.weights)[0]
+        if kind == "join" and not self.idle:
+            kind = "move"
+        elif kind != "join" and not self.in_voice:
+            kind = "join"
+        channels = self.guild.voice_channels
+
+        if kind == "join":
+            member = self.idle.choice(self.rng)
+            after = FakeVoiceState(channel=self.rng.choice(channels))
+        else:
+            member = self.in_voice.choice(self.rng)
+            current = member.voice
+            if kind == "move":
+                others = [c for c in channels if c is not current.channel] or channels
+                after = replace(current, channel=self.rng.choice(others))
+            elif kind == "leave":
+                after = None
+            else:
+                muted = not (current.self_mute and current.self_deaf)
+                after = replace(current, self_mute=muted, self_deaf=muted)
+        before = self.guild.set_voice(member, after)
+        self.track(member)
+        return kind, member, before, after
+
+
+async def seed(pool: Any, guild: FakeGuild, args: argparse.Namespace, rng: random.Random) -> list[tuple[int, int, int]]:
+    """Правила, чёрный список и пары стакинга. Возвращает пары (uid1, uid2, target_channel_id)."""
+    from src.db.repositories import rules_repo, users_repo
+
+    for i in range(args.rules):
+        await rules_repo.create_rule(pool, guild.id, {
+            "name": f"{BENCH_REASON}: blacklist {i}",
+            "description": BENCH_REASON,
+            "target_list": "blacklist",
+            "action_type": "kick" if i % 2 == 0 else "mute",
+            "is_dry_run": i % 2 == 1,
+            "priority": i,
+        })
+    blacklisted = rng.sample(guild.members, int(len(guild.members) * args.blacklist_ratio))
+    for member in blacklisted:
+        await users_repo.add_user(pool, guild.id, member.id, "blacklist", username=member.name, reason=BENCH_REASON)
+
+    pairs = []
+    shuffled = rng.sample(guild.members, min(len(guild.members), args.pairs * 2))
+    target = guild.voice_channels[0].id
+    for a, b in zip(shuffled[::2], shuffled[1::2]):
+        pairs.append((a.id, b.id, target))
+    return pairs
+
+
+async def _cleanup_postgres(pool: Any) -> None:
+    """Удалить всё, что создал прогон: данные подделок (ID >= FAKE_ID_BASE) и записи с пометкой bench."""
+    await pool.execute("DELETE FROM voice_sessions WHERE discord_id >= $1", FAKE_ID_BASE)
+    await pool.execute("DELETE FROM action_logs WHERE discord_id >= $1", FAKE_ID_BASE)
+    await pool.execute("DELETE FROM mute_sessions WHERE discord_id >= $1", FAKE_ID_BASE)
+    await pool.execute("DELETE FROM user_lists WHERE discord_id >= $1", FAKE_ID_BASE)
+    await pool.execute("DELETE FROM rules WHERE description = $1", BENCH_REASON)
+
+
+def build_voice_manager(pool: Any, guild: FakeGuild, pairs: list[tuple[int, int, int]]) -> Any:
+    """VoiceManager на «боте» с настоящими tracker, evaluator, actions, stacking и mute XP."""
+    from src.bot.cogs.voice_manager import VoiceManager
+    from src.db.repositories import logs_repo, rules_repo, users_repo
+    from src.engine import actions, evaluator, tracker
+    from src.engine.mute_xp_service import MuteXPService
+    from src.engine.stacking import PairRule, StackingDetector
+
+    stacking = StackingDetector()
+    stacking.load_pairs([PairRule(*p, guild.id) for p in pairs])
+    bot = SimpleNamespace(
+        pool=pool,
+        tracker=tracker,
+        rules_repo=rules_repo,
+        users_repo=users_repo,
+        logs_repo=logs_repo,
+        evaluator=evaluator,
+        actions=actions,
+        stacking_detector=stacking,
+        guild_id=guild.id,
+        guild_ids=[guild.id],
+    )
+    bot.mute_xp_service = MuteXPService(bot=bot, pool=pool, notifier=None)
+    return VoiceManager(bot)
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    from src.engine import tracker
+
+    rng = random.Random(args.seed)
+    guild = FakeGuild(args.members, args.channels, rest_latency=args.rest_latency / 1000)
+
+    if args.pool == "postgres":
+        from src.db import database
+        pool = await database.init_pool(max_size=args.pool_size)
+    else:
+        pool = MockPool()
+
+    pairs = await seed(pool, guild, args, rng)
+    cog = build_voice_manager(pool, guild, pairs)
+
+    generator = EventGenerator(guild, args.mix, rng)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies: dict[str, list[float]] = {t: [] for t in (*EVENT_TYPES, "gateway")}
+    errors: Counter[str] = Counter()
+    handlers: set[asyncio.Task[None]] = set()
+
+    async def handle(
+        kind: str,
+        member: FakeMember,
+        before: Optional[FakeVoiceState],
+        after: Optional[FakeVoiceState],
+    ) -> None:
+        start = time.perf_counter()
+        try:
+            await cog.on_voice_state_update(member, before or FakeVoiceState(), after or FakeVoiceState())
+        except Exception as e:
+            errors[type(e).__name__] += 1
+        finally:
+            latencies[kind].append(time.perf_counter() - start)
+            if kind != "gateway":
+                semaphore.release()
+
+    def dispatch(kind: str, member: FakeMember, before: Optional[FakeVoiceState], after: Optional[FakeVoiceState]) -> None:
+        task = asyncio.get_running_loop().create_task(handle(kind, member, before, after))
+        handlers.add(task)
+        task.add_done_callback(handlers.discard)
+
+    def on_gateway_event(member: FakeMember, before: Optional[FakeVoiceState], after: Optional[FakeVoiceState]) -> None:
+        # Ответное событие на move/kick/mute бота; слот concurrency не занимает
+        generator.track(member)
+        dispatch("gateway", member, before, after)
+
+    guild.on_gateway_event = on_gateway_event
+
+    try:
+        for _ in range(args.warmup):
+            await semaphore.acquire()
+            dispatch(*generator.next())
+        await drain()
+        for values in latencies.values():
+            values.clear()
+        errors.clear()
+
+        started = time.perf_counter()
+        for _ in range(args.events):
+            await semaphore.acquire()
+            dispatch(*generator.next())
+        await drain()
+        duration = time.perf_counter() - started
+    finally:
+        tracker._sessions.clear()
+        if args.pool == "postgres":
+            await _cleanup_postgres(pool)
+            await database.close_pool()
+
+    total = sum(len(v) for v in latencies.values())
+    return {
+        "benchmark": "voice_load",
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "params": {
+            "pool": args.pool,
+            "members": args.members,
+            "channels": args.channels,
+            "events": args.events,
+            "mix": args.mix,
+            "concurrency": args.concurrency,
+            "rules": args.rules,
+            "blacklist_ratio": args.blacklist_ratio,
+            "pairs": args.pairs,
+            "rate_limit": args.rate_limit,
+            "rest_latency_ms": args.rest_latency,
+            "seed": args.seed,
+        },
+        "duration_sec": duration,
+        "handled_events": total,
+        "errors": sum(errors.values()),
+        "error_types": dict(errors),
+        "events_per_sec": total / duration if duration else 0.0,
+        "latency": latency_summary([v for values in latencies.values() for v in values]),
+        "by_type": {t: latency_summary(v) for t, v in latencies.items() if v},
+    }
+
+
+async def drain() -> None:
+    """Дождаться обработчиков и фоновых задач, которые они породили (broadcast, mute XP)."""
+    current = asyncio.current_task()
+    while True:
+        pending = [t for t in asyncio.all_tasks() if t is not current and not t.done()]
+        if not pending:
+            return
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+def compare(result: dict[str, Any], baseline: dict[str, Any]) -> list[str]:
+    """Строки отчёта «было → стало» по throughput и перцентилям; регрессии помечены."""
+    lines = [f"baseline {baseline.get('commit')} → current {result.get('commit')}"]
+    metrics = [("events_per_sec", result["events_per_sec"], baseline["events_per_sec"], True)]
+    for key in ("p50_ms", "p90_ms", "p99_ms"):
+        metrics.append((key, result["latency"][key], baseline["latency"][key], False))
+    for name, current, before, higher_is_better in metrics:
+        change = (current - before) / before if before else 0.0
+        worse = -change if higher_is_better else change
+        mark = "  REGRESSION" if worse > REGRESSION_THRESHOLD else ""
+        lines.append(f"  {name:15} {before:12.3f} → {current:12.3f} ({change:+.1%}){mark}")
+    return lines
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0], formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pool", choices=("mock", "postgres"), default="mock")
+    parser.add_argument("--pool-size", type=int, default=10, help="max_size пула для --pool postgres")
+    parser.add_argument("--members", type=int, default=1000)
+    parser.add_argument("--channels", type=int, default=20)
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--warmup", type=int, default=500, help="события до начала замера")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"веса событий, по умолчанию {DEFAULT_MIX}")
+    parser.add_argument("--concurrency", type=int, default=50, help="событий в обработке одновременно")
+    parser.add_argument("--rules", type=int, default=4, help="правил по чёрному списку (чётные — kick, нечётные — dry run mute)")
+    parser.add_argument("--blacklist-ratio", type=float, default=0.05)
+    parser.add_argument("--pairs", type=int, default=10, help="пар стакинга")
+    parser.add_argument(
+        "--rate-limit", type=int, default=1_000_000,
+        help="RATE_LIMIT_ACTIONS_PER_MINUTE на прогон (по умолчанию без ограничения — действия доходят до REST)",
+    )
+    parser.add_argument("--rest-latency", type=float, default=0.0, help="задержка поддельного REST Discord, мс")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--log-level", default="ERROR", help="уровень structlog (INFO — с затратами на логи)")
+    parser.add_argument("--output", type=Path, help="записать JSON в файл (иначе stdout)")
+    parser.add_argument("--compare", type=Path, help="JSON прошлого прогона для сравнения")
+    return parser
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    args = build_parser().parse_args(argv)
+    if args.pool == "mock":
+        for key, value in PLACEHOLDER_ENV.items():
+            os.environ.setdefault(key, value)
+    os.environ["RATE_LIMIT_ACTIONS_PER_MINUTE"] = str(args.rate_limit)
+
+    from src.utils.logging import setup_logging
+    setup_logging(level=args.log_level)
+
+    result = asyncio.run(run(args))
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    print(
+        f"{result['handled_events']} events in {result['duration_sec']:.2f}s: "
+        f"{result['events_per_sec']:.0f} ev/s, p50 {result['latency']['p50_ms']:.2f} ms, "
+        f"p99 {result['latency']['p99_ms']:.2f} ms, errors {result['errors']}",
+        file=sys.stderr,
+    )
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        print("\n".join(compare(result, baseline)), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
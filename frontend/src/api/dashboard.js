@@ -1,3 +1,5 @@
 import client from './client'
 
 export const getDashboard = () => client.get('/dashboard').then(r => r.data)
+
+export const getDashboardBootstrap = () => client.get('/dashboard/bootstrap').then(r => r.data)
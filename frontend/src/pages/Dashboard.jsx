@@ -10,8 +10,7 @@ import {
   BoltOutlined,
   HistoryOutlined,
 } from '@mui/icons-material'
-import { getDashboard } from '../api/dashboard'
-import { getStatsOverview } from '../api/stats'
+import { getDashboardBootstrap } from '../api/dashboard'
 import { StatCard, ActionChip, PageHeader, LoadingState, ErrorState, EmptyState, DiscordId } from '../components/ui'
 import { PageWrapper } from '../styles/motion'
 import Timestamp from '../components/Timestamp'
@@ -25,9 +24,10 @@ export default function Dashboard() {
 
   const fetchData = useCallback(async () => {
     try {
-      const [dash, st] = await Promise.all([getDashboard(), getStatsOverview()])
+      // Один запрос: правила, логи, статистика, онлайн и участники
+      const dash = await getDashboardBootstrap()
       setDashboard(dash)
-      setStats(st)
+      setStats(dash.stats)
       setRecentLogs(dash.recent_logs || [])
     } catch (e) {
       setError(e.message)
@@ -43,7 +43,7 @@ export default function Dashboard() {
     es.onmessage = (e) => {
       const event = JSON.parse(e.data)
       if (event.type === 'ping') return
-      if (event.type === 'voice_update') fetchData()
+      if (event.type === 'voice_update' || event.type === 'voice_batch' || event.type === 'resync') fetchData()
       if (event.type === 'action_log') {
         setRecentLogs(prev => [
           {
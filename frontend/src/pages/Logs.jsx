@@ -1,4 +1,4 @@
-import { useState, useEffect, useCallback } from 'react'
+import { useState, useEffect, useCallback, useRef } from 'react'
 import {
   Box, Button, TextField, Typography,
   FormControl, InputLabel, Select, MenuItem,
@@ -22,13 +22,17 @@ export default function Logs() {
   const [paginationModel, setPaginationModel] = useState({ page: 0, pageSize: 50 })
   const [filters, setFilters] = useState({ action_type: '', discord_id: '', rule_id: '', date_from: '', date_to: '' })
   const [appliedFilters, setAppliedFilters] = useState({})
+  // cursors[page] — курсор, с которого начинается страница (keyset-пагинация API)
+  const cursors = useRef([null])
 
   const load = useCallback(async (page, pageSize, f) => {
     setLoading(true)
     try {
+      const cursor = cursors.current[page]
+      if (page > 0 && !cursor) return
       const params = {
         limit: pageSize,
-        offset: page * pageSize,
+        ...(cursor && { cursor }),
         ...(f.discord_id && { discord_id: f.discord_id }),
         ...(f.action_type && { action_type: f.action_type }),
         ...(f.rule_id && { rule_id: f.rule_id }),
@@ -36,10 +40,11 @@ export default function Logs() {
         ...(f.date_to && { date_to: new Date(f.date_to).toISOString() }),
       }
       const data = await getLogs(params)
-      setLogs(data)
+      cursors.current[page + 1] = data.next_cursor
+      setLogs(data.items)
       setRowCount(prev => {
-        const fetched = page * pageSize + data.length
-        return data.length < pageSize ? fetched : Math.max(prev, fetched + 1)
+        const fetched = page * pageSize + data.items.length
+        return data.next_cursor ? Math.max(prev, fetched + 1) : fetched
       })
     } catch (e) {
       setError(e.message)
@@ -52,13 +57,25 @@ export default function Logs() {
     load(paginationModel.page, paginationModel.pageSize, appliedFilters)
   }, [paginationModel, appliedFilters, load])
 
+  const handlePaginationChange = (model) => {
+    // Смена размера страницы сдвигает границы — курсоры строятся заново с первой страницы
+    if (model.pageSize !== paginationModel.pageSize) {
+      cursors.current = [null]
+      setPaginationModel({ ...model, page: 0 })
+      return
+    }
+    setPaginationModel(model)
+  }
+
   const handleSearch = () => {
+    cursors.current = [null]
     setAppliedFilters({ ...filters })
     setPaginationModel(m => ({ ...m, page: 0 }))
   }
 
   const handleReset = () => {
     const empty = { action_type: '', discord_id: '', rule_id: '', date_from: '', date_to: '' }
+    cursors.current = [null]
     setFilters(empty)
     setAppliedFilters({})
     setPaginationModel(m => ({ ...m, page: 0 }))
@@ -190,7 +207,7 @@ export default function Logs() {
         paginationMode="server"
         rowCount={rowCount}
         paginationModel={paginationModel}
-        onPaginationModelChange={setPaginationModel}
+        onPaginationModelChange={handlePaginationChange}
         pageSizeOptions={[25, 50, 100]}
         loading={loading}
         autoHeight
@@ -2,15 +2,52 @@
 FastAPI приложение Voice Bot API.
 Роутеры: rules, users, schedules, logs, dashboard, stats, health.
 Пул БД устанавливается извне (main) в app.state.pool.
+
+Отдельный запуск (без бота, в т.ч. несколько воркеров):
+    SSE_BACKEND=postgres uvicorn src.api.app:app --workers 4
+— тогда пул создаётся в lifespan, а SSE-события приходят от бота через LISTEN.
 """
-from fastapi import FastAPI
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 
-from src.api.routers import auth, dashboard, guild, kick_targets, logs, members, mute_levels, rules, schedules, settings, stacking_pairs, stats, users
+from src.api.routers import auth, dashboard, debug, guild, kick_targets, logs, members, mute_levels, rules, schedules, settings, stacking_pairs, stats, users, voice, voice_sessions
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Если пул не передан из main (API запущен отдельно) — поднять пул и LISTEN для SSE и версий конфигурации."""
+    standalone = getattr(app.state, "pool", None) is None
+    if standalone:
+        from src.api import config_cache
+        from src.api.sse import broadcaster
+        from src.api.sse_backends import configure_broadcaster
+        from src.config.settings import get_settings, load_config_yaml
+        from src.db import database
+        from src.utils.logging import setup_logging
+
+        settings = get_settings()
+        setup_logging(config_yaml=load_config_yaml())
+        await database.init_pool(slow_query_ms=settings.DB_SLOW_QUERY_MS)
+        app.state.pool = database.get_pool()
+        configure_broadcaster(broadcaster, app.state.pool, settings.SSE_BACKEND, publish=False)
+        config_cache.attach_listeners()
+        database.start_config_listener()
+    try:
+        yield
+    finally:
+        if standalone:
+            from src.db import database
+
+            await database.close_pool()
+            app.state.pool = None
+
 
 app = FastAPI(
     title="Voice Bot API",
     description="API для управления правилами и списками Discord Voice Bot",
+    lifespan=lifespan,
 )
 
 
@@ -20,6 +57,26 @@ def health() -> dict[str, str]:
     """Health check для контейнера и балансировщиков. Без аутентификации."""
     return {"status": "ok"}
 
+
+@app.get("/metrics", include_in_schema=False)
+def metrics(request: Request) -> Response:
+    """
+    Метрики процесса в формате Prometheus (src.utils.metrics).
+    При заданном METRICS_TOKEN требуется заголовок Authorization: Bearer <token>.
+    """
+    from src.config.settings import get_settings
+    from src.utils.metrics import CONTENT_TYPE, registry
+
+    token = get_settings().METRICS_TOKEN
+    if token and request.headers.get("authorization") != f"Bearer {token}":
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    return Response(content=registry.render(), media_type=CONTENT_TYPE)
+
+
+# Только /metrics — для процессов бота без API (METRICS_PORT, python -m src.run_shards)
+metrics_app = FastAPI(openapi_url=None, docs_url=None, redoc_url=None)
+metrics_app.add_api_route("/metrics", metrics, include_in_schema=False)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost", "http://localhost:80", "http://localhost:5173"],
@@ -41,3 +98,6 @@ app.include_router(settings.router, prefix="/api", tags=["settings"])
 app.include_router(members.router, prefix="/api", tags=["members"])
 app.include_router(mute_levels.router, prefix="/api", tags=["mute-levels"])
 app.include_router(guild.router, prefix="/api", tags=["guild"])
+app.include_router(voice_sessions.router, prefix="/api", tags=["voice-sessions"])
+app.include_router(voice.router, prefix="/api", tags=["voice"])
+app.include_router(debug.router, prefix="/api", tags=["debug"])
@@ -0,0 +1,129 @@
+"""
+Условные GET для конфигурационных списков (rules, user_lists, schedules, kick_targets,
+stacking_pairs, mute_levels): ETag по версии конфигурации и кэш сериализованного ответа.
+
+Версия — счётчик в памяти процесса на каждый kind (имя таблицы). Увеличивается:
+- сразу при database.notify_config_changed() из этого процесса (свои записи видны без задержки);
+- по NOTIFY config_versions от триггеров таблиц (миграция 007) — любые записи: бот,
+  планировщик, другие API-воркеры, ручной SQL.
+
+ETag включает boot id процесса, поэтому ETag другого воркера или до рестарта
+просто не совпадёт (ответ 200), а не даст ложный 304. Ключ ответа (гильдия, тип списка)
+тоже входит в ETag: у списков разных гильдий одна версия kind, но разное содержимое.
+"""
+import json
+import uuid
+from collections.abc import Awaitable, Callable, Hashable
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from src.db import database
+from src.utils.logging import get_logger
+
+logger = get_logger("api.config_cache")
+
+CONFIG_VERSIONS_CHANNEL = "config_versions"
+CONFIG_KINDS = ("rules", "user_lists", "schedules", "kick_targets", "stacking_pairs", "mute_levels")
+
+
+@dataclass(frozen=True)
+class _CachedBody:
+    version: int
+    etag: str
+    body: bytes
+
+
+class ConfigVersions:
+    """Версии конфигурации по kind и кэш тел ответов, привязанных к версии."""
+
+    def __init__(self) -> None:
+        self._boot_id = uuid.uuid4().hex[:8]
+        self._versions: dict[str, int] = {}
+        self._bodies: dict[tuple[str, Hashable], _CachedBody] = {}
+
+    def version(self, kind: str) -> int:
+        return self._versions.get(kind, 0)
+
+    def etag(self, kind: str, key: Hashable = None) -> str:
+        return self._make_etag(kind, key, self.version(kind))
+
+    def _make_etag(self, kind: str, key: Hashable, version: int) -> str:
+        parts = key if isinstance(key, tuple) else (() if key is None else (key,))
+        return '"' + ".".join([self._boot_id, kind, *map(str, parts), str(version)]) + '"'
+
+    def bump(self, kind: Optional[str] = None) -> None:
+        """Увеличить версию kind (None — все kinds) и выбросить устаревшие тела."""
+        kinds = CONFIG_KINDS if kind is None else (kind,)
+        for k in kinds:
+            self._versions[k] = self.version(k) + 1
+        self._bodies = {key: v for key, v in self._bodies.items() if key[0] not in kinds}
+
+    def on_config_changed(self, change: database.ConfigChange) -> None:
+        self.bump(change.kind)
+
+    def on_table_changed(self, payload: str) -> None:
+        self.bump(payload if payload in CONFIG_KINDS else None)
+
+    def get_body(self, kind: str, key: Hashable) -> Optional[_CachedBody]:
+        cached = self._bodies.get((kind, key))
+        if cached is None or cached.version != self.version(kind):
+            return None
+        return cached
+
+    def store_body(self, kind: str, key: Hashable, version: int, body: bytes) -> _CachedBody:
+        cached = _CachedBody(version=version, etag=self._make_etag(kind, key, version), body=body)
+        # Если за время запроса к БД версия ушла вперёд — не кэшируем устаревшие данные
+        if version == self.version(kind):
+            self._bodies[(kind, key)] = cached
+        return cached
+
+
+config_versions = ConfigVersions()
+
+
+def attach_listeners() -> None:
+    """
+    Подписать версии на изменения конфигурации. Вызывать в API-процессе
+    до database.start_config_listener().
+    """
+    database.register_config_listener(config_versions.on_config_changed, include_local=True)
+    database.register_channel_listener(CONFIG_VERSIONS_CHANNEL, config_versions.on_table_changed)
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag in candidates or "*" in candidates
+
+
+async def conditional_json(
+    request: Request,
+    kind: str,
+    load: Callable[[], Awaitable[Any]],
+    key: Hashable = None,
+) -> Response:
+    """
+    Ответ списка конфигурации с ETag. If-None-Match с текущей версией — 304 без запроса к БД;
+    иначе тело из кэша (та же версия) или load() → сериализация один раз → кэш.
+    """
+    headers = {"Cache-Control": "no-cache"}
+    etag = config_versions.etag(kind, key)
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers={**headers, "ETag": etag})
+
+    cached = config_versions.get_body(kind, key)
+    if cached is None:
+        version = config_versions.version(kind)
+        data = await load()
+        body = json.dumps(jsonable_encoder(data), separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        cached = config_versions.store_body(kind, key, version, body)
+    return Response(
+        content=cached.body,
+        media_type="application/json",
+        headers={**headers, "ETag": cached.etag},
+    )
@@ -1,11 +1,13 @@
 """
-Зависимости FastAPI: пул БД, аутентификация, scheduler, бот.
+Зависимости FastAPI: пул БД, аутентификация, scheduler, бот, гильдия запроса;
+разбор общих query-параметров.
 """
-from typing import Annotated, Optional
+from datetime import datetime
+from typing import Annotated, Any, Optional
 
 import asyncpg
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from fastapi import Depends, HTTPException, Request
+from fastapi import Depends, Header, HTTPException, Query, Request
 from jose import JWTError, jwt
 
 from src.config.settings import get_settings
@@ -56,9 +58,54 @@ async def get_current_user(request: Request) -> dict:
         raise HTTPException(status_code=401, detail="Invalid token")
 
 
+async def get_allowlisted_user(user: Annotated[dict, Depends(get_current_user)]) -> dict:
+    """
+    get_current_user + повторная проверка ALLOWED_DISCORD_IDS — для опасных эндпоинтов
+    (/api/debug/*): JWT живёт JWT_EXPIRE_HOURS и переживает удаление из allowlist.
+    """
+    if int(user["sub"]) not in get_settings().ALLOWED_DISCORD_IDS:
+        raise HTTPException(status_code=403, detail="Access denied")
+    return user
+
+
+async def get_guild_id(
+    guild_id: Annotated[Optional[int], Query(description="ID гильдии; по умолчанию — DISCORD_GUILD_ID")] = None,
+    x_guild_id: Annotated[Optional[int], Header(description="ID гильдии (альтернатива параметру guild_id)")] = None,
+) -> int:
+    """
+    Гильдия, к которой относится запрос: параметр guild_id, заголовок X-Guild-Id или основная
+    гильдия (DISCORD_GUILD_ID). Гильдия не из DISCORD_GUILD_ID/DISCORD_GUILD_IDS — HTTP 404.
+    """
+    settings = get_settings()
+    selected = guild_id if guild_id is not None else x_guild_id
+    if selected is None:
+        return settings.DISCORD_GUILD_ID
+    if selected not in settings.guild_ids:
+        raise HTTPException(status_code=404, detail="Guild not found")
+    return selected
+
+
 async def get_bot(request: Request):
     """Возвращает экземпляр бота из app.state.bot."""
     bot = getattr(request.app.state, "bot", None)
     if bot is None:
         raise HTTPException(status_code=503, detail="Bot not available")
     return bot
+
+
+def serves_guild(bot: Any, guild_id: int) -> bool:
+    """
+    Состояние гильдии (трекер, occupancy) есть в памяти этого процесса: бот запущен здесь и
+    гильдия на его шардах. При нескольких процессах (SHARD_IDS) API работает в одном из них.
+    """
+    return bot is not None and guild_id in (getattr(bot, "guild_ids", None) or ())
+
+
+def parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    """Дата query-параметра в ISO 8601 (в том числе с суффиксом Z); пусто или невалидно — None."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
@@ -0,0 +1,136 @@
+"""
+Кэш сериализованных участников для /members, /members/batch и bootstrap дашборда.
+
+member_to_dict каждый раз вычисляет display_avatar.url, label и собирает dict, а дашборд
+резолвит одни и те же сотни ID из логов снова и снова. MemberPayloadCache — ограниченный LRU
+готовых payload'ов: batch-резолвинг сводится к поиску в словаре на каждый ID.
+
+- Ключ — (guild_id, user_id): ник и аватар на сервере у одного пользователя в разных
+  гильдиях разные.
+- Записи участников живут до вытеснения или инвалидации из cog'а member_sync
+  (on_member_update, on_user_update, join/remove).
+- Промахи (заглушка Unknown) тоже кэшируются, но на MISS_TTL секунд: участник мог зайти
+  на сервер, а событие join до API-процесса не дошло.
+- В slim-режиме (гильдия не чанкована) отсутствие в guild.members ничего не значит:
+  resolve_many догружает недостающих через gateway, и этот LRU — единственное место,
+  где они хранятся.
+"""
+import time
+from collections import OrderedDict
+from collections.abc import Iterable
+from typing import Any, Optional
+
+from src.engine.member_index import fetch_members
+
+MEMBER_CACHE_SIZE = 5000
+MISS_TTL = 60.0
+
+
+def member_to_dict(member) -> dict:
+    """Сериализовать участника Discord в dict для API ответа."""
+    return {
+        "id": str(member.id),
+        "display_name": member.display_name,
+        "username": member.name,
+        "avatar": str(member.display_avatar.url) if member.display_avatar else None,
+        "label": f"{member.display_name} (@{member.name})",
+    }
+
+
+def unknown_member_dict(member_id: str) -> dict:
+    """Заглушка для участника которого нет на сервере."""
+    return {
+        "id": member_id,
+        "display_name": "Unknown",
+        "username": member_id,
+        "avatar": None,
+        "label": f"Unknown (@{member_id})",
+    }
+
+
+class MemberPayloadCache:
+    """LRU: (guild_id, user_id) → (payload, срок годности промаха или None)."""
+
+    def __init__(self, maxsize: int = MEMBER_CACHE_SIZE, miss_ttl: float = MISS_TTL) -> None:
+        self._maxsize = maxsize
+        self._miss_ttl = miss_ttl
+        self._items: OrderedDict[tuple[int, int], tuple[dict[str, Any], Optional[float]]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _cached(self, key: tuple[int, int]) -> Optional[dict[str, Any]]:
+        item = self._items.get(key)
+        if item is None:
+            return None
+        payload, expires_at = item
+        if expires_at is not None and expires_at <= time.monotonic():
+            return None
+        self._items.move_to_end(key)
+        return payload
+
+    def _store(self, key: tuple[int, int], payload: dict[str, Any], expires_at: Optional[float]) -> dict[str, Any]:
+        self._items[key] = (payload, expires_at)
+        self._items.move_to_end(key)
+        if len(self._items) > self._maxsize:
+            self._items.popitem(last=False)
+        return payload
+
+    def put(self, member: Any, guild_id: Optional[int] = None) -> dict[str, Any]:
+        """Сериализовать участника и положить в кэш (гильдия по умолчанию — member.guild)."""
+        if guild_id is None:
+            guild_id = member.guild.id
+        return self._store((guild_id, member.id), member_to_dict(member), None)
+
+    def _put_miss(self, guild_id: int, member_id: int) -> dict[str, Any]:
+        return self._store(
+            (guild_id, member_id), unknown_member_dict(str(member_id)), time.monotonic() + self._miss_ttl,
+        )
+
+    def get(self, guild: Any, member_id: int) -> dict[str, Any]:
+        """Payload участника из кэша или из guild.get_member (с сохранением в кэш)."""
+        cached = self._cached((guild.id, member_id))
+        if cached is not None:
+            return cached
+        member = guild.get_member(member_id)
+        return self.put(member, guild.id) if member is not None else self._put_miss(guild.id, member_id)
+
+    async def resolve_many(self, guild: Any, member_ids: Iterable[int]) -> dict[int, dict[str, Any]]:
+        """
+        Payload'ы для набора ID: кэш → guild.get_member → (нечанкованная гильдия) query_members.
+        Ненайденные — заглушка Unknown с TTL.
+        """
+        result: dict[int, dict[str, Any]] = {}
+        missing: list[int] = []
+        for member_id in dict.fromkeys(member_ids):
+            cached = self._cached((guild.id, member_id))
+            if cached is not None:
+                result[member_id] = cached
+                continue
+            member = guild.get_member(member_id)
+            if member is not None:
+                result[member_id] = self.put(member, guild.id)
+            else:
+                missing.append(member_id)
+
+        if missing and not guild.chunked:
+            for member in await fetch_members(guild, missing):
+                result[member.id] = self.put(member, guild.id)
+        for member_id in missing:
+            if member_id not in result:
+                result[member_id] = self._put_miss(guild.id, member_id)
+        return result
+
+    def invalidate(self, member_id: int, guild_id: Optional[int] = None) -> None:
+        """Сбросить участника в гильдии; без guild_id — во всех (смена username/аватара)."""
+        if guild_id is not None:
+            self._items.pop((guild_id, member_id), None)
+            return
+        for key in [k for k in self._items if k[1] == member_id]:
+            del self._items[key]
+
+    def clear(self) -> None:
+        self._items.clear()
+
+
+member_payloads = MemberPayloadCache()
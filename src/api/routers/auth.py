@@ -5,7 +5,7 @@ GET  /auth/discord/callback — обмен кода на токен, устан
 POST /auth/logout           — удалить cookie
 GET  /auth/me               — текущий пользователь
 """
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from urllib.parse import urlencode
 
 import httpx
@@ -84,7 +84,7 @@ async def discord_callback(code: str) -> RedirectResponse:
         "sub": discord_user["id"],
         "username": discord_user["username"],
         "avatar": avatar_url,
-        "exp": datetime.utcnow() + timedelta(hours=settings.JWT_EXPIRE_HOURS),
+        "exp": datetime.now(timezone.utc) + timedelta(hours=settings.JWT_EXPIRE_HOURS),
     }
     token = jwt.encode(payload, settings.JWT_SECRET, algorithm="HS256")
 
@@ -1,71 +1,220 @@
 """
 Роутер дашборда: агрегация активных правил, последних логов, числа в войсе.
-SSE endpoint для real-time обновлений.
+Bootstrap для первой загрузки одним запросом. SSE endpoint для real-time обновлений.
 """
 import asyncio
-import json
-from typing import Annotated
+from datetime import datetime
+from typing import Annotated, Any, Optional
 
 import asyncpg
-from fastapi import APIRouter, Depends, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sse_starlette.sse import EventSourceResponse
 
-from src.api.deps import get_current_user, get_db_pool
-from src.api.sse import broadcaster
-from src.api.schemas import ActionLogResponse, DashboardResponse, RuleResponse
+from src.api.deps import get_current_user, get_db_pool, get_guild_id, serves_guild
+from src.api.routers.guild import serialize_roles
+from src.api.member_cache import member_payloads, unknown_member_dict
+from src.api.sse import PING_FRAME, SSEFilter, broadcaster
+from src.api.schemas import (
+    ActionLogResponse,
+    DashboardBootstrapResponse,
+    DashboardResponse,
+    OnlineUser,
+    RuleResponse,
+    StatsOverviewResponse,
+)
+from src.api.streaming import json_response
 from src.db.repositories import logs_repo, rules_repo
+from src.engine import tracker
+from src.engine.occupancy import get_occupancy
 
 router = APIRouter()
 
 DASHBOARD_RECENT_LOGS_LIMIT = 20
 
 
+def _parse_csv(value: Optional[str]) -> Optional[frozenset[str]]:
+    """'a, b,c' → frozenset({'a', 'b', 'c'}); пустое значение — без фильтра."""
+    if not value or not value.strip():
+        return None
+    return frozenset(v.strip() for v in value.split(",") if v.strip())
+
+
+def _parse_id_csv(value: Optional[str], name: str) -> Optional[frozenset[int]]:
+    items = _parse_csv(value)
+    if items is None:
+        return None
+    try:
+        return frozenset(int(v) for v in items)
+    except ValueError:
+        raise HTTPException(status_code=422, detail=f"{name} must be comma-separated integers")
+
+
 @router.get("/dashboard", response_model=DashboardResponse)
 async def get_dashboard(
+    request: Request,
     _: Annotated[dict, Depends(get_current_user)],
     pool: Annotated[asyncpg.Pool, Depends(get_db_pool)],
+    guild_id: Annotated[int, Depends(get_guild_id)],
 ) -> DashboardResponse:
     """
-    Агрегация: активные правила, последние N логов, число активных голосовых сессий.
+    Агрегация по гильдии: активные правила, последние N логов, число активных голосовых сессий.
     """
-    active_rules = await rules_repo.get_active_rules(pool, channel_id=None)
-    recent_logs = await logs_repo.get_logs(
-        pool,
-        filters=None,
-        limit=DASHBOARD_RECENT_LOGS_LIMIT,
-        offset=0,
+    active_rules, recent_logs, voice_online_count = await asyncio.gather(
+        rules_repo.get_active_rules(pool, guild_id, channel_id=None),
+        logs_repo.get_logs(pool, guild_id, filters=None, limit=DASHBOARD_RECENT_LOGS_LIMIT),
+        _voice_online_count(request, pool, guild_id),
     )
+    return DashboardResponse(
+        active_rules=[RuleResponse(**r) for r in active_rules],
+        recent_logs=[ActionLogResponse(**r) for r in recent_logs],
+        voice_online_count=voice_online_count,
+    )
+
+
+async def _voice_online_count(request: Request, pool: asyncpg.Pool, guild_id: int) -> int:
+    """Число людей в войсе: из памяти бота (O(1)), если гильдия в этом процессе, иначе COUNT по открытым сессиям."""
+    if serves_guild(getattr(request.app.state, "bot", None), guild_id):
+        return get_occupancy(guild_id).count()
     row = await pool.fetchrow(
-        "SELECT COUNT(*)::int AS cnt FROM voice_sessions WHERE left_at IS NULL"
+        "SELECT COUNT(*)::int AS cnt FROM voice_sessions WHERE guild_id = $1 AND left_at IS NULL",
+        guild_id,
     )
-    voice_online_count = row["cnt"] if row else 0
+    return row["cnt"] if row else 0
 
-    return DashboardResponse(
+
+async def _stats_overview(pool: asyncpg.Pool, guild_id: int) -> StatsOverviewResponse:
+    """Итоги по action_logs гильдии одним запросом (итог = сумма по типам, включая NULL)."""
+    rows = await pool.fetch(
+        "SELECT action_type, COUNT(*)::int AS cnt FROM action_logs WHERE guild_id = $1 GROUP BY action_type",
+        guild_id,
+    )
+    return StatsOverviewResponse(
+        total_actions=sum(r["cnt"] for r in rows),
+        actions_by_type={r["action_type"]: r["cnt"] for r in rows if r["action_type"] is not None},
+    )
+
+
+async def _open_sessions_from_db(pool: asyncpg.Pool, guild_id: int) -> list[tuple[int, int, datetime]]:
+    """Открытые сессии из БД — когда трекер гильдии в другом процессе (API без бота или чужой шард)."""
+    rows = await pool.fetch(
+        "SELECT discord_id, channel_id, joined_at FROM voice_sessions WHERE guild_id = $1 AND left_at IS NULL",
+        guild_id,
+    )
+    return [(r["discord_id"], r["channel_id"], r["joined_at"]) for r in rows]
+
+
+def _ready_guild(request: Request, guild_id: int) -> Any:
+    bot = getattr(request.app.state, "bot", None)
+    if bot is None or not bot.is_ready():
+        return None
+    return bot.get_guild(guild_id)
+
+
+@router.get("/dashboard/bootstrap", response_model=DashboardBootstrapResponse)
+async def get_dashboard_bootstrap(
+    request: Request,
+    _: Annotated[dict, Depends(get_current_user)],
+    pool: Annotated[asyncpg.Pool, Depends(get_db_pool)],
+    guild_id: Annotated[int, Depends(get_guild_id)],
+) -> Response:
+    """
+    Всё для первой отрисовки дашборда одним запросом (gzip при Accept-Encoding: gzip):
+    активные правила, последние логи, статистика, кто сейчас в войсе (из трекера бота),
+    данные участников для всех ID в ответе и роли сервера (из кэша бота).
+
+    Запросы к БД выполняются параллельно на разных соединениях пула.
+    Без бота в процессе онлайн берётся из открытых voice_sessions, members/roles пустые
+    (кроме заглушек Unknown).
+    """
+    guild = _ready_guild(request, guild_id)
+    in_process_tracker = serves_guild(getattr(request.app.state, "bot", None), guild_id)
+
+    queries = [
+        rules_repo.get_active_rules(pool, guild_id, channel_id=None),
+        logs_repo.get_logs(pool, guild_id, filters=None, limit=DASHBOARD_RECENT_LOGS_LIMIT),
+        _stats_overview(pool, guild_id),
+    ]
+    if not in_process_tracker:
+        queries.append(_open_sessions_from_db(pool, guild_id))
+    results = await asyncio.gather(*queries)
+    active_rules, recent_logs, stats = results[0], results[1], results[2]
+    sessions = tracker.get_current_sessions(guild_id) if in_process_tracker else results[3]
+
+    member_ids = [s[0] for s in sessions] + [log["discord_id"] for log in recent_logs]
+    if guild is not None:
+        resolved = await member_payloads.resolve_many(guild, member_ids)
+        members = {str(k): v for k, v in resolved.items()}
+    else:
+        members = {str(k): unknown_member_dict(str(k)) for k in member_ids}
+
+    online_users = []
+    for discord_id, channel_id, joined_at in sorted(sessions, key=lambda s: s[2]):
+        info = members[str(discord_id)]
+        channel = guild.get_channel(channel_id) if guild is not None else None
+        online_users.append(OnlineUser(
+            user_id=discord_id,
+            channel_id=channel_id,
+            joined_at=joined_at,
+            username=info["display_name"],
+            avatar=info["avatar"],
+            channel_name=channel.name if channel is not None else None,
+        ))
+
+    payload = DashboardBootstrapResponse(
         active_rules=[RuleResponse(**r) for r in active_rules],
         recent_logs=[ActionLogResponse(**r) for r in recent_logs],
-        voice_online_count=voice_online_count,
+        voice_online_count=len(sessions),
+        online_users=online_users,
+        stats=stats,
+        members=members,
+        roles=serialize_roles(guild) if guild is not None else [],
     )
+    return json_response(request, payload)
 
 
 @router.get("/dashboard/stream")
 async def dashboard_stream(
     request: Request,
     _: Annotated[dict, Depends(get_current_user)],
+    guild_id: Annotated[int, Depends(get_guild_id)],
+    types: Optional[str] = Query(None, description="Типы событий через запятую: voice_update, action_log"),
+    channel_ids: Optional[str] = Query(None, description="ID голосовых каналов через запятую"),
+    user_ids: Optional[str] = Query(None, description="Discord ID пользователей через запятую"),
 ) -> EventSourceResponse:
-    """SSE endpoint: real-time события голосовых каналов и действий бота."""
-    queue = broadcaster.subscribe()
+    """
+    SSE endpoint: real-time события голосовых каналов и действий бота в гильдии запроса.
+
+    Каждое событие имеет `id`; при переподключении браузер присылает `Last-Event-ID`,
+    и пропущенные события досылаются из кольцевого буфера. Если их не восстановить
+    (рестарт, другой воркер, id выпал из буфера), первым приходит `resync` — клиент
+    перечитывает состояние через `GET /dashboard/bootstrap`.
+
+    Фильтры применяются на сервере. `voice_update` приходят пачками раз в 250 мс
+    в событии `voice_batch` (поле `updates` — последнее состояние по каждому пользователю).
+    """
+    event_filter = SSEFilter(
+        guild_id=guild_id,
+        types=_parse_csv(types),
+        channel_ids=_parse_id_csv(channel_ids, "channel_ids"),
+        user_ids=_parse_id_csv(user_ids, "user_ids"),
+    )
+
+    subscription = broadcaster.subscribe(
+        last_event_id=request.headers.get("last-event-id"), event_filter=event_filter
+    )
 
+    # Отключение клиента отслеживает EventSourceResponse: он отменяет генератор,
+    # и подписка снимается в finally — без опроса request.is_disconnected().
     async def generator():
         try:
             while True:
-                if await request.is_disconnected():
-                    break
-                try:
-                    event = await asyncio.wait_for(queue.get(), timeout=30.0)
-                    yield {"data": json.dumps(event)}
-                except asyncio.TimeoutError:
-                    yield {"data": json.dumps({"type": "ping"})}
+                frames = await subscription.next_frames(timeout=30.0)
+                if not frames:
+                    yield PING_FRAME
+                    continue
+                for frame in frames:
+                    yield frame
         finally:
-            broadcaster.unsubscribe(queue)
+            broadcaster.unsubscribe(subscription)
 
     return EventSourceResponse(generator())
@@ -0,0 +1,57 @@
+"""
+Роутер debug: диагностика производительности (статистика запросов к БД, профайлер loop).
+"""
+from datetime import datetime, timezone
+from typing import Annotated, Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+
+from src.api.deps import get_allowlisted_user
+from src.db.instrumented import query_stats
+from src.utils.profiler import MAX_DURATION, ProfilerBusyError, profiler
+
+router = APIRouter()
+
+
+@router.get("/debug/db-stats")
+async def get_db_stats(
+    _: Annotated[dict, Depends(get_allowlisted_user)],
+    limit: int = Query(20, ge=1, le=200),
+    sort: Literal["total_ms", "max_ms", "avg_ms", "calls", "rows", "errors", "acquire_wait_ms"] = "total_ms",
+) -> dict:
+    """
+    Топ запросов по отпечатку SQL с момента старта (или последнего сброса):
+    вызовы, суммарное/максимальное/среднее время, строки, ошибки, ожидание соединения из пула.
+    """
+    return {"summary": query_stats.summary(), "statements": query_stats.top(limit, sort)}
+
+
+@router.delete("/debug/db-stats", status_code=204)
+async def reset_db_stats(_: Annotated[dict, Depends(get_allowlisted_user)]) -> None:
+    """Сбросить накопленную статистику (например перед нагрузочным прогоном)."""
+    query_stats.reset()
+
+
+@router.get("/debug/profile")
+async def get_profile(
+    _: Annotated[dict, Depends(get_allowlisted_user)],
+    seconds: float = Query(10.0, gt=0, le=MAX_DURATION),
+    fmt: Literal["collapsed", "pstats"] = Query("collapsed", alias="format", description="collapsed или pstats"),
+) -> Response:
+    """
+    Сэмплирующий профайлер event loop на seconds секунд (бот, API и планировщик в одном loop).
+    collapsed — для flamegraph/speedscope, pstats — для snakeviz / python -m pstats.
+    """
+    try:
+        profile = await profiler.profile(seconds)
+    except ProfilerBusyError:
+        raise HTTPException(status_code=409, detail="Profiler is already running")
+    filename = f"profile-{datetime.now(timezone.utc):%Y%m%d-%H%M%S}.{'txt' if fmt == 'collapsed' else 'pstats'}"
+    return Response(
+        content=profile.render(fmt),
+        media_type="text/plain" if fmt == "collapsed" else "application/octet-stream",
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "X-Profile-Samples": str(profile.samples),
+        },
+    )
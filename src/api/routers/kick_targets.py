@@ -1,18 +1,31 @@
 """
-Роутер kick-targets: CRUD для таргетов тихого кика по таймауту.
+Роутер kick-targets: CRUD для таргетов тихого кика по таймауту (в пределах гильдии запроса).
 """
 from datetime import datetime, timezone
 from typing import Annotated
 
 import asyncpg
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 
-from src.api.deps import get_current_user, get_db_pool
-from src.api.schemas import KickTargetCreate, KickTargetResponse, KickTargetUpdate
+from src.api.config_cache import conditional_json
+from src.api.deps import get_current_user, get_db_pool, get_guild_id
+from src.api.schemas import (
+    BulkUpsertResult,
+    KickTargetBulkDelete,
+    KickTargetBulkEntry,
+    KickTargetCreate,
+    KickTargetResponse,
+    KickTargetUpdate,
+)
+from src.api.streaming import ExportFormat, bulk_request_body, export_response, read_bulk_entries
+from src.db import database
+from src.db.queries import iter_query
 
 router = APIRouter(prefix="/kick-targets", tags=["kick-targets"])
 
 _SELECT = "SELECT id, discord_id, username, timeout_sec, max_timeout_sec, is_active, created_at, updated_at FROM kick_targets"
+_EXPORT_COLUMNS = ["discord_id", "username", "timeout_sec", "max_timeout_sec", "is_active", "created_at", "updated_at"]
 
 
 def _row_to_response(row: asyncpg.Record) -> KickTargetResponse:
@@ -30,9 +43,11 @@ def _row_to_response(row: asyncpg.Record) -> KickTargetResponse:
 
 @router.get("", response_model=list[KickTargetResponse])
 async def list_kick_targets(
+    request: Request,
     _: Annotated[None, Depends(get_current_user)],
     pool: Annotated[asyncpg.Pool, Depends(get_db_pool)],
-) -> list[KickTargetResponse]:
+    guild_id: Annotated[int, Depends(get_guild_id)],
+) -> Response:
     """
     Список всех пользователей с таймаутом кика.
 
@@ -40,8 +55,107 @@ async def list_kick_targets(
     Если задан `max_timeout_sec` — таймаут рандомизируется в диапазоне `[timeout_sec, max_timeout_sec]`
     при каждом новом входе в канал.
     """
-    rows = await pool.fetch(f"{_SELECT} ORDER BY id")
-    return [_row_to_response(r) for r in rows]
+    async def load() -> list[KickTargetResponse]:
+        rows = await pool.fetch(f"{_SELECT} WHERE guild_id = $1 ORDER BY id", guild_id)
+        return [_row_to_response(r) for r in rows]
+
+    return await conditional_json(request, "kick_targets", load, key=guild_id)
+
+
+@router.get("/export")
+async def export_kick_targets(
+    _: Annotated[None, Depends(get_current_user)],
+    pool: Annotated[asyncpg.Pool, Depends(get_db_pool)],
+    guild_id: Annotated[int, Depends(get_guild_id)],
+    fmt: ExportFormat = Query("ndjson", alias="format", description="Формат выгрузки: ndjson или csv"),
+    use_gzip: bool = Query(False, alias="gzip", description="Сжать выгрузку gzip"),
+) -> StreamingResponse:
+    """
+    Потоковая выгрузка всех таргетов (бэкап или перенос на другой бот).
+    Выгрузку NDJSON можно отправить обратно в `POST /kick-targets/bulk` как есть
+    (Content-Type: application/x-ndjson).
+    """
+    return export_response(
+        iter_query(pool, f"{_SELECT} WHERE guild_id = $1 ORDER BY discord_id", guild_id),
+        fmt,
+        _EXPORT_COLUMNS,
+        filename="kick_targets",
+        gzip=use_gzip,
+        id_fields=frozenset({"discord_id"}),
+    )
+
+
+@router.post("/bulk", response_model=BulkUpsertResult, openapi_extra=bulk_request_body(KickTargetBulkEntry, "entries"))
+async def bulk_upsert_kick_targets(
+    request: Request,
+    _: Annotated[None, Depends(get_current_user)],
+    pool: Annotated[asyncpg.Pool, Depends(get_db_pool)],
+    guild_id: Annotated[int, Depends(get_guild_id)],
+    replace: bool = Query(False, description="Удалить таргеты, которых нет в запросе (восстановление из бэкапа)"),
+) -> BulkUpsertResult:
+    """
+    Массовый upsert таргетов одним запросом (массивы + unnest) в одной транзакции.
+    Существующие по `discord_id` обновляются, повторы в запросе — побеждает последний.
+    Тело — `{"entries": [...]}` или NDJSON из `GET /kick-targets/export` (application/x-ndjson).
+    С `replace=true` таблица приводится ровно к переданному набору; пустой набор с `replace=true` — 422.
+    """
+    entries = {e.discord_id: e for e in await read_bulk_entries(request, KickTargetBulkEntry, "entries")}
+    if replace and not entries:
+        raise HTTPException(status_code=422, detail="replace=true requires at least one entry")
+    ids = list(entries)
+    now = datetime.now(timezone.utc)
+    deleted = 0
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            if replace:
+                result = await conn.execute(
+                    "DELETE FROM kick_targets WHERE guild_id = $2 AND discord_id <> ALL($1::bigint[])", ids, guild_id
+                )
+                deleted = int(result.split()[-1])
+            rows = await conn.fetch(
+                """
+                INSERT INTO kick_targets (
+                    discord_id, username, timeout_sec, max_timeout_sec, is_active, created_at, updated_at, guild_id
+                )
+                SELECT t.discord_id, t.username, t.timeout_sec, t.max_timeout_sec, t.is_active, $6, $6, $7
+                FROM unnest($1::bigint[], $2::text[], $3::int[], $4::int[], $5::bool[])
+                    AS t(discord_id, username, timeout_sec, max_timeout_sec, is_active)
+                ON CONFLICT (guild_id, discord_id) DO UPDATE
+                SET username = COALESCE(EXCLUDED.username, kick_targets.username),
+                    timeout_sec = EXCLUDED.timeout_sec,
+                    max_timeout_sec = EXCLUDED.max_timeout_sec,
+                    is_active = EXCLUDED.is_active,
+                    updated_at = EXCLUDED.updated_at
+                RETURNING (xmax = 0) AS inserted
+                """,
+                ids,
+                [e.username for e in entries.values()],
+                [e.timeout_sec for e in entries.values()],
+                [e.max_timeout_sec for e in entries.values()],
+                [e.is_active for e in entries.values()],
+                now,
+                guild_id,
+            )
+    inserted = sum(1 for r in rows if r["inserted"])
+    await database.notify_config_changed(pool, "kick_targets", None if replace else ids)
+    return BulkUpsertResult(inserted=inserted, updated=len(rows) - inserted, deleted=deleted)
+
+
+@router.post("/bulk/delete", response_model=BulkUpsertResult)
+async def bulk_delete_kick_targets(
+    body: KickTargetBulkDelete,
+    _: Annotated[None, Depends(get_current_user)],
+    pool: Annotated[asyncpg.Pool, Depends(get_db_pool)],
+    guild_id: Annotated[int, Depends(get_guild_id)],
+) -> BulkUpsertResult:
+    """Удалить несколько таргетов по Discord ID одним запросом. Отсутствующие ID пропускаются."""
+    rows = await pool.fetch(
+        "DELETE FROM kick_targets WHERE guild_id = $2 AND discord_id = ANY($1::bigint[]) RETURNING discord_id",
+        body.discord_ids,
+        guild_id,
+    )
+    await database.notify_config_changed(pool, "kick_targets", [r["discord_id"] for r in rows])
+    return BulkUpsertResult(inserted=0, updated=0, deleted=len(rows))
 
 
 @router.post("", response_model=KickTargetResponse, status_code=201)
@@ -49,6 +163,7 @@ async def create_kick_target(
     body: KickTargetCreate,
     _: Annotated[None, Depends(get_current_user)],
     pool: Annotated[asyncpg.Pool, Depends(get_db_pool)],
+    guild_id: Annotated[int, Depends(get_guild_id)],
 ) -> KickTargetResponse:
     """
     Добавить пользователя в список автокика по таймауту.
@@ -72,8 +187,8 @@ async def create_kick_target(
         now = datetime.now(timezone.utc)
         row = await pool.fetchrow(
             """
-            INSERT INTO kick_targets (discord_id, username, timeout_sec, max_timeout_sec, is_active, created_at, updated_at)
-            VALUES ($1, $2, $3, $4, true, $5, $5)
+            INSERT INTO kick_targets (discord_id, username, timeout_sec, max_timeout_sec, is_active, created_at, updated_at, guild_id)
+            VALUES ($1, $2, $3, $4, true, $5, $5, $6)
             RETURNING id, discord_id, username, timeout_sec, max_timeout_sec, is_active, created_at, updated_at
             """,
             body.discord_id,
@@ -81,10 +196,12 @@ async def create_kick_target(
             body.timeout_sec,
             body.max_timeout_sec,
             now,
+            guild_id,
         )
-        return _row_to_response(row)
     except asyncpg.UniqueViolationError:
         raise HTTPException(status_code=409, detail="Target with this discord_id already exists")
+    await database.notify_config_changed(pool, "kick_targets", [body.discord_id])
+    return _row_to_response(row)
 
 
 @router.get("/{discord_id}", response_model=KickTargetResponse)
@@ -92,9 +209,10 @@ async def get_kick_target(
     discord_id: int,
     _: Annotated[None, Depends(get_current_user)],
     pool: Annotated[asyncpg.Pool, Depends(get_db_pool)],
+    guild_id: Annotated[int, Depends(get_guild_id)],
 ) -> KickTargetResponse:
     """Получить настройки таймаута кика для пользователя по его Discord ID."""
-    row = await pool.fetchrow(f"{_SELECT} WHERE discord_id = $1", discord_id)
+    row = await pool.fetchrow(f"{_SELECT} WHERE discord_id = $1 AND guild_id = $2", discord_id, guild_id)
     if not row:
         raise HTTPException(status_code=404, detail="Kick target not found")
     return _row_to_response(row)
@@ -106,6 +224,7 @@ async def update_kick_target(
     body: KickTargetUpdate,
     _: Annotated[None, Depends(get_current_user)],
     pool: Annotated[asyncpg.Pool, Depends(get_db_pool)],
+    guild_id: Annotated[int, Depends(get_guild_id)],
 ) -> KickTargetResponse:
     """
     Обновить настройки таймаута кика для пользователя.
@@ -119,7 +238,7 @@ async def update_kick_target(
     {"timeout_sec": 3600, "max_timeout_sec": 7200}
     ```
     """
-    row = await pool.fetchrow(f"{_SELECT} WHERE discord_id = $1", discord_id)
+    row = await pool.fetchrow(f"{_SELECT} WHERE discord_id = $1 AND guild_id = $2", discord_id, guild_id)
     if not row:
         raise HTTPException(status_code=404, detail="Kick target not found")
 
@@ -145,15 +264,16 @@ async def update_kick_target(
     if not updates:
         return _row_to_response(row)
     updates.append("updated_at = NOW()")
-    args.append(discord_id)
+    args.extend((discord_id, guild_id))
     row = await pool.fetchrow(
         f"""
         UPDATE kick_targets SET {", ".join(updates)}
-        WHERE discord_id = ${n}
+        WHERE discord_id = ${n} AND guild_id = ${n + 1}
         RETURNING id, discord_id, username, timeout_sec, max_timeout_sec, is_active, created_at, updated_at
         """,
         *args,
     )
+    await database.notify_config_changed(pool, "kick_targets", [discord_id])
     return _row_to_response(row)
 
 
@@ -162,8 +282,12 @@ async def delete_kick_target(
     discord_id: int,
     _: Annotated[None, Depends(get_current_user)],
     pool: Annotated[asyncpg.Pool, Depends(get_db_pool)],
+    guild_id: Annotated[int, Depends(get_guild_id)],
 ) -> None:
     """Полностью удалить пользователя из списка автокика по Discord ID."""
-    result = await pool.execute("DELETE FROM kick_targets WHERE discord_id = $1", discord_id)
+    result = await pool.execute(
+        "DELETE FROM kick_targets WHERE discord_id = $1 AND guild_id = $2", discord_id, guild_id
+    )
     if result == "DELETE 0":
         raise HTTPException(status_code=404, detail="Kick target not found")
+    await database.notify_config_changed(pool, "kick_targets", [discord_id])
@@ -1,32 +1,72 @@
 """
 Роутер логов действий.
 """
-from typing import Annotated, Optional
+import base64
+import binascii
+from datetime import datetime
+from typing import Annotated, Any, Optional
 
 import asyncpg
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 
-from src.api.deps import get_current_user, get_db_pool
-from src.api.schemas import ActionLogResponse
+from src.api.deps import get_current_user, get_db_pool, get_guild_id, parse_datetime
+from src.api.schemas import ActionLogPage, ActionLogResponse
+from src.api.streaming import ExportFormat, export_response
 from src.db.repositories import logs_repo
 
 router = APIRouter()
 
+LOG_EXPORT_COLUMNS = ["id", "executed_at", "discord_id", "action_type", "rule_id", "channel_id", "details"]
 
-@router.get("/logs", response_model=list[ActionLogResponse])
+
+def _encode_cursor(executed_at: datetime, log_id: int) -> str:
+    """Непрозрачный курсор страницы: (executed_at, id) последней записи."""
+    raw = f"{executed_at.isoformat()}|{log_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        executed_at, log_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(executed_at), int(log_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _build_filters(
+    discord_id: Optional[int],
+    rule_id: Optional[int],
+    action_type: Optional[str],
+    date_from: Optional[str],
+    date_to: Optional[str],
+) -> dict[str, Any]:
+    return {
+        "discord_id": discord_id,
+        "rule_id": rule_id,
+        "action_type": action_type,
+        "date_from": parse_datetime(date_from),
+        "date_to": parse_datetime(date_to),
+    }
+
+
+@router.get("/logs", response_model=ActionLogPage)
 async def list_logs(
     _: Annotated[None, Depends(get_current_user)],
     pool: Annotated[asyncpg.Pool, Depends(get_db_pool)],
+    guild_id: Annotated[int, Depends(get_guild_id)],
     limit: int = Query(default=50, ge=1, le=500, description="Количество записей (макс. 500)"),
-    offset: int = Query(default=0, ge=0, description="Смещение для пагинации"),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы (next_cursor из предыдущего ответа)"),
     discord_id: Optional[int] = Query(None, description="Фильтр по Discord ID пользователя"),
     rule_id: Optional[int] = Query(None, description="Фильтр по ID правила"),
     action_type: Optional[str] = Query(None, description="Фильтр по типу действия: kick, mute, unmute, move, kick_timeout, pair_move"),
     date_from: Optional[str] = Query(None, description="Начало периода (ISO 8601, например 2026-03-01T00:00:00Z)"),
     date_to: Optional[str] = Query(None, description="Конец периода (ISO 8601, например 2026-03-07T23:59:59Z)"),
-) -> list[ActionLogResponse]:
+) -> ActionLogPage:
     """
-    История всех действий бота с фильтрами и пагинацией.
+    История всех действий бота с фильтрами и курсорной пагинацией (новые первыми).
+    Следующая страница — запрос с `cursor=next_cursor`; `next_cursor: null` — записей больше нет.
 
     Типы действий (`action_type`):
     - `kick` — выброс из войса по правилу (blacklist/whitelist)
@@ -36,22 +76,40 @@ async def list_logs(
     - `kick_timeout` — выброс по истечении таймаута (`kick-targets`)
     - `pair_move` — автоматическое перемещение пары (`stacking-pairs`)
     """
-    filters: dict = {
-        "discord_id": discord_id,
-        "rule_id": rule_id,
-        "action_type": action_type,
-    }
-    if date_from:
-        from datetime import datetime
-        try:
-            filters["date_from"] = datetime.fromisoformat(date_from.replace("Z", "+00:00"))
-        except ValueError:
-            pass
-    if date_to:
-        from datetime import datetime
-        try:
-            filters["date_to"] = datetime.fromisoformat(date_to.replace("Z", "+00:00"))
-        except ValueError:
-            pass
-    rows = await logs_repo.get_logs(pool, filters=filters, limit=limit, offset=offset)
-    return [ActionLogResponse(**r) for r in rows]
+    filters = _build_filters(discord_id, rule_id, action_type, date_from, date_to)
+    after = _decode_cursor(cursor) if cursor else None
+    # Берём на одну запись больше, чтобы без COUNT понять, есть ли следующая страница
+    rows = await logs_repo.get_logs(pool, guild_id, filters=filters, limit=limit + 1, cursor=after)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_cursor(rows[-1]["executed_at"], rows[-1]["id"])
+    return ActionLogPage(items=[ActionLogResponse(**r) for r in rows], next_cursor=next_cursor)
+
+
+@router.get("/logs/export")
+async def export_logs(
+    _: Annotated[None, Depends(get_current_user)],
+    pool: Annotated[asyncpg.Pool, Depends(get_db_pool)],
+    guild_id: Annotated[int, Depends(get_guild_id)],
+    fmt: ExportFormat = Query("csv", alias="format", description="Формат выгрузки: csv или ndjson"),
+    use_gzip: bool = Query(False, alias="gzip", description="Сжать выгрузку gzip"),
+    discord_id: Optional[int] = Query(None, description="Фильтр по Discord ID пользователя"),
+    rule_id: Optional[int] = Query(None, description="Фильтр по ID правила"),
+    action_type: Optional[str] = Query(None, description="Фильтр по типу действия"),
+    date_from: Optional[str] = Query(None, description="Начало периода (ISO 8601)"),
+    date_to: Optional[str] = Query(None, description="Конец периода (ISO 8601)"),
+) -> StreamingResponse:
+    """
+    Выгрузка логов с теми же фильтрами, что и /logs, но без лимита и в хронологическом порядке.
+    Строки читаются серверным курсором и отдаются потоком — память не растёт с объёмом периода.
+    """
+    filters = _build_filters(discord_id, rule_id, action_type, date_from, date_to)
+    return export_response(
+        logs_repo.iter_logs(pool, guild_id, filters),
+        fmt,
+        LOG_EXPORT_COLUMNS,
+        filename="action_logs",
+        gzip=use_gzip,
+        id_fields=frozenset({"discord_id", "channel_id"}),
+    )
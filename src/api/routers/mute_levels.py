@@ -6,9 +6,10 @@
 from typing import Annotated
 
 import asyncpg
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 
-from src.api.deps import get_current_user, get_db_pool
+from src.api.config_cache import conditional_json
+from src.api.deps import get_current_user, get_db_pool, get_guild_id
 from src.api.schemas import (
     MuteLevelCreate,
     MuteLevelResponse,
@@ -16,6 +17,7 @@ from src.api.schemas import (
     MuteXPAdjust,
     MuteXPResponse,
 )
+from src.db import database
 
 router = APIRouter()
 
@@ -26,14 +28,20 @@ router = APIRouter()
 
 @router.get("/mute-levels", response_model=list[MuteLevelResponse])
 async def list_mute_levels(
+    request: Request,
     _: Annotated[None, Depends(get_current_user)],
     pool: Annotated[asyncpg.Pool, Depends(get_db_pool)],
-) -> list[MuteLevelResponse]:
-    """Список всех настроенных уровней мута."""
-    rows = await pool.fetch(
-        "SELECT level, xp_required, role_id, label, created_at FROM mute_levels ORDER BY level"
-    )
-    return [MuteLevelResponse(**dict(r)) for r in rows]
+    guild_id: Annotated[int, Depends(get_guild_id)],
+) -> Response:
+    """Список всех настроенных уровней мута (с ETag, см. /rules)."""
+    async def load() -> list[MuteLevelResponse]:
+        rows = await pool.fetch(
+            "SELECT level, xp_required, role_id, label, created_at FROM mute_levels WHERE guild_id = $1 ORDER BY level",
+            guild_id,
+        )
+        return [MuteLevelResponse(**dict(r)) for r in rows]
+
+    return await conditional_json(request, "mute_levels", load, key=guild_id)
 
 
 @router.post("/mute-levels", response_model=MuteLevelResponse, status_code=201)
@@ -41,23 +49,26 @@ async def create_mute_level(
     body: MuteLevelCreate,
     _: Annotated[None, Depends(get_current_user)],
     pool: Annotated[asyncpg.Pool, Depends(get_db_pool)],
+    guild_id: Annotated[int, Depends(get_guild_id)],
 ) -> MuteLevelResponse:
     """Создать новый уровень мута."""
     try:
         row = await pool.fetchrow(
             """
-            INSERT INTO mute_levels (level, xp_required, role_id, label)
-            VALUES ($1, $2, $3, $4)
+            INSERT INTO mute_levels (level, xp_required, role_id, label, guild_id)
+            VALUES ($1, $2, $3, $4, $5)
             RETURNING level, xp_required, role_id, label, created_at
             """,
             body.level,
             body.xp_required,
             body.role_id,
             body.label,
+            guild_id,
         )
-        return MuteLevelResponse(**dict(row))
     except asyncpg.UniqueViolationError:
         raise HTTPException(status_code=409, detail=f"Level {body.level} already exists")
+    await database.notify_config_changed(pool, "mute_levels", [body.level])
+    return MuteLevelResponse(**dict(row))
 
 
 @router.patch("/mute-levels/{level}", response_model=MuteLevelResponse)
@@ -66,11 +77,13 @@ async def update_mute_level(
     body: MuteLevelUpdate,
     _: Annotated[None, Depends(get_current_user)],
     pool: Annotated[asyncpg.Pool, Depends(get_db_pool)],
+    guild_id: Annotated[int, Depends(get_guild_id)],
 ) -> MuteLevelResponse:
     """Обновить уровень мута."""
     row = await pool.fetchrow(
-        "SELECT level, xp_required, role_id, label, created_at FROM mute_levels WHERE level = $1",
+        "SELECT level, xp_required, role_id, label, created_at FROM mute_levels WHERE level = $1 AND guild_id = $2",
         level,
+        guild_id,
     )
     if not row:
         raise HTTPException(status_code=404, detail="Level not found")
@@ -93,15 +106,16 @@ async def update_mute_level(
     if not updates:
         return MuteLevelResponse(**dict(row))
 
-    args.append(level)
+    args += [level, guild_id]
     row = await pool.fetchrow(
         f"""
         UPDATE mute_levels SET {", ".join(updates)}
-        WHERE level = ${n}
+        WHERE level = ${n} AND guild_id = ${n + 1}
         RETURNING level, xp_required, role_id, label, created_at
         """,
         *args,
     )
+    await database.notify_config_changed(pool, "mute_levels", [level])
     return MuteLevelResponse(**dict(row))
 
 
@@ -110,11 +124,13 @@ async def delete_mute_level(
     level: int,
     _: Annotated[None, Depends(get_current_user)],
     pool: Annotated[asyncpg.Pool, Depends(get_db_pool)],
+    guild_id: Annotated[int, Depends(get_guild_id)],
 ) -> None:
     """Удалить уровень мута."""
-    result = await pool.execute("DELETE FROM mute_levels WHERE level = $1", level)
+    result = await pool.execute("DELETE FROM mute_levels WHERE level = $1 AND guild_id = $2", level, guild_id)
     if result == "DELETE 0":
         raise HTTPException(status_code=404, detail="Level not found")
+    await database.notify_config_changed(pool, "mute_levels", [level])
 
 
 # ──────────────────────────────────────────────
@@ -125,15 +141,18 @@ async def delete_mute_level(
 async def mute_xp_leaderboard(
     _: Annotated[None, Depends(get_current_user)],
     pool: Annotated[asyncpg.Pool, Depends(get_db_pool)],
+    guild_id: Annotated[int, Depends(get_guild_id)],
 ) -> list[MuteXPResponse]:
     """Топ-10 пользователей по XP мута."""
     rows = await pool.fetch(
         """
         SELECT discord_id, xp, level, total_mute_seconds, updated_at
         FROM mute_xp
+        WHERE guild_id = $1
         ORDER BY xp DESC
         LIMIT 10
-        """
+        """,
+        guild_id,
     )
     return [MuteXPResponse(**dict(r)) for r in rows]
 
@@ -143,11 +162,13 @@ async def get_mute_xp(
     discord_id: int,
     _: Annotated[None, Depends(get_current_user)],
     pool: Annotated[asyncpg.Pool, Depends(get_db_pool)],
+    guild_id: Annotated[int, Depends(get_guild_id)],
 ) -> MuteXPResponse:
     """XP конкретного пользователя."""
     row = await pool.fetchrow(
-        "SELECT discord_id, xp, level, total_mute_seconds, updated_at FROM mute_xp WHERE discord_id = $1",
+        "SELECT discord_id, xp, level, total_mute_seconds, updated_at FROM mute_xp WHERE discord_id = $1 AND guild_id = $2",
         discord_id,
+        guild_id,
     )
     if not row:
         raise HTTPException(status_code=404, detail="User XP not found")
@@ -160,17 +181,19 @@ async def adjust_mute_xp(
     body: MuteXPAdjust,
     _: Annotated[None, Depends(get_current_user)],
     pool: Annotated[asyncpg.Pool, Depends(get_db_pool)],
+    guild_id: Annotated[int, Depends(get_guild_id)],
 ) -> MuteXPResponse:
     """Ручная корректировка XP пользователя (для дашборда)."""
     row = await pool.fetchrow(
         """
-        INSERT INTO mute_xp (discord_id, xp, total_mute_seconds)
-        VALUES ($1, $2, 0)
-        ON CONFLICT (discord_id) DO UPDATE
+        INSERT INTO mute_xp (guild_id, discord_id, xp, total_mute_seconds)
+        VALUES ($3, $1, $2, 0)
+        ON CONFLICT (guild_id, discord_id) DO UPDATE
         SET xp = $2, updated_at = NOW()
         RETURNING discord_id, xp, level, total_mute_seconds, updated_at
         """,
         discord_id,
         body.xp,
+        guild_id,
     )
     return MuteXPResponse(**dict(row))
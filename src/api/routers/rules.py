@@ -4,9 +4,10 @@
 from typing import Annotated
 
 import asyncpg
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 
-from src.api.deps import get_current_user, get_db_pool
+from src.api.config_cache import conditional_json
+from src.api.deps import get_current_user, get_db_pool, get_guild_id
 from src.api.schemas import RuleCreate, RuleResponse, RuleUpdate
 from src.db import database
 from src.db.repositories import rules_repo
@@ -16,11 +17,13 @@ router = APIRouter()
 
 @router.get("/rules", response_model=list[RuleResponse])
 async def list_rules(
+    request: Request,
     _: Annotated[None, Depends(get_current_user)],
     pool: Annotated[asyncpg.Pool, Depends(get_db_pool)],
-) -> list[RuleResponse]:
+    guild_id: Annotated[int, Depends(get_guild_id)],
+) -> Response:
     """
-    Список всех правил (активных и неактивных).
+    Список всех правил гильдии (активных и неактивных).
 
     Правило определяет, что делать с пользователем при входе в голосовой канал:
     - **target_list** — применять только к `whitelist` или `blacklist` пользователям
@@ -29,9 +32,14 @@ async def list_rules(
     - **action_type** — действие: `kick` (выкинуть из войса), `mute` (заглушить), `unmute`, `move` (переместить)
     - **action_params** — параметры действия, например `{"target_channel_id": 123}` для `move`
     - **priority** — приоритет правила (больше = выше)
+
+    Ответ с `ETag`: повторный запрос с `If-None-Match` без изменений правил — 304.
     """
-    rows = await rules_repo.get_rules(pool, active_only=False)
-    return [RuleResponse(**r) for r in rows]
+    async def load() -> list[RuleResponse]:
+        rows = await rules_repo.get_rules(pool, guild_id, active_only=False)
+        return [RuleResponse(**r) for r in rows]
+
+    return await conditional_json(request, "rules", load, key=guild_id)
 
 
 @router.post("/rules", response_model=RuleResponse)
@@ -39,6 +47,7 @@ async def create_rule(
     body: RuleCreate,
     _: Annotated[None, Depends(get_current_user)],
     pool: Annotated[asyncpg.Pool, Depends(get_db_pool)],
+    guild_id: Annotated[int, Depends(get_guild_id)],
 ) -> RuleResponse:
     """
     Создать новое правило.
@@ -69,8 +78,8 @@ async def create_rule(
     После создания бот применяет правило мгновенно (LISTEN/NOTIFY).
     """
     data = body.model_dump()
-    row = await rules_repo.create_rule(pool, data)
-    await database.notify_config_changed(pool)
+    row = await rules_repo.create_rule(pool, guild_id, data)
+    await database.notify_config_changed(pool, "rules", [row["id"]])
     return RuleResponse(**row)
 
 
@@ -79,9 +88,10 @@ async def get_rule(
     rule_id: int,
     _: Annotated[None, Depends(get_current_user)],
     pool: Annotated[asyncpg.Pool, Depends(get_db_pool)],
+    guild_id: Annotated[int, Depends(get_guild_id)],
 ) -> RuleResponse:
     """Получить правило по ID."""
-    row = await rules_repo.get_rule_by_id(pool, rule_id)
+    row = await rules_repo.get_rule_by_id(pool, rule_id, guild_id)
     if not row:
         raise HTTPException(status_code=404, detail="Rule not found")
     return RuleResponse(**row)
@@ -93,6 +103,7 @@ async def update_rule(
     body: RuleUpdate,
     _: Annotated[None, Depends(get_current_user)],
     pool: Annotated[asyncpg.Pool, Depends(get_db_pool)],
+    guild_id: Annotated[int, Depends(get_guild_id)],
 ) -> RuleResponse:
     """
     Обновить правило полностью (PUT).
@@ -101,10 +112,10 @@ async def update_rule(
     После обновления бот перезагружает правила мгновенно.
     """
     data = body.model_dump(exclude_unset=True)
-    row = await rules_repo.update_rule(pool, rule_id, data)
+    row = await rules_repo.update_rule(pool, rule_id, data, guild_id)
     if not row:
         raise HTTPException(status_code=404, detail="Rule not found")
-    await database.notify_config_changed(pool)
+    await database.notify_config_changed(pool, "rules", [rule_id])
     return RuleResponse(**row)
 
 
@@ -113,12 +124,13 @@ async def delete_rule(
     rule_id: int,
     _: Annotated[None, Depends(get_current_user)],
     pool: Annotated[asyncpg.Pool, Depends(get_db_pool)],
+    guild_id: Annotated[int, Depends(get_guild_id)],
 ) -> None:
     """Удалить правило по ID. Связанные расписания удаляются автоматически (CASCADE)."""
-    deleted = await rules_repo.delete_rule(pool, rule_id)
+    deleted = await rules_repo.delete_rule(pool, rule_id, guild_id)
     if not deleted:
         raise HTTPException(status_code=404, detail="Rule not found")
-    await database.notify_config_changed(pool)
+    await database.notify_config_changed(pool, "rules", [rule_id])
 
 
 @router.patch("/rules/{rule_id}/toggle", response_model=RuleResponse)
@@ -126,16 +138,17 @@ async def toggle_rule(
     rule_id: int,
     _: Annotated[None, Depends(get_current_user)],
     pool: Annotated[asyncpg.Pool, Depends(get_db_pool)],
+    guild_id: Annotated[int, Depends(get_guild_id)],
 ) -> RuleResponse:
     """
     Включить/выключить правило (переключает `is_active`).
 
     Удобно для быстрого отключения правила без его удаления.
     """
-    row = await rules_repo.get_rule_by_id(pool, rule_id)
+    row = await rules_repo.get_rule_by_id(pool, rule_id, guild_id)
     if not row:
         raise HTTPException(status_code=404, detail="Rule not found")
     new_active = not row["is_active"]
-    updated = await rules_repo.update_rule(pool, rule_id, {"is_active": new_active})
-    await database.notify_config_changed(pool)
+    updated = await rules_repo.update_rule(pool, rule_id, {"is_active": new_active}, guild_id)
+    await database.notify_config_changed(pool, "rules", [rule_id])
     return RuleResponse(**updated)
@@ -5,12 +5,13 @@ from typing import Annotated
 
 import asyncpg
 from apscheduler.jobstores.base import JobLookupError
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 
-from src.api.deps import get_current_user, get_db_pool, get_scheduler
+from src.api.config_cache import conditional_json
+from src.api.deps import get_current_user, get_db_pool, get_guild_id, get_scheduler
 from src.api.schemas import ScheduleCreate, ScheduleResponse, ScheduleUpdate
 from src.db import database
-from src.db.repositories import schedules_repo
+from src.db.repositories import rules_repo, schedules_repo
 from src.scheduler.jobs import register_schedule_job
 
 router = APIRouter()
@@ -18,17 +19,22 @@ router = APIRouter()
 
 @router.get("/schedules", response_model=list[ScheduleResponse])
 async def list_schedules(
+    request: Request,
     _: Annotated[None, Depends(get_current_user)],
     pool: Annotated[asyncpg.Pool, Depends(get_db_pool)],
-) -> list[ScheduleResponse]:
+    guild_id: Annotated[int, Depends(get_guild_id)],
+) -> Response:
     """
-    Список активных расписаний.
+    Список активных расписаний правил гильдии.
 
     Расписание автоматически включает (`enable`) или выключает (`disable`) правило по cron-выражению.
     Например, можно включать правило кика только в ночные часы.
     """
-    rows = await schedules_repo.get_active_schedules(pool)
-    return [ScheduleResponse(**r) for r in rows]
+    async def load() -> list[ScheduleResponse]:
+        rows = await schedules_repo.get_active_schedules(pool, guild_id)
+        return [ScheduleResponse(**r) for r in rows]
+
+    return await conditional_json(request, "schedules", load, key=guild_id)
 
 
 @router.post("/schedules", response_model=ScheduleResponse)
@@ -36,6 +42,7 @@ async def create_schedule(
     body: ScheduleCreate,
     _: Annotated[None, Depends(get_current_user)],
     pool: Annotated[asyncpg.Pool, Depends(get_db_pool)],
+    guild_id: Annotated[int, Depends(get_guild_id)],
 ) -> ScheduleResponse:
     """
     Создать расписание для правила.
@@ -60,6 +67,8 @@ async def create_schedule(
     }
     ```
     """
+    if not await rules_repo.get_rule_by_id(pool, body.rule_id, guild_id):
+        raise HTTPException(status_code=404, detail="Rule not found")
     row = await schedules_repo.create_schedule(
         pool,
         body.rule_id,
@@ -68,7 +77,7 @@ async def create_schedule(
         timezone=body.timezone,
     )
     register_schedule_job(get_scheduler(), row, pool)
-    await database.notify_config_changed(pool)
+    await database.notify_config_changed(pool, "schedules", [row["id"]])
     return ScheduleResponse(**row)
 
 
@@ -78,9 +87,10 @@ async def update_schedule(
     body: ScheduleUpdate,
     _: Annotated[None, Depends(get_current_user)],
     pool: Annotated[asyncpg.Pool, Depends(get_db_pool)],
+    guild_id: Annotated[int, Depends(get_guild_id)],
 ) -> ScheduleResponse:
     """Обновить расписание. Перерегистрирует APScheduler job с новыми параметрами."""
-    existing = await schedules_repo.get_schedule_by_id(pool, schedule_id)
+    existing = await schedules_repo.get_schedule_by_id(pool, schedule_id, guild_id)
     if not existing:
         raise HTTPException(status_code=404, detail="Schedule not found")
 
@@ -97,7 +107,7 @@ async def update_schedule(
     if updated.get("is_active"):
         register_schedule_job(scheduler, updated, pool)
 
-    await database.notify_config_changed(pool)
+    await database.notify_config_changed(pool, "schedules", [schedule_id])
     return ScheduleResponse(**updated)
 
 
@@ -106,8 +116,11 @@ async def delete_schedule(
     schedule_id: int,
     _: Annotated[None, Depends(get_current_user)],
     pool: Annotated[asyncpg.Pool, Depends(get_db_pool)],
+    guild_id: Annotated[int, Depends(get_guild_id)],
 ) -> None:
     """Удалить расписание по ID."""
+    if not await schedules_repo.get_schedule_by_id(pool, schedule_id, guild_id):
+        raise HTTPException(status_code=404, detail="Schedule not found")
     scheduler = get_scheduler()
     try:
         scheduler.remove_job(f"schedule_{schedule_id}")
@@ -116,4 +129,4 @@ async def delete_schedule(
     deleted = await schedules_repo.delete_schedule(pool, schedule_id)
     if not deleted:
         raise HTTPException(status_code=404, detail="Schedule not found")
-    await database.notify_config_changed(pool)
+    await database.notify_config_changed(pool, "schedules", [schedule_id])
@@ -1,13 +1,13 @@
 """
 Роутер настроек дашборда.
 """
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Annotated
 
 from fastapi import APIRouter, Depends
 from pydantic import BaseModel
 
-from src.api.deps import get_bot, get_current_user
+from src.api.deps import get_bot, get_current_user, get_guild_id
 from src.config.settings import get_settings
 
 router = APIRouter()
@@ -21,16 +21,18 @@ class DebugModeUpdate(BaseModel):
 async def bot_info(
     _: Annotated[dict, Depends(get_current_user)],
     bot=Depends(get_bot),
+    guild_id: int = Depends(get_guild_id),
 ) -> dict:
-    """Информация о боте: имя, guild, uptime, latency."""
+    """Информация о боте: имя, guild, список гильдий, uptime, latency."""
     settings = get_settings()
-    guild = bot.get_guild(settings.DISCORD_GUILD_ID)
+    guild = bot.get_guild(guild_id)
     start_time = getattr(bot, "start_time", None)
-    uptime_seconds = int((datetime.utcnow() - start_time).total_seconds()) if start_time else 0
+    uptime_seconds = int((datetime.now(timezone.utc) - start_time).total_seconds()) if start_time else 0
     return {
         "bot_name": bot.user.name if bot.user else "Unknown",
-        "guild_id": settings.DISCORD_GUILD_ID,
+        "guild_id": guild_id,
         "guild_name": guild.name if guild else None,
+        "guild_ids": settings.guild_ids,
         "uptime_seconds": uptime_seconds,
         "latency_ms": round(bot.latency * 1000),
     }
@@ -1,16 +1,29 @@
 """
-Роутер stacking-pairs: CRUD для пар стакинга.
+Роутер stacking-pairs: CRUD для пар стакинга (в пределах гильдии запроса).
 """
 from typing import Annotated
 
 import asyncpg
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 
-from src.api.deps import get_current_user, get_db_pool
-from src.api.schemas import StackingPairCreate, StackingPairResponse
+from src.api.config_cache import conditional_json
+from src.api.deps import get_current_user, get_db_pool, get_guild_id
+from src.api.schemas import (
+    BulkUpsertResult,
+    StackingPairBulkDelete,
+    StackingPairBulkEntry,
+    StackingPairCreate,
+    StackingPairResponse,
+)
+from src.api.streaming import ExportFormat, bulk_request_body, export_response, read_bulk_entries
+from src.db import database
+from src.db.queries import iter_query
 
 router = APIRouter(prefix="/stacking-pairs", tags=["stacking-pairs"])
 
+_EXPORT_COLUMNS = ["user_id_1", "user_id_2", "target_channel_id", "is_active", "created_at"]
+
 
 def _row_to_response(row: asyncpg.Record) -> StackingPairResponse:
     return StackingPairResponse(
@@ -32,19 +45,144 @@ def _normalize_pair(user_id_1: int, user_id_2: int) -> tuple[int, int]:
 
 @router.get("", response_model=list[StackingPairResponse])
 async def list_stacking_pairs(
+    request: Request,
     _: Annotated[None, Depends(get_current_user)],
     pool: Annotated[asyncpg.Pool, Depends(get_db_pool)],
-) -> list[StackingPairResponse]:
+    guild_id: Annotated[int, Depends(get_guild_id)],
+) -> Response:
     """
     Список всех пар стакинга (активных и неактивных).
 
     Пара стакинга — два пользователя, которых бот автоматически перемещает в целевой канал,
     как только они оба оказываются в одном войс-канале одновременно.
     """
+    async def load() -> list[StackingPairResponse]:
+        rows = await pool.fetch(
+            """
+            SELECT id, user_id_1, user_id_2, target_channel_id, is_active, created_at
+            FROM stacking_pairs WHERE guild_id = $1 ORDER BY id
+            """,
+            guild_id,
+        )
+        return [_row_to_response(r) for r in rows]
+
+    return await conditional_json(request, "stacking_pairs", load, key=guild_id)
+
+
+@router.get("/export")
+async def export_stacking_pairs(
+    _: Annotated[None, Depends(get_current_user)],
+    pool: Annotated[asyncpg.Pool, Depends(get_db_pool)],
+    guild_id: Annotated[int, Depends(get_guild_id)],
+    fmt: ExportFormat = Query("ndjson", alias="format", description="Формат выгрузки: ndjson или csv"),
+    use_gzip: bool = Query(False, alias="gzip", description="Сжать выгрузку gzip"),
+) -> StreamingResponse:
+    """
+    Потоковая выгрузка всех пар (бэкап или перенос на другой бот).
+    Выгрузку NDJSON можно отправить обратно в `POST /stacking-pairs/bulk` как есть
+    (Content-Type: application/x-ndjson).
+    """
+    return export_response(
+        iter_query(
+            pool,
+            """
+            SELECT user_id_1, user_id_2, target_channel_id, is_active, created_at
+            FROM stacking_pairs WHERE guild_id = $1 ORDER BY id
+            """,
+            guild_id,
+        ),
+        fmt,
+        _EXPORT_COLUMNS,
+        filename="stacking_pairs",
+        gzip=use_gzip,
+        id_fields=frozenset({"user_id_1", "user_id_2", "target_channel_id"}),
+    )
+
+
+@router.post("/bulk", response_model=BulkUpsertResult, openapi_extra=bulk_request_body(StackingPairBulkEntry, "pairs"))
+async def bulk_upsert_stacking_pairs(
+    request: Request,
+    _: Annotated[None, Depends(get_current_user)],
+    pool: Annotated[asyncpg.Pool, Depends(get_db_pool)],
+    guild_id: Annotated[int, Depends(get_guild_id)],
+    replace: bool = Query(False, description="Удалить пары, которых нет в запросе (восстановление из бэкапа)"),
+) -> BulkUpsertResult:
+    """
+    Массовый upsert пар одним запросом (массивы + unnest) в одной транзакции.
+    Пара определяется двумя пользователями (порядок не важен); у существующей
+    обновляются `target_channel_id` и `is_active`. Тело — `{"pairs": [...]}` или NDJSON
+    из `GET /stacking-pairs/export` (application/x-ndjson). С `replace=true` таблица
+    приводится ровно к переданному набору; пустой набор с `replace=true` — 422.
+    Стакинг перезагружается один раз.
+    """
+    pairs = {}
+    for p in await read_bulk_entries(request, StackingPairBulkEntry, "pairs"):
+        pairs[_normalize_pair(p.user_id_1, p.user_id_2)] = p
+    if replace and not pairs:
+        raise HTTPException(status_code=422, detail="replace=true requires at least one pair")
+    users_1 = [k[0] for k in pairs]
+    users_2 = [k[1] for k in pairs]
+    deleted = 0
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            if replace:
+                result = await conn.execute(
+                    """
+                    DELETE FROM stacking_pairs sp
+                    WHERE sp.guild_id = $3 AND NOT EXISTS (
+                        SELECT 1 FROM unnest($1::bigint[], $2::bigint[]) AS t(user_id_1, user_id_2)
+                        WHERE t.user_id_1 = sp.user_id_1 AND t.user_id_2 = sp.user_id_2
+                    )
+                    """,
+                    users_1,
+                    users_2,
+                    guild_id,
+                )
+                deleted = int(result.split()[-1])
+            rows = await conn.fetch(
+                """
+                INSERT INTO stacking_pairs (user_id_1, user_id_2, target_channel_id, is_active, created_at, guild_id)
+                SELECT t.user_id_1, t.user_id_2, t.target_channel_id, t.is_active, NOW(), $5
+                FROM unnest($1::bigint[], $2::bigint[], $3::bigint[], $4::bool[])
+                    AS t(user_id_1, user_id_2, target_channel_id, is_active)
+                ON CONFLICT (guild_id, user_id_1, user_id_2) DO UPDATE
+                SET target_channel_id = EXCLUDED.target_channel_id,
+                    is_active = EXCLUDED.is_active
+                RETURNING id, (xmax = 0) AS inserted
+                """,
+                users_1,
+                users_2,
+                [p.target_channel_id for p in pairs.values()],
+                [p.is_active for p in pairs.values()],
+                guild_id,
+            )
+    inserted = sum(1 for r in rows if r["inserted"])
+    await database.notify_config_changed(pool, "stacking_pairs", None if replace else [r["id"] for r in rows])
+    return BulkUpsertResult(inserted=inserted, updated=len(rows) - inserted, deleted=deleted)
+
+
+@router.post("/bulk/delete", response_model=BulkUpsertResult)
+async def bulk_delete_stacking_pairs(
+    body: StackingPairBulkDelete,
+    _: Annotated[None, Depends(get_current_user)],
+    pool: Annotated[asyncpg.Pool, Depends(get_db_pool)],
+    guild_id: Annotated[int, Depends(get_guild_id)],
+) -> BulkUpsertResult:
+    """Удалить несколько пар по паре пользователей (порядок не важен). Отсутствующие пропускаются."""
+    keys = [_normalize_pair(p.user_id_1, p.user_id_2) for p in body.pairs]
     rows = await pool.fetch(
-        "SELECT id, user_id_1, user_id_2, target_channel_id, is_active, created_at FROM stacking_pairs ORDER BY id"
+        """
+        DELETE FROM stacking_pairs sp
+        USING unnest($1::bigint[], $2::bigint[]) AS t(user_id_1, user_id_2)
+        WHERE sp.guild_id = $3 AND sp.user_id_1 = t.user_id_1 AND sp.user_id_2 = t.user_id_2
+        RETURNING sp.id
+        """,
+        [k[0] for k in keys],
+        [k[1] for k in keys],
+        guild_id,
     )
-    return [_row_to_response(r) for r in rows]
+    await database.notify_config_changed(pool, "stacking_pairs", [r["id"] for r in rows])
+    return BulkUpsertResult(inserted=0, updated=0, deleted=len(rows))
 
 
 @router.post("", response_model=StackingPairResponse, status_code=201)
@@ -52,6 +190,7 @@ async def create_stacking_pair(
     body: StackingPairCreate,
     _: Annotated[None, Depends(get_current_user)],
     pool: Annotated[asyncpg.Pool, Depends(get_db_pool)],
+    guild_id: Annotated[int, Depends(get_guild_id)],
 ) -> StackingPairResponse:
     """
     Добавить пару стакинга.
@@ -78,17 +217,19 @@ async def create_stacking_pair(
     try:
         row = await pool.fetchrow(
             """
-            INSERT INTO stacking_pairs (user_id_1, user_id_2, target_channel_id, is_active, created_at)
-            VALUES ($1, $2, $3, true, NOW())
+            INSERT INTO stacking_pairs (user_id_1, user_id_2, target_channel_id, is_active, created_at, guild_id)
+            VALUES ($1, $2, $3, true, NOW(), $4)
             RETURNING id, user_id_1, user_id_2, target_channel_id, is_active, created_at
             """,
             uid1,
             uid2,
             body.target_channel_id,
+            guild_id,
         )
-        return _row_to_response(row)
     except asyncpg.UniqueViolationError:
         raise HTTPException(status_code=409, detail="This pair already exists")
+    await database.notify_config_changed(pool, "stacking_pairs", [row["id"]])
+    return _row_to_response(row)
 
 
 @router.patch("/{pair_id}/toggle", response_model=StackingPairResponse)
@@ -96,6 +237,7 @@ async def toggle_stacking_pair(
     pair_id: int,
     _: Annotated[None, Depends(get_current_user)],
     pool: Annotated[asyncpg.Pool, Depends(get_db_pool)],
+    guild_id: Annotated[int, Depends(get_guild_id)],
 ) -> StackingPairResponse:
     """
     Включить/выключить пару стакинга (переключает `is_active`).
@@ -105,13 +247,15 @@ async def toggle_stacking_pair(
     row = await pool.fetchrow(
         """
         UPDATE stacking_pairs SET is_active = NOT is_active
-        WHERE id = $1
+        WHERE id = $1 AND guild_id = $2
         RETURNING id, user_id_1, user_id_2, target_channel_id, is_active, created_at
         """,
         pair_id,
+        guild_id,
     )
     if not row:
         raise HTTPException(status_code=404, detail="Stacking pair not found")
+    await database.notify_config_changed(pool, "stacking_pairs", [pair_id])
     return _row_to_response(row)
 
 
@@ -120,8 +264,10 @@ async def delete_stacking_pair(
     pair_id: int,
     _: Annotated[None, Depends(get_current_user)],
     pool: Annotated[asyncpg.Pool, Depends(get_db_pool)],
+    guild_id: Annotated[int, Depends(get_guild_id)],
 ) -> None:
     """Удалить пару стакинга по ID."""
-    result = await pool.execute("DELETE FROM stacking_pairs WHERE id = $1", pair_id)
+    result = await pool.execute("DELETE FROM stacking_pairs WHERE id = $1 AND guild_id = $2", pair_id, guild_id)
     if result == "DELETE 0":
         raise HTTPException(status_code=404, detail="Stacking pair not found")
+    await database.notify_config_changed(pool, "stacking_pairs", [pair_id])
@@ -6,7 +6,7 @@ from typing import Annotated
 import asyncpg
 from fastapi import APIRouter, Depends, HTTPException
 
-from src.api.deps import get_current_user, get_db_pool
+from src.api.deps import get_current_user, get_db_pool, get_guild_id
 from src.api.schemas import StatsOverviewResponse, UserStatsResponse
 
 router = APIRouter()
@@ -16,10 +16,12 @@ router = APIRouter()
 async def stats_overview(
     _: Annotated[None, Depends(get_current_user)],
     pool: Annotated[asyncpg.Pool, Depends(get_db_pool)],
+    guild_id: Annotated[int, Depends(get_guild_id)],
 ) -> StatsOverviewResponse:
-    """Агрегаты по всем логам: общее число действий и по типам."""
+    """Агрегаты по всем логам гильдии: общее число действий и по типам."""
     total_row = await pool.fetchrow(
-        "SELECT COUNT(*)::int AS cnt FROM action_logs"
+        "SELECT COUNT(*)::int AS cnt FROM action_logs WHERE guild_id = $1",
+        guild_id,
     )
     total_actions = total_row["cnt"] if total_row else 0
 
@@ -27,9 +29,10 @@ async def stats_overview(
         """
         SELECT action_type, COUNT(*)::int AS cnt
         FROM action_logs
-        WHERE action_type IS NOT NULL
+        WHERE guild_id = $1 AND action_type IS NOT NULL
         GROUP BY action_type
-        """
+        """,
+        guild_id,
     )
     actions_by_type = {r["action_type"]: r["cnt"] for r in rows}
 
@@ -44,11 +47,13 @@ async def stats_user(
     discord_id: int,
     _: Annotated[None, Depends(get_current_user)],
     pool: Annotated[asyncpg.Pool, Depends(get_db_pool)],
+    guild_id: Annotated[int, Depends(get_guild_id)],
 ) -> UserStatsResponse:
     """Агрегаты по логам для пользователя."""
     total_row = await pool.fetchrow(
-        "SELECT COUNT(*)::int AS cnt FROM action_logs WHERE discord_id = $1",
+        "SELECT COUNT(*)::int AS cnt FROM action_logs WHERE discord_id = $1 AND guild_id = $2",
         discord_id,
+        guild_id,
     )
     total_actions = total_row["cnt"] if total_row else 0
 
@@ -56,10 +61,11 @@ async def stats_user(
         """
         SELECT action_type, COUNT(*)::int AS cnt
         FROM action_logs
-        WHERE discord_id = $1 AND action_type IS NOT NULL
+        WHERE discord_id = $1 AND guild_id = $2 AND action_type IS NOT NULL
         GROUP BY action_type
         """,
         discord_id,
+        guild_id,
     )
     actions_by_type = {r["action_type"]: r["cnt"] for r in rows}
 
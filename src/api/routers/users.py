@@ -1,33 +1,47 @@
 """
 Роутер списков пользователей (whitelist/blacklist).
 """
-from typing import Annotated, Literal
+import asyncio
+import csv
+import io
+from collections.abc import AsyncIterator
+from typing import Annotated, Any, Literal, Optional
 
 import asyncpg
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile
 
-from src.api.deps import get_current_user, get_db_pool
+from src.api.config_cache import conditional_json
+from src.api.deps import get_current_user, get_db_pool, get_guild_id
 from src.api.schemas import UserListBulk, UserListCreate, UserListResponse
 from src.db import database
 from src.db.repositories import users_repo
 
 router = APIRouter()
 
+_LIST_TYPES = ("whitelist", "blacklist")
+# Строк CSV за один заход в поток: чтение загрузки (после 1 МБ — временный файл на диске) и разбор
+CSV_BATCH_ROWS = 1000
+
 
 @router.get("/users", response_model=list[UserListResponse])
 async def list_users(
+    request: Request,
     list_type: Annotated[Literal["whitelist", "blacklist"], Query(description="Тип списка: `whitelist` или `blacklist`")],
     _: Annotated[None, Depends(get_current_user)],
     pool: Annotated[asyncpg.Pool, Depends(get_db_pool)],
-) -> list[UserListResponse]:
+    guild_id: Annotated[int, Depends(get_guild_id)],
+) -> Response:
     """
-    Получить список пользователей по типу.
+    Получить список пользователей гильдии по типу.
 
     - **whitelist** — разрешённые пользователи (правила с `target_list=whitelist` их не трогают)
     - **blacklist** — запрещённые пользователи (правила с `target_list=blacklist` применяются к ним)
     """
-    rows = await users_repo.get_user_lists(pool, list_type)
-    return [UserListResponse(**r) for r in rows]
+    async def load() -> list[UserListResponse]:
+        rows = await users_repo.get_user_lists(pool, guild_id, list_type)
+        return [UserListResponse(**r) for r in rows]
+
+    return await conditional_json(request, "user_lists", load, key=(guild_id, list_type))
 
 
 @router.post("/users", response_model=UserListResponse)
@@ -35,6 +49,7 @@ async def add_user(
     body: UserListCreate,
     _: Annotated[None, Depends(get_current_user)],
     pool: Annotated[asyncpg.Pool, Depends(get_db_pool)],
+    guild_id: Annotated[int, Depends(get_guild_id)],
 ) -> UserListResponse:
     """
     Добавить пользователя в whitelist или blacklist.
@@ -53,12 +68,13 @@ async def add_user(
     """
     row = await users_repo.add_user(
         pool,
+        guild_id,
         body.discord_id,
         body.list_type,
         username=body.username,
         reason=body.reason,
     )
-    await database.notify_config_changed(pool)
+    await database.notify_config_changed(pool, "user_lists", [body.discord_id])
     return UserListResponse(**row)
 
 
@@ -68,16 +84,17 @@ async def remove_user(
     list_type: Annotated[Literal["whitelist", "blacklist"], Query(description="Тип списка из которого удалить")],
     _: Annotated[None, Depends(get_current_user)],
     pool: Annotated[asyncpg.Pool, Depends(get_db_pool)],
+    guild_id: Annotated[int, Depends(get_guild_id)],
 ) -> None:
     """
     Удалить пользователя из whitelist или blacklist по discord_id.
 
     Нужно указать `list_type` в query-параметре, так как пользователь может быть одновременно в обоих списках.
     """
-    deleted = await users_repo.remove_user(pool, discord_id, list_type)
+    deleted = await users_repo.remove_user(pool, guild_id, discord_id, list_type)
     if not deleted:
         raise HTTPException(status_code=404, detail="User not found in list")
-    await database.notify_config_changed(pool)
+    await database.notify_config_changed(pool, "user_lists", [discord_id])
 
 
 @router.post("/users/bulk")
@@ -85,11 +102,13 @@ async def bulk_add_users(
     body: UserListBulk,
     _: Annotated[None, Depends(get_current_user)],
     pool: Annotated[asyncpg.Pool, Depends(get_db_pool)],
+    guild_id: Annotated[int, Depends(get_guild_id)],
 ) -> dict:
     """
     Массовое добавление пользователей в списки.
 
     Удобно для первоначального заполнения. Дубликаты пропускаются (upsert).
+    Ответ: `processed` — принято записей, `inserted` / `updated` — новых и обновлённых.
 
     Пример:
     ```json
@@ -103,6 +122,95 @@ async def bulk_add_users(
     ```
     """
     entries = [e.model_dump() for e in body.entries]
-    count = await users_repo.bulk_add(pool, entries)
-    await database.notify_config_changed(pool)
-    return {"processed": count}
+    result = await users_repo.bulk_add(pool, guild_id, entries)
+    await database.notify_config_changed(pool, "user_lists", result.pop("discord_ids"))
+    return result
+
+
+def _read_csv_rows(reader: Any, limit: int) -> list[tuple[int, list[str]]]:
+    """До limit записей csv.reader с номером строки, на которой запись закончилась."""
+    rows: list[tuple[int, list[str]]] = []
+    for values in reader:
+        rows.append((reader.line_num, values))
+        if len(rows) >= limit:
+            break
+    return rows
+
+
+async def _iter_csv_entries(
+    file: UploadFile,
+    default_list_type: Optional[str],
+) -> AsyncIterator[dict[str, Any]]:
+    """
+    Разобрать CSV с заголовком: discord_id (обяз.), list_type, username, reason.
+    Без колонки list_type используется default_list_type. Ошибка строки — ValueError с номером.
+
+    csv.reader читает строки прямо из декодированного потока загрузки (по мере разбора, без
+    загрузки файла целиком), поэтому поля в кавычках с переводами строк разбираются корректно.
+    Чтение файла синхронное, поэтому пачки по CSV_BATCH_ROWS записей разбираются в потоке
+    (asyncio.to_thread) — loop, общий с ботом и планировщиком, не блокируется.
+    """
+    # newline="" — переводы строк внутри кавычек отдаются csv как есть
+    text = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        reader = csv.reader(text)
+        header: Optional[list[str]] = None
+        while rows := await asyncio.to_thread(_read_csv_rows, reader, CSV_BATCH_ROWS):
+            for line_num, values in rows:
+                if not any(v.strip() for v in values):
+                    continue
+                if header is None:
+                    header = [h.strip().lower() for h in values]
+                    if "discord_id" not in header:
+                        raise ValueError("CSV header must contain discord_id")
+                    continue
+                row = dict(zip(header, (v.strip() for v in values)))
+                try:
+                    discord_id = int(row["discord_id"])
+                except (KeyError, ValueError):
+                    raise ValueError(f"line {line_num}: invalid discord_id")
+                list_type = row.get("list_type") or default_list_type
+                if list_type not in _LIST_TYPES:
+                    raise ValueError(f"line {line_num}: list_type must be whitelist or blacklist")
+                yield {
+                    "discord_id": discord_id,
+                    "list_type": list_type,
+                    "username": row.get("username") or None,
+                    "reason": row.get("reason") or None,
+                }
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise ValueError(f"invalid CSV: {e}")
+    finally:
+        # Файл загрузки закрывает сам UploadFile, не обёртка
+        text.detach()
+
+
+@router.post("/users/bulk/csv")
+async def bulk_import_users_csv(
+    file: Annotated[UploadFile, File(description="CSV: discord_id[,list_type,username,reason] с заголовком")],
+    _: Annotated[None, Depends(get_current_user)],
+    pool: Annotated[asyncpg.Pool, Depends(get_db_pool)],
+    guild_id: Annotated[int, Depends(get_guild_id)],
+    list_type: Optional[Literal["whitelist", "blacklist"]] = Query(
+        None, description="Тип списка для строк без колонки list_type"
+    ),
+) -> dict:
+    """
+    Импорт списка из CSV-файла (например, бан-лист другого сервера).
+
+    Файл разбирается потоково и сразу копируется в БД (COPY), весь импорт — одна транзакция:
+    при ошибке в любой строке ничего не записывается (422 с номером строки).
+
+    Пример файла:
+    ```
+    discord_id,username,reason
+    111,user1,спам
+    222,,
+    ```
+    """
+    try:
+        result = await users_repo.bulk_add(pool, guild_id, _iter_csv_entries(file, list_type))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    await database.notify_config_changed(pool, "user_lists", result.pop("discord_ids"))
+    return result
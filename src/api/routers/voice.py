@@ -0,0 +1,54 @@
+"""
+Роутер voice: текущая заполненность голосовых каналов гильдии из памяти бота (без SQL).
+Доступен только когда бот работает в одном процессе с API и гильдия на шардах этого процесса.
+"""
+from typing import Annotated, Any
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from src.api.deps import get_bot, get_current_user, get_guild_id, serves_guild
+from src.engine import occupancy
+
+router = APIRouter()
+
+
+def _guild_occupancy(bot, guild_id: int) -> occupancy.VoiceOccupancy:
+    """Occupancy гильдии; 503, если её обслуживает другой процесс бота (другой диапазон шардов)."""
+    if not serves_guild(bot, guild_id):
+        raise HTTPException(status_code=503, detail="Guild is served by another bot process")
+    return occupancy.get_occupancy(guild_id)
+
+
+@router.get("/voice/occupancy")
+async def get_occupancy(
+    _: Annotated[None, Depends(get_current_user)],
+    bot: Annotated[Any, Depends(get_bot)],
+    guild_id: Annotated[int, Depends(get_guild_id)],
+) -> dict[str, Any]:
+    """
+    Снимок: кто в каких каналах, время входа и состояние мута.
+
+    Ответ: `version`, `count`, `channels` (`channel_id` → список участников).
+    Дальше можно опрашивать `/voice/occupancy/delta?since=<version>`.
+    """
+    return _guild_occupancy(bot, guild_id).snapshot()
+
+
+@router.get("/voice/occupancy/delta")
+async def get_occupancy_delta(
+    _: Annotated[None, Depends(get_current_user)],
+    bot: Annotated[Any, Depends(get_bot)],
+    guild_id: Annotated[int, Depends(get_guild_id)],
+    since: Annotated[int, Query(ge=0, description="Версия из предыдущего snapshot или delta")],
+) -> dict[str, Any]:
+    """
+    Изменения после версии `since`: `op` — join, move, leave или update (мут),
+    `occupant` — новое состояние участника (для leave — null).
+
+    410 — версия выпала из журнала (или бот пересинхронизировался): нужен новый snapshot.
+    """
+    guild_occupancy = _guild_occupancy(bot, guild_id)
+    deltas = guild_occupancy.deltas_since(since)
+    if deltas is None:
+        raise HTTPException(status_code=410, detail="Version is too old, fetch /voice/occupancy")
+    return {"version": guild_occupancy.version, "deltas": deltas}
@@ -0,0 +1,50 @@
+"""
+Роутер голосовых сессий: потоковый экспорт истории.
+"""
+from typing import Annotated, Optional
+
+import asyncpg
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+
+from src.api.deps import get_current_user, get_db_pool, get_guild_id, parse_datetime
+from src.api.streaming import ExportFormat, export_response
+from src.db.repositories import sessions_repo
+
+router = APIRouter()
+
+SESSION_EXPORT_COLUMNS = ["id", "discord_id", "channel_id", "joined_at", "left_at", "duration_sec"]
+
+
+@router.get("/voice-sessions/export")
+async def export_voice_sessions(
+    _: Annotated[dict, Depends(get_current_user)],
+    pool: Annotated[asyncpg.Pool, Depends(get_db_pool)],
+    guild_id: Annotated[int, Depends(get_guild_id)],
+    fmt: ExportFormat = Query("csv", alias="format", description="Формат выгрузки: csv или ndjson"),
+    use_gzip: bool = Query(False, alias="gzip", description="Сжать выгрузку gzip"),
+    discord_id: Optional[int] = Query(None, description="Фильтр по Discord ID пользователя"),
+    channel_id: Optional[int] = Query(None, description="Фильтр по голосовому каналу"),
+    active_only: bool = Query(False, description="Только незавершённые сессии"),
+    date_from: Optional[str] = Query(None, description="Вход не раньше (ISO 8601)"),
+    date_to: Optional[str] = Query(None, description="Вход не позже (ISO 8601)"),
+) -> StreamingResponse:
+    """
+    Выгрузка голосовых сессий целиком, без лимита: строки читаются серверным курсором
+    и отдаются потоком, память не растёт с объёмом периода.
+    """
+    filters = {
+        "discord_id": discord_id,
+        "channel_id": channel_id,
+        "active_only": active_only,
+        "date_from": parse_datetime(date_from),
+        "date_to": parse_datetime(date_to),
+    }
+    return export_response(
+        sessions_repo.iter_sessions(pool, guild_id, filters),
+        fmt,
+        SESSION_EXPORT_COLUMNS,
+        filename="voice_sessions",
+        gzip=use_gzip,
+        id_fields=frozenset({"discord_id", "channel_id"}),
+    )
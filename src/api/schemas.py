@@ -141,6 +141,12 @@ class ActionLogResponse(BaseModel):
     model_config = {"from_attributes": True}
 
 
+class ActionLogPage(BaseModel):
+    """Страница логов; next_cursor — непрозрачный курсор следующей страницы (None — конец)."""
+    items: list[ActionLogResponse]
+    next_cursor: Optional[str] = None
+
+
 class LogsFilter(BaseModel):
     discord_id: Optional[DiscordId] = None
     rule_id: Optional[int] = None
@@ -172,6 +178,26 @@ class UserStatsResponse(BaseModel):
     actions_by_type: dict[str, int]
 
 
+class OnlineUser(BaseModel):
+    user_id: DiscordId
+    channel_id: DiscordId
+    joined_at: datetime
+    username: Optional[str] = None
+    avatar: Optional[str] = None
+    channel_name: Optional[str] = None
+
+
+class DashboardBootstrapResponse(BaseModel):
+    """Всё для первой отрисовки дашборда одним ответом."""
+    active_rules: list[RuleResponse]
+    recent_logs: list[ActionLogResponse]
+    voice_online_count: int
+    online_users: list[OnlineUser]
+    stats: StatsOverviewResponse
+    members: dict[str, dict[str, Any]]
+    roles: list[dict[str, Any]]
+
+
 # --- Kick targets ---
 
 class KickTargetCreate(BaseModel):
@@ -201,6 +227,14 @@ class KickTargetResponse(BaseModel):
     model_config = {"from_attributes": True}
 
 
+class KickTargetBulkEntry(KickTargetCreate):
+    is_active: bool = True
+
+
+class KickTargetBulkDelete(BaseModel):
+    discord_ids: list[DiscordId]
+
+
 # --- Mute Levels ---
 
 class MuteLevelCreate(BaseModel):
@@ -248,6 +282,25 @@ class StackingPairCreate(BaseModel):
     target_channel_id: DiscordId
 
 
+class StackingPairBulkEntry(StackingPairCreate):
+    is_active: bool = True
+
+
+class StackingPairKey(BaseModel):
+    user_id_1: DiscordId
+    user_id_2: DiscordId
+
+
+class StackingPairBulkDelete(BaseModel):
+    pairs: list[StackingPairKey]
+
+
+class BulkUpsertResult(BaseModel):
+    inserted: int
+    updated: int
+    deleted: int = 0
+
+
 class StackingPairResponse(BaseModel):
     id: int
     user_id_1: DiscordId
@@ -1,39 +1,348 @@
 """
 SSE fan-out broadcaster: один синглтон, несколько подписчиков.
+
+Каждое событие сериализуется один раз в готовый SSE-кадр (bytes) с монотонным id
+и кладётся в кольцевой буфер последних N событий. id кадра — «<boot id>-<номер>»: счётчик
+живёт в памяти процесса, boot id отличает его от счётчиков других воркеров и до рестарта. Подписчики не имеют своих очередей —
+они читают общий буфер по своему курсору (last_id), поэтому стоимость broadcast
+не зависит от числа открытых дашбордов.
+
+- Переподключение с Last-Event-ID: пропущенные события отдаются из буфера. id чужой
+  (другой воркер, до рестарта) или уже выпавший из буфера — вместо replay первым кадром
+  уходит resync: клиент перечитывает состояние целиком (bootstrap дашборда).
+- Медленный подписчик не отключается: если его курсор выпал из буфера,
+  он перескакивает на самое старое доступное событие (пропуск логируется).
+- Фильтры подписчика (гильдия, типы событий, каналы, пользователи) применяются при broadcast:
+  подписчик просыпается только на подходящие кадры. Подписчику с фильтром по каналам или
+  пользователям voice_batch отдаётся только с подходящими обновлениями (тот же id, кадр
+  сериализуется один раз на фильтр).
+- voice_update коалесцируются: за интервал (250 мс) по каждому пользователю гильдии остаётся
+  последнее состояние, и всё уходит кадром voice_batch (по кадру на гильдию).
+- Транспорт между процессами подключаемый (set_backend): по умолчанию событие
+  доставляется в этом же процессе, с PgNotifyBackend (src.api.sse_backends) —
+  через pg_notify во все API-воркеры.
 """
 import asyncio
+import json
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Any, Optional, Protocol
 
 import structlog
+from sse_starlette.sse import ServerSentEvent
+
+from src.utils.metrics import SSE_DROPPED_EVENTS, SSE_EVENTS, SSE_SUBSCRIBERS
 
 log = structlog.get_logger()
 
+DEFAULT_BUFFER_SIZE = 500
+DEFAULT_COALESCE_INTERVAL_SEC = 0.25
+COALESCED_EVENT_TYPE = "voice_update"
+BATCH_EVENT_TYPE = "voice_batch"
+RESYNC_EVENT_TYPE = "resync"
+
+# Готовый кадр keep-alive: одинаковый для всех подписчиков, без id (не сдвигает Last-Event-ID)
+PING_FRAME: bytes = ServerSentEvent(data=json.dumps({"type": "ping"})).encode()
+
+
+def _guild_of(event: dict[str, Any]) -> Optional[int]:
+    ids = _ids_from(event, "guild_id")
+    return next(iter(ids)) if ids else None
+
+
+def _ids_from(event: dict[str, Any], *keys: str) -> frozenset[int]:
+    """Собрать числовые id из полей события (id в событиях — строки)."""
+    result: set[int] = set()
+    for key in keys:
+        value = event.get(key)
+        if value is None:
+            continue
+        try:
+            result.add(int(value))
+        except (TypeError, ValueError):
+            continue
+    return frozenset(result)
+
+
+@dataclass(frozen=True)
+class BatchPart:
+    """Одно обновление внутри voice_batch и его id для фильтров."""
+    event: dict[str, Any]
+    channel_ids: frozenset[int]
+    user_ids: frozenset[int]
+
+
+@dataclass(frozen=True)
+class SSEFrame:
+    """Сериализованное событие: номер, готовые байты SSE-кадра и метаданные для фильтров."""
+    id: int
+    data: bytes
+    type: str = ""
+    event_id: str = ""
+    guild_id: Optional[int] = None
+    channel_ids: frozenset[int] = frozenset()
+    user_ids: frozenset[int] = frozenset()
+    # voice_batch: событие без updates и сами обновления — для урезанных под фильтр кадров
+    batch: Optional[dict[str, Any]] = field(default=None, compare=False)
+    parts: tuple[BatchPart, ...] = field(default=(), compare=False)
+    _views: dict["SSEFilter", bytes] = field(default_factory=dict, compare=False, repr=False)
+
+    def data_for(self, event_filter: Optional["SSEFilter"]) -> bytes:
+        """Байты кадра для подписчика: voice_batch — только с обновлениями под его фильтр."""
+        if (
+            not self.parts
+            or event_filter is None
+            or (event_filter.channel_ids is None and event_filter.user_ids is None)
+        ):
+            return self.data
+        view = self._views.get(event_filter)
+        if view is None:
+            updates = [p.event for p in self.parts if event_filter.matches_ids(p.channel_ids, p.user_ids)]
+            if len(updates) == len(self.parts):
+                view = self.data
+            else:
+                event = {**(self.batch or {}), "updates": updates}
+                view = ServerSentEvent(data=json.dumps(event), id=self.event_id).encode()
+            self._views[event_filter] = view
+        return view
+
+
+@dataclass(frozen=True)
+class SSEFilter:
+    """Фильтр подписчика. None — без ограничения по этому измерению."""
+    guild_id: Optional[int] = None
+    types: Optional[frozenset[str]] = None
+    channel_ids: Optional[frozenset[int]] = None
+    user_ids: Optional[frozenset[int]] = None
+
+    def matches(self, frame: SSEFrame) -> bool:
+        if self.guild_id is not None and frame.guild_id != self.guild_id:
+            return False
+        if self.types is not None:
+            # Подписка на voice_update включает и батчи voice_batch
+            frame_type = COALESCED_EVENT_TYPE if frame.type == BATCH_EVENT_TYPE else frame.type
+            if frame_type not in self.types and frame.type not in self.types:
+                return False
+        return self.matches_ids(frame.channel_ids, frame.user_ids)
+
+    def matches_ids(self, channel_ids: frozenset[int], user_ids: frozenset[int]) -> bool:
+        if self.channel_ids is not None and self.channel_ids.isdisjoint(channel_ids):
+            return False
+        if self.user_ids is not None and self.user_ids.isdisjoint(user_ids):
+            return False
+        return True
+
+
+class SSEBackend(Protocol):
+    """Транспорт публикации: доставляет событие в deliver() broadcaster'ов всех процессов."""
+
+    async def publish(self, event: dict[str, Any]) -> None: ...
+
+
+class Subscription:
+    """Курсор подписчика по общему буферу + событие пробуждения."""
+
+    def __init__(
+        self,
+        broadcaster: "SSEBroadcaster",
+        last_id: int,
+        event_filter: Optional[SSEFilter] = None,
+        resync: Optional[bytes] = None,
+    ) -> None:
+        self._broadcaster = broadcaster
+        self.last_id = last_id
+        self.filter = event_filter
+        self.skipped = 0  # сколько событий пропущено из-за отставания
+        self._resync = resync  # кадр resync для первого чтения (Last-Event-ID не из буфера)
+        self._wakeup = asyncio.Event()
+
+    def _notify(self, frame: SSEFrame) -> None:
+        if self.filter is None or self.filter.matches(frame):
+            self._wakeup.set()
+
+    def drain(self) -> list[bytes]:
+        """Забрать все подходящие под фильтр кадры новее last_id (без ожидания)."""
+        resync, self._resync = self._resync, None
+        if resync is not None:
+            return [resync, *self.drain()]
+        frames, skipped = self._broadcaster._frames_after(self.last_id)
+        if skipped:
+            self.skipped += skipped
+            SSE_DROPPED_EVENTS.inc(skipped)
+            log.warning("sse.subscriber_lagged", skipped=skipped, last_id=self.last_id)
+        if not frames:
+            return []
+        self.last_id = frames[-1].id
+        if self.filter is not None:
+            frames = [f for f in frames if self.filter.matches(f)]
+        return [f.data_for(self.filter) for f in frames]
+
+    async def next_frames(self, timeout: float) -> list[bytes]:
+        """
+        Дождаться новых кадров. Возвращает пустой список по таймауту
+        (вызывающий код отправляет ping).
+        """
+        frames = self.drain()
+        if frames:
+            return frames
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return []
+        return self.drain()
+
 
 class SSEBroadcaster:
-    def __init__(self) -> None:
-        self._subscribers: list[asyncio.Queue] = []
+    def __init__(
+        self,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+        coalesce_interval: float = DEFAULT_COALESCE_INTERVAL_SEC,
+    ) -> None:
+        self._subscribers: list[Subscription] = []
+        self._buffer: deque[SSEFrame] = deque(maxlen=buffer_size)
+        self._boot_id = uuid.uuid4().hex[:8]
+        self._last_id = 0
+        self._coalesce_interval = coalesce_interval
+        # (guild_id, user_id) → последнее voice_update за текущий интервал коалесцирования
+        self._pending_voice: dict[tuple[Optional[int], str], dict[str, Any]] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._backend: Optional[SSEBackend] = None
+
+    def set_backend(self, backend: Optional[SSEBackend]) -> None:
+        """Подключить транспорт между процессами. None — доставка только в этом процессе."""
+        self._backend = backend
+        log.info("sse.backend", backend=type(backend).__name__ if backend else "in_process")
 
-    def subscribe(self) -> asyncio.Queue:
-        q: asyncio.Queue = asyncio.Queue(maxsize=50)
-        self._subscribers.append(q)
-        log.info("sse.subscribe", total=len(self._subscribers))
-        return q
+    @property
+    def last_id(self) -> int:
+        return self._last_id
 
-    def unsubscribe(self, q: asyncio.Queue) -> None:
+    def event_id(self, n: int) -> str:
+        """id SSE-кадра с номером n (значение Last-Event-ID у клиента)."""
+        return f"{self._boot_id}-{n}"
+
+    def _replay_cursor(self, last_event_id: str) -> Optional[int]:
+        """Номер из Last-Event-ID, если после него в буфере ничего не потеряно; иначе None."""
+        boot_id, _, raw_n = last_event_id.partition("-")
+        if boot_id != self._boot_id:
+            return None
+        try:
+            n = int(raw_n)
+        except ValueError:
+            return None
+        first_id = self._buffer[0].id if self._buffer else self._last_id + 1
+        if n > self._last_id or n < first_id - 1:
+            return None
+        return n
+
+    def subscribe(
+        self,
+        last_event_id: Optional[str] = None,
+        event_filter: Optional[SSEFilter] = None,
+    ) -> Subscription:
+        """
+        Подписаться на события. При last_event_id (заголовок Last-Event-ID)
+        первым чтением отдаются события из буфера, пропущенные клиентом; если их
+        не восстановить (id другого процесса или выпал из буфера) — кадр resync.
+        """
+        cursor = self._last_id
+        resync = None
+        if last_event_id:
+            replay_from = self._replay_cursor(last_event_id)
+            if replay_from is None:
+                event = {"type": RESYNC_EVENT_TYPE}
+                resync = ServerSentEvent(data=json.dumps(event), id=self.event_id(cursor)).encode()
+            else:
+                cursor = replay_from
+        sub = Subscription(self, cursor, event_filter, resync)
+        self._subscribers.append(sub)
+        log.info("sse.subscribe", total=len(self._subscribers), replay_from=cursor, resync=resync is not None)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
         try:
-            self._subscribers.remove(q)
+            self._subscribers.remove(sub)
             log.info("sse.unsubscribe", total=len(self._subscribers))
         except ValueError:
             pass
 
     async def broadcast(self, event: dict) -> None:
-        dead: list[asyncio.Queue] = []
-        for q in list(self._subscribers):
-            try:
-                q.put_nowait(event)
-            except asyncio.QueueFull:
-                dead.append(q)
-        for q in dead:
-            self.unsubscribe(q)
+        """Опубликовать событие через транспорт (или сразу доставить в этом процессе)."""
+        if self._backend is not None:
+            await self._backend.publish(event)
+            return
+        self.deliver(event)
+
+    def deliver(self, event: dict[str, Any]) -> None:
+        """
+        Доставить событие подписчикам этого процесса. voice_update копятся
+        и уходят батчем раз в интервал, остальные события сериализуются и рассылаются сразу.
+        """
+        if event.get("type") == COALESCED_EVENT_TYPE and self._coalesce_interval > 0:
+            self._pending_voice[(_guild_of(event), str(event.get("user_id")))] = event
+            if self._flush_handle is None:
+                loop = asyncio.get_running_loop()
+                self._flush_handle = loop.call_later(self._coalesce_interval, self._flush_voice)
+            return
+        self._emit(event)
+
+    def _flush_voice(self) -> None:
+        """Отправить накопленные voice_update: по кадру voice_batch на гильдию."""
+        self._flush_handle = None
+        if not self._pending_voice:
+            return
+        by_guild: dict[Optional[int], list[dict[str, Any]]] = {}
+        for (guild_id, _), update in self._pending_voice.items():
+            by_guild.setdefault(guild_id, []).append(update)
+        self._pending_voice = {}
+        for guild_id, updates in by_guild.items():
+            event: dict[str, Any] = {"type": BATCH_EVENT_TYPE, "updates": updates}
+            if guild_id is not None:
+                event["guild_id"] = str(guild_id)
+            self._emit(event, updates)
+
+    def _emit(self, event: dict[str, Any], sources: Optional[list[dict[str, Any]]] = None) -> None:
+        """Сериализовать событие один раз, положить в буфер и разбудить подходящих подписчиков."""
+        parts = tuple(
+            BatchPart(src, _ids_from(src, "channel_id", "from_channel_id"), _ids_from(src, "user_id", "discord_id"))
+            for src in sources or [event]
+        )
+        channel_ids: frozenset[int] = frozenset().union(*(p.channel_ids for p in parts))
+        user_ids: frozenset[int] = frozenset().union(*(p.user_ids for p in parts))
+
+        self._last_id += 1
+        event_id = self.event_id(self._last_id)
+        frame = SSEFrame(
+            id=self._last_id,
+            data=ServerSentEvent(data=json.dumps(event), id=event_id).encode(),
+            type=str(event.get("type", "")),
+            event_id=event_id,
+            guild_id=_guild_of(event),
+            channel_ids=channel_ids,
+            user_ids=user_ids,
+            batch={k: v for k, v in event.items() if k != "updates"} if sources else None,
+            parts=parts if sources else (),
+        )
+        self._buffer.append(frame)
+        SSE_EVENTS.inc(type=frame.type)
+        for sub in self._subscribers:
+            sub._notify(frame)
+
+    def _frames_after(self, last_id: int) -> tuple[list[SSEFrame], int]:
+        """
+        Кадры с id > last_id и число пропущенных (выпавших из буфера) событий.
+        id в буфере идут подряд, поэтому позиция вычисляется без поиска.
+        """
+        if not self._buffer or last_id >= self._last_id:
+            return [], 0
+        first_id = self._buffer[0].id
+        skipped = max(first_id - last_id - 1, 0)
+        start = max(last_id + 1 - first_id, 0)
+        return list(islice(self._buffer, start, None)), skipped
 
 
 broadcaster = SSEBroadcaster()
+SSE_SUBSCRIBERS.set_function(lambda: len(broadcaster._subscribers))
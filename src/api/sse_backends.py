@@ -0,0 +1,143 @@
+"""
+Транспорт SSE-событий между процессами через PostgreSQL LISTEN/NOTIFY.
+
+Бот публикует событие в канал sse_events (pg_notify), каждый API-процесс слушает
+канал через одно соединение (общий LISTEN из src.db.database) и передаёт событие
+в локальный broadcaster.deliver().
+
+Payload pg_notify ограничен 8000 байт, поэтому событие упаковывается:
+- "j<json>"                   — компактный JSON, если помещается;
+- "z<base85(zlib(json))>"     — сжатый JSON;
+- "c<msg_id>:<i>:<n>:<chunk>" — сжатый JSON, разрезанный на части (собирается на приёме).
+"""
+import base64
+import json
+import uuid
+import zlib
+from collections import OrderedDict
+from typing import Any, Optional
+
+import asyncpg
+
+from src.api.sse import SSEBroadcaster
+from src.db import database
+from src.utils.logging import get_logger
+
+logger = get_logger("api.sse_backends")
+
+SSE_NOTIFY_CHANNEL = "sse_events"
+# Лимит pg_notify — 8000 байт; оставляем запас под заголовок части
+MAX_NOTIFY_PAYLOAD = 7900
+_CHUNK_HEADER_RESERVE = 48
+_MAX_PARTIAL_MESSAGES = 64
+
+
+def pack_event(event: dict[str, Any]) -> list[str]:
+    """Упаковать событие в один или несколько payload'ов для pg_notify."""
+    raw = json.dumps(event, separators=(",", ":"), ensure_ascii=False)
+    if len(raw.encode("utf-8")) + 1 <= MAX_NOTIFY_PAYLOAD:
+        return ["j" + raw]
+
+    compressed = base64.b85encode(zlib.compress(raw.encode("utf-8"), 6)).decode("ascii")
+    if len(compressed) + 1 <= MAX_NOTIFY_PAYLOAD:
+        return ["z" + compressed]
+
+    msg_id = uuid.uuid4().hex[:12]
+    size = MAX_NOTIFY_PAYLOAD - _CHUNK_HEADER_RESERVE
+    parts = [compressed[i:i + size] for i in range(0, len(compressed), size)]
+    return [f"c{msg_id}:{i}:{len(parts)}:{part}" for i, part in enumerate(parts)]
+
+
+def _decode_compressed(data: str) -> dict[str, Any]:
+    return json.loads(zlib.decompress(base64.b85decode(data.encode("ascii"))).decode("utf-8"))
+
+
+class NotifyUnpacker:
+    """Распаковка payload'ов pack_event; хранит недособранные сообщения (ограниченно)."""
+
+    def __init__(self) -> None:
+        self._partial: OrderedDict[str, list[Optional[str]]] = OrderedDict()
+
+    def feed(self, payload: str) -> Optional[dict[str, Any]]:
+        """Вернуть событие, если payload завершает сообщение, иначе None."""
+        if not payload:
+            return None
+        kind, body = payload[0], payload[1:]
+        if kind == "j":
+            return json.loads(body)
+        if kind == "z":
+            return _decode_compressed(body)
+        if kind != "c":
+            logger.warning("sse.notify_unknown_payload", kind=kind)
+            return None
+
+        msg_id, index, total, chunk = body.split(":", 3)
+        parts = self._partial.get(msg_id)
+        if parts is None:
+            parts = [None] * int(total)
+            self._partial[msg_id] = parts
+            while len(self._partial) > _MAX_PARTIAL_MESSAGES:
+                dropped, _ = self._partial.popitem(last=False)
+                logger.warning("sse.notify_partial_dropped", msg_id=dropped)
+        parts[int(index)] = chunk
+        if any(p is None for p in parts):
+            return None
+        del self._partial[msg_id]
+        return _decode_compressed("".join(parts))  # type: ignore[arg-type]
+
+
+class PgNotifyBackend:
+    """Публикация SSE-событий через pg_notify (доставка во все процессы с LISTEN)."""
+
+    def __init__(self, pool: asyncpg.Pool, channel: str = SSE_NOTIFY_CHANNEL) -> None:
+        self._pool = pool
+        self._channel = channel
+
+    async def publish(self, event: dict[str, Any]) -> None:
+        try:
+            for payload in pack_event(event):
+                await self._pool.execute("SELECT pg_notify($1, $2)", self._channel, payload)
+        except Exception as e:
+            logger.warning("sse.notify_publish_failed", error=str(e), event_type=event.get("type"))
+
+
+def attach_listener(broadcaster: SSEBroadcaster, channel: str = SSE_NOTIFY_CHANNEL) -> None:
+    """
+    Подписать broadcaster этого процесса на канал NOTIFY.
+    Вызывать до database.start_config_listener().
+    """
+    unpacker = NotifyUnpacker()
+
+    def _on_payload(payload: str) -> None:
+        try:
+            event = unpacker.feed(payload)
+        except Exception as e:
+            logger.warning("sse.notify_decode_failed", error=str(e))
+            return
+        if event is not None:
+            broadcaster.deliver(event)
+
+    database.register_channel_listener(channel, _on_payload)
+
+
+def configure_broadcaster(
+    broadcaster: SSEBroadcaster,
+    pool: asyncpg.Pool,
+    backend: str,
+    publish: bool = True,
+    consume: bool = True,
+) -> None:
+    """
+    Настроить транспорт по SSE_BACKEND: "memory" (по умолчанию, один процесс)
+    или "postgres" (pg_notify). publish — процесс публикует события (бот),
+    consume — процесс раздаёт их подписчикам (API).
+    """
+    if backend == "memory":
+        return
+    if backend != "postgres":
+        logger.warning("sse.unknown_backend", backend=backend)
+        return
+    if publish:
+        broadcaster.set_backend(PgNotifyBackend(pool))
+    if consume:
+        attach_listener(broadcaster)
@@ -0,0 +1,189 @@
+"""
+Потоковая выгрузка строк из БД: NDJSON или CSV, опционально gzip.
+Здесь же json_response — сжатый JSON-ответ для крупных агрегатов (bootstrap дашборда)
+и read_bulk_entries — приём выгрузки NDJSON обратно в bulk-эндпоинты.
+
+Строки приходят из асинхронного итератора (серверный курсор, src.db.queries.iter_query), кодируются
+и копятся в буфер до EXPORT_CHUNK_SIZE байт — память не зависит от объёма выгрузки.
+"""
+import csv
+import gzip as gzip_lib
+import io
+import json
+import zlib
+from collections.abc import AsyncIterator, Iterable
+from datetime import datetime
+from typing import Any, Literal
+
+from fastapi import HTTPException, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+ExportFormat = Literal["csv", "ndjson"]
+
+EXPORT_CHUNK_SIZE = 64 * 1024
+# Меньше этого размера gzip не окупается
+GZIP_MIN_SIZE = 1024
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+_MEDIA_TYPES: dict[str, str] = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": NDJSON_MEDIA_TYPE,
+}
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _prepare_row(row: dict[str, Any], columns: Iterable[str], id_fields: frozenset[str]) -> dict[str, Any]:
+    """Оставить нужные колонки; Discord ID — строками (как в API), JSONB-строки — разобрать."""
+    result: dict[str, Any] = {}
+    for col in columns:
+        value = row.get(col)
+        if value is not None and col in id_fields:
+            value = str(value)
+        elif isinstance(value, str) and col == "details":
+            try:
+                value = json.loads(value)
+            except ValueError:
+                pass
+        result[col] = value
+    return result
+
+
+def _csv_cell(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+async def encode_rows(
+    rows: AsyncIterator[dict[str, Any]],
+    fmt: ExportFormat,
+    columns: list[str],
+    id_fields: frozenset[str] = frozenset(),
+) -> AsyncIterator[bytes]:
+    """Кодировать строки в NDJSON/CSV и отдавать блоками ~EXPORT_CHUNK_SIZE байт."""
+    buf = io.StringIO()
+    writer = csv.writer(buf) if fmt == "csv" else None
+    if writer is not None:
+        writer.writerow(columns)
+
+    async for row in rows:
+        item = _prepare_row(row, columns, id_fields)
+        if writer is not None:
+            writer.writerow([_csv_cell(item[c]) for c in columns])
+        else:
+            buf.write(json.dumps(item, ensure_ascii=False, default=_json_default))
+            buf.write("\n")
+        if buf.tell() >= EXPORT_CHUNK_SIZE:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
+
+
+async def gzip_stream(chunks: AsyncIterator[bytes], level: int = 6) -> AsyncIterator[bytes]:
+    """Сжать поток в формат gzip (wbits=31) без накопления всего ответа."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_response(
+    rows: AsyncIterator[dict[str, Any]],
+    fmt: ExportFormat,
+    columns: list[str],
+    filename: str,
+    gzip: bool = False,
+    id_fields: frozenset[str] = frozenset(),
+) -> StreamingResponse:
+    """StreamingResponse с выгрузкой: Content-Disposition attachment, при gzip — .gz файл."""
+    body = encode_rows(rows, fmt, columns, id_fields)
+    name = f"{filename}.{fmt}"
+    headers = {}
+    media_type = _MEDIA_TYPES[fmt]
+    if gzip:
+        body = gzip_stream(body)
+        name += ".gz"
+        media_type = "application/gzip"
+    headers["Content-Disposition"] = f'attachment; filename="{name}"'
+    return StreamingResponse(body, media_type=media_type, headers=headers)
+
+
+def json_response(request: Request, data: Any, min_size: int = GZIP_MIN_SIZE) -> Response:
+    """JSON-ответ, сжатый gzip, если клиент его принимает и тело не слишком мало."""
+    body = json.dumps(jsonable_encoder(data), separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    headers = {"Vary": "Accept-Encoding"}
+    if len(body) >= min_size and "gzip" in request.headers.get("accept-encoding", ""):
+        body = gzip_lib.compress(body, compresslevel=6)
+        headers["Content-Encoding"] = "gzip"
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def bulk_request_body(entry_model: type[BaseModel], field: str) -> dict[str, Any]:
+    """openapi_extra для bulk-эндпоинта с read_bulk_entries: тело JSON {field: [...]} или NDJSON."""
+    entry_schema = entry_model.model_json_schema()
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {field: {"type": "array", "items": entry_schema}},
+                        "required": [field],
+                    }
+                },
+                NDJSON_MEDIA_TYPE: {"schema": entry_schema},
+            },
+        }
+    }
+
+
+async def read_bulk_entries(request: Request, entry_model: type[BaseModel], field: str) -> list[Any]:
+    """
+    Записи тела bulk-запроса. Content-Type application/x-ndjson — по записи на строку, как в
+    выгрузке /export (лишние колонки вроде created_at игнорируются), ошибка — 422 с номером строки.
+    Иначе — JSON-объект {field: [...]}, ошибки валидации — 422 как у обычного тела FastAPI.
+    """
+    raw = await request.body()
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type == NDJSON_MEDIA_TYPE:
+        entries = []
+        for line_no, line in enumerate(raw.decode("utf-8-sig").splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                entries.append(entry_model.model_validate_json(line))
+            except ValidationError as e:
+                raise HTTPException(status_code=422, detail=f"line {line_no}: {e.errors(include_url=False)[0]['msg']}")
+        return entries
+
+    try:
+        data = json.loads(raw)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"invalid JSON: {e}")
+    if not isinstance(data, dict) or field not in data:
+        raise RequestValidationError([{"type": "missing", "loc": ("body", field), "msg": "Field required", "input": data}])
+    try:
+        return TypeAdapter(list[entry_model]).validate_python(data[field])
+    except ValidationError as e:
+        raise RequestValidationError(
+            [{**err, "loc": ("body", field, *err["loc"])} for err in e.errors(include_url=False, include_context=False)]
+        )
@@ -0,0 +1,110 @@
+"""
+AdminCache: небольшие in-memory индексы для slash-команд администратора —
+правила, записи whitelist/blacklist и kick targets, по гильдиям.
+
+Автодополнение должно ответить в пределах 3 секунд Discord, а списки с пагинацией листаются
+без повторных запросов к БД. Данные загружаются лениво по kind и считаются свежими:
+- до config_changed с этим kind (API и сами команды шлют notify_config_changed);
+- не дольше ADMIN_CACHE_TTL секунд — страховка для процессов без LISTEN (run_bot.py).
+"""
+import asyncio
+import time
+from typing import Any, Optional
+
+import asyncpg
+
+from src.db import database
+from src.db.repositories import rules_repo, users_repo
+
+ADMIN_CACHE_TTL = 60.0
+
+CACHE_KINDS = ("rules", "user_lists", "kick_targets")
+LIST_TYPES = ("whitelist", "blacklist")
+
+
+async def _load_kick_targets(pool: asyncpg.Pool, guild_id: int) -> list[dict[str, Any]]:
+    rows = await pool.fetch(
+        """
+        SELECT discord_id, username, timeout_sec, max_timeout_sec, is_active
+        FROM kick_targets
+        WHERE guild_id = $1
+        ORDER BY discord_id
+        """,
+        guild_id,
+    )
+    return [dict(r) for r in rows]
+
+
+class AdminCache:
+    def __init__(self, ttl: float = ADMIN_CACHE_TTL) -> None:
+        self._ttl = ttl
+        # (kind, guild_id) → время загрузки
+        self._loaded_at: dict[tuple[str, int], float] = {}
+        # Счётчик инвалидаций: изменение во время загрузки не даст пометить старые данные свежими
+        self._generation: dict[str, int] = {kind: 0 for kind in CACHE_KINDS}
+        self._locks: dict[tuple[str, int], asyncio.Lock] = {}
+        # guild_id → rule_id → правило (в порядке priority, как rules_repo.get_rules)
+        self.rules: dict[int, dict[int, dict[str, Any]]] = {}
+        # guild_id → list_type → discord_id → запись user_lists
+        self.lists: dict[int, dict[str, dict[int, dict[str, Any]]]] = {}
+        # guild_id → discord_id → kick target
+        self.kick_targets: dict[int, dict[int, dict[str, Any]]] = {}
+
+    def invalidate(self, kind: Optional[str] = None) -> None:
+        """Сбросить kind (None — все) во всех гильдиях: payload config_changed гильдию не несёт."""
+        kinds = CACHE_KINDS if kind is None else (kind,)
+        self._loaded_at = {key: t for key, t in self._loaded_at.items() if key[0] not in kinds}
+        for k in kinds:
+            self._generation[k] += 1
+
+    def on_config_changed(self, change: database.ConfigChange) -> None:
+        for kind in CACHE_KINDS:
+            if change.affects(kind):
+                self.invalidate(kind)
+
+    def _fresh(self, kind: str, guild_id: int) -> bool:
+        loaded_at = self._loaded_at.get((kind, guild_id))
+        return loaded_at is not None and time.monotonic() - loaded_at < self._ttl
+
+    async def ensure(self, pool: asyncpg.Pool, guild_id: int, kind: str) -> None:
+        """Загрузить kind гильдии, если он устарел. Параллельные вызовы ждут одну загрузку."""
+        if self._fresh(kind, guild_id):
+            return
+        lock = self._locks.setdefault((kind, guild_id), asyncio.Lock())
+        async with lock:
+            if self._fresh(kind, guild_id):
+                return
+            started = time.monotonic()
+            generation = self._generation[kind]
+            if kind == "rules":
+                self.rules[guild_id] = {r["id"]: r for r in await rules_repo.get_rules(pool, guild_id)}
+            elif kind == "user_lists":
+                lists = {}
+                for list_type in LIST_TYPES:
+                    entries = await users_repo.get_user_lists(pool, guild_id, list_type)
+                    lists[list_type] = {e["discord_id"]: e for e in entries}
+                self.lists[guild_id] = lists
+            else:
+                targets = await _load_kick_targets(pool, guild_id)
+                self.kick_targets[guild_id] = {t["discord_id"]: t for t in targets}
+            if generation == self._generation[kind]:
+                self._loaded_at[(kind, guild_id)] = started
+
+    async def get_rules(self, pool: asyncpg.Pool, guild_id: int) -> list[dict[str, Any]]:
+        await self.ensure(pool, guild_id, "rules")
+        return list(self.rules.get(guild_id, {}).values())
+
+    async def get_rule(self, pool: asyncpg.Pool, guild_id: int, rule_id: int) -> Optional[dict[str, Any]]:
+        await self.ensure(pool, guild_id, "rules")
+        return self.rules.get(guild_id, {}).get(rule_id)
+
+    async def get_list(self, pool: asyncpg.Pool, guild_id: int, list_type: str) -> dict[int, dict[str, Any]]:
+        await self.ensure(pool, guild_id, "user_lists")
+        return self.lists.get(guild_id, {}).get(list_type, {})
+
+    async def get_kick_targets(self, pool: asyncpg.Pool, guild_id: int) -> dict[int, dict[str, Any]]:
+        await self.ensure(pool, guild_id, "kick_targets")
+        return self.kick_targets.get(guild_id, {})
+
+
+admin_cache = AdminCache()
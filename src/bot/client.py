@@ -1,8 +1,19 @@
 """
-Discord-бот: intents, загрузка cogs (voice_manager, admin_commands), on_ready.
+Discord-бот: intents, загрузка cogs (voice_manager, member_sync, admin_commands), on_ready.
 Пул БД и трекер передаются через атрибуты (bot.pool, bot.tracker) до запуска.
+
+on_ready приходит и после каждого переподключения с новой сессией: разовая работа
+(синхронизация slash-команд, notifier.setup) выполняется только на первом. Дерево команд
+синхронизируется, только если его хэш отличается от сохранённого в bot_state.
+
+Шардирование (create_bot(sharded=True)): ShardedVoiceBot — AutoShardedBot с тем же поведением.
+shard_ids ограничивает процесс частью шардов (python -m src.run_shards запускает по процессу
+на диапазон); гильдии чужих шардов в этот процесс не приходят.
 """
-from datetime import datetime
+import asyncio
+import hashlib
+import json
+from datetime import datetime, timezone
 from typing import Any, Optional
 
 import discord
@@ -10,6 +21,14 @@ from discord.ext import commands
 
 # Типы для атрибутов, которые задаются при старте приложения
 import asyncpg
+import structlog
+
+from src.db.repositories import bot_state_repo
+from src.utils.metrics import DISCORD_GATEWAY_LATENCY
+
+logger = structlog.get_logger("bot")
+
+COMMAND_TREE_HASH_KEY = "command_tree_hash"
 
 
 class VoiceBot(commands.Bot):
@@ -20,43 +39,132 @@ class VoiceBot(commands.Bot):
 
     pool: Optional[asyncpg.Pool] = None
     tracker: Optional[Any] = None  # модуль/объект с start_session, end_session
-    guild_id: Optional[int] = None  # для синхронизации slash-команд с гильдией
+    guild_id: Optional[int] = None  # основная гильдия (DISCORD_GUILD_ID)
+    guild_ids: list[int] = []  # все обслуживаемые гильдии (settings.guild_ids), основная — первой
     config_changed: bool = False  # флаг после NOTIFY config_changed (перечитание правил при следующем событии)
 
-    def __init__(self, command_prefix: str = "!", **kwargs: Any) -> None:
+    def __init__(self, command_prefix: str = "!", member_cache_mode: str = "full", **kwargs: Any) -> None:
         intents = discord.Intents.default()
         intents.guilds = True
         intents.voice_states = True
         intents.members = True  # GUILD_MEMBERS — privileged
+        if member_cache_mode == "slim":
+            # Правилам нужны только участники в войсе; остальные догружаются по запросу
+            # (member_index.search_guild / fetch_members), гильдия не чанкуется на старте
+            member_cache_flags = discord.MemberCacheFlags.none()
+            member_cache_flags.voice = True
+            kwargs.setdefault("member_cache_flags", member_cache_flags)
+            kwargs.setdefault("chunk_guilds_at_startup", False)
         super().__init__(command_prefix=command_prefix, intents=intents, **kwargs)
-        self.start_time: datetime = datetime.utcnow()
+        self.member_cache_mode = member_cache_mode
+        self._first_ready_done = False
+        self.start_time: datetime = datetime.now(timezone.utc)
 
     async def setup_hook(self) -> None:
         """Загрузка cogs при старте."""
+        DISCORD_GATEWAY_LATENCY.set_function(self._gateway_latency)
         await self.load_extension("src.bot.cogs.voice_manager")
+        await self.load_extension("src.bot.cogs.member_sync")
         await self.load_extension("src.bot.cogs.admin_commands")
 
+    def _gateway_latency(self) -> dict[tuple[str, ...], float]:
+        """Задержка по шардам (у нешардированного — шард 0); NaN до первого heartbeat ACK не отдаётся."""
+        if isinstance(self, commands.AutoShardedBot):
+            latencies = self.latencies
+        else:
+            latencies = [(0, self.latency)]
+        return {(str(shard_id),): latency for shard_id, latency in latencies if latency == latency}
+
     async def on_ready(self) -> None:
-        """Логирование имени бота и количества гильдий; синхронизация slash-команд с гильдией."""
-        logger = __import__("structlog", fromlist=["get_logger"]).get_logger("bot")
+        """
+        Первый ready — синхронизация slash-команд и notifier; последующие (reconnect) — только лог.
+        Ошибка sync не отмечает первый ready выполненным: повтор на следующем ready.
+        """
         logger.info(
             "bot_ready",
             user=str(self.user),
             guild_count=len(self.guilds),
+            first=not self._first_ready_done,
         )
-        guild_id = getattr(self, "guild_id", None)
-        if guild_id is not None:
-            self.tree.copy_global_to(guild=discord.Object(id=guild_id))
-            await self.tree.sync(guild=discord.Object(id=guild_id))
-            logger.info("slash_commands_synced", guild_id=guild_id)
+        if self._first_ready_done:
+            return
+        try:
+            await self.sync_commands()
+        except discord.DiscordException as e:
+            logger.warning("slash_commands_sync_failed", error=str(e))
         else:
-            await self.tree.sync()
-            logger.info("slash_commands_synced_global")
+            self._first_ready_done = True
         notifier = getattr(self, "notifier", None)
         if notifier is not None:
             await notifier.setup()
 
+    def command_tree_hash(self, guild: Optional[discord.abc.Snowflake] = None) -> str:
+        """SHA-256 сериализованного дерева команд (то, что ушло бы в Discord при sync)."""
+        payload = sorted(
+            (cmd.to_dict(self.tree) for cmd in self.tree.get_commands(guild=guild)),
+            key=lambda c: (c.get("type", 1), c["name"]),
+        )
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+    async def sync_commands(self) -> bool:
+        """
+        Синхронизировать slash-команды с каждой гильдией бота (или глобально без гильдий), если
+        дерево изменилось с прошлой синхронизации. True — sync выполнялся хотя бы для одной.
+        """
+        guild_ids: list[Optional[int]] = list(self.guild_ids)
+        if not guild_ids and self.guild_id is not None:
+            guild_ids = [self.guild_id]
+        results = await asyncio.gather(*(self._sync_guild_commands(gid) for gid in guild_ids or [None]))
+        return any(results)
 
-def create_bot(command_prefix: str = "!") -> VoiceBot:
-    """Фабрика: создаёт экземпляр бота (pool и tracker задаются вызывающим кодом)."""
-    return VoiceBot(command_prefix=command_prefix)
+    async def _sync_guild_commands(self, guild_id: Optional[int]) -> bool:
+        guild = discord.Object(id=guild_id) if guild_id is not None else None
+        if guild is not None:
+            self.tree.copy_global_to(guild=guild)
+        digest = self.command_tree_hash(guild)
+        key = f"{COMMAND_TREE_HASH_KEY}:{guild_id or 'global'}"
+
+        stored = None
+        if self.pool is not None:
+            try:
+                stored = await bot_state_repo.get_value(self.pool, key)
+            except (asyncpg.PostgresError, OSError) as e:
+                logger.warning("slash_commands_hash_read_failed", error=str(e))
+        if stored == digest:
+            logger.info("slash_commands_sync_skipped", guild_id=guild_id)
+            return False
+
+        await self.tree.sync(guild=guild)
+        logger.info("slash_commands_synced", guild_id=guild_id)
+        if self.pool is not None:
+            try:
+                await bot_state_repo.set_value(self.pool, key, digest)
+            except (asyncpg.PostgresError, OSError) as e:
+                logger.warning("slash_commands_hash_write_failed", error=str(e))
+        return True
+
+
+class ShardedVoiceBot(VoiceBot, commands.AutoShardedBot):
+    """VoiceBot поверх AutoShardedBot: по соединению gateway на шард в одном процессе."""
+
+
+def create_bot(
+    command_prefix: str = "!",
+    member_cache_mode: str = "full",
+    sharded: bool = False,
+    shard_count: Optional[int] = None,
+    shard_ids: Optional[list[int]] = None,
+) -> VoiceBot:
+    """
+    Фабрика: создаёт экземпляр бота (pool и tracker задаются вызывающим кодом).
+    sharded — ShardedVoiceBot; shard_count=None — число шардов по рекомендации Discord,
+    shard_ids — только эти шарды (требует shard_count).
+    """
+    if not sharded:
+        return VoiceBot(command_prefix=command_prefix, member_cache_mode=member_cache_mode)
+    return ShardedVoiceBot(
+        command_prefix=command_prefix,
+        member_cache_mode=member_cache_mode,
+        shard_count=shard_count,
+        shard_ids=shard_ids or None,
+    )
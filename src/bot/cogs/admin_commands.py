@@ -1,18 +1,37 @@
 """
 Cog: slash-команды для администраторов.
-Группы: /rule, /user, /stats.
+Группы: /rule, /user, /stats, /debug.
 Все ответы ephemeral=True — видны только вызвавшему администратору.
 Доступ контролируется через default_member_permissions(administrator=True).
+
+Команды работают с данными гильдии, в которой вызваны (interaction.guild_id).
+Правила, списки и kick targets читаются из admin_cache (src.bot.admin_cache): автодополнение
+и листание страниц не ходят в БД. Изменения из команд шлют notify_config_changed —
+кэш, API и движок правил видят их сразу.
 """
+import io
+from datetime import datetime, timezone
+from typing import Any
+
 import discord
 from discord import app_commands
 from discord.ext import commands
 
+from src.bot.admin_cache import admin_cache
+from src.config.settings import get_settings
+from src.db import database
 from src.db.repositories import rules_repo, stats_repo, users_repo
+from src.engine.member_index import fetch_members, search_guild
 from src.utils.logging import get_logger
+from src.utils.profiler import MAX_DURATION, ProfilerBusyError, profiler
 
 logger = get_logger("admin_commands")
 
+# Discord показывает не больше 25 вариантов автодополнения
+AUTOCOMPLETE_LIMIT = 25
+PAGE_SIZE = 10
+PAGE_VIEW_TIMEOUT = 300
+
 
 def _fmt_seconds(seconds: int) -> str:
     h = seconds // 3600
@@ -22,6 +41,138 @@ def _fmt_seconds(seconds: int) -> str:
     return f"{m}m"
 
 
+async def member_autocomplete(
+    interaction: discord.Interaction,
+    current: str,
+) -> list[app_commands.Choice[str]]:
+    """Автодополнение участника по member_index: значение — Discord ID строкой."""
+    guild = interaction.guild
+    if guild is None:
+        return []
+    return [
+        app_commands.Choice(name=f"{m.display_name} (@{m.name})"[:100], value=str(m.id))
+        for m in await search_guild(guild, current, AUTOCOMPLETE_LIMIT)
+    ]
+
+
+def _pool(interaction: discord.Interaction) -> Any:
+    return getattr(interaction.client, "pool", None)
+
+
+async def rule_autocomplete(
+    interaction: discord.Interaction,
+    current: str,
+) -> list[app_commands.Choice[int]]:
+    """Правила из кэша: совпадение по ID или подстроке названия."""
+    pool = _pool(interaction)
+    if pool is None or interaction.guild_id is None:
+        return []
+    q = current.strip().lower().lstrip("#")
+    choices = []
+    for r in await admin_cache.get_rules(pool, interaction.guild_id):
+        if q and not (str(r["id"]).startswith(q) or q in r["name"].lower()):
+            continue
+        status = "✅" if r["is_active"] else "⏸️"
+        choices.append(app_commands.Choice(name=f"{status} #{r['id']} {r['name']}"[:100], value=r["id"]))
+        if len(choices) >= AUTOCOMPLETE_LIMIT:
+            break
+    return choices
+
+
+def _entry_choices(entries: dict[int, dict[str, Any]], current: str) -> list[app_commands.Choice[str]]:
+    q = current.strip().lower()
+    choices = []
+    for discord_id, entry in entries.items():
+        username = entry.get("username") or ""
+        if q and not (str(discord_id).startswith(q) or q in username.lower()):
+            continue
+        label = f"{username} ({discord_id})" if username else str(discord_id)
+        choices.append(app_commands.Choice(name=label[:100], value=str(discord_id)))
+        if len(choices) >= AUTOCOMPLETE_LIMIT:
+            break
+    return choices
+
+
+async def list_entry_autocomplete(
+    interaction: discord.Interaction,
+    current: str,
+) -> list[app_commands.Choice[str]]:
+    """Записи выбранного списка (list_type из уже введённых параметров) из кэша."""
+    pool = _pool(interaction)
+    if pool is None or interaction.guild_id is None:
+        return []
+    list_type = getattr(interaction.namespace, "list_type", None) or "whitelist"
+    return _entry_choices(await admin_cache.get_list(pool, interaction.guild_id, list_type), current)
+
+
+async def kick_target_autocomplete(
+    interaction: discord.Interaction,
+    current: str,
+) -> list[app_commands.Choice[str]]:
+    """Kick targets из кэша."""
+    pool = _pool(interaction)
+    if pool is None or interaction.guild_id is None:
+        return []
+    return _entry_choices(await admin_cache.get_kick_targets(pool, interaction.guild_id), current)
+
+
+def _parse_discord_id(value: str) -> int | None:
+    value = value.strip().removeprefix("<@").removesuffix(">").lstrip("!")
+    return int(value) if value.isdigit() else None
+
+
+class PagedEmbedView(discord.ui.View):
+    """Пагинация готовых строк кнопками ◀/▶: страницы листаются по уже загруженным данным."""
+
+    def __init__(self, title: str, lines: list[str], color: discord.Color, page_size: int = PAGE_SIZE) -> None:
+        super().__init__(timeout=PAGE_VIEW_TIMEOUT)
+        self.title = title
+        self.lines = lines
+        self.color = color
+        self.page_size = page_size
+        self.page = 0
+        self._update_buttons()
+
+    @property
+    def page_count(self) -> int:
+        return max(1, -(-len(self.lines) // self.page_size))
+
+    def embed(self) -> discord.Embed:
+        start = self.page * self.page_size
+        embed = discord.Embed(
+            title=self.title,
+            description="\n".join(self.lines[start:start + self.page_size]),
+            color=self.color,
+        )
+        if self.page_count > 1:
+            embed.set_footer(text=f"Страница {self.page + 1}/{self.page_count}")
+        return embed
+
+    def _update_buttons(self) -> None:
+        self.prev_page.disabled = self.page == 0
+        self.next_page.disabled = self.page >= self.page_count - 1
+
+    async def _show(self, interaction: discord.Interaction, page: int) -> None:
+        self.page = page
+        self._update_buttons()
+        await interaction.response.edit_message(embed=self.embed(), view=self)
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def prev_page(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
+        await self._show(interaction, max(0, self.page - 1))
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
+        await self._show(interaction, min(self.page_count - 1, self.page + 1))
+
+
+async def _send_paged(interaction: discord.Interaction, view: PagedEmbedView) -> None:
+    if view.page_count > 1:
+        await interaction.followup.send(embed=view.embed(), view=view, ephemeral=True)
+    else:
+        await interaction.followup.send(embed=view.embed(), ephemeral=True)
+
+
 # ---------------------------------------------------------------------------
 # /rule group
 # ---------------------------------------------------------------------------
@@ -44,14 +195,13 @@ class RuleGroup(app_commands.Group):
         if not self.pool:
             await interaction.followup.send("Pool недоступен.", ephemeral=True)
             return
-        rules = await rules_repo.get_rules(self.pool)
+        rules = await admin_cache.get_rules(self.pool, interaction.guild_id)
         if not rules:
             await interaction.followup.send("Правил не найдено.", ephemeral=True)
             return
 
-        shown = rules[:10]
         lines = []
-        for r in shown:
+        for r in rules:
             status = "✅" if r["is_active"] else "⏸️"
             dry = " [DRY RUN]" if r.get("is_dry_run") else ""
             max_t = f" / {_fmt_seconds(r['max_time_sec'])}" if r.get("max_time_sec") else ""
@@ -59,29 +209,26 @@ class RuleGroup(app_commands.Group):
                 f"{status} **#{r['id']}** `{r['action_type']}`{dry} "
                 f"— {r['name']}{max_t}"
             )
-
-        extra = f"\n…и ещё {len(rules) - 10}" if len(rules) > 10 else ""
-        embed = discord.Embed(
-            title=f"Правила ({len(rules)})",
-            description="\n".join(lines) + extra,
-            color=discord.Color.blurple(),
-        )
-        await interaction.followup.send(embed=embed, ephemeral=True)
+        view = PagedEmbedView(f"Правила ({len(rules)})", lines, discord.Color.blurple())
+        await _send_paged(interaction, view)
 
     @app_commands.command(name="toggle", description="Включить/выключить правило")
     @app_commands.default_permissions(administrator=True)
     @app_commands.describe(rule_id="ID правила")
+    @app_commands.autocomplete(rule_id=rule_autocomplete)
     async def rule_toggle(self, interaction: discord.Interaction, rule_id: int) -> None:
         await interaction.response.defer(ephemeral=True)
         if not self.pool:
             await interaction.followup.send("Pool недоступен.", ephemeral=True)
             return
-        rule = await rules_repo.get_rule_by_id(self.pool, rule_id)
+        # Текущее состояние — из БД: переключаем по факту, а не по возможно устаревшему кэшу
+        rule = await rules_repo.get_rule_by_id(self.pool, rule_id, interaction.guild_id)
         if not rule:
             await interaction.followup.send(f"Правило #{rule_id} не найдено.", ephemeral=True)
             return
         new_state = not rule["is_active"]
-        await rules_repo.update_rule(self.pool, rule_id, {"is_active": new_state})
+        await rules_repo.update_rule(self.pool, rule_id, {"is_active": new_state}, interaction.guild_id)
+        await database.notify_config_changed(self.pool, "rules", [rule_id])
         icon = "✅" if new_state else "⏸️"
         word = "включено" if new_state else "выключено"
         await interaction.followup.send(f"{icon} Rule #{rule_id} {word}.", ephemeral=True)
@@ -91,12 +238,13 @@ class RuleGroup(app_commands.Group):
     @app_commands.command(name="info", description="Подробная информация о правиле")
     @app_commands.default_permissions(administrator=True)
     @app_commands.describe(rule_id="ID правила")
+    @app_commands.autocomplete(rule_id=rule_autocomplete)
     async def rule_info(self, interaction: discord.Interaction, rule_id: int) -> None:
         await interaction.response.defer(ephemeral=True)
         if not self.pool:
             await interaction.followup.send("Pool недоступен.", ephemeral=True)
             return
-        rule = await rules_repo.get_rule_by_id(self.pool, rule_id)
+        rule = await admin_cache.get_rule(self.pool, interaction.guild_id, rule_id)
         if not rule:
             await interaction.followup.send(f"Правило #{rule_id} не найдено.", ephemeral=True)
             return
@@ -160,10 +308,12 @@ class UserGroup(app_commands.Group):
             return
         await users_repo.add_user(
             self.pool,
+            guild_id=discord_user.guild.id,
             discord_id=discord_user.id,
             list_type=list_type,
             username=discord_user.display_name,
         )
+        await database.notify_config_changed(self.pool, "user_lists", [discord_user.id])
         await interaction.followup.send(
             f"✅ {discord_user.mention} добавлен в {list_type}.", ephemeral=True
         )
@@ -173,35 +323,87 @@ class UserGroup(app_commands.Group):
     @app_commands.command(name="remove", description="Удалить пользователя из списка")
     @app_commands.default_permissions(administrator=True)
     @app_commands.describe(
-        discord_user="Пользователь Discord",
         list_type="Тип списка",
+        discord_user="Пользователь из списка (подсказки) или Discord ID",
     )
     @app_commands.choices(list_type=[
         app_commands.Choice(name="whitelist", value="whitelist"),
         app_commands.Choice(name="blacklist", value="blacklist"),
     ])
+    @app_commands.autocomplete(discord_user=list_entry_autocomplete)
     async def user_remove(
         self,
         interaction: discord.Interaction,
-        discord_user: discord.Member,
         list_type: str,
+        discord_user: str,
     ) -> None:
         await interaction.response.defer(ephemeral=True)
         if not self.pool:
             await interaction.followup.send("Pool недоступен.", ephemeral=True)
             return
-        removed = await users_repo.remove_user(self.pool, discord_user.id, list_type)
+        # Строка, а не discord.Member: из списка можно удалить и ушедшего с сервера
+        discord_id = _parse_discord_id(discord_user)
+        if discord_id is None:
+            await interaction.followup.send(f"⚠️ «{discord_user}» — не Discord ID.", ephemeral=True)
+            return
+        removed = await users_repo.remove_user(self.pool, interaction.guild_id, discord_id, list_type)
         if removed:
-            await interaction.followup.send(
-                f"✅ {discord_user.mention} удалён из {list_type}.", ephemeral=True
-            )
+            await database.notify_config_changed(self.pool, "user_lists", [discord_id])
+            await interaction.followup.send(f"✅ <@{discord_id}> удалён из {list_type}.", ephemeral=True)
         else:
-            await interaction.followup.send(
-                f"⚠️ {discord_user.mention} не найден в {list_type}.", ephemeral=True
-            )
-        logger.info("admin.user_remove", target_id=discord_user.id, list_type=list_type,
+            await interaction.followup.send(f"⚠️ <@{discord_id}> не найден в {list_type}.", ephemeral=True)
+        logger.info("admin.user_remove", target_id=discord_id, list_type=list_type,
                     removed=removed, admin_id=interaction.user.id)
 
+    @app_commands.command(name="list", description="Показать записи списка")
+    @app_commands.default_permissions(administrator=True)
+    @app_commands.describe(list_type="Тип списка")
+    @app_commands.choices(list_type=[
+        app_commands.Choice(name="whitelist", value="whitelist"),
+        app_commands.Choice(name="blacklist", value="blacklist"),
+    ])
+    async def user_list(self, interaction: discord.Interaction, list_type: str) -> None:
+        await interaction.response.defer(ephemeral=True)
+        if not self.pool:
+            await interaction.followup.send("Pool недоступен.", ephemeral=True)
+            return
+        entries = await admin_cache.get_list(self.pool, interaction.guild_id, list_type)
+        if not entries:
+            await interaction.followup.send(f"{list_type} пуст.", ephemeral=True)
+            return
+        lines = [
+            f"<@{discord_id}>" + (f" — {e['reason']}" if e.get("reason") else "")
+            for discord_id, e in entries.items()
+        ]
+        view = PagedEmbedView(f"{list_type} ({len(entries)})", lines, discord.Color.blurple())
+        await _send_paged(interaction, view)
+
+    @app_commands.command(name="target", description="Таймаут kick target пользователя")
+    @app_commands.default_permissions(administrator=True)
+    @app_commands.describe(target="Kick target (подсказки) или Discord ID")
+    @app_commands.autocomplete(target=kick_target_autocomplete)
+    async def user_target(self, interaction: discord.Interaction, target: str) -> None:
+        await interaction.response.defer(ephemeral=True)
+        if not self.pool:
+            await interaction.followup.send("Pool недоступен.", ephemeral=True)
+            return
+        discord_id = _parse_discord_id(target)
+        entry = (await admin_cache.get_kick_targets(self.pool, interaction.guild_id)).get(discord_id) if discord_id else None
+        if entry is None:
+            await interaction.followup.send(f"⚠️ «{target}» не в kick targets.", ephemeral=True)
+            return
+        timeout = _fmt_seconds(entry["timeout_sec"])
+        if entry.get("max_timeout_sec"):
+            timeout += f" – {_fmt_seconds(entry['max_timeout_sec'])}"
+        embed = discord.Embed(
+            title=f"Kick target: {entry.get('username') or discord_id}",
+            description=f"<@{discord_id}>",
+            color=discord.Color.green() if entry["is_active"] else discord.Color.greyple(),
+        )
+        embed.add_field(name="Статус", value="Активен" if entry["is_active"] else "Неактивен", inline=True)
+        embed.add_field(name="Таймаут", value=timeout, inline=True)
+        await interaction.followup.send(embed=embed, ephemeral=True)
+
     @app_commands.command(name="check", description="Проверить в каких списках пользователь")
     @app_commands.default_permissions(administrator=True)
     @app_commands.describe(discord_user="Пользователь Discord")
@@ -214,8 +416,39 @@ class UserGroup(app_commands.Group):
         if not self.pool:
             await interaction.followup.send("Pool недоступен.", ephemeral=True)
             return
-        in_whitelist = await users_repo.is_in_list(self.pool, discord_user.id, "whitelist")
-        in_blacklist = await users_repo.is_in_list(self.pool, discord_user.id, "blacklist")
+        embed = await self._lists_embed(discord_user)
+        await interaction.followup.send(embed=embed, ephemeral=True)
+
+    @app_commands.command(name="find", description="Найти участника по нику и показать его списки")
+    @app_commands.default_permissions(administrator=True)
+    @app_commands.describe(query="Ник или username (начните вводить — появятся подсказки)")
+    @app_commands.autocomplete(query=member_autocomplete)
+    async def user_find(
+        self,
+        interaction: discord.Interaction,
+        query: str,
+    ) -> None:
+        await interaction.response.defer(ephemeral=True)
+        if not self.pool:
+            await interaction.followup.send("Pool недоступен.", ephemeral=True)
+            return
+        member = None
+        guild = interaction.guild
+        if guild is not None:
+            # Из подсказки приходит ID; если ввели текст вручную — берём лучшее совпадение
+            if query.isdigit():
+                member = guild.get_member(int(query)) or next(iter(await fetch_members(guild, [int(query)])), None)
+            else:
+                member = next(iter(await search_guild(guild, query, 1)), None)
+        if member is None:
+            await interaction.followup.send(f"⚠️ Участник «{query}» не найден.", ephemeral=True)
+            return
+        embed = await self._lists_embed(member)
+        await interaction.followup.send(embed=embed, ephemeral=True)
+
+    async def _lists_embed(self, member: discord.Member) -> discord.Embed:
+        in_whitelist = member.id in await admin_cache.get_list(self.pool, member.guild.id, "whitelist")
+        in_blacklist = member.id in await admin_cache.get_list(self.pool, member.guild.id, "blacklist")
 
         lines = []
         if in_whitelist:
@@ -225,12 +458,11 @@ class UserGroup(app_commands.Group):
         if not lines:
             lines.append("Ни в одном списке")
 
-        embed = discord.Embed(
-            title=f"Списки: {discord_user.display_name}",
+        return discord.Embed(
+            title=f"Списки: {member.display_name}",
             description="\n".join(lines),
             color=discord.Color.blurple(),
         )
-        await interaction.followup.send(embed=embed, ephemeral=True)
 
 
 # ---------------------------------------------------------------------------
@@ -255,7 +487,7 @@ class StatsGroup(app_commands.Group):
         if not self.pool:
             await interaction.followup.send("Pool недоступен.", ephemeral=True)
             return
-        data = await stats_repo.get_today_stats(self.pool)
+        data = await stats_repo.get_today_stats(self.pool, interaction.guild_id)
         embed = discord.Embed(title="Статистика за сегодня", color=discord.Color.blurple())
         embed.add_field(name="Всего действий", value=str(data["total_actions"]), inline=False)
         for action_type, cnt in sorted(data["actions_by_type"].items()):
@@ -274,7 +506,7 @@ class StatsGroup(app_commands.Group):
         if not self.pool:
             await interaction.followup.send("Pool недоступен.", ephemeral=True)
             return
-        data = await stats_repo.get_user_stats(self.pool, discord_user.id)
+        data = await stats_repo.get_user_stats(self.pool, interaction.guild_id, discord_user.id)
         voice_sec = data["total_voice_seconds"]
         embed = discord.Embed(
             title=f"Статистика: {discord_user.display_name}",
@@ -287,6 +519,52 @@ class StatsGroup(app_commands.Group):
         await interaction.followup.send(embed=embed, ephemeral=True)
 
 
+# ---------------------------------------------------------------------------
+# /debug group
+# ---------------------------------------------------------------------------
+
+class DebugGroup(app_commands.Group):
+    """Диагностика производительности. Кроме прав администратора — ALLOWED_DISCORD_IDS, как у дашборда."""
+
+    def __init__(self, bot: commands.Bot) -> None:
+        super().__init__(name="debug", description="Диагностика бота")
+        self.bot = bot
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id in get_settings().ALLOWED_DISCORD_IDS:
+            return True
+        await interaction.response.send_message("Нет доступа.", ephemeral=True)
+        return False
+
+    @app_commands.command(name="profile", description="Профиль event loop (сэмплирование) в файле")
+    @app_commands.default_permissions(administrator=True)
+    @app_commands.rename(fmt="format")
+    @app_commands.describe(seconds="Длительность, сек", fmt="collapsed — flamegraph, pstats — snakeviz")
+    @app_commands.choices(fmt=[
+        app_commands.Choice(name="collapsed (flamegraph)", value="collapsed"),
+        app_commands.Choice(name="pstats", value="pstats"),
+    ])
+    async def debug_profile(
+        self,
+        interaction: discord.Interaction,
+        seconds: app_commands.Range[int, 1, int(MAX_DURATION)] = 10,
+        fmt: str = "collapsed",
+    ) -> None:
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        try:
+            profile = await profiler.profile(seconds)
+        except ProfilerBusyError:
+            await interaction.followup.send("Профайлер уже запущен.", ephemeral=True)
+            return
+        logger.info("debug_profile", user_id=interaction.user.id, seconds=seconds, samples=profile.samples)
+        filename = f"profile-{datetime.now(timezone.utc):%Y%m%d-%H%M%S}.{'txt' if fmt == 'collapsed' else 'pstats'}"
+        await interaction.followup.send(
+            f"Профиль за {profile.duration:.1f} с, сэмплов: {profile.samples}.",
+            file=discord.File(io.BytesIO(profile.render(fmt)), filename=filename),
+            ephemeral=True,
+        )
+
+
 # ---------------------------------------------------------------------------
 # Cog
 # ---------------------------------------------------------------------------
@@ -296,9 +574,19 @@ class AdminCommands(commands.Cog):
 
     def __init__(self, bot: commands.Bot) -> None:
         self.bot = bot
-        bot.tree.add_command(RuleGroup(bot))
-        bot.tree.add_command(UserGroup(bot))
-        bot.tree.add_command(StatsGroup(bot))
+        self._groups = [RuleGroup(bot), UserGroup(bot), StatsGroup(bot), DebugGroup(bot)]
+
+    async def cog_load(self) -> None:
+        # Свои изменения (include_local) и изменения из API сбрасывают кэш команд
+        database.register_config_listener(admin_cache.on_config_changed, include_local=True)
+        for group in self._groups:
+            self.bot.tree.add_command(group)
+
+    async def cog_unload(self) -> None:
+        # Иначе после reload_extension слушатели и группы команд копятся
+        database.unregister_config_listener(admin_cache.on_config_changed)
+        for group in self._groups:
+            self.bot.tree.remove_command(group.name)
 
     @app_commands.command(name="ping", description="Проверка отклика бота")
     async def ping(self, interaction: discord.Interaction) -> None:
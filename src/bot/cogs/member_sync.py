@@ -0,0 +1,65 @@
+"""
+Cog: поддержка поисковых индексов участников гильдий бота (src.engine.member_index)
+и инвалидация кэша сериализованных участников (src.api.member_cache).
+Полная сборка на on_ready, далее — инкрементально по join/update/remove.
+"""
+import discord
+from discord.ext import commands
+
+from src.api.member_cache import member_payloads
+from src.engine.member_index import get_member_index
+from src.utils.logging import get_logger
+
+logger = get_logger("member_sync")
+
+
+class MemberSync(commands.Cog):
+    """Обновление индексов участников из событий гильдий бота."""
+
+    def __init__(self, bot: commands.Bot) -> None:
+        self.bot = bot
+
+    def _guilds(self) -> list[discord.Guild]:
+        guilds = (self.bot.get_guild(gid) for gid in getattr(self.bot, "guild_ids", None) or [])
+        return [g for g in guilds if g is not None]
+
+    def _is_our_guild(self, guild: discord.Guild) -> bool:
+        guild_ids = getattr(self.bot, "guild_ids", None)
+        return not guild_ids or guild.id in guild_ids
+
+    @commands.Cog.listener()
+    async def on_ready(self) -> None:
+        for guild in self._guilds():
+            get_member_index(guild.id).rebuild(guild.members)
+        member_payloads.clear()
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member: discord.Member) -> None:
+        if self._is_our_guild(member.guild):
+            get_member_index(member.guild.id).upsert(member)
+            member_payloads.invalidate(member.id, member.guild.id)
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before: discord.Member, after: discord.Member) -> None:
+        if self._is_our_guild(after.guild):
+            get_member_index(after.guild.id).upsert(after)
+            member_payloads.invalidate(after.id, after.guild.id)
+
+    @commands.Cog.listener()
+    async def on_user_update(self, before: discord.User, after: discord.User) -> None:
+        # Смена username/глобального имени/аватара приходит без гильдии — берём участника из кэша каждой
+        member_payloads.invalidate(after.id)
+        for guild in self._guilds():
+            member = guild.get_member(after.id)
+            if member is not None:
+                get_member_index(guild.id).upsert(member)
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: discord.Member) -> None:
+        if self._is_our_guild(member.guild):
+            get_member_index(member.guild.id).remove(member.id)
+            member_payloads.invalidate(member.id, member.guild.id)
+
+
+async def setup(bot: commands.Bot) -> None:
+    await bot.add_cog(MemberSync(bot))
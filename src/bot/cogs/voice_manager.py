@@ -3,14 +3,18 @@ Cog: голосовые события. on_voice_state_update — tracker, evalu
 Pool, tracker, evaluator, actions и репозитории берутся из self.bot.
 """
 import asyncio
+import functools
 
 import discord
 from discord.ext import commands
 
 from src.api.sse import broadcaster
+from src.bot.recorder import voice_recorder
+from src.engine.occupancy import get_occupancy
 from src.engine.rules import rules_from_dicts
 from src.scheduler.kick_timeout_job import clear_session_timeout
 from src.utils.logging import get_logger
+from src.utils.metrics import VOICE_EVENT_SECONDS
 
 logger = get_logger("voice_manager")
 
@@ -21,23 +25,27 @@ class VoiceManager(commands.Cog):
     def __init__(self, bot: commands.Bot) -> None:
         self.bot = bot
 
-    @commands.Cog.listener()
-    async def on_ready(self) -> None:
+    async def _sync_guilds(self) -> None:
+        """Сверить трекер и occupancy с голосовыми каналами всех гильдий бота (параллельно)."""
         pool = getattr(self.bot, "pool", None)
         tracker = getattr(self.bot, "tracker", None)
-        guild_id = getattr(self.bot, "guild_id", None)
-        guild = self.bot.get_guild(guild_id) if guild_id else None
-        if guild and pool and tracker:
+        if not pool or not tracker:
+            return
+        guilds = [self.bot.get_guild(gid) for gid in getattr(self.bot, "guild_ids", None) or []]
+
+        async def sync(guild: discord.Guild) -> None:
             await tracker.sync_from_guild(pool, guild)
+            get_occupancy(guild.id).sync_from_guild(guild, functools.partial(tracker.get_joined_at, guild.id))
+
+        await asyncio.gather(*(sync(g) for g in guilds if g is not None))
+
+    @commands.Cog.listener()
+    async def on_ready(self) -> None:
+        await self._sync_guilds()
 
     @commands.Cog.listener()
     async def on_resumed(self) -> None:
-        pool = getattr(self.bot, "pool", None)
-        tracker = getattr(self.bot, "tracker", None)
-        guild_id = getattr(self.bot, "guild_id", None)
-        guild = self.bot.get_guild(guild_id) if guild_id else None
-        if guild and pool and tracker:
-            await tracker.sync_from_guild(pool, guild)
+        await self._sync_guilds()
 
     @commands.Cog.listener()
     async def on_voice_state_update(
@@ -45,6 +53,20 @@ class VoiceManager(commands.Cog):
         member: discord.Member,
         before: discord.VoiceState,
         after: discord.VoiceState,
+    ) -> None:
+        # Гильдии, которые бот не обслуживает (не из settings.guild_ids или на шардах другого процесса)
+        guild_ids = getattr(self.bot, "guild_ids", None)
+        if guild_ids and member.guild.id not in guild_ids:
+            return
+        voice_recorder.record(member, before, after)
+        with VOICE_EVENT_SECONDS.time(stage="total"):
+            await self._handle_voice_state_update(member, before, after)
+
+    async def _handle_voice_state_update(
+        self,
+        member: discord.Member,
+        before: discord.VoiceState,
+        after: discord.VoiceState,
     ) -> None:
         pool = getattr(self.bot, "pool", None)
         tracker = getattr(self.bot, "tracker", None)
@@ -52,11 +74,16 @@ class VoiceManager(commands.Cog):
             logger.warning("voice_event_skipped", reason="pool or tracker not set")
             return
 
+        guild_id = member.guild.id
         # Вход или перемещение в канал
         if after.channel is not None:
-            if before.channel is not None:
-                await tracker.end_session(pool, member.id, before.channel.id)
-            await tracker.start_session(pool, member.id, after.channel.id)
+            with VOICE_EVENT_SECONDS.time(stage="tracker"):
+                if before.channel is not None:
+                    await tracker.end_session(pool, guild_id, member.id, before.channel.id)
+                await tracker.start_session(pool, guild_id, member.id, after.channel.id)
+                get_occupancy(guild_id).apply(
+                    member, after.channel.id, tracker.get_joined_at(guild_id, member.id, after.channel.id),
+                )
             if before.channel is not None:
                 logger.info(
                     "voice_move",
@@ -74,22 +101,27 @@ class VoiceManager(commands.Cog):
                 )
             asyncio.create_task(broadcaster.broadcast({
                 "type": "voice_update",
+                "guild_id": str(guild_id),
                 "user_id": str(member.id),
                 "username": member.display_name,
                 "avatar": str(member.display_avatar.url),
                 "channel": after.channel.name,
+                "channel_id": str(after.channel.id),
+                "from_channel_id": str(before.channel.id) if before.channel else None,
                 "action": "move" if before.channel else "join",
             }))
 
             # Pair stacking: если пара в одном канале — перенос в целевой; при срабатывании правила не выполняем
             stacking = getattr(self.bot, "stacking_detector", None)
             if stacking and member.guild:
-                pair_moved = await stacking.check_and_move(member, member.guild)
+                with VOICE_EVENT_SECONDS.time(stage="stacking"):
+                    pair_moved = await stacking.check_and_move(member, member.guild)
                 if pair_moved:
                     logs_repo = getattr(self.bot, "logs_repo", None)
                     if logs_repo:
                         await logs_repo.log_action(
                             pool,
+                            guild_id,
                             rule_id=None,
                             discord_id=member.id,
                             action_type="pair_move",
@@ -105,25 +137,28 @@ class VoiceManager(commands.Cog):
             evaluator = getattr(self.bot, "evaluator", None)
             actions = getattr(self.bot, "actions", None)
             if all((rules_repo, users_repo, logs_repo, evaluator, actions)) and member.guild:
-                raw_rules = await rules_repo.get_active_rules(pool, after.channel.id)
-                rules = rules_from_dicts(raw_rules)
-                to_run = await evaluator.evaluate(
-                    member, after.channel, rules, users_repo, pool
-                )
-                for action in to_run:
-                    ok = await actions.execute_action(
-                        action.action_type,
-                        member,
-                        action.params,
-                        member.guild,
-                        is_dry_run=action.is_dry_run,
-                        rule_id=action.rule_id,
-                        pool=pool,
+                with VOICE_EVENT_SECONDS.time(stage="evaluator"):
+                    raw_rules = await rules_repo.get_active_rules(pool, guild_id, after.channel.id)
+                    rules = rules_from_dicts(raw_rules)
+                    to_run = await evaluator.evaluate(
+                        member, after.channel, rules, users_repo, pool
                     )
+                for action in to_run:
+                    with VOICE_EVENT_SECONDS.time(stage="actions"):
+                        ok = await actions.execute_action(
+                            action.action_type,
+                            member,
+                            action.params,
+                            member.guild,
+                            is_dry_run=action.is_dry_run,
+                            rule_id=action.rule_id,
+                            pool=pool,
+                        )
                     if ok:
                         try:
                             await logs_repo.log_action(
                                 pool,
+                                guild_id,
                                 action.rule_id,
                                 member.id,
                                 action.action_type,
@@ -137,52 +172,56 @@ class VoiceManager(commands.Cog):
                                 member_id=member.id,
                                 error=str(log_err),
                             )
-                        from datetime import datetime
+                        from datetime import datetime, timezone
                         asyncio.create_task(broadcaster.broadcast({
                             "type": "action_log",
+                            "guild_id": str(guild_id),
                             "discord_id": str(member.id),
                             "username": member.display_name,
                             "action_type": action.action_type,
                             "rule_id": action.rule_id,
                             "is_dry_run": action.is_dry_run,
-                            "timestamp": datetime.utcnow().isoformat(),
+                            "timestamp": datetime.now(timezone.utc).isoformat(),
                         }))
 
             # Обработка мут-состояния (self_mute AND self_deaf)
             mute_xp_service = getattr(self.bot, "mute_xp_service", None)
             if mute_xp_service:
                 from src.engine.mute_tracker import mute_tracker
-                mute_state_changed = (
-                    before.self_mute != after.self_mute
-                    or before.self_deaf != after.self_deaf
-                )
-                if mute_state_changed:
-                    if mute_tracker.is_fully_muted(member):
+                with VOICE_EVENT_SECONDS.time(stage="mute"):
+                    mute_state_changed = (
+                        before.self_mute != after.self_mute
+                        or before.self_deaf != after.self_deaf
+                    )
+                    if mute_state_changed:
+                        if mute_tracker.is_fully_muted(member):
+                            mute_tracker.start_mute(member)
+                        else:
+                            session = mute_tracker.end_mute(guild_id, member.id)
+                            if session:
+                                duration = mute_tracker.get_duration(session)
+                                asyncio.create_task(
+                                    mute_xp_service.record_mute_session(pool, member, session, duration)
+                                )
+                    elif before.channel is None and mute_tracker.is_fully_muted(member):
+                        # Пользователь зашёл в канал уже замьюченным
                         mute_tracker.start_mute(member)
-                    else:
-                        session = mute_tracker.end_mute(member.id)
-                        if session:
-                            duration = mute_tracker.get_duration(session)
-                            asyncio.create_task(
-                                mute_xp_service.record_mute_session(pool, member, session, duration)
-                            )
-                elif before.channel is None and mute_tracker.is_fully_muted(member):
-                    # Пользователь зашёл в канал уже замьюченным
-                    mute_tracker.start_mute(member)
             return
 
         # Выход из канала
         if before.channel is not None:
-            await tracker.end_session(pool, member.id, before.channel.id)
+            with VOICE_EVENT_SECONDS.time(stage="tracker"):
+                await tracker.end_session(pool, guild_id, member.id, before.channel.id)
+                get_occupancy(guild_id).apply(member, None)
             stacking = getattr(self.bot, "stacking_detector", None)
             if stacking:
-                stacking.on_user_leave(member.id)
-            clear_session_timeout(member.id)
+                stacking.on_user_leave(guild_id, member.id)
+            clear_session_timeout(guild_id, member.id)
             # Завершить мут-сессию при выходе
             mute_xp_service = getattr(self.bot, "mute_xp_service", None)
             if mute_xp_service:
                 from src.engine.mute_tracker import mute_tracker
-                session = mute_tracker.end_mute(member.id)
+                session = mute_tracker.end_mute(guild_id, member.id)
                 if session:
                     duration = mute_tracker.get_duration(session)
                     asyncio.create_task(
@@ -196,10 +235,13 @@ class VoiceManager(commands.Cog):
             )
             asyncio.create_task(broadcaster.broadcast({
                 "type": "voice_update",
+                "guild_id": str(guild_id),
                 "user_id": str(member.id),
                 "username": member.display_name,
                 "avatar": str(member.display_avatar.url),
                 "channel": None,
+                "channel_id": None,
+                "from_channel_id": str(before.channel.id),
                 "action": "leave",
             }))
 
@@ -5,6 +5,9 @@ BotNotifier: отправка embed-сообщений в Discord-каналы.
 - send_daily() — ежедневная статистика
 
 Singleton: set_notifier / get_notifier для доступа без передачи зависимости.
+
+Процесс с частью шардов (SHARD_IDS) может не видеть гильдию каналов уведомлений в кэше —
+тогда сообщения уходят через REST по ID канала (bot.get_partial_messageable).
 """
 from typing import Optional
 
@@ -53,24 +56,30 @@ class BotNotifier:
         self.log_kick_timeouts = log_kick_timeouts
         self.log_rule_actions = log_rule_actions
 
+    def _resolve_channel(self, channel_id: int):  # noqa: ANN202
+        channel = self._bot.get_channel(channel_id)
+        if channel is None and getattr(self._bot, "shard_ids", None):
+            channel = self._bot.get_partial_messageable(channel_id)
+        return channel
+
     async def setup(self) -> None:
         """Вызывать после on_ready — кешировать каналы."""
         if self._channel_id:
-            self._channel = self._bot.get_channel(self._channel_id)
+            self._channel = self._resolve_channel(self._channel_id)
             if not self._channel:
                 log.warning("notifier.channel_not_found", channel_id=self._channel_id)
             else:
                 log.info("notifier.channel_ready", channel_id=self._channel_id)
 
         if self._debug_channel_id:
-            self._debug_channel = self._bot.get_channel(self._debug_channel_id)
+            self._debug_channel = self._resolve_channel(self._debug_channel_id)
             if not self._debug_channel:
                 log.warning("notifier.debug_channel_not_found", channel_id=self._debug_channel_id)
             else:
                 log.info("notifier.debug_channel_ready", channel_id=self._debug_channel_id)
 
         if self._daily_channel_id:
-            self._daily_channel = self._bot.get_channel(self._daily_channel_id)
+            self._daily_channel = self._resolve_channel(self._daily_channel_id)
             if not self._daily_channel:
                 log.warning("notifier.daily_channel_not_found", channel_id=self._daily_channel_id)
             else:
@@ -0,0 +1,205 @@
+"""
+Запись голосовых событий gateway для воспроизведения инцидентов и бенчмарков на реальном трафике.
+
+Включается VOICE_RECORD_PATH. Каждый on_voice_state_update — строка NDJSON:
+
+    {"t": 12345.678901, "g": <guild_id>, "m": <member_id>, "b": [<channel_id>, <flags>] | null, "a": ...}
+
+t — time.monotonic() (важны только интервалы между событиями), b/a — состояние до/после
+(null — не в войсе), flags — битовая маска FLAGS. Воспроизведение: python -m benchmarks.replay.
+
+На горячем пути только снимок полей в кортеж и put в очередь: discord.py обновляет VoiceState
+на месте, поэтому копировать приходится сразу. Сериализация, запись и ротация по размеру
+(<path>.1 … <path>.<backups>, как RotatingFileHandler) — в отдельном потоке. Если поток
+не успевает и в очереди больше MAX_PENDING событий, новые отбрасываются (метрика dropped).
+Если поток упал (диск заполнен, нет прав), запись выключается: record() больше ничего
+не ставит в очередь, а то, что не успело записаться, учитывается как dropped.
+"""
+import json
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+import structlog
+
+from src.utils.metrics import VOICE_RECORDER_EVENTS
+
+log = structlog.get_logger("voice_recorder")
+
+# Порядок битов в flags; при добавлении — только в конец
+FLAGS = ("self_mute", "self_deaf", "mute", "deaf", "self_stream", "self_video")
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+DEFAULT_BACKUPS = 5
+MAX_PENDING = 100_000
+# Как часто поток сбрасывает буфер на диск, если событий мало
+FLUSH_INTERVAL = 1.0
+
+_STOP = object()
+
+# (channel_id, flags) или None
+StateSnapshot = Optional[tuple[Optional[int], int]]
+Record = tuple[float, Optional[int], int, StateSnapshot, StateSnapshot]
+
+
+def snapshot_state(state: Any) -> StateSnapshot:
+    """VoiceState → (channel_id, flags); None, если участник не в голосовом канале."""
+    if state is None or state.channel is None:
+        return None
+    flags = 0
+    for bit, name in enumerate(FLAGS):
+        if getattr(state, name, False):
+            flags |= 1 << bit
+    return state.channel.id, flags
+
+
+def unpack_flags(flags: int) -> dict[str, bool]:
+    return {name: bool(flags & (1 << bit)) for bit, name in enumerate(FLAGS)}
+
+
+def encode_record(record: Record) -> str:
+    t, guild_id, member_id, before, after = record
+    return json.dumps(
+        {"t": round(t, 6), "g": guild_id, "m": member_id, "b": before, "a": after},
+        separators=(",", ":"),
+    )
+
+
+def rotated_paths(path: Path, backups: int = DEFAULT_BACKUPS) -> list[Path]:
+    """Файлы записи от старых к новым: <path>.<backups> … <path>.1, <path>."""
+    candidates = [path.with_name(f"{path.name}.{i}") for i in range(backups, 0, -1)] + [path]
+    return [p for p in candidates if p.exists()]
+
+
+class VoiceEventRecorder:
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        backups: int = DEFAULT_BACKUPS,
+    ) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._queue: "queue.SimpleQueue[Any]" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._thread is not None
+
+    def start(self) -> None:
+        if self._thread is not None or self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._thread = threading.Thread(target=self._write_loop, name="voice-recorder", daemon=True)
+        self._thread.start()
+        log.info("voice_recorder.started", path=str(self.path), max_bytes=self.max_bytes)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Дописать очередь и закрыть файл."""
+        if self._thread is None:
+            return
+        thread, self._thread = self._thread, None
+        self._queue.put(_STOP)
+        thread.join(timeout=timeout)
+
+    def record(self, member: Any, before: Any, after: Any) -> None:
+        """Вызывается из on_voice_state_update; ничего не делает, если запись выключена."""
+        if self._thread is None:
+            return
+        if self._queue.qsize() >= MAX_PENDING:
+            VOICE_RECORDER_EVENTS.inc(result="dropped")
+            return
+        guild = getattr(member, "guild", None)
+        self._queue.put((
+            time.monotonic(),
+            guild.id if guild is not None else None,
+            member.id,
+            snapshot_state(before),
+            snapshot_state(after),
+        ))
+
+    def _write_loop(self) -> None:
+        assert self.path is not None
+        file = None
+        batch: list[Record] = []
+        try:
+            file = open(self.path, "a", encoding="utf-8")
+            while True:
+                try:
+                    item = self._queue.get(timeout=FLUSH_INTERVAL)
+                except queue.Empty:
+                    file.flush()
+                    continue
+                # Забрать всё накопившееся одной пачкой: одна запись в файл на пачку
+                batch = []
+                stopping = item is _STOP
+                if not stopping:
+                    batch.append(item)
+                while not stopping:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stopping = True
+                    else:
+                        batch.append(item)
+                if batch:
+                    file.write("".join(encode_record(r) + "\n" for r in batch))
+                    VOICE_RECORDER_EVENTS.inc(len(batch), result="written")
+                    if file.tell() >= self.max_bytes:
+                        file.close()
+                        self._rotate()
+                        file = open(self.path, "a", encoding="utf-8")
+                if stopping:
+                    return
+        except Exception:
+            log.exception("voice_recorder.write_failed", path=str(self.path))
+            # Очередь больше никто не читает: выключить запись, а не копить до MAX_PENDING
+            if self._thread is threading.current_thread():
+                self._thread = None
+            VOICE_RECORDER_EVENTS.inc(len(batch) + self._discard_pending(), result="dropped")
+        finally:
+            if file is not None:
+                try:
+                    file.close()
+                except OSError:
+                    pass
+
+    def _discard_pending(self) -> int:
+        """Очистить очередь; число отброшенных событий."""
+        count = 0
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return count
+            if item is not _STOP:
+                count += 1
+
+    def _rotate(self) -> None:
+        assert self.path is not None
+        if self.backups <= 0:
+            self.path.unlink(missing_ok=True)
+            return
+        for i in range(self.backups - 1, 0, -1):
+            src = self.path.with_name(f"{self.path.name}.{i}")
+            if src.exists():
+                os.replace(src, self.path.with_name(f"{self.path.name}.{i + 1}"))
+        os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+
+
+voice_recorder = VoiceEventRecorder()
+
+
+def start_voice_recorder(path: str, max_mb: float = DEFAULT_MAX_BYTES / 1024 / 1024) -> VoiceEventRecorder:
+    """Настроить и запустить глобальный рекордер (src/main.py, src/run_bot.py); пустой path — выключен."""
+    if path:
+        voice_recorder.path = Path(path)
+        voice_recorder.max_bytes = int(max_mb * 1024 * 1024)
+        voice_recorder.start()
+    return voice_recorder
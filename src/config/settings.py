@@ -7,7 +7,7 @@ from pathlib import Path
 from typing import Any
 
 import yaml
-from pydantic import Field, field_validator
+from pydantic import Field, field_validator, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -21,7 +21,7 @@ _DEFAULT_YAML = {
         "kick_on_blacklist_join": False,
     },
     "channels": {"monitored": [], "move_target": None},
-    "logging": {"level": "INFO", "format": "json"},
+    "logging": {"level": "INFO", "format": "json", "async": False, "sampling": {}},
     "pair_stacking": {
         "enabled": True,
         "target_channel_id": None,
@@ -85,7 +85,11 @@ class Settings(BaseSettings):
     )
 
     DISCORD_TOKEN: str = Field(..., description="Токен Discord-бота")
-    DISCORD_GUILD_ID: int = Field(..., description="ID гильдии")
+    DISCORD_GUILD_ID: int = Field(..., description="ID основной гильдии (по умолчанию для API и YAML-конфига)")
+    DISCORD_GUILD_IDS: list[int] = Field(
+        default=[],
+        description="Дополнительные гильдии, которые обслуживает бот (JSON-массив); пусто — только DISCORD_GUILD_ID",
+    )
     DATABASE_URL: str = Field(..., description="URL БД (postgresql+asyncpg://...)")
     API_HOST: str = Field(default="0.0.0.0", description="Хост API")
     API_PORT: int = Field(default=8000, description="Порт API")
@@ -97,6 +101,55 @@ class Settings(BaseSettings):
         description="Макс. действий (mute/kick/move) в минуту на гильдию; 0 — без лимита",
     )
 
+    SSE_BACKEND: str = Field(
+        default="memory",
+        description="Транспорт SSE-событий: memory (бот и API в одном процессе) или postgres (pg_notify)",
+    )
+    MEMBER_CACHE_MODE: str = Field(
+        default="full",
+        description="Кэш участников: full (все, чанкинг на старте) или slim (только в войсе, остальные по запросу)",
+    )
+    DB_SLOW_QUERY_MS: float = Field(
+        default=200.0,
+        description="Порог события db.slow_query в логах (мс); статистика запросов — GET /api/debug/db-stats",
+    )
+    LOOP_SLOW_CALLBACK_MS: float = Field(
+        default=0.0,
+        description="Порог детектора блокировок event loop (мс): дольше — событие loop.blocked со стеком; 0 — выключен",
+    )
+    VOICE_RECORD_PATH: str = Field(
+        default="",
+        description="Файл записи голосовых событий (NDJSON) для python -m benchmarks.replay; пусто — запись выключена",
+    )
+    VOICE_RECORD_MAX_MB: float = Field(
+        default=50.0,
+        description="Размер файла записи, после которого он ротируется (<path>.1 … <path>.5)",
+    )
+    BOT_SHARDED: bool = Field(
+        default=False,
+        description="AutoShardedBot: несколько соединений gateway в одном процессе (число шардов — SHARD_COUNT или рекомендация Discord)",
+    )
+    SHARD_COUNT: int | None = Field(
+        default=None,
+        description="Общее число шардов; задано — бот шардированный. Обязательно при SHARD_IDS",
+    )
+    SHARD_IDS: list[int] = Field(
+        default=[],
+        description="Шарды этого процесса (JSON-массив, например [0,1]); пусто — все. Процесс обслуживает только гильдии своих шардов",
+    )
+    API_ENABLED: bool = Field(
+        default=True,
+        description="Запускать API в процессе src.main (python -m src.run_shards включает его только в первом процессе)",
+    )
+    METRICS_TOKEN: str = Field(
+        default="",
+        description="Bearer-токен для GET /metrics; пусто — без аутентификации (закройте порт снаружи)",
+    )
+    METRICS_PORT: int = Field(
+        default=0,
+        description="Порт отдельного сервера только с GET /metrics в процессе без API (API_ENABLED=false); 0 — не запускать",
+    )
+
     # Discord OAuth2
     DISCORD_CLIENT_ID: str = Field(default="", description="Discord OAuth2 Client ID")
     DISCORD_CLIENT_SECRET: str = Field(default="", description="Discord OAuth2 Client Secret")
@@ -115,7 +168,33 @@ class Settings(BaseSettings):
         description="Discord ID пользователей с доступом к дашборду",
     )
 
-    @field_validator("ALLOWED_DISCORD_IDS", mode="before")
+    @property
+    def guild_ids(self) -> list[int]:
+        """Все обслуживаемые гильдии: DISCORD_GUILD_ID первой, затем DISCORD_GUILD_IDS без повторов."""
+        return list(dict.fromkeys([self.DISCORD_GUILD_ID, *self.DISCORD_GUILD_IDS]))
+
+    @property
+    def sharded(self) -> bool:
+        return self.BOT_SHARDED or self.SHARD_COUNT is not None or bool(self.SHARD_IDS)
+
+    @property
+    def local_guild_ids(self) -> list[int]:
+        """Гильдии этого процесса: при SHARD_IDS — только те, что приходят через его шарды."""
+        if not self.SHARD_IDS or self.SHARD_COUNT is None:
+            return self.guild_ids
+        shard_ids = set(self.SHARD_IDS)
+        return [g for g in self.guild_ids if shard_for_guild(g, self.SHARD_COUNT) in shard_ids]
+
+    @model_validator(mode="after")
+    def check_shards(self) -> "Settings":
+        if self.SHARD_IDS:
+            if self.SHARD_COUNT is None:
+                raise ValueError("SHARD_IDS requires SHARD_COUNT")
+            if any(not 0 <= s < self.SHARD_COUNT for s in self.SHARD_IDS):
+                raise ValueError("SHARD_IDS must be in range [0, SHARD_COUNT)")
+        return self
+
+    @field_validator("ALLOWED_DISCORD_IDS", "DISCORD_GUILD_IDS", "SHARD_IDS", mode="before")
     @classmethod
     def parse_allowed_ids(cls, v: Any) -> list[int]:
         if isinstance(v, str):
@@ -139,6 +218,11 @@ class Settings(BaseSettings):
 _settings: Settings | None = None
 
 
+def shard_for_guild(guild_id: int, shard_count: int) -> int:
+    """Шард, через который Discord присылает события гильдии: (guild_id >> 22) % shard_count."""
+    return (guild_id >> 22) % shard_count
+
+
 def get_stacking_pairs(config: dict) -> list[dict]:
     """
     Из config["pair_stacking"]["pairs"] извлечь список:
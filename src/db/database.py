@@ -2,19 +2,64 @@
 Подключение к PostgreSQL через asyncpg. Пул соединений, context manager и LISTEN/NOTIFY.
 """
 import asyncio
+import json
 import os
-from collections.abc import Callable
+from collections.abc import Callable, Iterable
 from contextlib import asynccontextmanager
-from typing import Optional
+from dataclasses import dataclass
+from typing import Any, Optional
 
 import asyncpg
 
+from src.db.instrumented import DEFAULT_SLOW_QUERY_MS, InstrumentedPool, query_stats
+from src.utils.logging import get_logger
+from src.utils.metrics import DB_POOL_CONNECTIONS
+
+logger = get_logger("db.database")
+
 # Чтение только из окружения, чтобы не создавать циклические зависимости с config
 DATABASE_URL_ENV_KEY = "DATABASE_URL"
 CONFIG_CHANGED_CHANNEL = "config_changed"
+# Лимит payload pg_notify — 8000 байт; длинный список id заменяется на «изменено всё в kind»
+_MAX_CONFIG_PAYLOAD = 7900
+# Пауза перед переподключением LISTEN после потери соединения (удваивается до максимума)
+LISTEN_RETRY_MIN_SEC = 1.0
+LISTEN_RETRY_MAX_SEC = 30.0
+
+
+@dataclass(frozen=True)
+class ConfigChange:
+    """
+    Что изменилось в конфигурации: kind — сущность (rules, user_lists, schedules, ...),
+    ids — затронутые ключи, те же, что в пути API сущности (id правила, расписания и пары
+    стакинга, discord_id таргета и пользователя списка). None в поле означает «всё»
+    (пустой/старый payload, массовая замена с replace=true).
+    """
+    kind: Optional[str] = None
+    ids: Optional[tuple[Any, ...]] = None
+
+    def affects(self, *kinds: str) -> bool:
+        return self.kind is None or self.kind in kinds
+
+
+def parse_config_change(payload: str) -> ConfigChange:
+    """Разобрать payload NOTIFY config_changed; невалидный или пустой — «изменено всё»."""
+    if not payload:
+        return ConfigChange()
+    try:
+        data = json.loads(payload)
+        ids = data.get("ids")
+        return ConfigChange(kind=data.get("kind"), ids=tuple(ids) if ids is not None else None)
+    except (ValueError, AttributeError, TypeError):
+        return ConfigChange()
+
 
 _pool: Optional[asyncpg.Pool] = None
-_config_listeners: list[Callable[[], None]] = []
+_config_listeners: list[Callable[[ConfigChange], None]] = []
+# Вызываются и при отправке notify_config_changed из этого же процесса (не дожидаясь NOTIFY)
+_local_config_listeners: list[Callable[[ConfigChange], None]] = []
+# Дополнительные каналы LISTEN (например SSE fan-out): channel → callback(payload)
+_channel_listeners: dict[str, list[Callable[[str], None]]] = {}
 _listen_task: Optional[asyncio.Task[None]] = None
 _listen_stop = asyncio.Event()
 
@@ -43,21 +88,37 @@ async def init_pool(
     min_size: int = 2,
     max_size: int = 10,
     command_timeout: float = 60.0,
+    slow_query_ms: float = DEFAULT_SLOW_QUERY_MS,
 ) -> asyncpg.Pool:
-    """Создаёт глобальный пул asyncpg и возвращает его."""
+    """
+    Создаёт глобальный пул asyncpg и возвращает его — обёрнутым в InstrumentedPool
+    (статистика запросов для /api/debug/db-stats, событие db.slow_query дольше slow_query_ms;
+    вызывающий код передаёт settings.DB_SLOW_QUERY_MS).
+    """
     global _pool
     if _pool is not None:
         return _pool
     url = _get_database_url()
-    _pool = await asyncpg.create_pool(
+    raw_pool = await asyncpg.create_pool(
         url,
         min_size=min_size,
         max_size=max_size,
         command_timeout=command_timeout,
     )
+    query_stats.slow_query_ms = slow_query_ms
+    _pool = InstrumentedPool(raw_pool)
+    DB_POOL_CONNECTIONS.set_function(_pool_connections)
     return _pool
 
 
+def _pool_connections() -> dict[tuple[str, ...], float]:
+    """Заполненность пула для метрики db_pool_connections (вычисляется при чтении /metrics)."""
+    if _pool is None:
+        return {}
+    size, idle = _pool.get_size(), _pool.get_idle_size()
+    return {("in_use",): size - idle, ("idle",): idle, ("max",): _pool.get_max_size()}
+
+
 async def close_pool() -> None:
     """Закрывает глобальный пул подключений и останавливает задачу LISTEN."""
     global _listen_task
@@ -75,65 +136,167 @@ async def close_pool() -> None:
         _pool = None
 
 
-def register_config_listener(callback: Callable[[], None]) -> None:
+def register_config_listener(
+    callback: Callable[[ConfigChange], None],
+    include_local: bool = False,
+) -> None:
     """
-    Регистрирует callback для вызова при получении NOTIFY config_changed.
+    Регистрирует callback(change) для вызова при получении NOTIFY config_changed.
+    include_local — вызывать сразу и при notify_config_changed() из этого процесса
+    (для кэшей, которые должны видеть свои записи без задержки NOTIFY).
     При первой регистрации запускается фоновая задача LISTEN (нужен уже инициализированный пул).
     """
     _config_listeners.append(callback)
+    if include_local:
+        _local_config_listeners.append(callback)
+
+
+def unregister_config_listener(callback: Callable[[ConfigChange], None]) -> None:
+    """Снять callback, зарегистрированный register_config_listener (выгрузка cog'а). Незарегистрированный — no-op."""
+    for listeners in (_config_listeners, _local_config_listeners):
+        if callback in listeners:
+            listeners.remove(callback)
 
 
-def _invoke_config_listeners() -> None:
+def _invoke_config_listeners(
+    change: ConfigChange,
+    listeners: Optional[list[Callable[[ConfigChange], None]]] = None,
+) -> None:
     """Вызывает все зарегистрированные callback'и при получении NOTIFY."""
-    for cb in _config_listeners:
+    for cb in _config_listeners if listeners is None else listeners:
         try:
-            cb()
+            cb(change)
         except Exception:
             pass  # не ломаем остальных слушателей
 
 
+def register_channel_listener(channel: str, callback: Callable[[str], None]) -> None:
+    """
+    Регистрирует callback(payload) для NOTIFY на произвольном канале.
+    Все каналы слушаются через одно соединение процесса; регистрировать до start_config_listener().
+    """
+    _channel_listeners.setdefault(channel, []).append(callback)
+
+
+def _make_channel_handler(
+    channel: str,
+) -> Callable[[asyncpg.Connection, int, str, str], None]:
+    def _on_notify(
+        _connection: asyncpg.Connection,
+        _pid: int,
+        _channel: str,
+        payload: str,
+    ) -> None:
+        for cb in _channel_listeners.get(channel, []):
+            try:
+                cb(payload)
+            except Exception:
+                pass  # не ломаем остальных слушателей
+
+    return _on_notify
+
+
 async def _listen_task_fn() -> None:
     """
-    Держит отдельное соединение из пула, подписывается на config_changed,
-    при получении NOTIFY вызывает зарегистрированные callback'и.
+    Держит отдельное соединение из пула, подписывается на config_changed
+    и зарегистрированные каналы, при получении NOTIFY вызывает callback'и.
+
+    Соединение потеряно (рестарт Postgres, сеть) — переподключение с растущей паузой.
+    NOTIFY за время разрыва не доставляются, поэтому при потере и после переподключения
+    слушатели получают ConfigChange() («изменено всё»): кэши сбрасываются, а не отдают
+    устаревшие данные и 304.
     """
     pool = get_pool()
-    conn = await pool.acquire()
+
+    def _on_notify(
+        _connection: asyncpg.Connection,
+        _pid: int,
+        _channel: str,
+        payload: str,
+    ) -> None:
+        _invoke_config_listeners(parse_config_change(payload))
+
+    delay = LISTEN_RETRY_MIN_SEC
+    reconnect = False
+    while not _listen_stop.is_set():
+        lost = asyncio.Event()
+        conn = None
+        try:
+            conn = await pool.acquire()
+            conn.add_termination_listener(lambda _connection: lost.set())
+            if _config_listeners:
+                await conn.add_listener(CONFIG_CHANGED_CHANNEL, _on_notify)
+            for channel in _channel_listeners:
+                await conn.add_listener(channel, _make_channel_handler(channel))
+            if reconnect:
+                logger.info("listen_reconnected")
+                _invoke_config_listeners(ConfigChange())
+            delay = LISTEN_RETRY_MIN_SEC
+            await _wait_first(_listen_stop, lost)
+        except asyncio.CancelledError:
+            return
+        except (asyncpg.PostgresError, asyncpg.InterfaceError, OSError, asyncio.TimeoutError) as e:
+            logger.warning("listen_failed", error=str(e))
+        finally:
+            if conn is not None:
+                try:
+                    await pool.release(conn)
+                except Exception:
+                    pass  # соединение уже закрыто
+        if _listen_stop.is_set():
+            return
+        logger.warning("listen_connection_lost", retry_in_sec=delay)
+        _invoke_config_listeners(ConfigChange())
+        reconnect = True
+        try:
+            await asyncio.wait_for(_listen_stop.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            return
+        delay = min(delay * 2, LISTEN_RETRY_MAX_SEC)
+
+
+async def _wait_first(*events: asyncio.Event) -> None:
+    """Дождаться первого из событий."""
+    waiters = [asyncio.ensure_future(e.wait()) for e in events]
     try:
-        def _on_notify(
-            _connection: asyncpg.Connection,
-            _pid: int,
-            _channel: str,
-            _payload: str,
-        ) -> None:
-            _invoke_config_listeners()
-
-        await conn.add_listener(CONFIG_CHANGED_CHANNEL, _on_notify)
-        await _listen_stop.wait()
-    except asyncio.CancelledError:
-        pass
+        await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
     finally:
-        await pool.release(conn)
+        for w in waiters:
+            w.cancel()
 
 
 def start_config_listener() -> None:
     """
-    Запускает фоновую задачу LISTEN config_changed (если есть подписчики).
+    Запускает фоновую задачу LISTEN config_changed и зарегистрированных каналов (если есть подписчики).
     Вызывать после init_pool(). Пул должен быть инициализирован.
     """
     global _listen_task
-    if not _config_listeners or _listen_task is not None:
+    if (not _config_listeners and not _channel_listeners) or _listen_task is not None:
         return
     _listen_stop.clear()
     _listen_task = asyncio.create_task(_listen_task_fn())
 
 
-async def notify_config_changed(pool: asyncpg.Pool) -> None:
+async def notify_config_changed(
+    pool: asyncpg.Pool,
+    kind: Optional[str] = None,
+    ids: Optional[Iterable[Any]] = None,
+) -> None:
     """
     Отправляет NOTIFY config_changed (для вызова из API после изменения правил/пользователей/расписаний).
+    kind и ids уходят в payload JSON; без kind слушатели перечитывают всё.
     """
+    payload = ""
+    if kind is not None:
+        id_list = list(ids) if ids is not None else None
+        payload = json.dumps({"kind": kind, "ids": id_list}, separators=(",", ":"))
+        if len(payload) > _MAX_CONFIG_PAYLOAD:
+            payload = json.dumps({"kind": kind, "ids": None}, separators=(",", ":"))
+    _invoke_config_listeners(parse_config_change(payload), _local_config_listeners)
     async with pool.acquire() as conn:
-        await conn.execute("SELECT pg_notify($1, $2)", CONFIG_CHANGED_CHANNEL, "")
+        await conn.execute("SELECT pg_notify($1, $2)", CONFIG_CHANGED_CHANNEL, payload)
 
 
 @asynccontextmanager
@@ -0,0 +1,260 @@
+"""
+InstrumentedPool: обёртка над asyncpg.Pool со статистикой по запросам.
+
+database.init_pool() возвращает пул уже обёрнутым — репозитории и роутеры вызывают
+те же fetch/fetchrow/fetchval/execute/acquire и ничего не замечают. По отпечатку запроса
+(SQL с нормализованными пробелами и литералами) копятся: число вызовов, суммарное и
+максимальное время, возвращённые/затронутые строки, ошибки и ожидание соединения из пула.
+Запросы дольше порога пишутся событием db.slow_query — в том числе упавшие и отменённые
+(command_timeout): время учитывается при любом исходе, строк у таких запросов 0.
+
+Не учитываются: строки серверных курсоров (conn.cursor) и COPY — проходят к соединению как есть.
+"""
+import re
+import time
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from typing import Any, Optional
+
+import asyncpg
+import structlog
+
+from src.utils.metrics import DB_ACQUIRE_SECONDS
+
+log = structlog.get_logger()
+
+DEFAULT_SLOW_QUERY_MS = 200.0
+# Защита от неограниченного роста при динамически собранном SQL
+MAX_STATEMENTS = 1000
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"(?<![$\w])\d+(?:\.\d+)?\b")
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(query: str) -> str:
+    """Нормализованный SQL: пробелы схлопнуты, строковые и числовые литералы заменены на ?."""
+    normalized = _STRING_RE.sub("?", query)
+    normalized = _NUMBER_RE.sub("?", normalized)
+    return _WHITESPACE_RE.sub(" ", normalized).strip()
+
+
+@dataclass
+class StatementStats:
+    statement: str
+    calls: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    rows: int = 0
+    errors: int = 0
+    acquire_wait_ms: float = 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        data = asdict(self)
+        data["avg_ms"] = self.total_ms / self.calls if self.calls else 0.0
+        return data
+
+
+class QueryStats:
+    def __init__(self, slow_query_ms: float = DEFAULT_SLOW_QUERY_MS) -> None:
+        self.slow_query_ms = slow_query_ms
+        self._statements: dict[str, StatementStats] = {}
+        self.acquires = 0
+        self.acquire_wait_ms = 0.0
+        self.acquire_wait_max_ms = 0.0
+
+    def record(
+        self,
+        query: str,
+        duration_ms: float,
+        rows: int,
+        acquire_wait_ms: float = 0.0,
+        error: Optional[str] = None,
+    ) -> None:
+        """error — имя исключения, если запрос упал или был отменён."""
+        fp = fingerprint(query)
+        stats = self._statements.get(fp)
+        if stats is None:
+            if len(self._statements) >= MAX_STATEMENTS:
+                return
+            stats = self._statements[fp] = StatementStats(statement=fp)
+        stats.calls += 1
+        stats.total_ms += duration_ms
+        stats.max_ms = max(stats.max_ms, duration_ms)
+        stats.rows += rows
+        stats.acquire_wait_ms += acquire_wait_ms
+        if error is not None:
+            stats.errors += 1
+        if duration_ms >= self.slow_query_ms:
+            log.warning(
+                "db.slow_query", statement=fp[:500], duration_ms=round(duration_ms, 1), rows=rows, error=error,
+            )
+
+    def record_acquire(self, wait_ms: float) -> None:
+        self.acquires += 1
+        self.acquire_wait_ms += wait_ms
+        self.acquire_wait_max_ms = max(self.acquire_wait_max_ms, wait_ms)
+        DB_ACQUIRE_SECONDS.observe(wait_ms / 1000)
+
+    def top(self, limit: int = 20, sort: str = "total_ms") -> list[dict[str, Any]]:
+        items = [s.to_dict() for s in self._statements.values()]
+        items.sort(key=lambda s: s[sort], reverse=True)
+        return items[:limit]
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "statements": len(self._statements),
+            "calls": sum(s.calls for s in self._statements.values()),
+            "errors": sum(s.errors for s in self._statements.values()),
+            "acquires": self.acquires,
+            "acquire_wait_ms": self.acquire_wait_ms,
+            "acquire_wait_max_ms": self.acquire_wait_max_ms,
+            "slow_query_ms": self.slow_query_ms,
+        }
+
+    def reset(self) -> None:
+        self._statements.clear()
+        self.acquires = 0
+        self.acquire_wait_ms = 0.0
+        self.acquire_wait_max_ms = 0.0
+
+
+query_stats = QueryStats()
+
+
+def _status_rows(status: Any) -> int:
+    """Число строк из статуса execute ('UPDATE 3', 'INSERT 0 5')."""
+    last = str(status).rsplit(" ", 1)[-1]
+    return int(last) if last.isdigit() else 0
+
+
+def _one_if_present(result: Any) -> int:
+    return int(result is not None)
+
+
+# Метод соединения → сколько строк вернул/затронул результат
+_ROWS: dict[str, Callable[[Any], int]] = {
+    "fetch": len,
+    "fetchrow": _one_if_present,
+    "fetchval": _one_if_present,
+    "execute": _status_rows,
+    "executemany": lambda _result: 0,
+}
+
+
+class InstrumentedConnection:
+    """Соединение из пула: запросы замеряются, остальное (transaction, cursor, copy_*) — как есть."""
+
+    def __init__(self, conn: asyncpg.Connection, stats: QueryStats) -> None:
+        self._conn = conn
+        self._stats = stats
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._conn, name)
+
+    async def _run(
+        self,
+        method: str,
+        query: str,
+        args: tuple[Any, ...],
+        kwargs: dict[str, Any],
+        acquire_wait_ms: float = 0.0,
+    ) -> Any:
+        start = time.perf_counter()
+        rows = 0
+        error: Optional[str] = None
+        try:
+            result = await getattr(self._conn, method)(query, *args, **kwargs)
+            rows = _ROWS[method](result)
+            return result
+        except BaseException as e:
+            # Включая CancelledError и таймаут: самые долгие запросы не должны пропадать из статистики
+            error = type(e).__name__
+            raise
+        finally:
+            self._stats.record(query, (time.perf_counter() - start) * 1000, rows, acquire_wait_ms, error)
+
+    async def fetch(self, query: str, *args: Any, **kwargs: Any) -> list[asyncpg.Record]:
+        return await self._run("fetch", query, args, kwargs)
+
+    async def fetchrow(self, query: str, *args: Any, **kwargs: Any) -> Optional[asyncpg.Record]:
+        return await self._run("fetchrow", query, args, kwargs)
+
+    async def fetchval(self, query: str, *args: Any, **kwargs: Any) -> Any:
+        return await self._run("fetchval", query, args, kwargs)
+
+    async def execute(self, query: str, *args: Any, **kwargs: Any) -> str:
+        return await self._run("execute", query, args, kwargs)
+
+    async def executemany(self, command: str, args: Any, **kwargs: Any) -> None:
+        return await self._run("executemany", command, (args,), kwargs)
+
+
+class _AcquireContext:
+    """Как PoolAcquireContext: `async with pool.acquire() as conn` и `conn = await pool.acquire()`."""
+
+    def __init__(self, pool: "InstrumentedPool", timeout: Optional[float]) -> None:
+        self._pool = pool
+        self._timeout = timeout
+        self._conn: Optional[InstrumentedConnection] = None
+
+    async def _acquire(self) -> InstrumentedConnection:
+        start = time.perf_counter()
+        raw = await self._pool.raw.acquire(timeout=self._timeout)
+        self._pool.stats.record_acquire((time.perf_counter() - start) * 1000)
+        return InstrumentedConnection(raw, self._pool.stats)
+
+    def __await__(self):  # noqa: ANN204
+        return self._acquire().__await__()
+
+    async def __aenter__(self) -> InstrumentedConnection:
+        self._conn = await self._acquire()
+        return self._conn
+
+    async def __aexit__(self, *exc: Any) -> None:
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            await self._pool.release(conn)
+
+
+class InstrumentedPool:
+    """Обёртка над asyncpg.Pool: те же методы, плюс статистика в stats (по умолчанию query_stats)."""
+
+    def __init__(self, pool: asyncpg.Pool, stats: QueryStats = query_stats) -> None:
+        self.raw = pool
+        self.stats = stats
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.raw, name)
+
+    def acquire(self, *, timeout: Optional[float] = None) -> _AcquireContext:
+        return _AcquireContext(self, timeout)
+
+    async def release(self, connection: Any, *, timeout: Optional[float] = None) -> None:
+        raw = connection._conn if isinstance(connection, InstrumentedConnection) else connection
+        await self.raw.release(raw, timeout=timeout)
+
+    async def _call(self, method: str, query: str, args: tuple[Any, ...], kwargs: dict[str, Any]) -> Any:
+        """Запрос на свободном соединении (как Pool.fetch): ожидание пула приписывается запросу."""
+        start = time.perf_counter()
+        async with self.raw.acquire() as raw:
+            wait_ms = (time.perf_counter() - start) * 1000
+            self.stats.record_acquire(wait_ms)
+            return await InstrumentedConnection(raw, self.stats)._run(method, query, args, kwargs, wait_ms)
+
+    async def fetch(self, query: str, *args: Any, **kwargs: Any) -> list[asyncpg.Record]:
+        return await self._call("fetch", query, args, kwargs)
+
+    async def fetchrow(self, query: str, *args: Any, **kwargs: Any) -> Optional[asyncpg.Record]:
+        return await self._call("fetchrow", query, args, kwargs)
+
+    async def fetchval(self, query: str, *args: Any, **kwargs: Any) -> Any:
+        return await self._call("fetchval", query, args, kwargs)
+
+    async def execute(self, query: str, *args: Any, **kwargs: Any) -> str:
+        return await self._call("execute", query, args, kwargs)
+
+    async def executemany(self, command: str, args: Any, **kwargs: Any) -> None:
+        return await self._call("executemany", command, (args,), kwargs)
@@ -13,6 +13,7 @@ from sqlalchemy import (
     Integer,
     String,
     Text,
+    UniqueConstraint,
     text,
 )
 from sqlalchemy.dialects.postgresql import ARRAY, JSONB
@@ -31,6 +32,7 @@ class UserList(Base):
     __tablename__ = "user_lists"
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    guild_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
     discord_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
     username: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
     list_type: Mapped[str] = mapped_column(String(10), nullable=False)  # 'whitelist' | 'blacklist'
@@ -39,8 +41,8 @@ class UserList(Base):
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
 
     __table_args__ = (
-        # UNIQUE(discord_id, list_type)
-        Index("uq_user_lists_discord_id_list_type", "discord_id", "list_type", unique=True),
+        # UNIQUE(guild_id, discord_id, list_type)
+        Index("uq_user_lists_guild_id_discord_id_list_type", "guild_id", "discord_id", "list_type", unique=True),
     )
 
 
@@ -50,6 +52,7 @@ class Rule(Base):
     __tablename__ = "rules"
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    guild_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
     name: Mapped[str] = mapped_column(String(100), nullable=False)
     description: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
@@ -67,6 +70,10 @@ class Rule(Base):
     action_logs = relationship("ActionLog", back_populates="rule")
     schedules = relationship("Schedule", back_populates="rule", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_rules_guild_id_priority", "guild_id", "priority"),
+    )
+
 
 class ActionLog(Base):
     """Лог выполненных действий по правилам."""
@@ -74,6 +81,7 @@ class ActionLog(Base):
     __tablename__ = "action_logs"
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    guild_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
     rule_id: Mapped[Optional[int]] = mapped_column(
         Integer,
         ForeignKey("rules.id", ondelete="SET NULL"),
@@ -88,8 +96,25 @@ class ActionLog(Base):
     rule = relationship("Rule", back_populates="action_logs")
 
     __table_args__ = (
-        Index("ix_action_logs_discord_id", "discord_id"),
         Index("ix_action_logs_executed_at", "executed_at"),
+        Index(
+            "ix_action_logs_guild_id_executed_at",
+            "guild_id",
+            text("executed_at DESC"),
+            text("id DESC"),
+        ),
+        Index(
+            "ix_action_logs_discord_id_executed_at",
+            "discord_id",
+            text("executed_at DESC"),
+            text("id DESC"),
+        ),
+        Index(
+            "ix_action_logs_rule_id_executed_at",
+            "rule_id",
+            text("executed_at DESC"),
+            text("id DESC"),
+        ),
     )
 
 
@@ -99,18 +124,21 @@ class VoiceSession(Base):
     __tablename__ = "voice_sessions"
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    guild_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
     discord_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
     channel_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
     joined_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
     left_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
 
     __table_args__ = (
-        # Partial index: (discord_id) WHERE left_at IS NULL
+        # Partial index: (guild_id, discord_id) WHERE left_at IS NULL
         Index(
-            "ix_voice_sessions_discord_id_active",
+            "ix_voice_sessions_guild_id_active",
+            "guild_id",
             "discord_id",
             postgresql_where=text("left_at IS NULL"),
         ),
+        Index("ix_voice_sessions_guild_id_joined_at", "guild_id", "joined_at"),
     )
 
 
@@ -140,7 +168,8 @@ class KickTarget(Base):
     __tablename__ = "kick_targets"
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    discord_id: Mapped[int] = mapped_column(BigInteger, unique=True, nullable=False)
+    guild_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    discord_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
     username: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
     timeout_sec: Mapped[int] = mapped_column(Integer, nullable=False, default=3600)
     max_timeout_sec: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
@@ -148,6 +177,10 @@ class KickTarget(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
 
+    __table_args__ = (
+        UniqueConstraint("guild_id", "discord_id", name="uq_kick_targets_guild_id_discord_id"),
+    )
+
 
 class StackingPair(Base):
     """Пара пользователей для переноса в целевой канал при стакинге."""
@@ -155,6 +188,7 @@ class StackingPair(Base):
     __tablename__ = "stacking_pairs"
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    guild_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
     user_id_1: Mapped[int] = mapped_column(BigInteger, nullable=False)
     user_id_2: Mapped[int] = mapped_column(BigInteger, nullable=False)
     target_channel_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
@@ -162,5 +196,5 @@ class StackingPair(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
 
     __table_args__ = (
-        Index("uq_stacking_pairs_user_ids", "user_id_1", "user_id_2", unique=True),
+        UniqueConstraint("guild_id", "user_id_1", "user_id_2", name="uq_stacking_pairs_guild_id_user_ids"),
     )
@@ -0,0 +1,48 @@
+"""
+Общие части SQL репозиториев и роутеров: WHERE из шаблонов фильтров и потоковое
+чтение серверным курсором (экспорт без загрузки выборки в память).
+"""
+from collections.abc import AsyncIterator, Iterable
+from typing import Any, Optional
+
+import asyncpg
+
+EXPORT_PREFETCH = 1000
+
+
+def filter_conditions(
+    templates: Iterable[tuple[str, str]],
+    filters: Optional[dict[str, Any]],
+) -> tuple[list[str], list[Any]]:
+    """
+    Условия и аргументы по шаблонам (поле фильтра, условие с ${} под номер аргумента).
+    Значение None в filters — «без фильтра». Номера аргументов идут с $1 подряд.
+    """
+    filters = filters or {}
+    conditions: list[str] = []
+    args: list[Any] = []
+    for key, template in templates:
+        value = filters.get(key)
+        if value is None:
+            continue
+        args.append(value)
+        conditions.append(template.format(len(args)))
+    return conditions, args
+
+
+def where_clause(conditions: list[str]) -> str:
+    """WHERE из условий через AND; пустая строка без условий."""
+    return ("WHERE " + " AND ".join(conditions)) if conditions else ""
+
+
+async def iter_query(
+    pool: asyncpg.Pool,
+    query: str,
+    *args: Any,
+    prefetch: int = EXPORT_PREFETCH,
+) -> AsyncIterator[dict[str, Any]]:
+    """Строки запроса dict'ами через серверный курсор в транзакции: в памяти не больше prefetch строк."""
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            async for row in conn.cursor(query, *args, prefetch=prefetch):
+                yield {k: row[k] for k in row.keys()}
@@ -1,11 +1,59 @@
-"""Репозитории для работы с БД (asyncpg)."""
+"""
+Репозитории для работы с БД (asyncpg).
 
-from . import logs_repo, rules_repo, schedules_repo, stats_repo, users_repo
+Корутины репозиториев оборачиваются замером длительности (метрика db_query_seconds
+с меткой function="<repo>.<функция>"); вызывающий код этого не замечает. Замеряется только
+внешний вызов: функция репозитория, вызванная из другой (update_rule → get_rule_by_id),
+в гистограмму не пишется — иначе время вложенного запроса учитывалось бы дважды.
+"""
+import functools
+import inspect
+from collections.abc import Awaitable, Callable
+from contextvars import ContextVar
+from types import ModuleType
+from typing import Any
+
+from src.utils.metrics import DB_QUERY_SECONDS, timed
+
+from . import bot_state_repo, logs_repo, rules_repo, schedules_repo, sessions_repo, stats_repo, users_repo
 
 __all__ = [
+    "bot_state_repo",
     "logs_repo",
     "rules_repo",
     "schedules_repo",
+    "sessions_repo",
     "stats_repo",
     "users_repo",
 ]
+
+
+# Идёт ли уже замер внешней функции репозитория в этом контексте (задаче)
+_timing: ContextVar[bool] = ContextVar("repo_timing", default=False)
+
+
+def _timed_outermost(func: Callable[..., Awaitable[Any]], function: str) -> Callable[..., Awaitable[Any]]:
+    timed_func = timed(DB_QUERY_SECONDS, function=function)(func)
+
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        if _timing.get():
+            return await func(*args, **kwargs)
+        token = _timing.set(True)
+        try:
+            return await timed_func(*args, **kwargs)
+        finally:
+            _timing.reset(token)
+    return wrapper
+
+
+def _instrument(module: ModuleType) -> None:
+    repo = module.__name__.rsplit(".", 1)[-1]
+    for name, func in list(vars(module).items()):
+        if name.startswith("_") or not inspect.iscoroutinefunction(func) or func.__module__ != module.__name__:
+            continue
+        setattr(module, name, _timed_outermost(func, f"{repo}.{name}"))
+
+
+for _module in (bot_state_repo, logs_repo, rules_repo, schedules_repo, sessions_repo, stats_repo, users_repo):
+    _instrument(_module)
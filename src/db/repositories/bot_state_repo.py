@@ -0,0 +1,25 @@
+"""
+Репозиторий состояния бота: таблица bot_state (ключ → значение), например хэш дерева slash-команд.
+"""
+from typing import Optional
+
+import asyncpg
+
+
+async def get_value(pool: asyncpg.Pool, key: str) -> Optional[str]:
+    """Значение по ключу или None."""
+    async with pool.acquire() as conn:
+        return await conn.fetchval("SELECT value FROM bot_state WHERE key = $1", key)
+
+
+async def set_value(pool: asyncpg.Pool, key: str, value: str) -> None:
+    """Записать значение (upsert)."""
+    async with pool.acquire() as conn:
+        await conn.execute(
+            """
+            INSERT INTO bot_state (key, value) VALUES ($1, $2)
+            ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value, updated_at = NOW()
+            """,
+            key,
+            value,
+        )
@@ -1,11 +1,15 @@
 """
 Репозиторий логов действий (action_logs). Асинхронные операции через asyncpg.
+Запись и выборки — в пределах гильдии (guild_id).
 """
+from collections.abc import AsyncIterator
 from datetime import datetime, timezone
 from typing import Any, Optional
 
 import asyncpg
 
+from src.db.queries import EXPORT_PREFETCH, filter_conditions, iter_query, where_clause
+
 
 def _row_to_dict(row: asyncpg.Record) -> dict[str, Any]:
     return {k: row[k] for k in row.keys()}
@@ -13,17 +17,18 @@ def _row_to_dict(row: asyncpg.Record) -> dict[str, Any]:
 
 async def log_action(
     pool: asyncpg.Pool,
+    guild_id: int,
     rule_id: Optional[int],
     discord_id: int,
     action_type: str,
     channel_id: Optional[int] = None,
     details: Optional[dict[str, Any]] = None,
 ) -> dict[str, Any]:
-    """Записать выполненное действие."""
+    """Записать выполненное действие в гильдии."""
     now = datetime.now(timezone.utc)
     query = """
-        INSERT INTO action_logs (rule_id, discord_id, action_type, channel_id, details, executed_at)
-        VALUES ($1, $2, $3, $4, $5, $6)
+        INSERT INTO action_logs (rule_id, discord_id, action_type, channel_id, details, executed_at, guild_id)
+        VALUES ($1, $2, $3, $4, $5, $6, $7)
         RETURNING id, rule_id, discord_id, action_type, channel_id, details, executed_at
     """
     row = await pool.fetchrow(
@@ -34,57 +39,78 @@ async def log_action(
         channel_id,
         details or {},
         now,
+        guild_id,
     )
     return _row_to_dict(row)
 
 
+# Поля фильтра → условие; значение None означает «без фильтра»
+_FILTER_CONDITIONS: tuple[tuple[str, str], ...] = (
+    ("guild_id", "guild_id = ${}"),
+    ("discord_id", "discord_id = ${}"),
+    ("rule_id", "rule_id = ${}"),
+    ("action_type", "action_type = ${}"),
+    ("date_from", "executed_at >= ${}"),
+    ("date_to", "executed_at <= ${}"),
+)
+
+
+def build_where(
+    filters: Optional[dict[str, Any]],
+    cursor: Optional[tuple[datetime, int]] = None,
+) -> tuple[str, list[Any]]:
+    """
+    Собрать WHERE для выборки логов: (sql, args), sql пустой без условий.
+    cursor — (executed_at, id) последней записи предыдущей страницы (keyset).
+    """
+    conditions, args = filter_conditions(_FILTER_CONDITIONS, filters)
+    if cursor is not None:
+        args.extend(cursor)
+        conditions.append(f"(executed_at, id) < (${len(args) - 1}, ${len(args)})")
+    return where_clause(conditions), args
+
+
 async def get_logs(
     pool: asyncpg.Pool,
+    guild_id: int,
     filters: Optional[dict[str, Any]] = None,
     limit: int = 50,
-    offset: int = 0,
+    cursor: Optional[tuple[datetime, int]] = None,
 ) -> list[dict[str, Any]]:
     """
-    Выборка логов с фильтрами и пагинацией.
-    filters: discord_id, rule_id, action_type, date_from, date_to (datetime или ISO строка).
+    Выборка логов гильдии с фильтрами и keyset-пагинацией (новые первыми).
+    filters: discord_id, rule_id, action_type, date_from, date_to (datetime).
+    cursor: (executed_at, id) последней записи предыдущей страницы — стоимость страницы
+    не зависит от глубины (индексы (guild_id|discord_id|rule_id, executed_at DESC, id DESC)).
     """
-    filters = filters or {}
-    conditions = []
-    args: list[Any] = []
-    n = 1
-
-    if "discord_id" in filters and filters["discord_id"] is not None:
-        conditions.append(f"discord_id = ${n}")
-        args.append(filters["discord_id"])
-        n += 1
-    if "rule_id" in filters and filters["rule_id"] is not None:
-        conditions.append(f"rule_id = ${n}")
-        args.append(filters["rule_id"])
-        n += 1
-    if "action_type" in filters and filters["action_type"] is not None:
-        conditions.append(f"action_type = ${n}")
-        args.append(filters["action_type"])
-        n += 1
-    if "date_from" in filters and filters["date_from"] is not None:
-        conditions.append(f"executed_at >= ${n}")
-        args.append(filters["date_from"])
-        n += 1
-    if "date_to" in filters and filters["date_to"] is not None:
-        conditions.append(f"executed_at <= ${n}")
-        args.append(filters["date_to"])
-        n += 1
-
-    where_clause = (" AND " + " AND ".join(conditions)) if conditions else ""
-    args.extend([limit, offset])
-    limit_pos = len(args) - 1
-    offset_pos = len(args)
-
+    where, args = build_where({**(filters or {}), "guild_id": guild_id}, cursor)
+    args.append(limit)
     query = f"""
         SELECT id, rule_id, discord_id, action_type, channel_id, details, executed_at
         FROM action_logs
-        {where_clause}
-        ORDER BY executed_at DESC
-        LIMIT ${limit_pos} OFFSET ${offset_pos}
+        {where}
+        ORDER BY executed_at DESC, id DESC
+        LIMIT ${len(args)}
     """
     rows = await pool.fetch(query, *args)
     return [_row_to_dict(r) for r in rows]
+
+
+def iter_logs(
+    pool: asyncpg.Pool,
+    guild_id: int,
+    filters: Optional[dict[str, Any]] = None,
+    prefetch: int = EXPORT_PREFETCH,
+) -> AsyncIterator[dict[str, Any]]:
+    """
+    Потоковая выборка логов гильдии для экспорта (в хронологическом порядке).
+    Серверный курсор внутри транзакции: в памяти не больше prefetch строк.
+    """
+    where, args = build_where({**(filters or {}), "guild_id": guild_id})
+    query = f"""
+        SELECT id, rule_id, discord_id, action_type, channel_id, details, executed_at
+        FROM action_logs
+        {where}
+        ORDER BY executed_at, id
+    """
+    return iter_query(pool, query, *args, prefetch=prefetch)
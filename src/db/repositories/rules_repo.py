@@ -1,5 +1,7 @@
 """
 Репозиторий правил (rules). Асинхронные операции через asyncpg.
+Выборки и создание — в пределах гильдии (guild_id); операции по id принимают guild_id
+опционально: API передаёт его, чтобы не затронуть правило чужой гильдии.
 """
 from datetime import datetime, timezone
 from typing import Any, Optional
@@ -21,90 +23,95 @@ _RULE_COLUMNS = """
 
 async def get_rules(
     pool: asyncpg.Pool,
+    guild_id: int,
     active_only: bool = False,
 ) -> list[dict[str, Any]]:
     """
-    Выборка всех правил (для API). При active_only=True — только is_active.
+    Выборка всех правил гильдии (для API). При active_only=True — только is_active.
     ORDER BY priority.
     """
     if active_only:
         query = f"""
             SELECT {_RULE_COLUMNS}
             FROM rules
-            WHERE is_active
+            WHERE guild_id = $1 AND is_active
             ORDER BY priority
         """
     else:
         query = f"""
             SELECT {_RULE_COLUMNS}
             FROM rules
+            WHERE guild_id = $1
             ORDER BY priority
         """
-    rows = await pool.fetch(query)
+    rows = await pool.fetch(query, guild_id)
     return [_row_to_dict(r) for r in rows]
 
 
-async def get_all_active_rules(pool: asyncpg.Pool) -> list[dict[str, Any]]:
+async def get_all_active_rules(pool: asyncpg.Pool, guild_id: int) -> list[dict[str, Any]]:
     """
-    Все активные правила (для планировщика overtime). ORDER BY priority.
+    Все активные правила гильдии (для планировщика overtime). ORDER BY priority.
     """
     query = f"""
         SELECT {_RULE_COLUMNS}
         FROM rules
-        WHERE is_active
+        WHERE guild_id = $1 AND is_active
         ORDER BY priority
     """
-    rows = await pool.fetch(query)
+    rows = await pool.fetch(query, guild_id)
     return [_row_to_dict(r) for r in rows]
 
 
 async def get_active_rules(
     pool: asyncpg.Pool,
+    guild_id: int,
     channel_id: Optional[int] = None,
 ) -> list[dict[str, Any]]:
     """
-    Выборка активных правил, применимых к каналу (или всех с channel_ids IS NULL при channel_id=None).
-    ORDER BY priority.
+    Выборка активных правил гильдии, применимых к каналу (или всех с channel_ids IS NULL
+    при channel_id=None). ORDER BY priority.
     """
     if channel_id is None:
         query = f"""
             SELECT {_RULE_COLUMNS}
             FROM rules
-            WHERE is_active AND channel_ids IS NULL
+            WHERE is_active AND channel_ids IS NULL AND guild_id = $1
             ORDER BY priority
         """
-        rows = await pool.fetch(query)
+        rows = await pool.fetch(query, guild_id)
     else:
         query = f"""
             SELECT {_RULE_COLUMNS}
             FROM rules
-            WHERE is_active AND (channel_ids IS NULL OR $1 = ANY(channel_ids))
+            WHERE is_active AND (channel_ids IS NULL OR $1 = ANY(channel_ids)) AND guild_id = $2
             ORDER BY priority
         """
-        rows = await pool.fetch(query, channel_id)
+        rows = await pool.fetch(query, channel_id, guild_id)
     return [_row_to_dict(r) for r in rows]
 
 
 async def get_rule_by_id(
     pool: asyncpg.Pool,
     rule_id: int,
+    guild_id: Optional[int] = None,
 ) -> Optional[dict[str, Any]]:
-    """Получить правило по id."""
+    """Получить правило по id (с guild_id — только правило этой гильдии)."""
     query = f"""
         SELECT {_RULE_COLUMNS}
         FROM rules
-        WHERE id = $1
+        WHERE id = $1 AND ($2::bigint IS NULL OR guild_id = $2)
     """
-    row = await pool.fetchrow(query, rule_id)
+    row = await pool.fetchrow(query, rule_id, guild_id)
     return _row_to_dict(row) if row else None
 
 
 async def create_rule(
     pool: asyncpg.Pool,
+    guild_id: int,
     data: dict[str, Any],
 ) -> dict[str, Any]:
     """
-    Создать правило. data: name (обяз.), description, is_active, is_dry_run, target_list,
+    Создать правило гильдии. data: name (обяз.), description, is_active, is_dry_run, target_list,
     channel_ids, max_time_sec, action_type (обяз.), action_params, schedule_cron,
     schedule_tz, priority. created_at/updated_at проставляются автоматически.
     """
@@ -113,9 +120,9 @@ async def create_rule(
         INSERT INTO rules (
             name, description, is_active, is_dry_run, target_list, channel_ids,
             max_time_sec, action_type, action_params, schedule_cron, schedule_tz,
-            priority, created_at, updated_at
+            priority, created_at, updated_at, guild_id
         )
-        VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14)
+        VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15)
         RETURNING id, name, description, is_active, is_dry_run, target_list, channel_ids,
                   max_time_sec, action_type, action_params, schedule_cron, schedule_tz,
                   priority, created_at, updated_at
@@ -136,6 +143,7 @@ async def create_rule(
         data.get("priority", 0),
         data.get("created_at") or now,
         data.get("updated_at") or now,
+        guild_id,
     )
     return _row_to_dict(row)
 
@@ -144,12 +152,13 @@ async def update_rule(
     pool: asyncpg.Pool,
     rule_id: int,
     data: dict[str, Any],
+    guild_id: Optional[int] = None,
 ) -> Optional[dict[str, Any]]:
     """
-    Обновить правило. data может содержать любые поля таблицы (кроме id).
-    updated_at обновляется автоматически.
+    Обновить правило. data может содержать любые поля таблицы (кроме id и guild_id).
+    updated_at обновляется автоматически. С guild_id — только правило этой гильдии.
     """
-    current = await get_rule_by_id(pool, rule_id)
+    current = await get_rule_by_id(pool, rule_id, guild_id)
     if not current:
         return None
 
@@ -190,7 +199,12 @@ async def update_rule(
 async def delete_rule(
     pool: asyncpg.Pool,
     rule_id: int,
+    guild_id: Optional[int] = None,
 ) -> bool:
-    """Удалить правило по id. Возвращает True, если удалена хотя бы одна строка."""
-    result = await pool.execute("DELETE FROM rules WHERE id = $1", rule_id)
+    """Удалить правило по id (с guild_id — только правило этой гильдии). True, если удалено."""
+    result = await pool.execute(
+        "DELETE FROM rules WHERE id = $1 AND ($2::bigint IS NULL OR guild_id = $2)",
+        rule_id,
+        guild_id,
+    )
     return result.split()[-1] == "1"
@@ -1,5 +1,7 @@
 """
 Репозиторий расписаний (schedules). Асинхронные операции через asyncpg.
+Расписание принадлежит гильдии своего правила: guild_id (опционально) ограничивает выборку
+расписаниями правил этой гильдии, без него — все (планировщик).
 """
 from datetime import datetime, timezone
 from typing import Any, Literal, Optional
@@ -15,15 +17,17 @@ def _row_to_dict(row: asyncpg.Record) -> dict[str, Any]:
 
 async def get_active_schedules(
     pool: asyncpg.Pool,
+    guild_id: Optional[int] = None,
 ) -> list[dict[str, Any]]:
-    """Список активных расписаний."""
+    """Список активных расписаний (с guild_id — только для правил гильдии)."""
     query = """
         SELECT id, rule_id, cron_expr, action, timezone, is_active, created_at
         FROM schedules
         WHERE is_active
+          AND ($1::bigint IS NULL OR rule_id IN (SELECT id FROM rules WHERE guild_id = $1))
         ORDER BY id
     """
-    rows = await pool.fetch(query)
+    rows = await pool.fetch(query, guild_id)
     return [_row_to_dict(r) for r in rows]
 
 
@@ -57,14 +61,16 @@ async def delete_schedule(
 async def get_schedule_by_id(
     pool: asyncpg.Pool,
     schedule_id: int,
+    guild_id: Optional[int] = None,
 ) -> Optional[dict[str, Any]]:
-    """Получить расписание по id. Возвращает None, если не найдено."""
+    """Получить расписание по id. Возвращает None, если не найдено (или оно другой гильдии)."""
     query = """
         SELECT id, rule_id, cron_expr, action, timezone, is_active, created_at
         FROM schedules
         WHERE id = $1
+          AND ($2::bigint IS NULL OR rule_id IN (SELECT id FROM rules WHERE guild_id = $2))
     """
-    row = await pool.fetchrow(query, schedule_id)
+    row = await pool.fetchrow(query, schedule_id, guild_id)
     return _row_to_dict(row) if row else None
 
 
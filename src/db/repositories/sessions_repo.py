@@ -0,0 +1,46 @@
+"""
+Репозиторий голосовых сессий (voice_sessions) для выборок API. Запись сессий — в src.engine.tracker.
+"""
+from collections.abc import AsyncIterator
+from typing import Any, Optional
+
+import asyncpg
+
+from src.db.queries import EXPORT_PREFETCH, filter_conditions, iter_query, where_clause
+
+_FILTER_CONDITIONS: tuple[tuple[str, str], ...] = (
+    ("guild_id", "guild_id = ${}"),
+    ("discord_id", "discord_id = ${}"),
+    ("channel_id", "channel_id = ${}"),
+    ("date_from", "joined_at >= ${}"),
+    ("date_to", "joined_at <= ${}"),
+)
+
+
+def build_where(filters: Optional[dict[str, Any]]) -> tuple[str, list[Any]]:
+    """WHERE для выборки сессий: (sql, args). active_only — только незавершённые сессии."""
+    conditions, args = filter_conditions(_FILTER_CONDITIONS, filters)
+    if (filters or {}).get("active_only"):
+        conditions.append("left_at IS NULL")
+    return where_clause(conditions), args
+
+
+def iter_sessions(
+    pool: asyncpg.Pool,
+    guild_id: int,
+    filters: Optional[dict[str, Any]] = None,
+    prefetch: int = EXPORT_PREFETCH,
+) -> AsyncIterator[dict[str, Any]]:
+    """
+    Потоковая выборка сессий гильдии для экспорта (по времени входа).
+    Серверный курсор внутри транзакции: в памяти не больше prefetch строк.
+    """
+    where, args = build_where({**(filters or {}), "guild_id": guild_id})
+    query = f"""
+        SELECT id, discord_id, channel_id, joined_at, left_at,
+               EXTRACT(EPOCH FROM (left_at - joined_at))::bigint AS duration_sec
+        FROM voice_sessions
+        {where}
+        ORDER BY joined_at, id
+    """
+    return iter_query(pool, query, *args, prefetch=prefetch)
@@ -1,5 +1,5 @@
 """
-Репозиторий статистики. Агрегации по voice_sessions и action_logs.
+Репозиторий статистики. Агрегации по voice_sessions и action_logs гильдии.
 """
 from datetime import datetime, timezone
 from typing import Any, Optional
@@ -7,9 +7,9 @@ from typing import Any, Optional
 import asyncpg
 
 
-async def get_weekly_stats(pool: asyncpg.Pool) -> dict[str, Any]:
+async def get_weekly_stats(pool: asyncpg.Pool, guild_id: int) -> dict[str, Any]:
     """
-    Статистика за последние 7 дней:
+    Статистика гильдии за последние 7 дней:
     - total_sessions: количество сессий
     - total_seconds: суммарное время в войсе (только завершённые сессии)
     - top_user_id: discord_id пользователя с наибольшим суммарным временем
@@ -22,22 +22,22 @@ async def get_weekly_stats(pool: asyncpg.Pool) -> dict[str, Any]:
                 FILTER (WHERE left_at IS NOT NULL) AS total_seconds,
             (
                 SELECT discord_id FROM voice_sessions
-                WHERE joined_at >= NOW() - INTERVAL '7 days'
+                WHERE guild_id = $1 AND joined_at >= NOW() - INTERVAL '7 days'
                 GROUP BY discord_id
                 ORDER BY SUM(EXTRACT(EPOCH FROM (COALESCE(left_at, NOW()) - joined_at))) DESC
                 LIMIT 1
             ) AS top_user_id
         FROM voice_sessions
-        WHERE joined_at >= NOW() - INTERVAL '7 days'
+        WHERE guild_id = $1 AND joined_at >= NOW() - INTERVAL '7 days'
     """
     actions_query = """
         SELECT COUNT(*) AS total_actions
         FROM action_logs
-        WHERE executed_at >= NOW() - INTERVAL '7 days'
+        WHERE guild_id = $1 AND executed_at >= NOW() - INTERVAL '7 days'
     """
 
-    row = await pool.fetchrow(sessions_query)
-    actions_row = await pool.fetchrow(actions_query)
+    row = await pool.fetchrow(sessions_query, guild_id)
+    actions_row = await pool.fetchrow(actions_query, guild_id)
 
     return {
         "total_sessions": row["total_sessions"] or 0,
@@ -47,17 +47,17 @@ async def get_weekly_stats(pool: asyncpg.Pool) -> dict[str, Any]:
     }
 
 
-async def get_today_stats(pool: asyncpg.Pool) -> dict[str, Any]:
+async def get_today_stats(pool: asyncpg.Pool, guild_id: int) -> dict[str, Any]:
     """
-    Статистика за сегодня (UTC): общее количество действий и разбивка по типам.
+    Статистика гильдии за сегодня (UTC): общее количество действий и разбивка по типам.
     """
     query = """
         SELECT action_type, COUNT(*) AS cnt
         FROM action_logs
-        WHERE executed_at >= NOW()::date
+        WHERE guild_id = $1 AND executed_at >= NOW()::date
         GROUP BY action_type
     """
-    rows = await pool.fetch(query)
+    rows = await pool.fetch(query, guild_id)
     by_type = {r["action_type"]: r["cnt"] for r in rows}
     return {
         "total_actions": sum(by_type.values()),
@@ -65,9 +65,9 @@ async def get_today_stats(pool: asyncpg.Pool) -> dict[str, Any]:
     }
 
 
-async def get_user_stats(pool: asyncpg.Pool, discord_id: int) -> dict[str, Any]:
+async def get_user_stats(pool: asyncpg.Pool, guild_id: int, discord_id: int) -> dict[str, Any]:
     """
-    Статистика по пользователю за последние 30 дней:
+    Статистика по пользователю в гильдии за последние 30 дней:
     - total_voice_seconds: суммарное время в войсе
     - total_actions: количество действий над пользователем
     - actions_by_type: разбивка по типам действий
@@ -76,18 +76,18 @@ async def get_user_stats(pool: asyncpg.Pool, discord_id: int) -> dict[str, Any]:
         SELECT COALESCE(SUM(EXTRACT(EPOCH FROM (COALESCE(left_at, NOW()) - joined_at))), 0)
                AS total_seconds
         FROM voice_sessions
-        WHERE discord_id = $1
+        WHERE discord_id = $1 AND guild_id = $2
           AND joined_at >= NOW() - INTERVAL '30 days'
     """
     actions_query = """
         SELECT action_type, COUNT(*) AS cnt
         FROM action_logs
-        WHERE discord_id = $1
+        WHERE discord_id = $1 AND guild_id = $2
           AND executed_at >= NOW() - INTERVAL '30 days'
         GROUP BY action_type
     """
-    voice_row = await pool.fetchrow(voice_query, discord_id)
-    action_rows = await pool.fetch(actions_query, discord_id)
+    voice_row = await pool.fetchrow(voice_query, discord_id, guild_id)
+    action_rows = await pool.fetch(actions_query, discord_id, guild_id)
 
     by_type = {r["action_type"]: r["cnt"] for r in action_rows}
     return {
@@ -1,9 +1,10 @@
 """
 Репозиторий списков пользователей (user_lists): whitelist / blacklist.
-Асинхронные операции через asyncpg.
+Списки у каждой гильдии свои (guild_id). Асинхронные операции через asyncpg.
 """
+from collections.abc import AsyncIterable, AsyncIterator, Iterable
 from datetime import datetime, timezone
-from typing import Any, Literal, Optional
+from typing import Any, Literal, Optional, Union
 
 import asyncpg
 
@@ -16,49 +17,52 @@ def _row_to_dict(row: asyncpg.Record) -> dict[str, Any]:
 
 async def get_user_lists(
     pool: asyncpg.Pool,
+    guild_id: int,
     list_type: ListType,
 ) -> list[dict[str, Any]]:
-    """Список записей по типу (whitelist или blacklist)."""
+    """Список записей гильдии по типу (whitelist или blacklist)."""
     query = """
         SELECT id, discord_id, username, list_type, reason, created_at, updated_at
         FROM user_lists
-        WHERE list_type = $1
+        WHERE list_type = $1 AND guild_id = $2
         ORDER BY discord_id
     """
-    rows = await pool.fetch(query, list_type)
+    rows = await pool.fetch(query, list_type, guild_id)
     return [_row_to_dict(r) for r in rows]
 
 
 async def is_in_list(
     pool: asyncpg.Pool,
+    guild_id: int,
     discord_id: int,
     list_type: str,
 ) -> bool:
-    """Проверить, есть ли пользователь в указанном списке."""
+    """Проверить, есть ли пользователь в указанном списке гильдии."""
     query = """
         SELECT 1 FROM user_lists
-        WHERE discord_id = $1 AND list_type = $2
+        WHERE discord_id = $1 AND list_type = $2 AND guild_id = $3
         LIMIT 1
     """
-    row = await pool.fetchrow(query, discord_id, list_type)
+    row = await pool.fetchrow(query, discord_id, list_type, guild_id)
     return row is not None
 
 
 async def add_user(
     pool: asyncpg.Pool,
+    guild_id: int,
     discord_id: int,
     list_type: str,
     username: Optional[str] = None,
     reason: Optional[str] = None,
 ) -> dict[str, Any]:
     """
-    Добавить пользователя в список. При конфликте (discord_id, list_type) — обновить.
+    Добавить пользователя в список гильдии. При конфликте (guild_id, discord_id, list_type) — обновить.
     """
     now = datetime.now(timezone.utc)
     query = """
-        INSERT INTO user_lists (discord_id, username, list_type, reason, created_at, updated_at)
-        VALUES ($1, $2, $3, $4, $5, $6)
-        ON CONFLICT (discord_id, list_type)
+        INSERT INTO user_lists (discord_id, username, list_type, reason, created_at, updated_at, guild_id)
+        VALUES ($1, $2, $3, $4, $5, $6, $7)
+        ON CONFLICT (guild_id, discord_id, list_type)
         DO UPDATE SET username = COALESCE(EXCLUDED.username, user_lists.username),
                       reason = COALESCE(EXCLUDED.reason, user_lists.reason),
                       updated_at = EXCLUDED.updated_at
@@ -72,53 +76,94 @@ async def add_user(
         reason,
         now,
         now,
+        guild_id,
     )
     return _row_to_dict(row)
 
 
 async def remove_user(
     pool: asyncpg.Pool,
+    guild_id: int,
     discord_id: int,
     list_type: str,
 ) -> bool:
-    """Удалить пользователя из списка. Возвращает True, если удалена хотя бы одна строка."""
+    """Удалить пользователя из списка гильдии. Возвращает True, если удалена хотя бы одна строка."""
     result = await pool.execute(
-        "DELETE FROM user_lists WHERE discord_id = $1 AND list_type = $2",
+        "DELETE FROM user_lists WHERE discord_id = $1 AND list_type = $2 AND guild_id = $3",
         discord_id,
         list_type,
+        guild_id,
     )
     return result.split()[-1] == "1"
 
 
+async def _import_records(
+    entries: Union[Iterable[dict[str, Any]], AsyncIterable[dict[str, Any]]],
+) -> AsyncIterator[tuple[int, Optional[str], str, Optional[str], int]]:
+    """Записи для COPY во временную таблицу; ord — порядковый номер (при дублях побеждает последний)."""
+    ord_ = 0
+    if isinstance(entries, AsyncIterable):
+        async for e in entries:
+            ord_ += 1
+            yield (e["discord_id"], e.get("username"), e["list_type"], e.get("reason"), ord_)
+    else:
+        for e in entries:
+            ord_ += 1
+            yield (e["discord_id"], e.get("username"), e["list_type"], e.get("reason"), ord_)
+
+
 async def bulk_add(
     pool: asyncpg.Pool,
-    entries: list[dict[str, Any]],
-) -> int:
+    guild_id: int,
+    entries: Union[Iterable[dict[str, Any]], AsyncIterable[dict[str, Any]]],
+) -> dict[str, Any]:
     """
-    Массовое добавление. Каждый элемент: discord_id (обяз.), list_type (обяз.),
-    username (опц.), reason (опц.). Возвращает количество обработанных записей.
+    Массовое добавление (upsert) в списки гильдии. Каждый элемент: discord_id (обяз.), list_type (обяз.),
+    username (опц.), reason (опц.). entries может быть асинхронным итератором (потоковый импорт).
+
+    Записи копируются во временную таблицу через COPY и сливаются одним
+    INSERT ... SELECT ... ON CONFLICT в транзакции. Возвращает
+    {"processed", "inserted", "updated", "discord_ids"} (discord_ids — затронутые пользователи).
     """
-    if not entries:
-        return 0
     now = datetime.now(timezone.utc)
-    count = 0
-    for e in entries:
-        query = """
-            INSERT INTO user_lists (discord_id, username, list_type, reason, created_at, updated_at)
-            VALUES ($1, $2, $3, $4, $5, $6)
-            ON CONFLICT (discord_id, list_type)
-            DO UPDATE SET username = COALESCE(EXCLUDED.username, user_lists.username),
-                          reason = COALESCE(EXCLUDED.reason, user_lists.reason),
-                          updated_at = EXCLUDED.updated_at
-        """
-        await pool.execute(
-            query,
-            e["discord_id"],
-            e.get("username"),
-            e["list_type"],
-            e.get("reason"),
-            now,
-            now,
-        )
-        count += 1
-    return count
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            await conn.execute(
+                """
+                CREATE TEMP TABLE user_lists_import (
+                    discord_id BIGINT NOT NULL,
+                    username TEXT,
+                    list_type TEXT NOT NULL,
+                    reason TEXT,
+                    ord BIGINT NOT NULL
+                ) ON COMMIT DROP
+                """
+            )
+            copied = await conn.copy_records_to_table(
+                "user_lists_import",
+                records=_import_records(entries),
+                columns=["discord_id", "username", "list_type", "reason", "ord"],
+            )
+            # DISTINCT ON: одна строка на ключ, иначе ON CONFLICT DO UPDATE упадёт на дублях
+            rows = await conn.fetch(
+                """
+                INSERT INTO user_lists (discord_id, username, list_type, reason, created_at, updated_at, guild_id)
+                SELECT DISTINCT ON (discord_id, list_type) discord_id, username, list_type, reason, $1, $1, $2
+                FROM user_lists_import
+                ORDER BY discord_id, list_type, ord DESC
+                ON CONFLICT (guild_id, discord_id, list_type)
+                DO UPDATE SET username = COALESCE(EXCLUDED.username, user_lists.username),
+                              reason = COALESCE(EXCLUDED.reason, user_lists.reason),
+                              updated_at = EXCLUDED.updated_at
+                RETURNING discord_id, (xmax = 0) AS inserted
+                """,
+                now,
+                guild_id,
+            )
+    inserted = sum(1 for r in rows if r["inserted"])
+    return {
+        "processed": int(copied.split()[-1]),
+        "inserted": inserted,
+        "updated": len(rows) - inserted,
+        "discord_ids": sorted({r["discord_id"] for r in rows}),
+    }
@@ -3,6 +3,7 @@
 Rate limiting: N действий в минуту на гильдию (из настроек).
 Dry run: если is_dry_run=True — действие логируется, но не выполняется.
 """
+from collections.abc import Awaitable
 from typing import Any, Optional
 
 import asyncpg
@@ -10,6 +11,7 @@ import discord
 
 from src.config.settings import get_settings
 from src.utils.logging import get_logger
+from src.utils.metrics import DISCORD_REST_ERRORS, DISCORD_REST_SECONDS
 from src.utils.permissions import can_kick, can_mute, can_move
 from src.utils.rate_limit import check_action_allowed, record_action
 
@@ -44,6 +46,7 @@ async def execute_action(
             from src.db.repositories import logs_repo
             await logs_repo.log_action(
                 pool,
+                guild.id,
                 rule_id=rule_id,
                 discord_id=member.id,
                 action_type=action_type,
@@ -80,7 +83,7 @@ async def execute_action(
             if not can_mute(member, guild):
                 logger.warning("action_skipped_no_permission", action_type="mute", member_id=member.id)
                 return False
-            await member.edit(mute=True)
+            await _rest_call(action_type, member.edit(mute=True))
             record_action(guild.id)
             await _notify_rule_action(member, action_type, voice_channel, rule_id)
             return True
@@ -89,7 +92,7 @@ async def execute_action(
             if not can_mute(member, guild):
                 logger.warning("action_skipped_no_permission", action_type="unmute", member_id=member.id)
                 return False
-            await member.edit(mute=False)
+            await _rest_call(action_type, member.edit(mute=False))
             record_action(guild.id)
             await _notify_rule_action(member, action_type, voice_channel, rule_id)
             return True
@@ -106,7 +109,7 @@ async def execute_action(
             if channel is None or not isinstance(channel, discord.VoiceChannel):
                 logger.warning("action_skipped_channel_not_found", target_channel_id=target_channel_id)
                 return False
-            await member.move_to(channel)
+            await _rest_call(action_type, member.move_to(channel))
             record_action(guild.id)
             await _notify_rule_action(member, action_type, voice_channel, rule_id)
             return True
@@ -115,7 +118,7 @@ async def execute_action(
             if not can_kick(member, guild):
                 logger.warning("action_skipped_no_permission", action_type="kick", member_id=member.id)
                 return False
-            await member.move_to(None)
+            await _rest_call(action_type, member.move_to(None))
             record_action(guild.id)
             await _notify_rule_action(member, action_type, voice_channel, rule_id)
             return True
@@ -123,6 +126,7 @@ async def execute_action(
         logger.warning("action_unknown", action_type=action_type)
         return False
     except discord.HTTPException as e:
+        DISCORD_REST_ERRORS.inc(action=action_type, status=e.status)
         logger.exception("action_failed", action_type=action_type, member_id=member.id, status=e.status)
         return False
     except Exception as e:
@@ -130,6 +134,12 @@ async def execute_action(
         return False
 
 
+async def _rest_call(action_type: str, call: Awaitable[Any]) -> None:
+    """REST-запрос к Discord с замером длительности (discord_rest_seconds)."""
+    with DISCORD_REST_SECONDS.time(action=action_type):
+        await call
+
+
 async def _notify_rule_action(
     member: discord.Member,
     action_type: str,
@@ -40,11 +40,11 @@ async def evaluate(
             continue
 
         if target_list == "blacklist":
-            in_list = await users_repo.is_in_list(pool, member.id, "blacklist")
+            in_list = await users_repo.is_in_list(pool, member.guild.id, member.id, "blacklist")
             if not in_list:
                 continue
         elif target_list == "whitelist":
-            in_list = await users_repo.is_in_list(pool, member.id, "whitelist")
+            in_list = await users_repo.is_in_list(pool, member.guild.id, member.id, "whitelist")
             if in_list:
                 continue  # в whitelist — разрешён, действие не применяем
         else:
@@ -0,0 +1,208 @@
+"""
+MemberSearchIndex: поиск участников сервера по нику и username без полного прохода по guild.members.
+Индекс гильдии (get_member_index) поддерживается cog'ом member_sync (join/update/remove) и используется
+в /api/members и автодополнении slash-команд.
+
+- Имена хранятся уже в нижнем регистре.
+- Префиксный поиск — бинарный поиск по отсортированному массиву (ключ, user_id).
+- Подстрока (от 3 символов) — пересечение списков триграмм, затем проверка вхождения.
+- Первые limit результатов — через heapq.nsmallest, без сортировки всех совпадений.
+
+В slim-режиме кэша участников (MEMBER_CACHE_MODE=slim) гильдия не чанкуется и индекс знает
+только закэшированных (в войсе); search_guild/fetch_members тогда идут в gateway (query_members).
+"""
+import asyncio
+import heapq
+from bisect import bisect_left, insort
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import structlog
+
+log = structlog.get_logger()
+
+TRIGRAM = 3
+# Лимит Discord на один запрос query_members (REQUEST_GUILD_MEMBERS)
+QUERY_MEMBERS_MAX = 100
+
+
+@dataclass(frozen=True)
+class _Entry:
+    user_id: int
+    display_lower: str
+    name_lower: str
+    has_nick: bool
+
+    def keys(self) -> set[str]:
+        return {self.display_lower, self.name_lower}
+
+
+def _trigrams(text: str) -> set[str]:
+    return {text[i:i + TRIGRAM] for i in range(len(text) - TRIGRAM + 1)}
+
+
+class MemberSearchIndex:
+    def __init__(self) -> None:
+        self._entries: dict[int, _Entry] = {}
+        # Отсортированные пары (ключ в нижнем регистре, user_id): по две на участника (ник и username)
+        self._prefix: list[tuple[str, int]] = []
+        self._postings: dict[str, set[int]] = {}
+        # Был ли rebuild: пустой индекс пустой гильдии не пересобирается на каждый запрос,
+        # а upsert до первой сборки не выдаёт частичный индекс за полный
+        self.built = False
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._entries
+
+    @staticmethod
+    def _make_entry(member: Any) -> _Entry:
+        display = member.display_name or ""
+        name = member.name or ""
+        return _Entry(
+            user_id=member.id,
+            display_lower=display.lower(),
+            name_lower=name.lower(),
+            has_nick=display != name,
+        )
+
+    def _index(self, entry: _Entry) -> None:
+        for key in entry.keys():
+            for gram in _trigrams(key):
+                self._postings.setdefault(gram, set()).add(entry.user_id)
+
+    def _unindex(self, entry: _Entry) -> None:
+        for key in entry.keys():
+            i = bisect_left(self._prefix, (key, entry.user_id))
+            if i < len(self._prefix) and self._prefix[i] == (key, entry.user_id):
+                del self._prefix[i]
+        # Триграмма могла встречаться в обоих ключах — удаляем по объединению
+        for gram in _trigrams(entry.display_lower) | _trigrams(entry.name_lower):
+            ids = self._postings.get(gram)
+            if ids is not None:
+                ids.discard(entry.user_id)
+                if not ids:
+                    del self._postings[gram]
+
+    def rebuild(self, members: Iterable[Any]) -> None:
+        """Построить индекс заново (on_ready): одна сортировка вместо вставок по одному."""
+        self._entries.clear()
+        self._postings.clear()
+        prefix: list[tuple[str, int]] = []
+        for member in members:
+            if getattr(member, "bot", False):
+                continue
+            entry = self._make_entry(member)
+            self._entries[entry.user_id] = entry
+            prefix.extend((key, entry.user_id) for key in entry.keys())
+            self._index(entry)
+        prefix.sort()
+        self._prefix = prefix
+        self.built = True
+        log.info("member_index.rebuild", members=len(self._entries), trigrams=len(self._postings))
+
+    def upsert(self, member: Any) -> None:
+        """Добавить или обновить участника (смена ника/username). Боты не индексируются."""
+        if getattr(member, "bot", False):
+            self.remove(member.id)
+            return
+        entry = self._make_entry(member)
+        old = self._entries.get(member.id)
+        if old == entry:
+            return
+        if old is not None:
+            self._unindex(old)
+        self._entries[entry.user_id] = entry
+        for key in entry.keys():
+            insort(self._prefix, (key, entry.user_id))
+        self._index(entry)
+
+    def remove(self, user_id: int) -> None:
+        entry = self._entries.pop(user_id, None)
+        if entry is not None:
+            self._unindex(entry)
+
+    def _prefix_matches(self, query: str) -> set[int]:
+        result: set[int] = set()
+        i = bisect_left(self._prefix, (query,))
+        while i < len(self._prefix) and self._prefix[i][0].startswith(query):
+            result.add(self._prefix[i][1])
+            i += 1
+        return result
+
+    def _substring_matches(self, query: str) -> set[int]:
+        grams = sorted(_trigrams(query), key=lambda g: len(self._postings.get(g, ())))
+        if not grams:
+            return set()
+        candidates = set(self._postings.get(grams[0], ()))
+        for gram in grams[1:]:
+            if not candidates:
+                break
+            candidates &= self._postings.get(gram, set())
+        return {
+            uid for uid in candidates
+            if query in self._entries[uid].display_lower or query in self._entries[uid].name_lower
+        }
+
+    def search(self, query: Optional[str], limit: int = 25) -> list[int]:
+        """
+        user_id лучших совпадений: сначала совпадения по префиксу, затем участники
+        с серверным ником, затем по алфавиту. Запрос короче 3 символов ищется только по префиксу.
+        """
+        if limit <= 0:
+            return []
+        q = (query or "").strip().lower()
+        if not q:
+            top = heapq.nsmallest(limit, self._entries.values(), key=lambda e: (not e.has_nick, e.display_lower))
+            return [e.user_id for e in top]
+
+        prefix_ids = self._prefix_matches(q)
+        matches = prefix_ids | self._substring_matches(q) if len(q) >= TRIGRAM else prefix_ids
+
+        def rank(uid: int) -> tuple[bool, bool, str, int]:
+            entry = self._entries[uid]
+            return (uid not in prefix_ids, not entry.has_nick, entry.display_lower, uid)
+
+        return heapq.nsmallest(limit, matches, key=rank)
+
+
+# guild_id → MemberSearchIndex
+_by_guild: dict[int, MemberSearchIndex] = {}
+
+
+def get_member_index(guild_id: int) -> MemberSearchIndex:
+    """Индекс участников гильдии (создаётся при первом обращении)."""
+    index = _by_guild.get(guild_id)
+    if index is None:
+        index = _by_guild[guild_id] = MemberSearchIndex()
+    return index
+
+
+async def search_guild(guild: Any, query: Optional[str], limit: int) -> list[Any]:
+    """
+    Участники гильдии по запросу. Полный кэш (guild.chunked) — через member_index;
+    иначе непустой запрос уходит в query_members (поиск Discord по началу имени, без кэширования).
+    """
+    q = (query or "").strip()
+    if q and not guild.chunked:
+        try:
+            return await guild.query_members(query=q, limit=min(limit, QUERY_MEMBERS_MAX), cache=False)
+        except asyncio.TimeoutError:
+            log.warning("member_index.query_members_timeout", query=q)
+    members = (guild.get_member(user_id) for user_id in get_member_index(guild.id).search(q, limit))
+    return [m for m in members if m is not None]
+
+
+async def fetch_members(guild: Any, user_ids: list[int]) -> list[Any]:
+    """Участники по ID через gateway пачками по QUERY_MEMBERS_MAX (для нечанкованной гильдии)."""
+    found: list[Any] = []
+    for i in range(0, len(user_ids), QUERY_MEMBERS_MAX):
+        chunk = user_ids[i:i + QUERY_MEMBERS_MAX]
+        try:
+            found.extend(await guild.query_members(user_ids=chunk, limit=len(chunk), cache=False))
+        except asyncio.TimeoutError:
+            log.warning("member_index.query_members_timeout", ids=len(chunk))
+    return found
@@ -1,6 +1,6 @@
 """
 MuteTracker: отслеживание "полного мута" (self_mute AND self_deaf).
-Singleton mute_tracker используется в voice_manager и scheduler.
+Singleton mute_tracker используется в voice_manager и scheduler; сессии раздельные по гильдиям.
 """
 from dataclasses import dataclass
 from datetime import datetime, timezone
@@ -12,6 +12,7 @@ log = structlog.get_logger()
 
 @dataclass
 class MuteSession:
+    guild_id: int
     discord_id: int
     channel_id: int
     started_at: datetime
@@ -20,8 +21,8 @@ class MuteSession:
 
 class MuteTracker:
     def __init__(self) -> None:
-        # discord_id → MuteSession
-        self._active: dict[int, MuteSession] = {}
+        # guild_id → {discord_id → MuteSession}
+        self._active: dict[int, dict[int, MuteSession]] = {}
 
     def is_fully_muted(self, member) -> bool:
         """Полный мут = self_mute AND self_deaf (не server mute)."""
@@ -31,23 +32,26 @@ class MuteTracker:
 
     def start_mute(self, member) -> MuteSession | None:
         """Начать мут-сессию. Возвращает None если уже активна."""
-        if member.id in self._active:
+        guild_sessions = self._active.setdefault(member.guild.id, {})
+        if member.id in guild_sessions:
             return None
         session = MuteSession(
+            guild_id=member.guild.id,
             discord_id=member.id,
             channel_id=member.voice.channel.id,
             started_at=datetime.now(timezone.utc),
         )
-        self._active[member.id] = session
-        log.info("mute_tracker.start", discord_id=str(member.id))
+        guild_sessions[member.id] = session
+        log.info("mute_tracker.start", guild_id=str(member.guild.id), discord_id=str(member.id))
         return session
 
-    def end_mute(self, member_id: int) -> MuteSession | None:
+    def end_mute(self, guild_id: int, member_id: int) -> MuteSession | None:
         """Завершить мут-сессию. Возвращает сессию или None."""
-        session = self._active.pop(member_id, None)
+        session = self._active.get(guild_id, {}).pop(member_id, None)
         if session:
             log.info(
                 "mute_tracker.end",
+                guild_id=str(guild_id),
                 discord_id=str(member_id),
                 duration_sec=self.get_duration(session),
             )
@@ -57,11 +61,11 @@ class MuteTracker:
         """Секунды с момента старта сессии."""
         return int((datetime.now(timezone.utc) - session.started_at).total_seconds())
 
-    def get_active(self) -> dict[int, MuteSession]:
-        return dict(self._active)
+    def get_active(self, guild_id: int) -> dict[int, MuteSession]:
+        return dict(self._active.get(guild_id, {}))
 
-    def get_session(self, member_id: int) -> MuteSession | None:
-        return self._active.get(member_id)
+    def get_session(self, guild_id: int, member_id: int) -> MuteSession | None:
+        return self._active.get(guild_id, {}).get(member_id)
 
 
 # Singleton
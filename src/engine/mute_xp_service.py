@@ -1,6 +1,7 @@
 """
 MuteXPService: начисление XP за мут, проверка level-up, выдача ролей, embed в лог-канал.
 XP начисляется за каждую минуту в "полном муте" (self_mute AND self_deaf).
+XP, уровни и мут-сессии ведутся отдельно для каждой гильдии (member.guild).
 """
 from datetime import datetime, timezone
 from typing import Optional
@@ -38,14 +39,15 @@ class MuteXPService:
             await pool.execute(
                 """
                 INSERT INTO mute_sessions
-                    (discord_id, channel_id, started_at, ended_at, duration_sec)
-                VALUES ($1, $2, $3, $4, $5)
+                    (discord_id, channel_id, started_at, ended_at, duration_sec, guild_id)
+                VALUES ($1, $2, $3, $4, $5, $6)
                 """,
                 member.id,
                 session.channel_id,
                 session.started_at,
                 datetime.now(timezone.utc),
                 duration_sec,
+                session.guild_id,
             )
         except Exception as e:
             log.warning("mute_xp.session_insert_failed", error=str(e), discord_id=str(member.id))
@@ -60,9 +62,11 @@ class MuteXPService:
         duration_sec: Optional[int] = None,
     ) -> None:
         """Добавить XP и проверить level-up."""
+        guild = member.guild
         row = await pool.fetchrow(
-            "SELECT xp, level FROM mute_xp WHERE discord_id = $1",
+            "SELECT xp, level FROM mute_xp WHERE discord_id = $1 AND guild_id = $2",
             member.id,
+            guild.id,
         )
         current_xp = row["xp"] if row else 0
         current_level = row["level"] if row else 0
@@ -72,9 +76,9 @@ class MuteXPService:
 
         await pool.execute(
             """
-            INSERT INTO mute_xp (discord_id, xp, total_mute_seconds, updated_at)
-            VALUES ($1, $2, $3, NOW())
-            ON CONFLICT (discord_id) DO UPDATE
+            INSERT INTO mute_xp (guild_id, discord_id, xp, total_mute_seconds, updated_at)
+            VALUES ($4, $1, $2, $3, NOW())
+            ON CONFLICT (guild_id, discord_id) DO UPDATE
             SET xp = mute_xp.xp + $2,
                 total_mute_seconds = mute_xp.total_mute_seconds + $3,
                 updated_at = NOW()
@@ -82,6 +86,7 @@ class MuteXPService:
             member.id,
             xp_earned,
             mute_secs,
+            guild.id,
         )
 
         # Проверить пороги уровней
@@ -89,11 +94,12 @@ class MuteXPService:
             """
             SELECT level, xp_required, role_id, label
             FROM mute_levels
-            WHERE xp_required <= $1 AND level > $2
+            WHERE guild_id = $3 AND xp_required <= $1 AND level > $2
             ORDER BY level ASC
             """,
             new_xp,
             current_level,
+            guild.id,
         )
         if not levels:
             return
@@ -102,14 +108,14 @@ class MuteXPService:
         new_level = new_level_row["level"]
 
         await pool.execute(
-            "UPDATE mute_xp SET level = $1 WHERE discord_id = $2",
+            "UPDATE mute_xp SET level = $1 WHERE discord_id = $2 AND guild_id = $3",
             new_level,
             member.id,
+            guild.id,
         )
 
         # Выдать роль если задана
-        guild = self.bot.get_guild(self.bot.guild_id)
-        if guild and new_level_row["role_id"]:
+        if new_level_row["role_id"]:
             try:
                 guild_member = guild.get_member(member.id)
                 role = guild.get_role(new_level_row["role_id"])
@@ -0,0 +1,202 @@
+"""
+VoiceOccupancy: текущая заполненность голосовых каналов гильдии в памяти бота.
+Экземпляр на гильдию (get_occupancy) обновляется инкрементально из voice_manager на каждое голосовое событие.
+
+Хранит по каналам участников с временем входа и состоянием мута, без SQL.
+Каждое изменение увеличивает version и пишется в кольцевой журнал дельт:
+клиент берёт snapshot(), затем опрашивает deltas_since(version). Если его версия
+выпала из журнала — deltas_since возвращает None, и нужен новый snapshot.
+"""
+from collections import deque
+from dataclasses import dataclass, replace
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Any, Callable, Optional
+
+import structlog
+
+log = structlog.get_logger()
+
+DEFAULT_DELTA_LOG_SIZE = 1000
+
+
+@dataclass(frozen=True)
+class Occupant:
+    user_id: int
+    channel_id: int
+    joined_at: datetime
+    display_name: str = ""
+    self_mute: bool = False
+    self_deaf: bool = False
+    server_mute: bool = False
+    server_deaf: bool = False
+    streaming: bool = False
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "user_id": str(self.user_id),
+            "channel_id": str(self.channel_id),
+            "joined_at": self.joined_at.isoformat(),
+            "display_name": self.display_name,
+            "self_mute": self.self_mute,
+            "self_deaf": self.self_deaf,
+            "server_mute": self.server_mute,
+            "server_deaf": self.server_deaf,
+            "streaming": self.streaming,
+        }
+
+
+def _voice_flags(voice: Any) -> dict[str, bool]:
+    """Флаги мута из discord.VoiceState (None — всё False)."""
+    if voice is None:
+        return {}
+    return {
+        "self_mute": bool(voice.self_mute),
+        "self_deaf": bool(voice.self_deaf),
+        "server_mute": bool(voice.mute),
+        "server_deaf": bool(voice.deaf),
+        "streaming": bool(getattr(voice, "self_stream", False)),
+    }
+
+
+class VoiceOccupancy:
+    def __init__(self, delta_log_size: int = DEFAULT_DELTA_LOG_SIZE) -> None:
+        # channel_id → {user_id → Occupant}
+        self._channels: dict[int, dict[int, Occupant]] = {}
+        # user_id → channel_id (для O(1) поиска при выходе/перемещении)
+        self._user_channel: dict[int, int] = {}
+        self._version = 0
+        self._deltas: deque[dict[str, Any]] = deque(maxlen=delta_log_size)
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def count(self) -> int:
+        """Число людей в голосовых каналах."""
+        return len(self._user_channel)
+
+    def get(self, user_id: int) -> Optional[Occupant]:
+        channel_id = self._user_channel.get(user_id)
+        if channel_id is None:
+            return None
+        return self._channels[channel_id].get(user_id)
+
+    def channel_members(self, channel_id: int) -> list[Occupant]:
+        return list(self._channels.get(channel_id, {}).values())
+
+    def _record(self, op: str, user_id: int, occupant: Optional[Occupant], from_channel_id: Optional[int]) -> None:
+        self._version += 1
+        self._deltas.append({
+            "version": self._version,
+            "op": op,
+            "user_id": str(user_id),
+            "from_channel_id": str(from_channel_id) if from_channel_id is not None else None,
+            "occupant": occupant.to_dict() if occupant is not None else None,
+        })
+
+    def _remove(self, user_id: int) -> Optional[int]:
+        channel_id = self._user_channel.pop(user_id, None)
+        if channel_id is None:
+            return None
+        members = self._channels.get(channel_id)
+        if members is not None:
+            members.pop(user_id, None)
+            if not members:
+                del self._channels[channel_id]
+        return channel_id
+
+    def apply(self, member: Any, channel_id: Optional[int], joined_at: Optional[datetime] = None) -> None:
+        """
+        Применить голосовое событие: channel_id — канал после события (None — вышел).
+        Вход/перемещение/выход или смена мута в том же канале — одна дельта.
+        """
+        previous = self.get(member.id)
+        if channel_id is None:
+            if self._remove(member.id) is not None:
+                self._record("leave", member.id, None, previous.channel_id if previous else None)
+            return
+
+        flags = _voice_flags(getattr(member, "voice", None))
+        name = getattr(member, "display_name", "") or ""
+        if previous is not None and previous.channel_id == channel_id:
+            updated = replace(previous, display_name=name, **flags)
+            if updated == previous:
+                return
+            self._channels[channel_id][member.id] = updated
+            self._record("update", member.id, updated, None)
+            return
+
+        from_channel_id = self._remove(member.id)
+        occupant = Occupant(
+            user_id=member.id,
+            channel_id=channel_id,
+            joined_at=joined_at or datetime.now(timezone.utc),
+            display_name=name,
+            **flags,
+        )
+        self._channels.setdefault(channel_id, {})[member.id] = occupant
+        self._user_channel[member.id] = channel_id
+        self._record("move" if from_channel_id is not None else "join", member.id, occupant, from_channel_id)
+
+    def sync_from_guild(
+        self,
+        guild: Any,
+        joined_at_lookup: Callable[[int, int], Optional[datetime]] = lambda _u, _c: None,
+    ) -> None:
+        """
+        Пересобрать состояние по voice-каналам гильдии (on_ready / on_resumed).
+        Журнал дельт сбрасывается: клиенты с прежней версией получат None и возьмут snapshot.
+        """
+        self._channels.clear()
+        self._user_channel.clear()
+        for channel in guild.voice_channels:
+            for member in channel.members:
+                self._channels.setdefault(channel.id, {})[member.id] = Occupant(
+                    user_id=member.id,
+                    channel_id=channel.id,
+                    joined_at=joined_at_lookup(member.id, channel.id) or datetime.now(timezone.utc),
+                    display_name=getattr(member, "display_name", "") or "",
+                    **_voice_flags(getattr(member, "voice", None)),
+                )
+                self._user_channel[member.id] = channel.id
+        self._version += 1
+        self._deltas.clear()
+        log.info("occupancy.sync", members=self.count(), channels=len(self._channels), version=self._version)
+
+    def snapshot(self) -> dict[str, Any]:
+        """Полное состояние: версия и участники по каналам."""
+        return {
+            "version": self._version,
+            "count": self.count(),
+            "channels": {
+                str(channel_id): [o.to_dict() for o in members.values()]
+                for channel_id, members in self._channels.items()
+            },
+        }
+
+    def deltas_since(self, version: int) -> Optional[list[dict[str, Any]]]:
+        """
+        Дельты с версией > version. None — версия слишком старая (или из будущего),
+        нужен полный snapshot.
+        """
+        if version == self._version:
+            return []
+        if version > self._version:
+            return None
+        if not self._deltas or self._deltas[0]["version"] > version + 1:
+            return None
+        start = version + 1 - self._deltas[0]["version"]
+        return list(islice(self._deltas, start, None))
+
+
+# guild_id → VoiceOccupancy
+_by_guild: dict[int, VoiceOccupancy] = {}
+
+
+def get_occupancy(guild_id: int) -> VoiceOccupancy:
+    """Заполненность каналов гильдии (создаётся при первом обращении)."""
+    occupancy = _by_guild.get(guild_id)
+    if occupancy is None:
+        occupancy = _by_guild[guild_id] = VoiceOccupancy()
+    return occupancy
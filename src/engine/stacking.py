@@ -1,6 +1,6 @@
 """
 Детектор стакинга пар: если два пользователя из пары в одном войс-канале — перенос обоих в целевой канал.
-Защита от move-loop через _recently_moved.
+Защита от move-loop через _recently_moved. Пары и блокировки раздельные для каждой гильдии.
 """
 from __future__ import annotations
 
@@ -14,12 +14,13 @@ logger = get_logger("stacking")
 
 
 class PairRule:
-    """Правило пары: user_id_1, user_id_2, target_channel_id."""
+    """Правило пары: user_id_1, user_id_2, target_channel_id в гильдии guild_id."""
 
-    def __init__(self, user_id_1: int, user_id_2: int, target_channel_id: int) -> None:
+    def __init__(self, user_id_1: int, user_id_2: int, target_channel_id: int, guild_id: int) -> None:
         self.user_id_1 = user_id_1
         self.user_id_2 = user_id_2
         self.target_channel_id = target_channel_id
+        self.guild_id = guild_id
 
     def contains(self, user_id: int) -> bool:
         return user_id in (self.user_id_1, self.user_id_2)
@@ -42,18 +43,28 @@ class StackingDetector:
     """
 
     def __init__(self) -> None:
-        self._pairs: list[PairRule] = []
-        self._recently_moved: set[frozenset[int]] = set()
+        # guild_id → пары гильдии
+        self._pairs: dict[int, list[PairRule]] = {}
+        # guild_id → ключи пар, уже перенесённых в целевой канал
+        self._recently_moved: dict[int, set[frozenset[int]]] = {}
 
     def load_pairs(self, pairs: list[PairRule]) -> None:
-        self._pairs = list(pairs)
+        """Заменить все пары (всех гильдий); _recently_moved сохраняется."""
+        by_guild: dict[int, list[PairRule]] = {}
+        for pair in pairs:
+            by_guild.setdefault(pair.guild_id, []).append(pair)
+        self._pairs = by_guild
 
     def add_pair(self, pair: PairRule) -> None:
-        if pair not in self._pairs:
-            self._pairs.append(pair)
+        guild_pairs = self._pairs.setdefault(pair.guild_id, [])
+        if pair not in guild_pairs:
+            guild_pairs.append(pair)
 
-    def get_pairs(self) -> list[PairRule]:
-        return list(self._pairs)
+    def get_pairs(self, guild_id: Optional[int] = None) -> list[PairRule]:
+        """Пары гильдии или, без guild_id, всех гильдий."""
+        if guild_id is not None:
+            return list(self._pairs.get(guild_id, ()))
+        return [pair for guild_pairs in self._pairs.values() for pair in guild_pairs]
 
     async def check_and_move(self, member: discord.Member, guild: discord.Guild) -> bool:
         """
@@ -65,7 +76,8 @@ class StackingDetector:
         if not channel:
             return False
 
-        for rule in self._pairs:
+        recently_moved = self._recently_moved.setdefault(guild.id, set())
+        for rule in self._pairs.get(guild.id, ()):
             if not rule.contains(member.id):
                 continue
             partner_id = rule.partner_of(member.id)
@@ -92,10 +104,10 @@ class StackingDetector:
             if channel.id == rule.target_channel_id:
                 continue
             pair_key = rule.pair_key()
-            if pair_key in self._recently_moved:
+            if pair_key in recently_moved:
                 continue
 
-            self._recently_moved.add(pair_key)
+            recently_moved.add(pair_key)
             target = guild.get_channel(rule.target_channel_id)
             if not target or not isinstance(target, discord.VoiceChannel):
                 logger.warning(
@@ -103,7 +115,7 @@ class StackingDetector:
                     target_channel_id=rule.target_channel_id,
                     guild_id=guild.id,
                 )
-                self._recently_moved.discard(pair_key)
+                recently_moved.discard(pair_key)
                 continue
 
             from_channel = channel
@@ -136,7 +148,8 @@ class StackingDetector:
 
         return False
 
-    def on_user_leave(self, user_id: int) -> None:
-        """Снять блокировку move-loop для пар с этим юзером."""
-        to_remove = {pk for pk in self._recently_moved if user_id in pk}
-        self._recently_moved -= to_remove
+    def on_user_leave(self, guild_id: int, user_id: int) -> None:
+        """Снять блокировку move-loop для пар гильдии с этим юзером."""
+        recently_moved = self._recently_moved.get(guild_id)
+        if recently_moved:
+            recently_moved -= {pk for pk in recently_moved if user_id in pk}
@@ -1,6 +1,6 @@
 """
 Трекер голосовых сессий: in-memory хранилище и запись в voice_sessions.
-Pool передаётся при вызове (dependency injection).
+Pool передаётся при вызове (dependency injection). Состояние раздельное для каждой гильдии.
 """
 from datetime import datetime, timezone
 from typing import Any, Optional
@@ -12,22 +12,35 @@ from src.utils.logging import get_logger
 
 _log = get_logger("tracker")
 
-# Ключ in-memory: (discord_id, channel_id), значение: joined_at (datetime)
-_sessions: dict[tuple[int, int], datetime] = {}
+# guild_id → {(discord_id, channel_id): joined_at (datetime)}
+_sessions: dict[int, dict[tuple[int, int], datetime]] = {}
 
 
-def get_current_sessions() -> list[tuple[int, int, datetime]]:
+def _guild_sessions(guild_id: int) -> dict[tuple[int, int], datetime]:
+    sessions = _sessions.get(guild_id)
+    if sessions is None:
+        sessions = _sessions[guild_id] = {}
+    return sessions
+
+
+def get_current_sessions(guild_id: int) -> list[tuple[int, int, datetime]]:
     """
-    Список активных сессий из памяти: (discord_id, channel_id, joined_at).
+    Список активных сессий гильдии из памяти: (discord_id, channel_id, joined_at).
     """
     return [
         (discord_id, channel_id, joined_at)
-        for (discord_id, channel_id), joined_at in _sessions.items()
+        for (discord_id, channel_id), joined_at in _sessions.get(guild_id, {}).items()
     ]
 
 
+def get_joined_at(guild_id: int, discord_id: int, channel_id: int) -> Optional[datetime]:
+    """Время входа активной сессии из памяти (None — сессии нет)."""
+    return _sessions.get(guild_id, {}).get((discord_id, channel_id))
+
+
 async def start_session(
     pool: asyncpg.Pool,
+    guild_id: int,
     discord_id: int,
     channel_id: int,
     joined_at: Optional[datetime] = None,
@@ -39,41 +52,45 @@ async def start_session(
     """
     if joined_at is None:
         joined_at = datetime.now(timezone.utc)
-        _sessions[(discord_id, channel_id)] = joined_at
+        _guild_sessions(guild_id)[(discord_id, channel_id)] = joined_at
         await pool.execute(
             """
-            INSERT INTO voice_sessions (discord_id, channel_id, joined_at, left_at)
-            VALUES ($1, $2, $3, NULL)
+            INSERT INTO voice_sessions (discord_id, channel_id, joined_at, left_at, guild_id)
+            VALUES ($1, $2, $3, NULL, $4)
             """,
             discord_id,
             channel_id,
             joined_at,
+            guild_id,
         )
     else:
         # Recovery path: сессия уже открыта в БД, только восстанавливаем in-memory
-        _sessions[(discord_id, channel_id)] = joined_at
+        _guild_sessions(guild_id)[(discord_id, channel_id)] = joined_at
 
 
 async def end_session(
     pool: asyncpg.Pool,
+    guild_id: int,
     discord_id: int,
     channel_id: int,
 ) -> None:
     """
     Завершить сессию: UPDATE voice_sessions SET left_at = NOW() и удалить из памяти.
     """
+    sessions = _sessions.get(guild_id)
     key = (discord_id, channel_id)
-    if key not in _sessions:
+    if sessions is None or key not in sessions:
         return
-    del _sessions[key]
+    del sessions[key]
     await pool.execute(
         """
         UPDATE voice_sessions
         SET left_at = NOW()
-        WHERE discord_id = $1 AND channel_id = $2 AND left_at IS NULL
+        WHERE discord_id = $1 AND channel_id = $2 AND left_at IS NULL AND guild_id = $3
         """,
         discord_id,
         channel_id,
+        guild_id,
     )
 
 
@@ -104,41 +121,44 @@ async def sync_from_guild(
     Если нет — вызываем start_session (INSERT новой записи).
     """
     recovered = 0
+    sessions = _guild_sessions(guild.id)
     for channel in guild.voice_channels:
         for member in channel.members:
             key = (member.id, channel.id)
-            if key in _sessions:
+            if key in sessions:
                 continue
             try:
                 row = await pool.fetchrow(
                     """
                     SELECT joined_at FROM voice_sessions
-                    WHERE discord_id = $1 AND channel_id = $2 AND left_at IS NULL
+                    WHERE discord_id = $1 AND channel_id = $2 AND left_at IS NULL AND guild_id = $3
                     ORDER BY joined_at DESC
                     LIMIT 1
                     """,
                     member.id,
                     channel.id,
+                    guild.id,
                 )
             except Exception as e:
                 _log.warning("tracker.sync_db_error", discord_id=member.id, error=str(e))
                 continue
             if row:
                 # Восстанавливаем из БД: реальное joined_at известно
-                await start_session(pool, member.id, channel.id, joined_at=row["joined_at"])
+                await start_session(pool, guild.id, member.id, channel.id, joined_at=row["joined_at"])
             else:
                 # Нет открытой записи в БД — создаём новую
-                await start_session(pool, member.id, channel.id)
+                await start_session(pool, guild.id, member.id, channel.id)
             recovered += 1
-    _log.info("tracker.sync", recovered=recovered)
+    _log.info("tracker.sync", guild_id=guild.id, recovered=recovered)
 
 
 async def get_overtime_users(
     pool: asyncpg.Pool,
+    guild_id: int,
     rules: list[dict[str, Any]],
 ) -> list[dict[str, Any]]:
     """
-    Для каждой активной сессии и каждого правила с max_time_sec и подходящим channel_id
+    Для каждой активной сессии гильдии и каждого её правила с max_time_sec и подходящим channel_id
     вычислить длительность; если >= max_time_sec, добавить в результат элемент:
     {discord_id, channel_id, rule, overtime_seconds}.
     """
@@ -147,7 +167,7 @@ async def get_overtime_users(
     if not rules_with_time:
         return result
 
-    for (discord_id, channel_id), joined_at in list(_sessions.items()):
+    for (discord_id, channel_id), joined_at in list(_sessions.get(guild_id, {}).items()):
         duration_sec = _duration_seconds(joined_at)
         for rule in rules_with_time:
             if not _rule_applies_to_channel(rule, channel_id):
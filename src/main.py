@@ -1,21 +1,31 @@
 """
 Единая точка входа: бот + FastAPI + планировщик + LISTEN/NOTIFY.
 Запуск: python -m src.main
+
+С SHARD_IDS процесс обслуживает только гильдии своих шардов (несколько процессов —
+python -m src.run_shards): трекер, правила и задачи по гильдиям у каждого свои, cron-задачи
+schedules выполняет лидер (pg advisory lock), API — процесс с API_ENABLED.
 """
 import asyncio
 
 from uvicorn import Config, Server
 
-from src.api.app import app
+from src.api import config_cache
+from src.api.app import app, metrics_app
+from src.api.sse import broadcaster
+from src.api.sse_backends import configure_broadcaster
 from src.bot.client import create_bot
+from src.bot.recorder import start_voice_recorder
 from src.config.settings import get_settings, load_config_yaml
 from src.db import database
 from src.db.repositories import logs_repo, rules_repo, schedules_repo, users_repo
 from src.engine import actions, evaluator, tracker
 from src.scheduler import jobs as scheduler_jobs
+from src.scheduler.leader import SchedulerLeader
 from src.api.deps import set_scheduler
 from src.setup_features import reload_stacking, setup_all_features
 from src.utils.logging import get_logger, setup_logging
+from src.utils.loop_monitor import start_loop_monitor
 
 
 async def main() -> None:
@@ -25,12 +35,20 @@ async def main() -> None:
     logger = get_logger("main")
 
     logger.info("initializing")
-    await database.init_pool()
+    loop_monitor = start_loop_monitor(slow_callback_ms=settings.LOOP_SLOW_CALLBACK_MS)
+    voice_recorder = start_voice_recorder(settings.VOICE_RECORD_PATH, settings.VOICE_RECORD_MAX_MB)
+    await database.init_pool(slow_query_ms=settings.DB_SLOW_QUERY_MS)
     pool = database.get_pool()
 
     app.state.pool = pool
 
-    bot = create_bot(command_prefix=config_yaml.get("bot", {}).get("command_prefix", "!"))
+    bot = create_bot(
+        command_prefix=config_yaml.get("bot", {}).get("command_prefix", "!"),
+        member_cache_mode=settings.MEMBER_CACHE_MODE,
+        sharded=settings.sharded,
+        shard_count=settings.SHARD_COUNT,
+        shard_ids=settings.SHARD_IDS,
+    )
     app.state.bot = bot
     bot.pool = pool
     bot.tracker = tracker
@@ -40,54 +58,80 @@ async def main() -> None:
     bot.evaluator = evaluator
     bot.actions = actions
     bot.guild_id = settings.DISCORD_GUILD_ID
+    bot.guild_ids = settings.local_guild_ids
     bot.config_changed = False
+    logger.info("guilds_assigned", shard_ids=settings.SHARD_IDS or None, guild_ids=bot.guild_ids)
 
-    def get_guild():
-        if bot.is_ready():
-            return bot.get_guild(settings.DISCORD_GUILD_ID)
-        return None
+    def get_guilds():
+        if not bot.is_ready():
+            return []
+        return [g for g in map(bot.get_guild, bot.guild_ids) if g is not None]
 
     scheduler = scheduler_jobs.setup_scheduler(
         pool=pool,
-        get_guild=get_guild,
+        get_guilds=get_guilds,
         check_interval_sec=settings.SCHEDULER_CHECK_INTERVAL,
     )
     set_scheduler(scheduler)
+    leader = SchedulerLeader(pool) if settings.SHARD_IDS else None
+    scheduler_jobs.set_scheduler_leader(leader)
     await setup_all_features(bot, pool, scheduler)
 
-    def on_config_changed() -> None:
+    def on_config_changed(change: database.ConfigChange) -> None:
         bot.config_changed = True
-        logger.info("config_changed_notify_received")
+        logger.info("config_changed_notify_received", kind=change.kind)
         try:
             loop = asyncio.get_running_loop()
-            loop.create_task(reload_stacking(bot, pool))
         except RuntimeError:
-            pass
+            return
+        if change.affects("stacking_pairs"):
+            loop.create_task(reload_stacking(bot, pool))
+        # Расписания меняет API другого процесса: cron-задачи этого перечитываются из БД
+        if change.affects("schedules"):
+            loop.create_task(scheduler_jobs.reload_schedule_jobs(pool, scheduler, change.ids))
 
     database.register_config_listener(on_config_changed)
+    configure_broadcaster(broadcaster, pool, settings.SSE_BACKEND, consume=settings.API_ENABLED)
+    config_cache.attach_listeners()
     database.start_config_listener()
 
-    await scheduler_jobs.start_scheduler(pool, scheduler, report_timezone=settings.DEFAULT_TIMEZONE)
-
-    server_config = Config(
-        app=app,
-        host=settings.API_HOST,
-        port=settings.API_PORT,
-        log_level="info",
+    # Отчёты — в процессе, который обслуживает основную гильдию
+    report_guild_id = settings.DISCORD_GUILD_ID if settings.DISCORD_GUILD_ID in bot.guild_ids else None
+    await scheduler_jobs.start_scheduler(
+        pool, scheduler, report_guild_id, report_timezone=settings.DEFAULT_TIMEZONE,
     )
-    server = Server(server_config)
-    server_task = asyncio.create_task(server.serve())
-    logger.info("api_started", host=settings.API_HOST, port=settings.API_PORT)
+
+    server_task = None
+    if settings.API_ENABLED:
+        server_config = Config(
+            app=app,
+            host=settings.API_HOST,
+            port=settings.API_PORT,
+            log_level="info",
+        )
+        server = Server(server_config)
+        server_task = asyncio.create_task(server.serve())
+        logger.info("api_started", host=settings.API_HOST, port=settings.API_PORT)
+    elif settings.METRICS_PORT:
+        # Без API метрики процесса иначе не видны никому
+        server = Server(Config(app=metrics_app, host=settings.API_HOST, port=settings.METRICS_PORT, log_level="warning"))
+        server_task = asyncio.create_task(server.serve())
+        logger.info("metrics_server_started", host=settings.API_HOST, port=settings.METRICS_PORT)
 
     try:
         await bot.start(settings.DISCORD_TOKEN)
     finally:
-        server_task.cancel()
-        try:
-            await server_task
-        except asyncio.CancelledError:
-            pass
+        if server_task is not None:
+            server_task.cancel()
+            try:
+                await server_task
+            except asyncio.CancelledError:
+                pass
         scheduler_jobs.shutdown_scheduler()
+        if leader is not None:
+            await leader.release()
+        await loop_monitor.stop()
+        voice_recorder.stop()
         await database.close_pool()
         logger.info("shutdown_complete")
 
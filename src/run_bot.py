@@ -4,12 +4,16 @@
 """
 import asyncio
 
+from src.api.sse import broadcaster
+from src.api.sse_backends import configure_broadcaster
 from src.bot.client import create_bot
+from src.bot.recorder import start_voice_recorder
 from src.config.settings import get_settings, load_config_yaml
 from src.db import database
 from src.db.repositories import logs_repo, rules_repo, users_repo
 from src.engine import actions, evaluator, tracker
 from src.utils.logging import get_logger, setup_logging
+from src.utils.loop_monitor import start_loop_monitor
 
 
 async def main() -> None:
@@ -19,11 +23,19 @@ async def main() -> None:
 
     logger = get_logger("run_bot")
     logger.info("starting_bot")
+    loop_monitor = start_loop_monitor(slow_callback_ms=settings.LOOP_SLOW_CALLBACK_MS)
+    voice_recorder = start_voice_recorder(settings.VOICE_RECORD_PATH, settings.VOICE_RECORD_MAX_MB)
 
-    await database.init_pool()
+    await database.init_pool(slow_query_ms=settings.DB_SLOW_QUERY_MS)
     pool = database.get_pool()
 
-    bot = create_bot(command_prefix=config_yaml.get("bot", {}).get("command_prefix", "!"))
+    bot = create_bot(
+        command_prefix=config_yaml.get("bot", {}).get("command_prefix", "!"),
+        member_cache_mode=settings.MEMBER_CACHE_MODE,
+        sharded=settings.sharded,
+        shard_count=settings.SHARD_COUNT,
+        shard_ids=settings.SHARD_IDS,
+    )
     bot.pool = pool
     bot.tracker = tracker
     bot.rules_repo = rules_repo
@@ -32,10 +44,16 @@ async def main() -> None:
     bot.evaluator = evaluator
     bot.actions = actions
     bot.guild_id = settings.DISCORD_GUILD_ID
+    bot.guild_ids = settings.local_guild_ids
+
+    # Без API в процессе события имеет смысл только публиковать (SSE_BACKEND=postgres)
+    configure_broadcaster(broadcaster, pool, settings.SSE_BACKEND, consume=False)
 
     try:
         await bot.start(settings.DISCORD_TOKEN)
     finally:
+        await loop_monitor.stop()
+        voice_recorder.stop()
         await database.close_pool()
         logger.info("pool_closed")
 
@@ -0,0 +1,119 @@
+"""
+Запуск бота несколькими процессами: каждый — python -m src.main со своим диапазоном шардов.
+
+    python -m src.run_shards --processes 4               # SHARD_COUNT из окружения или = processes
+    python -m src.run_shards --processes 4 --shards 16   # по 4 шарда на процесс
+
+Процесс получает SHARD_COUNT и SHARD_IDS (смежный диапазон) и обслуживает только гильдии своих
+шардов: трекер сессий, правила и задачи по гильдиям у него свои, события голосовых каналов
+разных шардов обрабатываются на разных ядрах. Общее — через Postgres: NOTIFY config_changed,
+SSE (SSE_BACKEND=postgres), блокировка лидера для cron-задач schedules. API запускается
+только в первом процессе; остальные отдают свой GET /metrics на METRICS_PORT = API_PORT + номер
+процесса. Запись голосовых событий (VOICE_RECORD_PATH) у каждого процесса — в свой файл
+<имя>.p<номер><расширение>.
+
+Сигнал SIGINT/SIGTERM пересылается всем процессам. Если один завершился, остальные
+останавливаются, и супервизор выходит с ненулевым кодом — перезапуск за оркестратором
+(docker restart policy, systemd).
+"""
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+# Сколько ждать завершения процессов после SIGTERM, прежде чем убить
+STOP_TIMEOUT = 30.0
+# Как в Settings.API_PORT: от него считаются METRICS_PORT процессов без API
+DEFAULT_API_PORT = 8000
+
+
+def shard_ranges(shard_count: int, processes: int) -> list[list[int]]:
+    """Разбить шарды 0…shard_count-1 на processes смежных диапазонов (размеры отличаются ≤ 1)."""
+    base, extra = divmod(shard_count, processes)
+    ranges = []
+    start = 0
+    for i in range(processes):
+        size = base + (1 if i < extra else 0)
+        ranges.append(list(range(start, start + size)))
+        start += size
+    return ranges
+
+
+def child_env(shard_count: int, shard_ids: list[int], index: int) -> dict[str, str]:
+    """Окружение процесса index: его шарды, API только у первого, свои порт метрик и файл записи."""
+    env = dict(os.environ)
+    env["SHARD_COUNT"] = str(shard_count)
+    # JSON-массив: список через запятую pydantic-settings из окружения не разбирает
+    env["SHARD_IDS"] = json.dumps(shard_ids)
+    env["API_ENABLED"] = "true" if index == 0 else "false"
+    if index:
+        env["METRICS_PORT"] = str(int(env.get("API_PORT") or DEFAULT_API_PORT) + index)
+    # События голоса из всех процессов должны доходить до API первого
+    env["SSE_BACKEND"] = "postgres"
+    # Один файл на процесс: общий писали бы несколько потоков записи с ротацией наперегонки
+    if env.get("VOICE_RECORD_PATH"):
+        path = Path(env["VOICE_RECORD_PATH"])
+        env["VOICE_RECORD_PATH"] = str(path.with_name(f"{path.stem}.p{index}{path.suffix}"))
+    return env
+
+
+def _stop(children: list[subprocess.Popen], sig: int = signal.SIGTERM) -> None:
+    for child in children:
+        if child.poll() is None:
+            child.send_signal(sig)
+    deadline = time.monotonic() + STOP_TIMEOUT
+    for child in children:
+        try:
+            child.wait(timeout=max(deadline - time.monotonic(), 0.1))
+        except subprocess.TimeoutExpired:
+            child.kill()
+            child.wait()
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="число процессов (по умолчанию — ядер)")
+    parser.add_argument("--shards", type=int, help="общее число шардов (по умолчанию $SHARD_COUNT или --processes)")
+    args = parser.parse_args(argv)
+
+    shard_count = args.shards or int(os.environ.get("SHARD_COUNT") or 0) or args.processes
+    processes = min(args.processes, shard_count)
+    if processes < 1:
+        parser.error("--processes must be positive")
+
+    children: list[subprocess.Popen] = []
+    stopping = False
+
+    def on_signal(signum: int, frame: object) -> None:
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGINT, on_signal)
+    signal.signal(signal.SIGTERM, on_signal)
+
+    for i, shard_ids in enumerate(shard_ranges(shard_count, processes)):
+        env = child_env(shard_count, shard_ids, i)
+        children.append(subprocess.Popen([sys.executable, "-m", "src.main"], env=env))
+        print(f"started pid {children[-1].pid}: shards {shard_ids[0]}-{shard_ids[-1]} of {shard_count}", file=sys.stderr)
+
+    exit_code = 0
+    while not stopping:
+        exited = [c for c in children if c.poll() is not None]
+        if exited:
+            child = exited[0]
+            print(f"pid {child.pid} exited with code {child.returncode}, stopping all", file=sys.stderr)
+            exit_code = child.returncode or 1
+            break
+        time.sleep(0.5)
+
+    _stop(children)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
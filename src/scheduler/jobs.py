@@ -1,25 +1,36 @@
 """
 Планировщик: APScheduler (AsyncIOScheduler).
-- check_overtime: периодическая проверка превышения max_time_sec и выполнение действий.
-- cron-задачи из schedules: enable/disable правил по расписанию.
+- check_overtime: периодическая проверка превышения max_time_sec и выполнение действий
+  (гильдии бота обрабатываются параллельно).
+- cron-задачи из schedules: enable/disable правил по расписанию. При нескольких процессах
+  бота (SHARD_IDS) их выполняет только лидер (src/scheduler/leader.py); изменения расписаний
+  из API доходят до всех процессов через NOTIFY config_changed (reload_schedule_jobs).
 """
+import asyncio
+import time
 from typing import Any, Callable, Optional
 
 import asyncpg
 import discord
+from apscheduler.events import EVENT_JOB_ERROR, EVENT_JOB_EXECUTED, EVENT_JOB_SUBMITTED, JobEvent
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
 
+from src.db import database
 from src.db.repositories import logs_repo, rules_repo, schedules_repo, stats_repo
 from src.engine import actions as actions_module
 from src.engine import tracker
+from src.scheduler.leader import SchedulerLeader
 from src.utils.logging import get_logger
+from src.utils.metrics import SCHEDULER_JOB_ERRORS, SCHEDULER_JOB_SECONDS
 
 logger = get_logger("scheduler.jobs")
 
 # Глобальный экземпляр планировщика (устанавливается в setup_scheduler)
 _scheduler: Optional[AsyncIOScheduler] = None
+# Лидер для глобальных задач; None — процесс один, выполняет всё сам
+_leader: Optional[SchedulerLeader] = None
 
 
 def _get_scheduler() -> AsyncIOScheduler:
@@ -28,25 +39,34 @@ def _get_scheduler() -> AsyncIOScheduler:
     return _scheduler
 
 
+def set_scheduler_leader(leader: Optional[SchedulerLeader]) -> None:
+    """Включить выбор лидера для cron-задач schedules (запуск несколькими процессами)."""
+    global _leader
+    _leader = leader
+
+
 async def _check_overtime(
     pool: asyncpg.Pool,
-    get_guild: Callable[[], Optional[discord.Guild]],
+    get_guilds: Callable[[], list[discord.Guild]],
 ) -> None:
     """
-    Задача check_overtime: загрузить активные правила, получить overtime пользователей,
-    для каждого выполнить действие и записать лог.
+    Задача check_overtime: по каждой гильдии бота (параллельно) загрузить активные правила,
+    получить overtime пользователей, для каждого выполнить действие и записать лог.
     """
-    guild = get_guild() if get_guild else None
-    if not guild:
+    guilds = get_guilds() if get_guilds else []
+    if not guilds:
         logger.debug("check_overtime_skipped_no_guild")
         return
+    await asyncio.gather(*(_check_guild_overtime(pool, guild) for guild in guilds))
 
+
+async def _check_guild_overtime(pool: asyncpg.Pool, guild: discord.Guild) -> None:
     try:
-        rules = await rules_repo.get_all_active_rules(pool)
+        rules = await rules_repo.get_all_active_rules(pool, guild.id)
         if not rules:
             return
 
-        overtime_entries = await tracker.get_overtime_users(pool, rules)
+        overtime_entries = await tracker.get_overtime_users(pool, guild.id, rules)
         for entry in overtime_entries:
             discord_id = entry["discord_id"]
             channel_id = entry["channel_id"]
@@ -74,6 +94,7 @@ async def _check_overtime(
             if ok:
                 await logs_repo.log_action(
                     pool,
+                    guild.id,
                     rule_id=rule_id,
                     discord_id=discord_id,
                     action_type=action_type,
@@ -82,13 +103,14 @@ async def _check_overtime(
                 )
                 logger.info(
                     "overtime_action_executed",
+                    guild_id=guild.id,
                     discord_id=discord_id,
                     channel_id=channel_id,
                     rule_id=rule_id,
                     action_type=action_type,
                 )
     except Exception as e:
-        logger.exception("check_overtime_failed", error=str(e))
+        logger.exception("check_overtime_failed", guild_id=guild.id, error=str(e))
 
 
 def _make_schedule_callback(
@@ -101,12 +123,20 @@ def _make_schedule_callback(
 
     async def _run() -> None:
         try:
+            if _leader is not None and not await _leader.acquire():
+                logger.debug("schedule_skipped_not_leader", schedule_id=schedule_id)
+                return
             if action == "enable":
-                await rules_repo.update_rule(pool, rule_id, {"is_active": True})
+                rule = await rules_repo.update_rule(pool, rule_id, {"is_active": True})
                 logger.info("schedule_enabled_rule", schedule_id=schedule_id, rule_id=rule_id)
             elif action == "disable":
-                await rules_repo.update_rule(pool, rule_id, {"is_active": False})
+                rule = await rules_repo.update_rule(pool, rule_id, {"is_active": False})
                 logger.info("schedule_disabled_rule", schedule_id=schedule_id, rule_id=rule_id)
+            else:
+                return
+            # Как после PATCH /api/rules: кэши правил (движок, админ-команды) перечитывают правило
+            if rule is not None:
+                await database.notify_config_changed(pool, "rules", [rule_id])
         except Exception as e:
             logger.exception(
                 "schedule_job_failed",
@@ -187,9 +217,33 @@ async def _register_schedule_jobs(
         register_schedule_job(scheduler, s, pool)
 
 
+async def reload_schedule_jobs(
+    pool: asyncpg.Pool,
+    scheduler: AsyncIOScheduler,
+    schedule_ids: Optional[tuple[Any, ...]] = None,
+) -> None:
+    """
+    Перечитать расписания из БД после NOTIFY config_changed (kind="schedules"): изменённые —
+    перерегистрировать, удалённые и выключенные — снять. schedule_ids=None — все.
+    """
+    if schedule_ids is None:
+        for job in scheduler.get_jobs():
+            if job.id.startswith("schedule_"):
+                job.remove()
+        await _register_schedule_jobs(pool, scheduler)
+        return
+    for schedule_id in schedule_ids:
+        schedule = await schedules_repo.get_schedule_by_id(pool, int(schedule_id))
+        if schedule is not None and schedule.get("is_active"):
+            register_schedule_job(scheduler, schedule, pool)
+        elif scheduler.get_job(f"schedule_{schedule_id}") is not None:
+            scheduler.remove_job(f"schedule_{schedule_id}")
+            logger.info("schedule_unregistered", schedule_id=schedule_id)
+
+
 def setup_scheduler(
     pool: asyncpg.Pool,
-    get_guild: Callable[[], Optional[discord.Guild]],
+    get_guilds: Callable[[], list[discord.Guild]],
     check_interval_sec: int,
 ) -> AsyncIOScheduler:
     """
@@ -207,7 +261,7 @@ def setup_scheduler(
     scheduler.add_job(
         _check_overtime,
         trigger=IntervalTrigger(seconds=check_interval_sec),
-        args=[pool, get_guild],
+        args=[pool, get_guilds],
         id="check_overtime",
         name="check_overtime",
         replace_existing=True,
@@ -220,33 +274,38 @@ def setup_scheduler(
 
 
 async def tick_mute_xp(pool: asyncpg.Pool, mute_tracker, mute_xp_service, bot) -> None:
-    """Каждую минуту начислять XP пользователям, которые прямо сейчас в полном муте."""
+    """Каждую минуту начислять XP пользователям, которые прямо сейчас в полном муте (по всем гильдиям)."""
     from src.engine.mute_xp_service import MUTE_XP_PER_MINUTE
-    active = mute_tracker.get_active()
-    if not active:
-        return
 
-    guild_id = getattr(bot, "guild_id", None)
-    guild = bot.get_guild(guild_id) if guild_id else None
-    if not guild:
-        return
-
-    for member_id in list(active.keys()):
-        member = guild.get_member(member_id)
-        if not member:
-            continue
-        try:
-            await mute_xp_service._add_xp(pool, member, MUTE_XP_PER_MINUTE)
-        except Exception as e:
-            logger.warning("mute_xp.tick_failed", discord_id=str(member_id), error=str(e))
+    async def tick_guild(guild_id: int) -> int:
+        active = mute_tracker.get_active(guild_id)
+        if not active:
+            return 0
+        guild = bot.get_guild(guild_id)
+        if not guild:
+            return 0
+        for member_id in list(active.keys()):
+            member = guild.get_member(member_id)
+            if not member:
+                continue
+            try:
+                await mute_xp_service._add_xp(pool, member, MUTE_XP_PER_MINUTE)
+            except Exception as e:
+                logger.warning("mute_xp.tick_failed", guild_id=guild_id, discord_id=str(member_id), error=str(e))
+        return len(active)
 
-    logger.info("mute_xp.tick", active_sessions=len(active))
+    counts = await asyncio.gather(*(tick_guild(gid) for gid in getattr(bot, "guild_ids", None) or []))
+    if any(counts):
+        logger.info("mute_xp.tick", active_sessions=sum(counts))
 
 
 async def send_daily_stats(pool: asyncpg.Pool, notifier, bot) -> None:
-    """Отправить статистику за прошедшие 24 часа в daily-канал."""
+    """Отправить статистику основной гильдии (bot.guild_id) за прошедшие 24 часа в daily-канал."""
     from datetime import datetime, timezone
 
+    guild_id = getattr(bot, "guild_id", None)
+    if guild_id is None:
+        return
     try:
         stats = await pool.fetchrow("""
             SELECT
@@ -258,28 +317,28 @@ async def send_daily_stats(pool: asyncpg.Pool, notifier, bot) -> None:
                     ))
                 ), 0)::INT AS total_voice_seconds,
                 (SELECT COUNT(*) FROM action_logs
-                 WHERE created_at >= NOW() - INTERVAL '24 hours') AS total_actions
+                 WHERE guild_id = $1 AND created_at >= NOW() - INTERVAL '24 hours') AS total_actions
             FROM voice_sessions vs
-            WHERE vs.joined_at >= NOW() - INTERVAL '24 hours'
-        """)
+            WHERE vs.guild_id = $1 AND vs.joined_at >= NOW() - INTERVAL '24 hours'
+        """, guild_id)
 
         top_mute = await pool.fetchrow("""
             SELECT discord_id, SUM(duration_sec) AS total_sec
             FROM mute_sessions
-            WHERE started_at >= NOW() - INTERVAL '24 hours'
+            WHERE guild_id = $1 AND started_at >= NOW() - INTERVAL '24 hours'
               AND ended_at IS NOT NULL
             GROUP BY discord_id
             ORDER BY total_sec DESC
             LIMIT 1
-        """)
+        """, guild_id)
 
         action_breakdown = await pool.fetch("""
             SELECT action_type, COUNT(*) AS cnt
             FROM action_logs
-            WHERE created_at >= NOW() - INTERVAL '24 hours'
+            WHERE guild_id = $1 AND created_at >= NOW() - INTERVAL '24 hours'
             GROUP BY action_type
             ORDER BY cnt DESC
-        """)
+        """, guild_id)
     except Exception as e:
         logger.exception("daily_stats.query_failed", error=str(e))
         return
@@ -317,8 +376,7 @@ async def send_daily_stats(pool: asyncpg.Pool, notifier, bot) -> None:
     embed.add_field(name="Действия бота", value=actions_value, inline=True)
 
     if top_mute:
-        guild_id = getattr(bot, "guild_id", None)
-        guild = bot.get_guild(guild_id) if guild_id else None
+        guild = bot.get_guild(guild_id)
         member = guild.get_member(top_mute["discord_id"]) if guild else None
         name = member.display_name if member else str(top_mute["discord_id"])
         embed.add_field(
@@ -335,8 +393,8 @@ async def send_daily_stats(pool: asyncpg.Pool, notifier, bot) -> None:
         logger.exception("daily_stats.send_failed", error=str(e))
 
 
-async def _send_weekly_report(pool: asyncpg.Pool) -> None:
-    """Отправить еженедельный отчёт в лог-канал."""
+async def _send_weekly_report(pool: asyncpg.Pool, guild_id: int) -> None:
+    """Отправить еженедельный отчёт гильдии в лог-канал."""
     from src.bot.notifier import get_notifier
     from src.bot.embeds import build_weekly_report_embed
 
@@ -344,7 +402,7 @@ async def _send_weekly_report(pool: asyncpg.Pool) -> None:
     if not notifier:
         return
     try:
-        stats = await stats_repo.get_weekly_stats(pool)
+        stats = await stats_repo.get_weekly_stats(pool, guild_id)
         embed = build_weekly_report_embed(stats)
         await notifier.send(embed)
         logger.info("weekly_report_sent")
@@ -355,13 +413,14 @@ async def _send_weekly_report(pool: asyncpg.Pool) -> None:
 def register_weekly_report_job(
     scheduler: AsyncIOScheduler,
     pool: asyncpg.Pool,
+    guild_id: int,
     timezone: str = "UTC",
 ) -> None:
-    """Зарегистрировать задачу еженедельного отчёта (каждое воскресенье в 00:00)."""
+    """Зарегистрировать задачу еженедельного отчёта гильдии (каждое воскресенье в 00:00)."""
     scheduler.add_job(
         _send_weekly_report,
         trigger=CronTrigger(day_of_week="sun", hour=0, minute=0, timezone=timezone),
-        args=[pool],
+        args=[pool, guild_id],
         id="weekly_report",
         name="weekly_report",
         replace_existing=True,
@@ -369,17 +428,43 @@ def register_weekly_report_job(
     logger.info("weekly_report_job_registered", timezone=timezone)
 
 
+class _JobTimer:
+    """
+    Длительность задач планировщика (scheduler_job_seconds) по событиям APScheduler:
+    старт — при отправке в executor, конец — по EXECUTED/ERROR. Покрывает и задачи,
+    добавленные позже (расписания из БД, фичи), без обёртки каждой функции.
+    """
+
+    def __init__(self) -> None:
+        self._started: dict[str, float] = {}
+
+    def __call__(self, event: JobEvent) -> None:
+        if event.code == EVENT_JOB_SUBMITTED:
+            self._started[event.job_id] = time.perf_counter()
+            return
+        started = self._started.pop(event.job_id, None)
+        if started is not None:
+            SCHEDULER_JOB_SECONDS.observe(time.perf_counter() - started, job=event.job_id)
+        if event.code == EVENT_JOB_ERROR:
+            SCHEDULER_JOB_ERRORS.inc(job=event.job_id)
+
+
 async def start_scheduler(
     pool: asyncpg.Pool,
     scheduler: AsyncIOScheduler,
+    report_guild_id: Optional[int],
     report_timezone: str = "UTC",
 ) -> None:
     """
     Зарегистрировать cron-задачи из таблицы schedules и запустить планировщик.
     Вызывать после setup_scheduler, когда event loop уже запущен.
+    Еженедельный отчёт — по report_guild_id (каналы уведомлений принадлежат основной гильдии);
+    None — отчёт шлёт другой процесс (основная гильдия не на шардах этого).
     """
     await _register_schedule_jobs(pool, scheduler)
-    register_weekly_report_job(scheduler, pool, timezone=report_timezone)
+    if report_guild_id is not None:
+        register_weekly_report_job(scheduler, pool, report_guild_id, timezone=report_timezone)
+    scheduler.add_listener(_JobTimer(), EVENT_JOB_SUBMITTED | EVENT_JOB_EXECUTED | EVENT_JOB_ERROR)
     scheduler.start()
     logger.info("scheduler_started")
 
@@ -2,6 +2,7 @@
 Проверка таймаутов в войсе: пользователи из kick_targets, сидящие дольше timeout_sec — тихий disconnect.
 Если задан max_timeout_sec, таймаут рандомизируется в диапазоне [timeout_sec, max_timeout_sec] для каждой сессии.
 """
+import asyncio
 import random
 from datetime import datetime, timezone
 from typing import TYPE_CHECKING
@@ -12,25 +13,30 @@ from src.engine import tracker
 from src.utils.logging import get_logger
 
 if TYPE_CHECKING:
+    import discord
     from discord.ext import commands
 
 logger = get_logger("scheduler.kick_timeout")
 
-# discord_id -> эффективный таймаут для текущей сессии (сбрасывается при выходе из канала)
-_session_timeouts: dict[int, int] = {}
+# (guild_id, discord_id) -> эффективный таймаут для текущей сессии (сбрасывается при выходе из канала)
+_session_timeouts: dict[tuple[int, int], int] = {}
 
 
-def clear_session_timeout(discord_id: int) -> None:
+def clear_session_timeout(guild_id: int, discord_id: int) -> None:
     """Сбросить таймаут сессии при выходе пользователя из канала."""
-    _session_timeouts.pop(discord_id, None)
+    _session_timeouts.pop((guild_id, discord_id), None)
 
 
-async def load_kick_targets(pool: asyncpg.Pool) -> dict[int, dict]:
+async def load_kick_targets(pool: asyncpg.Pool, guild_id: int) -> dict[int, dict]:
     """
-    Загрузить активные таргеты: discord_id -> {timeout_sec, max_timeout_sec}.
+    Загрузить активные таргеты гильдии: discord_id -> {timeout_sec, max_timeout_sec}.
     """
     rows = await pool.fetch(
-        "SELECT discord_id, timeout_sec, max_timeout_sec FROM kick_targets WHERE is_active = true"
+        """
+        SELECT discord_id, timeout_sec, max_timeout_sec FROM kick_targets
+        WHERE guild_id = $1 AND is_active = true
+        """,
+        guild_id,
     )
     return {
         r["discord_id"]: {
@@ -41,13 +47,14 @@ async def load_kick_targets(pool: asyncpg.Pool) -> dict[int, dict]:
     }
 
 
-def _get_effective_timeout(discord_id: int, target: dict) -> int:
+def _get_effective_timeout(guild_id: int, discord_id: int, target: dict) -> int:
     """
     Вернуть эффективный таймаут для сессии.
     Если max_timeout_sec задан — генерируем рандомный таймаут один раз на сессию.
     """
-    if discord_id in _session_timeouts:
-        return _session_timeouts[discord_id]
+    key = (guild_id, discord_id)
+    if key in _session_timeouts:
+        return _session_timeouts[key]
 
     min_sec = target["timeout_sec"]
     max_sec = target["max_timeout_sec"]
@@ -57,9 +64,10 @@ def _get_effective_timeout(discord_id: int, target: dict) -> int:
     else:
         effective = min_sec
 
-    _session_timeouts[discord_id] = effective
+    _session_timeouts[key] = effective
     logger.info(
         "kick_timeout_session_assigned",
+        guild_id=guild_id,
         discord_id=discord_id,
         timeout_sec=effective,
         is_random=bool(max_sec and max_sec > min_sec),
@@ -75,18 +83,18 @@ def _elapsed_seconds(joined_at: datetime) -> float:
 
 async def check_kick_timeouts(bot: "commands.Bot") -> None:
     """
-    1. Получить pool и guild из bot
-    2. load_kick_targets(pool)
-    3. tracker.get_current_sessions() → (discord_id, channel_id, joined_at)
-    4. Для каждой сессии: если discord_id в targets и elapsed >= effective_timeout:
+    Для каждой гильдии бота (параллельно):
+    1. load_kick_targets(pool, guild_id)
+    2. tracker.get_current_sessions(guild_id) → (discord_id, channel_id, joined_at)
+    3. Для каждой сессии: если discord_id в targets и elapsed >= effective_timeout:
        — guild.get_member(discord_id), member.move_to(None), INSERT в action_logs
     """
     pool = getattr(bot, "pool", None)
-    guild_id = getattr(bot, "guild_id", None)
-    if pool is None or guild_id is None:
+    if pool is None or not bot.is_ready():
         return
-    guild = bot.get_guild(guild_id) if bot.is_ready() else None
-    if not guild:
+    guilds = [bot.get_guild(gid) for gid in getattr(bot, "guild_ids", None) or []]
+    guilds = [g for g in guilds if g is not None]
+    if not guilds:
         logger.debug("kick_timeout_skipped_no_guild")
         return
 
@@ -95,18 +103,22 @@ async def check_kick_timeouts(bot: "commands.Bot") -> None:
         logger.warning("kick_timeout_skipped_no_logs_repo")
         return
 
+    await asyncio.gather(*(_check_guild_kick_timeouts(pool, guild, logs_repo) for guild in guilds))
+
+
+async def _check_guild_kick_timeouts(pool: asyncpg.Pool, guild: "discord.Guild", logs_repo) -> None:
     try:
-        targets = await load_kick_targets(pool)
+        targets = await load_kick_targets(pool, guild.id)
         if not targets:
             return
 
-        sessions = tracker.get_current_sessions()
+        sessions = tracker.get_current_sessions(guild.id)
         for discord_id, channel_id, joined_at in sessions:
             target = targets.get(discord_id)
             if target is None:
                 continue
 
-            effective_timeout = _get_effective_timeout(discord_id, target)
+            effective_timeout = _get_effective_timeout(guild.id, discord_id, target)
             if _elapsed_seconds(joined_at) < effective_timeout:
                 continue
 
@@ -127,10 +139,11 @@ async def check_kick_timeouts(bot: "commands.Bot") -> None:
                 )
                 continue
 
-            clear_session_timeout(discord_id)
+            clear_session_timeout(guild.id, discord_id)
             try:
                 await logs_repo.log_action(
                     pool,
+                    guild.id,
                     rule_id=None,
                     discord_id=discord_id,
                     action_type="kick_timeout",
@@ -160,4 +173,4 @@ async def check_kick_timeouts(bot: "commands.Bot") -> None:
             except Exception as e:
                 logger.warning("kick_timeout_notify_failed", error=str(e))
     except Exception as e:
-        logger.exception("check_kick_timeouts_failed", error=str(e))
+        logger.exception("check_kick_timeouts_failed", guild_id=guild.id, error=str(e))
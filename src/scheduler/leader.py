@@ -0,0 +1,74 @@
+"""
+Лидер планировщика при запуске нескольких процессов бота (python -m src.run_shards).
+
+Задачи по гильдиям (check_overtime, kick timeout, mute XP) каждый процесс выполняет только для
+своих гильдий — им блокировка не нужна. Глобальные cron-задачи из schedules (enable/disable
+правил) должен выполнять один процесс: тот, что держит сессионный pg_try_advisory_lock.
+
+Блокировка живёт, пока жива сессия, поэтому лидер держит отдельное соединение из пула.
+Процесс-лидер упал или потерял соединение — блокировка снимается, и следующий, кто попробует
+(при очередном срабатывании задачи), становится лидером.
+"""
+import asyncio
+from typing import Optional
+
+import asyncpg
+
+from src.utils.logging import get_logger
+
+logger = get_logger("scheduler.leader")
+
+# Ключ pg_advisory_lock; общий для всех процессов бота в одной БД
+SCHEDULER_LOCK_KEY = 0x766F_6963_6562_6F74 >> 1  # b"voicebot" >> 1, чтобы поместиться в bigint
+
+
+class SchedulerLeader:
+    def __init__(self, pool: asyncpg.Pool, key: int = SCHEDULER_LOCK_KEY) -> None:
+        self._pool = pool
+        self._key = key
+        self._conn: Optional[asyncpg.Connection] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def is_leader(self) -> bool:
+        return self._conn is not None and not self._conn.is_closed()
+
+    async def acquire(self) -> bool:
+        """Попробовать стать лидером (без ожидания). True — этот процесс лидер."""
+        async with self._lock:
+            if self.is_leader:
+                return True
+            await self._drop_connection()
+            conn = await self._pool.acquire()
+            try:
+                locked = await conn.fetchval("SELECT pg_try_advisory_lock($1)", self._key)
+            except BaseException:
+                await self._pool.release(conn)
+                raise
+            if not locked:
+                await self._pool.release(conn)
+                return False
+            self._conn = conn
+            logger.info("scheduler_leader_acquired", key=self._key)
+            return True
+
+    async def release(self) -> None:
+        """Отпустить блокировку и соединение (при остановке процесса)."""
+        async with self._lock:
+            if self.is_leader:
+                try:
+                    await self._conn.execute("SELECT pg_advisory_unlock($1)", self._key)
+                except (asyncpg.PostgresError, OSError) as e:
+                    logger.warning("scheduler_leader_unlock_failed", error=str(e))
+            await self._drop_connection()
+
+    async def _drop_connection(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        if conn.is_closed():
+            logger.warning("scheduler_leader_lost", key=self._key)
+        try:
+            await self._pool.release(conn)
+        except Exception as e:
+            logger.warning("scheduler_leader_release_failed", error=str(e))
@@ -18,40 +18,46 @@ from src.utils.logging import get_logger
 logger = get_logger("setup_features")
 
 
-async def setup_stacking(bot, pool: asyncpg.Pool) -> StackingDetector:
+async def _load_pair_rules(pool: asyncpg.Pool, yaml_guild_id: int, event: str) -> list[PairRule]:
     """
-    1. Загрузить пары из config.yaml (get_stacking_pairs)
-    2. Загрузить пары из БД (SELECT FROM stacking_pairs WHERE is_active)
-    3. Дедупликация: ключ = frozenset(uid1, uid2), БД приоритетнее
-    4. detector.load_pairs(all_pairs)
-    5. bot.stacking_detector = detector
+    Пары из config.yaml (относятся к yaml_guild_id — основной гильдии) и активные пары из БД
+    всех гильдий. Дедупликация: ключ = (guild_id, frozenset(uid1, uid2)), БД приоритетнее.
     """
     config = load_config_yaml()
     yaml_pairs = get_stacking_pairs(config)
     yaml_rules = [
-        PairRule(p["user_id_1"], p["user_id_2"], p["target_channel_id"])
+        PairRule(p["user_id_1"], p["user_id_2"], p["target_channel_id"], yaml_guild_id)
         for p in yaml_pairs
     ]
 
-    db_pairs: list[tuple[int, int, int]] = []
+    db_pairs: list[tuple[int, int, int, int]] = []
     try:
         rows = await pool.fetch(
-            "SELECT user_id_1, user_id_2, target_channel_id FROM stacking_pairs WHERE is_active = true"
+            "SELECT guild_id, user_id_1, user_id_2, target_channel_id FROM stacking_pairs WHERE is_active = true"
         )
-        db_pairs = [(r["user_id_1"], r["user_id_2"], r["target_channel_id"]) for r in rows]
+        db_pairs = [(r["user_id_1"], r["user_id_2"], r["target_channel_id"], r["guild_id"]) for r in rows]
     except Exception as e:
-        logger.warning("stacking_load_db_failed", error=str(e))
+        logger.warning(event, error=str(e))
 
-    by_key: dict[frozenset[int], PairRule] = {}
+    by_key: dict[tuple[int, frozenset[int]], PairRule] = {}
     for r in yaml_rules:
-        by_key[r.pair_key()] = r
-    for uid1, uid2, target_id in db_pairs:
-        by_key[frozenset((uid1, uid2))] = PairRule(uid1, uid2, target_id)
+        by_key[(r.guild_id, r.pair_key())] = r
+    for uid1, uid2, target_id, guild_id in db_pairs:
+        by_key[(guild_id, frozenset((uid1, uid2)))] = PairRule(uid1, uid2, target_id, guild_id)
+    return list(by_key.values())
+
 
+async def setup_stacking(bot, pool: asyncpg.Pool) -> StackingDetector:
+    """
+    1. Загрузить пары из config.yaml и БД (_load_pair_rules)
+    2. detector.load_pairs(all_pairs) — пары раскладываются по гильдиям
+    3. bot.stacking_detector = detector
+    """
+    pairs = await _load_pair_rules(pool, bot.guild_id, "stacking_load_db_failed")
     detector = StackingDetector()
-    detector.load_pairs(list(by_key.values()))
+    detector.load_pairs(pairs)
     bot.stacking_detector = detector
-    logger.info("stacking_initialized", pairs_count=len(by_key))
+    logger.info("stacking_initialized", pairs_count=len(pairs))
     return detector
 
 
@@ -63,27 +69,9 @@ async def reload_stacking(bot, pool: asyncpg.Pool) -> None:
     detector = getattr(bot, "stacking_detector", None)
     if detector is None:
         return
-    config = load_config_yaml()
-    yaml_pairs = get_stacking_pairs(config)
-    yaml_rules = [
-        PairRule(p["user_id_1"], p["user_id_2"], p["target_channel_id"])
-        for p in yaml_pairs
-    ]
-    db_pairs: list[tuple[int, int, int]] = []
-    try:
-        rows = await pool.fetch(
-            "SELECT user_id_1, user_id_2, target_channel_id FROM stacking_pairs WHERE is_active = true"
-        )
-        db_pairs = [(r["user_id_1"], r["user_id_2"], r["target_channel_id"]) for r in rows]
-    except Exception as e:
-        logger.warning("stacking_reload_db_failed", error=str(e))
-    by_key: dict[frozenset[int], PairRule] = {}
-    for r in yaml_rules:
-        by_key[r.pair_key()] = r
-    for uid1, uid2, target_id in db_pairs:
-        by_key[frozenset((uid1, uid2))] = PairRule(uid1, uid2, target_id)
-    detector.load_pairs(list(by_key.values()))
-    logger.info("stacking_reloaded", pairs_count=len(by_key))
+    pairs = await _load_pair_rules(pool, bot.guild_id, "stacking_reload_db_failed")
+    detector.load_pairs(pairs)
+    logger.info("stacking_reloaded", pairs_count=len(pairs))
 
 
 def setup_kick_timeout_scheduler(
@@ -144,7 +132,8 @@ def setup_mute_xp(
 ) -> MuteXPService:
     """
     Создать MuteXPService и зарегистрировать tick_mute_xp (каждую минуту)
-    и send_daily_stats (ежедневно в 23:00 по daily_stats_timezone).
+    и send_daily_stats (ежедневно в 23:00 по daily_stats_timezone) — последнюю только в процессе,
+    который обслуживает основную гильдию.
     """
     from src.scheduler.jobs import send_daily_stats, tick_mute_xp
     from apscheduler.triggers.cron import CronTrigger
@@ -165,6 +154,7 @@ def setup_mute_xp(
         )
         logger.info("mute_xp_tick_registered")
 
+    if scheduler is not None and bot.guild_id in bot.guild_ids:
         config = load_config_yaml()
         notif_cfg = get_notifications_config(config)
         tz = notif_cfg.get("daily_stats_timezone", "Europe/Moscow")
@@ -188,10 +178,12 @@ async def setup_all_features(
 ) -> Optional[AsyncIOScheduler]:
     """
     Вызвать setup_stacking + setup_kick_timeout_scheduler + setup_notifier + setup_mute_xp.
-    Установить bot.guild_id = settings.DISCORD_GUILD_ID.
+    Установить bot.guild_id = settings.DISCORD_GUILD_ID и bot.guild_ids = settings.local_guild_ids
+    (при SHARD_IDS — только гильдии шардов этого процесса).
     """
     settings = get_settings()
     bot.guild_id = settings.DISCORD_GUILD_ID
+    bot.guild_ids = settings.local_guild_ids
     await setup_stacking(bot, pool)
     setup_kick_timeout_scheduler(bot, scheduler)
     setup_notifier(bot)
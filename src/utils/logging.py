@@ -2,17 +2,146 @@
 Настройка structlog: JSON renderer, уровень из конфига (config.yaml logging.level или INFO).
 Привязка к стандартному logging по необходимости.
 Вызов setup_logging() при старте приложения.
+
+Для нагруженных серверов (config.yaml, секция logging):
+
+- async: true — loop только рендерит запись и кладёт строку в очередь, запись в stdout
+  (write + flush пачкой) делает фоновый поток; остаток очереди дописывается при выходе (atexit).
+- sampling: {voice_join: 0.01} — доля записей события, которые попадают в лог. Применяется
+  только к debug/info: предупреждения и ошибки пишутся всегда. Отброшенная запись не рендерится.
+- Если установлен orjson, JSON рендерится им (в несколько раз быстрее json.dumps).
 """
 
+import atexit
+import json
 import logging
+import queue
+import random
 import sys
+import threading
+from collections.abc import Mapping
+from typing import Any, TextIO
 
 import structlog
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson необязателен
+    orjson = None
+
+# Уровни, к которым применяется sampling
+_SAMPLED_METHODS = frozenset({"debug", "info", "msg"})
+# Сколько строк может ждать в очереди async-режима; сверх — отбрасываются с пометкой log.dropped
+MAX_PENDING = 100_000
+
+
+def _orjson_dumps(obj: Any, default: Any = None, **_: Any) -> str:
+    return orjson.dumps(obj, default=default, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
+class EventSampler:
+    """Процессор structlog: пропускает долю rates[event] записей уровня debug/info."""
+
+    def __init__(self, rates: Mapping[str, float]) -> None:
+        self.rates = {event: float(rate) for event, rate in rates.items()}
+
+    def __call__(self, logger: Any, method_name: str, event_dict: dict[str, Any]) -> dict[str, Any]:
+        rate = self.rates.get(event_dict.get("event"))  # type: ignore[arg-type]
+        if rate is not None and method_name in _SAMPLED_METHODS and random.random() >= rate:
+            raise structlog.DropEvent
+        return event_dict
+
+
+class _LogWriter:
+    """Фоновый поток записи отрендеренных строк в stdout."""
+
+    def __init__(self) -> None:
+        self._queue: "queue.SimpleQueue[str | None]" = queue.SimpleQueue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        # put() вызывают поток loop и потоки to_thread, сбрасывает — поток записи
+        self._dropped_lock = threading.Lock()
+        self._atexit_registered = False
+        self.dropped = 0
+
+    def put(self, line: str) -> None:
+        if self._thread is None:
+            self._start()
+        if self._queue.qsize() >= MAX_PENDING:
+            with self._dropped_lock:
+                self.dropped += 1
+            return
+        self._queue.put(line)
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+                self._thread.start()
+                # Поток перезапускается после stop(), обработчик выхода нужен один
+                if not self._atexit_registered:
+                    atexit.register(self.stop)
+                    self._atexit_registered = True
+
+    def stop(self, timeout: float = 2.0) -> None:
+        """Дописать очередь и остановить поток."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout=timeout)
+
+    def _run(self) -> None:
+        while True:
+            line = self._queue.get()
+            lines = []
+            while line is not None:
+                lines.append(line)
+                try:
+                    line = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            with self._dropped_lock:
+                dropped, self.dropped = self.dropped, 0
+            if dropped:
+                lines.append(json.dumps({"event": "log.dropped", "count": dropped, "level": "warning"}))
+            if lines:
+                self._write(sys.stdout, lines)
+            if line is None:
+                return
+
+    @staticmethod
+    def _write(stream: TextIO, lines: list[str]) -> None:
+        try:
+            stream.write("\n".join(lines) + "\n")
+            stream.flush()
+        except (OSError, ValueError):
+            # stdout закрыт (завершение процесса) — писать некуда
+            pass
+
+
+_writer = _LogWriter()
+
+
+class QueueLogger:
+    """Логгер для structlog: отдаёт отрендеренную строку потоку _LogWriter."""
+
+    def msg(self, message: str) -> None:
+        _writer.put(message)
+
+    log = debug = info = warn = warning = err = error = critical = exception = fatal = failure = msg
+
+
+class QueueLoggerFactory:
+    def __call__(self, *args: Any) -> QueueLogger:
+        return QueueLogger()
+
 
 def setup_logging(
     level: str | None = None,
     config_yaml: dict | None = None,
+    async_output: bool | None = None,
+    sampling: Mapping[str, float] | None = None,
 ) -> None:
     """
     Настраивает structlog для приложения.
@@ -20,12 +149,17 @@ def setup_logging(
     - level: явный уровень (DEBUG, INFO, WARNING, ERROR). Если не передан,
       берётся из config_yaml["logging"]["level"], иначе "INFO".
     - config_yaml: структура, возвращённая load_config_yaml() (bot, defaults, channels, logging).
+    - async_output, sampling: явные значения logging.async и logging.sampling из config.yaml.
     """
+    logging_config = (config_yaml or {}).get("logging") or {}
     if level is None and config_yaml:
-        logging_config = config_yaml.get("logging") or {}
         level = (logging_config.get("level") or "INFO").upper()
     else:
         level = (level or "INFO").upper()
+    if async_output is None:
+        async_output = bool(logging_config.get("async", False))
+    if sampling is None:
+        sampling = logging_config.get("sampling") or {}
 
     numeric_level = getattr(logging, level, logging.INFO)
 
@@ -36,18 +170,22 @@ def setup_logging(
         level=numeric_level,
     )
 
+    # Сэмплер первым: отброшенная запись не проходит через остальные процессоры
+    processors: list[Any] = [EventSampler(sampling)] if sampling else []
+    processors += [
+        structlog.contextvars.merge_contextvars,
+        structlog.processors.add_log_level,
+        structlog.processors.StackInfoRenderer(),
+        structlog.dev.set_exc_info,
+        structlog.processors.TimeStamper(fmt="iso"),
+        structlog.processors.JSONRenderer(serializer=_orjson_dumps) if orjson else structlog.processors.JSONRenderer(),
+    ]
+
     structlog.configure(
-        processors=[
-            structlog.contextvars.merge_contextvars,
-            structlog.processors.add_log_level,
-            structlog.processors.StackInfoRenderer(),
-            structlog.dev.set_exc_info,
-            structlog.processors.TimeStamper(fmt="iso"),
-            structlog.processors.JSONRenderer(),
-        ],
+        processors=processors,
         wrapper_class=structlog.make_filtering_bound_logger(numeric_level),
         context_class=dict,
-        logger_factory=structlog.PrintLoggerFactory(),
+        logger_factory=QueueLoggerFactory() if async_output else structlog.PrintLoggerFactory(),
         cache_logger_on_first_use=True,
     )
 
@@ -0,0 +1,127 @@
+"""
+Мониторинг event loop: бот, FastAPI и APScheduler в src/main.py делят один loop, и любая
+синхронная работа (разбор YAML, рендер JSON в structlog, валидация большого ответа)
+задерживает heartbeat gateway.
+
+- Сэмплер — задача, которая спит interval и сравнивает запланированное время пробуждения
+  с фактическим; разница пишется в гистограмму event_loop_lag_seconds.
+- Детектор блокировок (slow_callback_ms > 0) — отдельный поток-сторож. Если сэмплер не
+  просыпался дольше interval + порог, loop занят одним callback'ом: сторож снимает стек
+  потока loop (sys._current_frames) и пишет событие loop.blocked с корутиной-виновником.
+  В отличие от asyncio debug (loop.slow_callback_duration) стек снимается во время
+  блокировки, а не после, и на обычную работу loop накладных расходов нет.
+"""
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+import structlog
+
+from src.utils.metrics import EVENT_LOOP_BLOCKED, EVENT_LOOP_LAG_SECONDS
+
+log = structlog.get_logger("loop_monitor")
+
+DEFAULT_INTERVAL = 0.25
+# Глубина стека в поле stack события loop.blocked (виновник ищется по полному стеку)
+STACK_LIMIT = 30
+
+
+def _blocking_coroutine(stack: traceback.StackSummary) -> Optional[str]:
+    """Первый кадр над asyncio (Handle._run) — корутина или callback, который держит loop."""
+    for i in range(len(stack) - 1, -1, -1):
+        if stack[i].filename.endswith(("asyncio/events.py", "asyncio\\events.py")):
+            if i + 1 < len(stack):
+                frame = stack[i + 1]
+                return f"{frame.name} ({frame.filename}:{frame.lineno})"
+            return None
+    return None
+
+
+class LoopMonitor:
+    def __init__(self, interval: float = DEFAULT_INTERVAL, slow_callback_ms: float = 0.0) -> None:
+        self.interval = interval
+        self.slow_callback_ms = slow_callback_ms
+        self._task: Optional[asyncio.Task[None]] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+        # time.monotonic() последнего пробуждения сэмплера (читается потоком-сторожем)
+        self._last_tick = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self) -> None:
+        """Запустить сэмплер (и сторож, если задан порог). Вызывать из работающего loop."""
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_tick = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._sample())
+        if self.slow_callback_ms > 0:
+            self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+            self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1)
+            self._watchdog = None
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _sample(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            EVENT_LOOP_LAG_SECONDS.observe(max(loop.time() - expected, 0.0))
+            self._last_tick = time.monotonic()
+
+    def _watch(self) -> None:
+        threshold = self.interval + self.slow_callback_ms / 1000
+        poll = max(self.slow_callback_ms / 2000, 0.005)
+        reported_tick: Optional[float] = None
+        while not self._stop.wait(poll):
+            last_tick = self._last_tick
+            blocked_for = time.monotonic() - last_tick
+            # Одна запись на эпизод блокировки: следующая — после очередного пробуждения сэмплера
+            if blocked_for < threshold or reported_tick == last_tick:
+                continue
+            reported_tick = last_tick
+            self._report(blocked_for - self.interval)
+
+    def _report(self, blocked_sec: float) -> None:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return
+        # Полный стек: при глубокой блокирующей цепочке кадр asyncio/events.py ниже последних STACK_LIMIT
+        stack = traceback.extract_stack(frame)
+        EVENT_LOOP_BLOCKED.inc()
+        log.warning(
+            "loop.blocked",
+            blocked_ms=round(blocked_sec * 1000, 1),
+            coroutine=_blocking_coroutine(stack),
+            stack="".join(traceback.StackSummary.from_list(stack[-STACK_LIMIT:]).format()),
+        )
+
+
+loop_monitor = LoopMonitor()
+
+
+def start_loop_monitor(slow_callback_ms: float = 0.0, interval: float = DEFAULT_INTERVAL) -> LoopMonitor:
+    """Настроить и запустить глобальный монитор (src/main.py, src/run_bot.py)."""
+    loop_monitor.interval = interval
+    loop_monitor.slow_callback_ms = slow_callback_ms
+    loop_monitor.start()
+    return loop_monitor
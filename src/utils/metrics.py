@@ -0,0 +1,265 @@
+"""
+Метрики в формате Prometheus без внешних зависимостей: Counter, Gauge, Histogram и реестр.
+
+Запись — это инкремент числа в словаре (гистограмма — bisect по границам бакетов);
+текст экспозиции собирается только при запросе GET /metrics. Gauge может вычисляться
+функцией в момент чтения (размер пула, число SSE-подписчиков) — тогда в горячем пути нет ничего.
+
+Метрики процесса: в режиме main.py (бот + API) /metrics показывает и бот, и API;
+при раздельном запуске — только процесс API. Процесс бота без API (API_ENABLED=false,
+python -m src.run_shards) отдаёт свои метрики на METRICS_PORT.
+"""
+import functools
+import threading
+import time
+from bisect import bisect_left
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from typing import Any, TypeVar, Union
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+T = TypeVar("T")
+LabelValues = tuple[str, ...]
+GaugeFunction = Callable[[], Union[float, dict[LabelValues, float]]]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+
+    def _key(self, labels: dict[str, object]) -> LabelValues:
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def _samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: object) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: object) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> Iterator[str]:
+        for key, value in list(self._values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[LabelValues, float] = {}
+        self._function: GaugeFunction | None = None
+
+    def set(self, value: float, **labels: object) -> None:
+        self._values[self._key(labels)] = value
+
+    def set_function(self, function: GaugeFunction | None) -> None:
+        """Значение вычисляется при чтении: число (без меток) или {значения меток: число}."""
+        self._function = function
+
+    def value(self, **labels: object) -> float:
+        return self._current().get(self._key(labels), 0)
+
+    def _current(self) -> dict[LabelValues, float]:
+        if self._function is None:
+            return dict(self._values)
+        result = self._function()
+        return result if isinstance(result, dict) else {(): result}
+
+    def _samples(self) -> Iterator[str]:
+        for key, value in self._current().items():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # значения меток → [счётчики по бакетам (последний — +Inf), сумма]
+        self._data: dict[LabelValues, list] = {}
+
+    def observe(self, value: float, **labels: object) -> None:
+        key = self._key(labels)
+        data = self._data.get(key)
+        if data is None:
+            data = self._data[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        data[0][bisect_left(self.buckets, value)] += 1
+        data[1] += value
+
+    @contextmanager
+    def time(self, **labels: object) -> Iterator[None]:
+        """Замерить длительность блока (в том числе с await внутри)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: object) -> int:
+        data = self._data.get(self._key(labels))
+        return sum(data[0]) if data else 0
+
+    def _samples(self) -> Iterator[str]:
+        for key, (counts, total) in list(self._data.items()):
+            cumulative = 0
+            for bound, c in zip((*self.buckets, float("inf")), counts):
+                cumulative += c
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))  # type: ignore[return-value]
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))  # type: ignore[return-value]
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))  # type: ignore[return-value]
+
+    def render(self) -> str:
+        """Текст экспозиции Prometheus (text/plain; version=0.0.4)."""
+        return "\n".join(m.render() for m in list(self._metrics.values())) + "\n"
+
+
+registry = Registry()
+
+
+def timed(histogram: Histogram, **labels: object) -> Callable[[Callable[..., Awaitable[T]]], Callable[..., Awaitable[T]]]:
+    """Декоратор корутины: длительность каждого вызова в histogram с заданными метками."""
+    def decorator(func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> T:
+            with histogram.time(**labels):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# --- Голосовые события ---
+VOICE_EVENT_SECONDS = registry.histogram(
+    "voice_event_stage_seconds",
+    "on_voice_state_update latency by stage (tracker, stacking, evaluator, actions, mute, total)",
+    ("stage",),
+)
+VOICE_RECORDER_EVENTS = registry.counter(
+    "voice_recorder_events_total", "Voice events captured by VOICE_RECORD_PATH recorder (written, dropped)",
+    ("result",),
+)
+
+# --- Event loop и gateway ---
+EVENT_LOOP_LAG_SECONDS = registry.histogram(
+    "event_loop_lag_seconds", "Delay between scheduled and actual wakeup of the loop sampler",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+EVENT_LOOP_BLOCKED = registry.counter(
+    "event_loop_blocked_total", "Callbacks that held the loop longer than LOOP_SLOW_CALLBACK_MS",
+)
+DISCORD_GATEWAY_LATENCY = registry.gauge(
+    "discord_gateway_latency_seconds", "Gateway heartbeat ACK latency per shard (bot.latencies)", ("shard",),
+)
+
+# --- БД ---
+DB_QUERY_SECONDS = registry.histogram(
+    "db_query_seconds", "Repository function latency", ("function",),
+)
+DB_ACQUIRE_SECONDS = registry.histogram(
+    "db_pool_acquire_seconds", "Time waiting for a connection from the asyncpg pool",
+)
+DB_POOL_CONNECTIONS = registry.gauge(
+    "db_pool_connections", "asyncpg pool connections by state (in_use, idle, max)", ("state",),
+)
+
+# --- Discord REST ---
+DISCORD_REST_SECONDS = registry.histogram(
+    "discord_rest_seconds", "Discord REST call latency from execute_action", ("action",),
+)
+DISCORD_REST_ERRORS = registry.counter(
+    "discord_rest_errors_total", "Discord REST errors from execute_action by HTTP status (429 = rate limited)",
+    ("action", "status"),
+)
+
+# --- Планировщик ---
+SCHEDULER_JOB_SECONDS = registry.histogram(
+    "scheduler_job_seconds", "Scheduler job duration", ("job",),
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0),
+)
+SCHEDULER_JOB_ERRORS = registry.counter(
+    "scheduler_job_errors_total", "Scheduler jobs that raised", ("job",),
+)
+
+# --- SSE ---
+SSE_SUBSCRIBERS = registry.gauge("sse_subscribers", "Connected SSE subscribers")
+SSE_EVENTS = registry.counter("sse_events_total", "SSE frames emitted", ("type",))
+SSE_DROPPED_EVENTS = registry.counter(
+    "sse_dropped_events_total", "SSE events skipped by lagging subscribers (fell out of the buffer)",
+)
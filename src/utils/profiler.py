@@ -0,0 +1,190 @@
+"""
+Сэмплирующий профайлер event loop для продакшена: GET /api/debug/profile и /debug profile.
+
+Поток-сэмплер каждые interval секунд снимает стек потока loop (sys._current_frames) —
+сам loop не инструментируется, поэтому профилирование безопасно под живой нагрузкой:
+цена — обход стека 200 раз в секунду в отдельном потоке. Одновременно идёт только один прогон.
+
+Стеки «coroutine-aware»: корень — текущая задача asyncio (имя задачи или её корутина,
+например _run_event для событий discord.py, run_coroutine_job для APScheduler), ниже —
+кадры от Handle._run до листа без обвязки asyncio.run/_run_once. Пока loop ждёт в select,
+сэмпл засчитывается в <idle>, собственная работа loop между callback'ами — в <loop>.
+
+Ограничение: сэмплер берёт GIL, поэтому фактическая частота не выше 1/sys.getswitchinterval()
+(200 Гц по умолчанию), а короткие callback'и смещаются к точкам отпускания GIL (select, I/O).
+Долгие синхронные участки — то, что ищем, — видны точно.
+
+Результат: collapsed stacks (flamegraph.pl, speedscope, inferno) или pstats (snakeviz, pstats.Stats).
+"""
+import asyncio
+import marshal
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from types import FrameType
+from typing import Any, Optional
+
+DEFAULT_INTERVAL = 0.005
+MAX_DURATION = 60.0
+FORMATS = ("collapsed", "pstats")
+
+IDLE = "<idle>"
+LOOP_OVERHEAD = "<loop>"
+_DEFAULT_TASK_NAME_RE = re.compile(r"^Task-\d+$")
+_ASYNCIO_DIR = os.path.dirname(asyncio.__file__)
+_SITE_MARKERS = ("site-packages" + os.sep, "dist-packages" + os.sep)
+
+# (filename, firstlineno, qualname) — ключ функции, как в pstats
+FrameKey = tuple[str, int, str]
+
+
+class ProfilerBusyError(RuntimeError):
+    """Профайлер уже запущен (прогоны не накладываются друг на друга)."""
+
+
+def _short_path(filename: str) -> str:
+    for marker in _SITE_MARKERS:
+        if marker in filename:
+            return filename.split(marker, 1)[1]
+    try:
+        return os.path.relpath(filename)
+    except ValueError:
+        return filename
+
+
+def _frame_key(frame: FrameType) -> FrameKey:
+    code = frame.f_code
+    return code.co_filename, code.co_firstlineno, getattr(code, "co_qualname", code.co_name)
+
+
+def _task_label(task: Optional[asyncio.Task[Any]]) -> str:
+    if task is None:
+        return "<callback>"
+    name = task.get_name()
+    if _DEFAULT_TASK_NAME_RE.match(name):
+        coro = task.get_coro()
+        name = getattr(coro, "__qualname__", None) or name
+    return f"<task {name}>"
+
+
+def _loop_stack(frame: FrameType) -> Optional[list[FrameKey]]:
+    """Кадры от корня к листу ниже Handle._run; None — loop простаивает (нет выполняемого callback'а)."""
+    stack: list[FrameKey] = []
+    current: Optional[FrameType] = frame
+    while current is not None:
+        code = current.f_code
+        if code.co_name == "_run" and code.co_filename.startswith(_ASYNCIO_DIR):
+            stack.reverse()
+            return stack
+        stack.append(_frame_key(current))
+        current = current.f_back
+    return None
+
+
+@dataclass
+class Profile:
+    interval: float
+    duration: float = 0.0
+    # (метка задачи, кадры...) → число сэмплов
+    stacks: Counter = field(default_factory=Counter)
+
+    @property
+    def samples(self) -> int:
+        return sum(self.stacks.values())
+
+    def collapsed(self) -> str:
+        """Формат flamegraph: «кадр;кадр;кадр N» на строку."""
+        lines = []
+        for stack, count in self.stacks.most_common():
+            frames = [stack[0]] + [f"{name} ({_short_path(fn)}:{line})" for fn, line, name in stack[1:]]
+            lines.append(f"{';'.join(frames)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def pstats(self) -> bytes:
+        """marshal-дамп в формате pstats.Stats: время функции = число сэмплов × interval."""
+        # func → [cc, nc, tt, ct, callers{caller: [cc, nc, tt, ct]}]
+        stats: dict[FrameKey, list[Any]] = {}
+        dt = self.interval
+        for stack, count in self.stacks.items():
+            keys: list[FrameKey] = [("~", 0, stack[0])] + list(stack[1:])
+            seen: set[FrameKey] = set()
+            seen_edges: set[tuple[FrameKey, FrameKey]] = set()
+            for i, key in enumerate(keys):
+                entry = stats.setdefault(key, [0, 0, 0.0, 0.0, {}])
+                leaf = i == len(keys) - 1
+                if leaf:
+                    entry[2] += count * dt
+                if key not in seen:  # рекурсия не удваивает cumulative
+                    seen.add(key)
+                    entry[0] += count
+                    entry[1] += count
+                    entry[3] += count * dt
+                if i and (keys[i - 1], key) not in seen_edges:
+                    seen_edges.add((keys[i - 1], key))
+                    edge = entry[4].setdefault(keys[i - 1], [0, 0, 0.0, 0.0])
+                    edge[0] += count
+                    edge[1] += count
+                    edge[2] += count * dt if leaf else 0.0
+                    edge[3] += count * dt
+        return marshal.dumps({
+            key: (cc, nc, tt, ct, {caller: tuple(v) for caller, v in callers.items()})
+            for key, (cc, nc, tt, ct, callers) in stats.items()
+        })
+
+    def render(self, fmt: str) -> bytes:
+        return self.collapsed().encode() if fmt == "collapsed" else self.pstats()
+
+
+class SamplingProfiler:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+
+    @property
+    def busy(self) -> bool:
+        return self._lock.locked()
+
+    async def profile(self, duration: float, interval: float = DEFAULT_INTERVAL) -> Profile:
+        """Профилировать текущий loop duration секунд (не больше MAX_DURATION)."""
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusyError("profiler is already running")
+        try:
+            loop = asyncio.get_running_loop()
+            duration = min(max(duration, interval), MAX_DURATION)
+            return await asyncio.to_thread(self._sample, loop, threading.get_ident(), duration, interval)
+        finally:
+            self._lock.release()
+
+    def _sample(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        thread_id: int,
+        duration: float,
+        interval: float,
+    ) -> Profile:
+        profile = Profile(interval=interval)
+        started = time.perf_counter()
+        deadline = started + duration
+        while time.perf_counter() < deadline:
+            frame = sys._current_frames().get(thread_id)
+            if frame is not None:
+                stack = _loop_stack(frame)
+                if stack is None:
+                    idle = frame.f_code.co_filename.endswith("selectors.py")
+                    profile.stacks[(IDLE if idle else LOOP_OVERHEAD,)] += 1
+                else:
+                    try:
+                        task = asyncio.current_task(loop)
+                    except RuntimeError:
+                        task = None
+                    profile.stacks[(_task_label(task), *stack)] += 1
+            del frame
+            time.sleep(interval)
+        profile.duration = time.perf_counter() - started
+        return profile
+
+
+profiler = SamplingProfiler()
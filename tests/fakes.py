@@ -0,0 +1,164 @@
+"""
+Общие подделки для тестов: MockPool — in-memory пул БД вместо PostgreSQL (фикстура pool в
+conftest.py). Им же пользуются бенчмарки (voice_load --pool mock, replay).
+"""
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Any
+
+
+class MockConn:
+    """Мок соединения: execute делегируется пулу (для pg_notify и т.д.)."""
+
+    def __init__(self, pool: "MockPool") -> None:
+        self._pool = pool
+
+    async def execute(self, query: str, *args: Any) -> str:
+        return await self._pool.execute(query, *args)
+
+    async def fetch(self, query: str, *args: Any) -> list:
+        return await self._pool.fetch(query, *args)
+
+    async def fetchrow(self, query: str, *args: Any) -> dict | None:
+        return await self._pool.fetchrow(query, *args)
+
+
+class MockPool:
+    """
+    Мок asyncpg.Pool с in-memory хранилищем для voice_sessions, rules, user_lists, action_logs.
+    Поддерживает execute, fetch, fetchrow, acquire для трекера и API-тестов.
+    """
+
+    def __init__(self) -> None:
+        self.voice_sessions: list[dict[str, Any]] = []
+        self.rules: list[dict[str, Any]] = []
+        self._rules_id = 0
+        self.user_lists: list[dict[str, Any]] = []
+        self._user_lists_id = 0
+        self.action_logs: list[dict[str, Any]] = []
+
+    async def execute(self, query: str, *args: Any) -> str:
+        q = query.strip().upper()
+        if "INSERT INTO VOICE_SESSIONS" in q:
+            # INSERT INTO voice_sessions (discord_id, channel_id, joined_at, left_at, guild_id) VALUES ($1, $2, $3, NULL, $4)
+            self.voice_sessions.append({
+                "discord_id": args[0],
+                "channel_id": args[1],
+                "joined_at": args[2],
+                "left_at": None,
+                "guild_id": args[3] if len(args) > 3 else None,
+            })
+            return "INSERT 1"
+        if "UPDATE VOICE_SESSIONS" in q and "LEFT_AT" in q:
+            # UPDATE ... SET left_at = NOW() WHERE discord_id = $1 AND channel_id = $2 AND ... guild_id = $3
+            guild_id = args[2] if len(args) > 2 else None
+            for row in self.voice_sessions:
+                if (
+                    row["left_at"] is None
+                    and row["discord_id"] == args[0]
+                    and row["channel_id"] == args[1]
+                    and guild_id in (None, row["guild_id"])
+                ):
+                    row["left_at"] = datetime.now(timezone.utc)
+                    return "UPDATE 1"
+            return "UPDATE 0"
+        if "SELECT PG_NOTIFY" in q:
+            return "SELECT"
+        if "INSERT INTO RULES" in q:
+            # Обрабатывается в fetchrow с RETURNING
+            return "INSERT 1"
+        if "INSERT INTO USER_LISTS" in q:
+            return "INSERT 1"
+        if "DELETE FROM" in q:
+            return "DELETE 1"
+        if "UPDATE RULES" in q:
+            return "UPDATE 1"
+        return "OK"
+
+    async def fetch(self, query: str, *args: Any) -> list[dict]:
+        q = query.strip().upper()
+        if "FROM RULES" in q and "SELECT" in q:
+            # guild_id — последний параметр выборок rules_repo
+            if args and "GUILD_ID" in q:
+                return [r for r in self.rules if r["guild_id"] == args[-1]]
+            return list(self.rules)
+        if "FROM USER_LISTS" in q and "SELECT" in q:
+            list_type = args[0] if args else None
+            guild_id = args[1] if len(args) > 1 else None
+            rows = [r for r in self.user_lists if guild_id in (None, r["guild_id"])]
+            if list_type:
+                return [r for r in rows if r["list_type"] == list_type]
+            return rows
+        return []
+
+    async def fetchrow(self, query: str, *args: Any) -> dict | None:
+        q = query.strip().upper()
+        if "INSERT INTO RULES" in q and "RETURNING" in q:
+            self._rules_id += 1
+            now = datetime.now(timezone.utc)
+            row = {
+                "id": self._rules_id,
+                "name": args[0] if len(args) > 0 else "",
+                "description": args[1] if len(args) > 1 else None,
+                "is_active": args[2] if len(args) > 2 else True,
+                "is_dry_run": args[3] if len(args) > 3 else False,
+                "target_list": args[4] if len(args) > 4 else None,
+                "channel_ids": args[5] if len(args) > 5 else None,
+                "max_time_sec": args[6] if len(args) > 6 else None,
+                "action_type": args[7] if len(args) > 7 else "",
+                "action_params": args[8] if len(args) > 8 else {},
+                "schedule_cron": args[9] if len(args) > 9 else None,
+                "schedule_tz": args[10] if len(args) > 10 else "UTC",
+                "priority": args[11] if len(args) > 11 else 0,
+                "created_at": args[12] if len(args) > 12 else now,
+                "updated_at": args[13] if len(args) > 13 else now,
+                "guild_id": args[14] if len(args) > 14 else None,
+            }
+            self.rules.append(row)
+            return row
+        if "INSERT INTO USER_LISTS" in q and "RETURNING" in q:
+            self._user_lists_id += 1
+            now = datetime.now(timezone.utc)
+            row = {
+                "id": self._user_lists_id,
+                "discord_id": args[0],
+                "username": args[1] if len(args) > 1 else None,
+                "list_type": args[2],
+                "reason": args[3] if len(args) > 3 else None,
+                "created_at": args[4] if len(args) > 4 else now,
+                "updated_at": args[5] if len(args) > 5 else now,
+                "guild_id": args[6] if len(args) > 6 else None,
+            }
+            self.user_lists.append(row)
+            return row
+        if "INSERT INTO ACTION_LOGS" in q and "RETURNING" in q:
+            row = {
+                "id": len(self.action_logs) + 1,
+                "rule_id": args[0],
+                "discord_id": args[1],
+                "action_type": args[2],
+                "channel_id": args[3],
+                "details": args[4],
+                "executed_at": args[5],
+                "guild_id": args[6] if len(args) > 6 else None,
+            }
+            self.action_logs.append(row)
+            return row
+        if "FROM RULES" in q and "WHERE ID" in q:
+            rid = args[0] if args else None
+            for r in self.rules:
+                if r["id"] == rid:
+                    return r
+            return None
+        if "SELECT 1 FROM USER_LISTS" in q:
+            discord_id, list_type = args[0], args[1]
+            guild_id = args[2] if len(args) > 2 else None
+            for r in self.user_lists:
+                if r["discord_id"] == discord_id and r["list_type"] == list_type and guild_id in (None, r["guild_id"]):
+                    return {"1": 1}
+            return None
+        return None
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield MockConn(self)
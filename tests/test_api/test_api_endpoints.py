@@ -68,3 +68,18 @@ async def test_post_users_with_api_key_returns_200_and_body(api_client):
     assert data["list_type"] == "blacklist"
     assert "id" in data
     assert "created_at" in data
+
+
+@pytest.mark.asyncio
+async def test_get_guild_id_defaults_to_primary_and_rejects_unknown(monkeypatch):
+    """Без guild_id — основная гильдия; гильдия из DISCORD_GUILD_IDS — она; чужая — 404."""
+    from fastapi import HTTPException
+
+    from src.api.deps import get_guild_id
+
+    monkeypatch.setenv("DISCORD_GUILD_IDS", "456")
+    assert await get_guild_id() == 123
+    assert await get_guild_id(x_guild_id=456) == 456
+    with pytest.raises(HTTPException) as exc:
+        await get_guild_id(guild_id=789)
+    assert exc.value.status_code == 404
@@ -0,0 +1,198 @@
+"""
+Тесты bulk-эндпоинтов kick-targets и stacking-pairs: выгрузка NDJSON → /bulk без правок,
+отказ пустого replace=true и одинаковые ids в NOTIFY config_changed.
+"""
+import json
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Any
+from unittest.mock import AsyncMock
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from src.api.app import app
+from src.api.deps import get_current_user
+from src.db import database
+
+GUILD_ID = 123
+NDJSON = {"Content-Type": "application/x-ndjson"}
+
+
+class _Cursor:
+    def __init__(self, rows: list[dict]) -> None:
+        self._rows = iter(rows)
+
+    def __aiter__(self) -> "_Cursor":
+        return self
+
+    async def __anext__(self) -> dict:
+        try:
+            return next(self._rows)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class _ConfigPool:
+    """In-memory kick_targets и stacking_pairs под SQL bulk-роутеров."""
+
+    def __init__(self) -> None:
+        self.kick_targets: dict[int, dict[str, Any]] = {}
+        self.stacking_pairs: dict[tuple[int, int], dict[str, Any]] = {}
+        self._next_id = 0
+
+    def _new_id(self) -> int:
+        self._next_id += 1
+        return self._next_id
+
+    async def execute(self, query: str, *args: Any) -> str:
+        if "DELETE FROM kick_targets" in query:
+            keep = set(args[0])
+            gone = [d for d in self.kick_targets if d not in keep]
+        elif "DELETE FROM stacking_pairs" in query:
+            keep = set(zip(args[0], args[1]))
+            gone = [k for k in self.stacking_pairs if k not in keep]
+        else:
+            return "SELECT 1"
+        table = self.kick_targets if "kick_targets" in query else self.stacking_pairs
+        for key in gone:
+            del table[key]
+        return f"DELETE {len(gone)}"
+
+    async def fetch(self, query: str, *args: Any) -> list[dict]:
+        if "INSERT INTO kick_targets" in query:
+            ids, usernames, timeouts, max_timeouts, active, now, _guild = args
+            rows = []
+            for values in zip(ids, usernames, timeouts, max_timeouts, active):
+                discord_id = values[0]
+                existing = self.kick_targets.get(discord_id)
+                self.kick_targets[discord_id] = {
+                    "id": existing["id"] if existing else self._new_id(),
+                    "discord_id": discord_id,
+                    "username": values[1] or (existing or {}).get("username"),
+                    "timeout_sec": values[2],
+                    "max_timeout_sec": values[3],
+                    "is_active": values[4],
+                    "created_at": existing["created_at"] if existing else now,
+                    "updated_at": now,
+                }
+                rows.append({"inserted": existing is None})
+            return rows
+        if "INSERT INTO stacking_pairs" in query:
+            rows = []
+            for user_1, user_2, channel_id, active in zip(*args[:4]):
+                existing = self.stacking_pairs.get((user_1, user_2))
+                row_id = existing["id"] if existing else self._new_id()
+                self.stacking_pairs[(user_1, user_2)] = {
+                    "id": row_id,
+                    "user_id_1": user_1,
+                    "user_id_2": user_2,
+                    "target_channel_id": channel_id,
+                    "is_active": active,
+                    "created_at": datetime(2026, 3, 1, tzinfo=timezone.utc),
+                }
+                rows.append({"id": row_id, "inserted": existing is None})
+            return rows
+        if "DELETE FROM kick_targets" in query:
+            gone = [self.kick_targets.pop(d) for d in args[0] if d in self.kick_targets]
+            return [{"discord_id": r["discord_id"]} for r in gone]
+        if "DELETE FROM stacking_pairs" in query:
+            keys = [k for k in zip(args[0], args[1]) if k in self.stacking_pairs]
+            return [{"id": self.stacking_pairs.pop(k)["id"]} for k in keys]
+        return []
+
+    def cursor(self, query: str, *args: Any, prefetch: int = 0) -> _Cursor:
+        if "FROM kick_targets" in query:
+            return _Cursor(sorted(self.kick_targets.values(), key=lambda r: r["discord_id"]))
+        return _Cursor(sorted(self.stacking_pairs.values(), key=lambda r: r["id"]))
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield self
+
+
+@pytest.fixture
+def config_pool(monkeypatch):
+    pool = _ConfigPool()
+    notify = AsyncMock()
+    monkeypatch.setattr(database, "notify_config_changed", notify)
+    app.state.pool = pool
+    app.dependency_overrides[get_current_user] = lambda: {"sub": "1", "username": "test", "avatar": None}
+    yield pool, notify
+    app.dependency_overrides.clear()
+
+
+def _client() -> AsyncClient:
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_kick_targets_export_posts_back_to_bulk(config_pool):
+    """NDJSON из /export принимается /bulk как есть: лишние колонки игнорируются, ID-строки разбираются."""
+    pool, notify = config_pool
+    entries = [
+        {"discord_id": 111, "username": "alice", "timeout_sec": 600, "max_timeout_sec": 1200},
+        {"discord_id": 222, "timeout_sec": 900, "is_active": False},
+    ]
+    async with _client() as client:
+        response = await client.post("/api/kick-targets/bulk", json={"entries": entries})
+        assert response.json() == {"inserted": 2, "updated": 0, "deleted": 0}
+        notify.assert_awaited_with(pool, "kick_targets", [111, 222])
+
+        exported = (await client.get("/api/kick-targets/export")).content
+        csv_gz = await client.get("/api/kick-targets/export?format=csv&gzip=true")
+        assert csv_gz.headers["content-disposition"] == 'attachment; filename="kick_targets.csv.gz"'
+        assert json.loads(exported.splitlines()[0])["discord_id"] == "111"
+        pool.kick_targets[333] = {**pool.kick_targets[111], "discord_id": 333}
+
+        response = await client.post("/api/kick-targets/bulk?replace=true", content=exported, headers=NDJSON)
+        assert response.json() == {"inserted": 0, "updated": 2, "deleted": 1}
+        notify.assert_awaited_with(pool, "kick_targets", None)
+    assert sorted(pool.kick_targets) == [111, 222]
+    assert pool.kick_targets[222]["is_active"] is False
+
+
+@pytest.mark.asyncio
+async def test_bulk_replace_rejects_empty_payload(config_pool):
+    """replace=true с пустым набором не удаляет всё, а возвращает 422."""
+    pool, notify = config_pool
+    pool.kick_targets[111] = {"discord_id": 111}
+    pool.stacking_pairs[(1, 2)] = {"id": 1}
+    async with _client() as client:
+        kick = await client.post("/api/kick-targets/bulk?replace=true", json={"entries": []})
+        pairs = await client.post("/api/stacking-pairs/bulk?replace=true", content=b"\n", headers=NDJSON)
+        missing = await client.post("/api/stacking-pairs/bulk", json={})
+    assert (kick.status_code, pairs.status_code, missing.status_code) == (422, 422, 422)
+    assert pool.kick_targets and pool.stacking_pairs
+    notify.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_stacking_pairs_bulk_notifies_row_ids(config_pool):
+    """Bulk пар, как и одиночные эндпоинты, шлёт в NOTIFY id строк; ошибка NDJSON — 422 с номером строки."""
+    pool, notify = config_pool
+    lines = [
+        {"user_id_1": "20", "user_id_2": "10", "target_channel_id": "5", "is_active": True, "created_at": None},
+        {"user_id_1": 30, "user_id_2": 40, "target_channel_id": 6},
+    ]
+    body = "\n".join(json.dumps(line) for line in lines).encode()
+    async with _client() as client:
+        response = await client.post("/api/stacking-pairs/bulk", content=body, headers=NDJSON)
+        assert response.json() == {"inserted": 2, "updated": 0, "deleted": 0}
+        assert sorted(pool.stacking_pairs) == [(10, 20), (30, 40)]
+        ids = [row["id"] for row in pool.stacking_pairs.values()]
+        notify.assert_awaited_with(pool, "stacking_pairs", ids)
+
+        response = await client.post(
+            "/api/stacking-pairs/bulk/delete", json={"pairs": [{"user_id_1": 40, "user_id_2": 30}]}
+        )
+        assert response.json()["deleted"] == 1
+        notify.assert_awaited_with(pool, "stacking_pairs", [ids[1]])
+
+        response = await client.post("/api/stacking-pairs/bulk", content=body + b'\n{"user_id_1": 1}', headers=NDJSON)
+    assert response.status_code == 422
+    assert response.json()["detail"].startswith("line 3:")
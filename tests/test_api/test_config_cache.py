@@ -0,0 +1,136 @@
+"""
+Тесты условных GET конфигурации: ETag, 304 без обращения к БД, кэш тела и сброс по версии
+(в том числе при потере соединения LISTEN).
+"""
+import pytest
+from starlette.requests import Request
+
+from src.api import config_cache
+from src.api.config_cache import ConfigVersions, conditional_json
+from src.db.database import ConfigChange
+
+
+def _request(if_none_match: str | None = None) -> Request:
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": "/api/rules", "headers": headers})
+
+
+@pytest.fixture
+def versions(monkeypatch):
+    v = ConfigVersions()
+    monkeypatch.setattr(config_cache, "config_versions", v)
+    return v
+
+
+@pytest.mark.asyncio
+async def test_etag_304_and_body_cache(versions):
+    """Второй запрос с If-None-Match — 304; без заголовка — тело из кэша; load вызывается один раз."""
+    calls = []
+
+    async def load():
+        calls.append(1)
+        return [{"id": 1, "name": "rule"}]
+
+    first = await conditional_json(_request(), "rules", load)
+    etag = first.headers["etag"]
+    assert first.status_code == 200 and first.body == b'[{"id":1,"name":"rule"}]'
+
+    not_modified = await conditional_json(_request(etag), "rules", load)
+    assert not_modified.status_code == 304
+
+    again = await conditional_json(_request(), "rules", load)
+    assert again.body == first.body
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_config_change_invalidates_only_its_kind(versions):
+    """Изменение kind меняет его ETag и сбрасывает кэш; другие kinds не трогаются."""
+    async def load():
+        return []
+
+    rules_etag = (await conditional_json(_request(), "rules", load)).headers["etag"]
+    users_etag = (await conditional_json(_request(), "user_lists", load, key="blacklist")).headers["etag"]
+
+    versions.on_config_changed(ConfigChange(kind="rules", ids=(1,)))
+    assert (await conditional_json(_request(rules_etag), "rules", load)).status_code == 200
+    assert (await conditional_json(_request(users_etag), "user_lists", load, key="blacklist")).status_code == 304
+
+    versions.on_table_changed("user_lists")
+    assert (await conditional_json(_request(users_etag), "user_lists", load, key="blacklist")).status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_etag_differs_per_key(versions):
+    """ETag одной гильдии не даёт 304 для другой: ключ входит в ETag."""
+    async def load():
+        return []
+
+    guild_a = await conditional_json(_request(), "rules", load, key=1)
+    guild_b = await conditional_json(_request(guild_a.headers["etag"]), "rules", load, key=2)
+    assert guild_b.status_code == 200
+    assert guild_b.headers["etag"] != guild_a.headers["etag"]
+
+
+class _ListenConn:
+    def __init__(self) -> None:
+        self.on_terminate = None
+
+    def add_termination_listener(self, callback) -> None:
+        self.on_terminate = callback
+
+    async def add_listener(self, channel, callback) -> None:
+        pass
+
+
+class _ListenPool:
+    def __init__(self) -> None:
+        self.conns: list[_ListenConn] = []
+
+    async def acquire(self) -> _ListenConn:
+        if len(self.conns) == 1:
+            self.conns.append(None)
+            raise OSError("connection refused")
+        conn = _ListenConn()
+        self.conns.append(conn)
+        return conn
+
+    async def release(self, conn) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+
+@pytest.mark.asyncio
+async def test_listen_reconnects_and_invalidates_cache_on_connection_loss(versions, monkeypatch):
+    """Потеря соединения LISTEN сбрасывает версии (нет устаревших 304), LISTEN переподключается."""
+    import asyncio
+
+    from src.db import database
+
+    pool = _ListenPool()
+    monkeypatch.setattr(database, "_pool", pool)
+    monkeypatch.setattr(database, "_config_listeners", [])
+    monkeypatch.setattr(database, "_channel_listeners", {})
+    monkeypatch.setattr(database, "LISTEN_RETRY_MIN_SEC", 0.01)
+    database.register_config_listener(versions.on_config_changed)
+
+    async def load():
+        return [{"id": 1}]
+
+    etag = (await conditional_json(_request(), "rules", load)).headers["etag"]
+    database.start_config_listener()
+    try:
+        await asyncio.sleep(0.01)
+        pool.conns[0].on_terminate(pool.conns[0])
+        for _ in range(100):
+            if len(pool.conns) == 3:
+                break
+            await asyncio.sleep(0.01)
+        assert pool.conns[2] is not None
+        assert (await conditional_json(_request(etag), "rules", load)).status_code == 200
+        # разрыв, неудачная попытка, переподключение — по сбросу на каждое
+        assert versions.version("rules") == 3
+    finally:
+        await database.close_pool()
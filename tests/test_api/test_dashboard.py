@@ -0,0 +1,66 @@
+"""
+Тест GET /api/dashboard/bootstrap: онлайн из трекера, участники и роли из кэша бота.
+"""
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from src.api.app import app
+from src.api.deps import get_current_user
+from src.api.member_cache import member_payloads
+from src.engine import tracker
+
+GUILD_ID = 123
+
+
+def _role(role_id: int, name: str, position: int, managed: bool = False) -> SimpleNamespace:
+    return SimpleNamespace(id=role_id, name=name, color="#ffffff", position=position, managed=managed)
+
+
+class _Bot:
+    def __init__(self, guild: SimpleNamespace) -> None:
+        self.guild_ids = [guild.id]
+        self._guild = guild
+
+    def is_ready(self) -> bool:
+        return True
+
+    def get_guild(self, guild_id: int):
+        return self._guild if guild_id == self._guild.id else None
+
+
+@pytest.fixture
+def bootstrap_client(pool, clear_tracker_sessions):
+    member = SimpleNamespace(id=111, name="alice", display_name="Alice", display_avatar=None)
+    channel = SimpleNamespace(id=555, name="General")
+    guild = SimpleNamespace(
+        id=GUILD_ID,
+        chunked=True,
+        roles=[_role(1, "@everyone", 0), _role(2, "Mod", 2), _role(3, "Bot", 3, managed=True), _role(4, "Member", 1)],
+        get_member={111: member}.get,
+        get_channel={555: channel}.get,
+    )
+    app.state.pool = pool
+    app.state.bot = _Bot(guild)
+    app.dependency_overrides[get_current_user] = lambda: {"sub": "1", "username": "test", "avatar": None}
+    member_payloads.clear()
+    yield AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+    app.dependency_overrides.clear()
+    app.state.bot = None
+    member_payloads.clear()
+
+
+@pytest.mark.asyncio
+async def test_dashboard_bootstrap_returns_online_members_and_roles(bootstrap_client):
+    tracker._sessions[GUILD_ID] = {(111, 555): datetime(2026, 3, 1, tzinfo=timezone.utc)}
+    async with bootstrap_client as client:
+        response = await client.get("/api/dashboard/bootstrap")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["voice_online_count"] == 1
+    assert data["online_users"][0]["username"] == "Alice"
+    assert data["online_users"][0]["channel_name"] == "General"
+    assert data["members"]["111"]["display_name"] == "Alice"
+    assert [r["name"] for r in data["roles"]] == ["Mod", "Member"]
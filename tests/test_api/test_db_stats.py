@@ -0,0 +1,71 @@
+"""
+Тесты InstrumentedPool: отпечатки SQL, накопление статистики поверх пула, порог db.slow_query.
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from src.db import instrumented
+from src.db.instrumented import InstrumentedPool, QueryStats, fingerprint
+from src.db.repositories import rules_repo
+
+
+def test_fingerprint_normalizes_literals_and_whitespace():
+    """Литералы и пробелы не плодят отдельные записи; плейсхолдеры $n сохраняются."""
+    a = fingerprint("SELECT *\n  FROM rules WHERE id = 5 AND name = 'x'")
+    b = fingerprint("SELECT * FROM rules WHERE id = 17 AND name = 'it''s'")
+    assert a == b == "SELECT * FROM rules WHERE id = ? AND name = ?"
+    assert fingerprint("SELECT * FROM t WHERE id = $1") == "SELECT * FROM t WHERE id = $1"
+
+
+@pytest.mark.asyncio
+async def test_pool_calls_are_recorded(pool):
+    """Вызовы через обёртку копятся по отпечатку: calls, rows, ожидание пула; репозитории работают как прежде."""
+    stats = QueryStats()
+    wrapped = InstrumentedPool(pool, stats)
+    await rules_repo.create_rule(wrapped, 123, {"name": "r1", "action_type": "kick"})
+    await rules_repo.create_rule(wrapped, 123, {"name": "r2", "action_type": "kick"})
+    rules = await rules_repo.get_rules(wrapped, 123)
+    assert [r["name"] for r in rules] == ["r1", "r2"]
+
+    top = stats.top(sort="calls")
+    assert top[0]["calls"] == 2 and top[0]["statement"].startswith("INSERT INTO rules")
+    select = next(s for s in top if "FROM rules" in s["statement"] and s["calls"] == 1)
+    assert select["rows"] == 2
+    assert stats.summary()["acquires"] == 3
+
+    stats.reset()
+    assert stats.top() == [] and stats.summary()["calls"] == 0
+
+
+@pytest.mark.asyncio
+async def test_slow_query_is_logged(pool, monkeypatch):
+    """Запрос не быстрее порога пишется событием db.slow_query."""
+    events = []
+    monkeypatch.setattr(instrumented, "log", SimpleNamespace(warning=lambda event, **kw: events.append((event, kw))))
+    wrapped = InstrumentedPool(pool, QueryStats(slow_query_ms=0))
+    await wrapped.fetch("SELECT * FROM rules")
+    assert events and events[0][0] == "db.slow_query"
+    assert events[0][1]["statement"] == "SELECT * FROM rules"
+
+
+class _FailingConn:
+    async def fetch(self, query: str, *args):
+        await asyncio.sleep(0.01)
+        raise asyncio.TimeoutError
+
+
+@pytest.mark.asyncio
+async def test_failed_query_is_timed_and_counted(monkeypatch):
+    """Упавший запрос (например по command_timeout) попадает в статистику и db.slow_query с ошибкой."""
+    events = []
+    monkeypatch.setattr(instrumented, "log", SimpleNamespace(warning=lambda event, **kw: events.append((event, kw))))
+    stats = QueryStats(slow_query_ms=5)
+    conn = instrumented.InstrumentedConnection(_FailingConn(), stats)
+    with pytest.raises(asyncio.TimeoutError):
+        await conn.fetch("SELECT pg_sleep(10)")
+    [entry] = stats.top()
+    assert (entry["calls"], entry["errors"], entry["rows"]) == (1, 1, 0)
+    assert entry["max_ms"] >= 5 and stats.summary()["errors"] == 1
+    assert events[0][0] == "db.slow_query" and events[0][1]["error"] == "TimeoutError"
@@ -0,0 +1,33 @@
+"""
+Тесты выборки логов: сборка WHERE с фильтрами и keyset-курсором, кодирование курсора.
+"""
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from src.api.routers.logs import _decode_cursor, _encode_cursor
+from src.db.repositories.logs_repo import build_where
+
+
+def test_build_where_without_filters_is_empty():
+    """Без фильтров и курсора WHERE не добавляется."""
+    assert build_where(None) == ("", [])
+    assert build_where({"discord_id": None, "rule_id": None}) == ("", [])
+
+
+def test_build_where_with_filters_and_cursor():
+    """Фильтры и курсор дают корректный WHERE с последовательными плейсхолдерами."""
+    ts = datetime(2026, 3, 1, tzinfo=timezone.utc)
+    sql, args = build_where({"discord_id": 42, "action_type": "kick"}, cursor=(ts, 10))
+    assert sql == "WHERE discord_id = $1 AND action_type = $2 AND (executed_at, id) < ($3, $4)"
+    assert args == [42, "kick", ts, 10]
+
+
+def test_cursor_roundtrip_and_invalid_cursor():
+    """Курсор непрозрачен, декодируется обратно; мусор — 400."""
+    ts = datetime(2026, 3, 1, 12, 30, tzinfo=timezone.utc)
+    assert _decode_cursor(_encode_cursor(ts, 7)) == (ts, 7)
+    with pytest.raises(HTTPException) as exc:
+        _decode_cursor("not-a-cursor")
+    assert exc.value.status_code == 400
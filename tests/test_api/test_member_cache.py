@@ -0,0 +1,80 @@
+"""
+Тесты MemberPayloadCache: повторный резолвинг без сериализации, LRU-вытеснение, TTL промахов,
+догрузка через query_members в slim-режиме.
+"""
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from src.api import member_cache
+from src.api.member_cache import MemberPayloadCache
+
+
+def _guild(members: dict[int, str]) -> MagicMock:
+    def get_member(member_id):
+        if member_id not in members:
+            return None
+        member = MagicMock()
+        member.id = member_id
+        member.name = members[member_id]
+        member.display_name = members[member_id]
+        member.display_avatar.url = f"https://cdn/{member_id}.png"
+        return member
+
+    guild = MagicMock()
+    guild.get_member.side_effect = get_member
+    return guild
+
+
+def test_hits_eviction_and_invalidate():
+    """Повторный ID берётся из кэша; самый давний вытесняется; invalidate перечитывает участника."""
+    guild = _guild({1: "alice", 2: "bob", 3: "carol"})
+    cache = MemberPayloadCache(maxsize=2)
+
+    assert cache.get(guild, 1)["label"] == "alice (@alice)"
+    cache.get(guild, 2)
+    cache.get(guild, 1)
+    assert guild.get_member.call_count == 2
+
+    cache.get(guild, 3)  # вытесняет 2 (1 использовался позже)
+    assert len(cache) == 2
+    cache.get(guild, 2)
+    assert guild.get_member.call_count == 4
+
+    cache.invalidate(2)
+    cache.get(guild, 2)
+    assert guild.get_member.call_count == 5
+
+
+def test_miss_is_cached_until_ttl(monkeypatch):
+    """Заглушка Unknown кэшируется на miss_ttl, после — участник ищется снова."""
+    now = [1000.0]
+    monkeypatch.setattr(member_cache.time, "monotonic", lambda: now[0])
+    guild = _guild({})
+    cache = MemberPayloadCache(miss_ttl=30)
+
+    assert cache.get(guild, 9)["display_name"] == "Unknown"
+    cache.get(guild, 9)
+    assert guild.get_member.call_count == 1
+
+    now[0] += 31
+    cache.get(guild, 9)
+    assert guild.get_member.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_resolve_many_fetches_missing_when_not_chunked():
+    """Нечанкованная гильдия (slim): недостающие ID догружаются одним query_members, кэшируются."""
+    guild = _guild({1: "alice"})
+    guild.chunked = False
+    fetched = MagicMock(id=2, display_name="bob")
+    fetched.name = "bob"
+    guild.query_members = AsyncMock(return_value=[fetched])
+    cache = MemberPayloadCache()
+
+    result = await cache.resolve_many(guild, [1, 2, 3, 1])
+    assert [result[i]["display_name"] for i in (1, 2, 3)] == ["alice", "bob", "Unknown"]
+    guild.query_members.assert_awaited_once_with(user_ids=[2, 3], limit=2, cache=False)
+
+    await cache.resolve_many(guild, [2, 3])
+    assert guild.query_members.await_count == 1
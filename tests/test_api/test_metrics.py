@@ -0,0 +1,51 @@
+"""
+Тесты метрик: формат экспозиции Prometheus для счётчика, gauge-функции и гистограммы.
+"""
+import pytest
+
+from src.db.repositories import rules_repo
+from src.utils.metrics import DB_QUERY_SECONDS, Registry
+
+
+def test_render_exposition_format():
+    """Бакеты гистограммы кумулятивные, +Inf равен count; метки экранируются."""
+    registry = Registry()
+    hist = registry.histogram("op_seconds", "Op latency", ("stage",), buckets=(0.1, 1.0))
+    hist.observe(0.05, stage="a")
+    hist.observe(0.5, stage="a")
+    hist.observe(5, stage="a")
+    counter = registry.counter("errors_total", "Errors", ("status",))
+    counter.inc(status='4"29')
+    gauge = registry.gauge("pool_connections", "Pool", ("state",))
+    gauge.set_function(lambda: {("in_use",): 3, ("max",): 10})
+
+    text = registry.render()
+    assert 'op_seconds_bucket{stage="a",le="0.1"} 1' in text
+    assert 'op_seconds_bucket{stage="a",le="1"} 2' in text
+    assert 'op_seconds_bucket{stage="a",le="+Inf"} 3' in text
+    assert 'op_seconds_count{stage="a"} 3' in text
+    assert 'op_seconds_sum{stage="a"} 5.55' in text
+    assert 'errors_total{status="4\\"29"} 1' in text
+    assert 'pool_connections{state="in_use"} 3' in text
+    assert "# TYPE op_seconds histogram" in text
+    assert registry.histogram("op_seconds", "again") is hist
+
+
+@pytest.mark.asyncio
+async def test_repository_calls_are_timed(pool):
+    """Функции репозиториев пишут db_query_seconds с меткой repo.function."""
+    before = DB_QUERY_SECONDS.count(function="rules_repo.get_rules")
+    await rules_repo.get_rules(pool, 123)
+    assert DB_QUERY_SECONDS.count(function="rules_repo.get_rules") == before + 1
+
+
+@pytest.mark.asyncio
+async def test_nested_repository_calls_are_timed_once(pool):
+    """Вызов репозитория из репозитория не пишет db_query_seconds второй раз."""
+    before_outer = DB_QUERY_SECONDS.count(function="rules_repo.update_rule")
+    before_inner = DB_QUERY_SECONDS.count(function="rules_repo.get_rule_by_id")
+    assert await rules_repo.update_rule(pool, 42, {"is_active": False}) is None
+    assert DB_QUERY_SECONDS.count(function="rules_repo.update_rule") == before_outer + 1
+    assert DB_QUERY_SECONDS.count(function="rules_repo.get_rule_by_id") == before_inner
+    await rules_repo.get_rule_by_id(pool, 42)
+    assert DB_QUERY_SECONDS.count(function="rules_repo.get_rule_by_id") == before_inner + 1
@@ -0,0 +1,57 @@
+"""
+Тесты сэмплирующего профайлера: стеки с меткой задачи, дамп pstats, один прогон за раз.
+"""
+import asyncio
+import io
+import marshal
+import pstats
+import time
+
+import pytest
+
+from src.utils.profiler import ProfilerBusyError, SamplingProfiler
+
+
+def _cpu_work(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sum(range(1000))
+
+
+async def _busy_handler(seconds: float) -> None:
+    for _ in range(int(seconds / 0.02)):
+        _cpu_work(0.02)
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_profile_collapsed_and_pstats(tmp_path):
+    """Занятая корутина попадает в collapsed под своей задачей; pstats читается стандартным модулем."""
+    profiler = SamplingProfiler()
+    busy = asyncio.create_task(_busy_handler(0.3), name="voice_state_update")
+    profile = await profiler.profile(0.2, interval=0.002)
+    await busy
+
+    assert profile.samples > 0
+    collapsed = profile.collapsed()
+    busy_lines = [line for line in collapsed.splitlines() if "_busy_handler" in line]
+    assert busy_lines and all(line.startswith("<task voice_state_update>;") for line in busy_lines)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in collapsed.splitlines())
+
+    dump = tmp_path / "profile.pstats"
+    dump.write_bytes(profile.pstats())
+    stats = pstats.Stats(str(dump), stream=io.StringIO())
+    busy_funcs = [key for key in stats.stats if key[2] == "_busy_handler"]
+    assert busy_funcs and stats.stats[busy_funcs[0]][3] > 0
+    assert isinstance(marshal.loads(profile.pstats()), dict)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_profile_is_rejected():
+    profiler = SamplingProfiler()
+    first = asyncio.create_task(profiler.profile(0.1))
+    await asyncio.sleep(0.01)
+    with pytest.raises(ProfilerBusyError):
+        await profiler.profile(0.1)
+    await first
+    assert not profiler.busy
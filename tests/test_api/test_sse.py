@@ -0,0 +1,168 @@
+"""
+Тесты SSEBroadcaster: сериализация один раз, replay по Last-Event-ID и resync, перескок медленного подписчика,
+фильтры подписчика, коалесцирование voice_update и упаковка событий для pg_notify.
+"""
+import asyncio
+import random
+
+import pytest
+
+from src.api.sse import SSEBroadcaster, SSEFilter
+from src.api.sse_backends import MAX_NOTIFY_PAYLOAD, NotifyUnpacker, pack_event
+
+
+@pytest.mark.asyncio
+async def test_broadcast_serializes_once_and_shares_frame():
+    """Все подписчики получают один и тот же объект bytes с id события."""
+    b = SSEBroadcaster()
+    s1 = b.subscribe()
+    s2 = b.subscribe()
+    await b.broadcast({"type": "action_log", "discord_id": "1"})
+
+    f1 = s1.drain()
+    f2 = s2.drain()
+    assert len(f1) == 1 and f1[0] is f2[0]
+    assert f"id: {b.event_id(1)}".encode() in f1[0]
+    assert b'"action_log"' in f1[0]
+
+
+@pytest.mark.asyncio
+async def test_subscribe_with_last_event_id_replays_missed_events():
+    """Переподключение с Last-Event-ID отдаёт события после этого id."""
+    b = SSEBroadcaster()
+    for i in range(5):
+        await b.broadcast({"type": "action_log", "n": i})
+
+    sub = b.subscribe(last_event_id=b.event_id(3))
+    frames = sub.drain()
+    assert len(frames) == 2
+    assert f"id: {b.event_id(4)}".encode() in frames[0] and f"id: {b.event_id(5)}".encode() in frames[1]
+    assert sub.drain() == []
+
+
+@pytest.mark.asyncio
+async def test_unknown_or_evicted_last_event_id_sends_resync():
+    """id другого процесса, из будущего или выпавший из буфера — resync вместо replay."""
+    b = SSEBroadcaster(buffer_size=3)
+    for i in range(10):
+        await b.broadcast({"type": "action_log", "n": i})
+    other = SSEBroadcaster()
+
+    for last_event_id in (other.event_id(9), b.event_id(11), b.event_id(5), "garbage"):
+        frames = b.subscribe(last_event_id=last_event_id).drain()
+        assert len(frames) == 1
+        assert b'"resync"' in frames[0] and f"id: {b.event_id(10)}".encode() in frames[0]
+
+    sub = b.subscribe(last_event_id=b.event_id(7))
+    assert len(sub.drain()) == 3
+    await b.broadcast({"type": "action_log", "n": 10})
+    assert len(sub.drain()) == 1
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_skips_ahead_instead_of_being_dropped():
+    """Отставший подписчик остаётся подписан и перескакивает на самое старое событие буфера."""
+    b = SSEBroadcaster(buffer_size=3)
+    sub = b.subscribe()
+    for i in range(10):
+        await b.broadcast({"n": i})
+
+    frames = sub.drain()
+    assert len(frames) == 3
+    assert f"id: {b.event_id(8)}".encode() in frames[0]
+    assert sub.skipped == 7
+    assert sub in b._subscribers
+
+
+@pytest.mark.asyncio
+async def test_next_frames_returns_empty_on_timeout():
+    """Без событий next_frames возвращает пустой список по таймауту (сигнал для ping)."""
+    b = SSEBroadcaster()
+    sub = b.subscribe()
+    assert await sub.next_frames(timeout=0.01) == []
+
+
+@pytest.mark.asyncio
+async def test_filter_applies_to_type_channel_and_user():
+    """Подписчик с фильтром получает только подходящие события."""
+    b = SSEBroadcaster(coalesce_interval=0)
+    by_type = b.subscribe(event_filter=SSEFilter(types=frozenset({"action_log"})))
+    by_user = b.subscribe(event_filter=SSEFilter(user_ids=frozenset({7})))
+    by_channel = b.subscribe(event_filter=SSEFilter(channel_ids=frozenset({100})))
+
+    await b.broadcast({"type": "voice_update", "user_id": "7", "channel_id": "100"})
+    await b.broadcast({"type": "action_log", "discord_id": "8"})
+
+    assert len(by_type.drain()) == 1
+    assert len(by_user.drain()) == 1
+    assert len(by_channel.drain()) == 1
+
+
+@pytest.mark.asyncio
+async def test_voice_updates_are_coalesced_into_one_batch():
+    """Несколько voice_update за интервал превращаются в один voice_batch с последним состоянием."""
+    b = SSEBroadcaster(coalesce_interval=0.01)
+    sub = b.subscribe()
+    await b.broadcast({"type": "voice_update", "user_id": "1", "channel_id": "10", "action": "join"})
+    await b.broadcast({"type": "voice_update", "user_id": "1", "channel_id": "11", "action": "move"})
+    await b.broadcast({"type": "voice_update", "user_id": "2", "channel_id": "10", "action": "join"})
+    assert sub.drain() == []
+
+    await asyncio.sleep(0.05)
+    frames = sub.drain()
+    assert len(frames) == 1
+    assert b'"voice_batch"' in frames[0]
+    assert frames[0].count(b'"user_id"') == 2
+    assert b'"move"' in frames[0]
+
+
+@pytest.mark.asyncio
+async def test_guild_filter_isolates_events_and_batches():
+    """Подписчик гильдии не видит событий и voice_batch других гильдий."""
+    b = SSEBroadcaster(coalesce_interval=0.01)
+    first = b.subscribe(event_filter=SSEFilter(guild_id=1))
+    second = b.subscribe(event_filter=SSEFilter(guild_id=2))
+    await b.broadcast({"type": "voice_update", "guild_id": "1", "user_id": "7", "channel_id": "10"})
+    await b.broadcast({"type": "voice_update", "guild_id": "2", "user_id": "7", "channel_id": "20"})
+    await b.broadcast({"type": "action_log", "guild_id": "2", "discord_id": "8"})
+
+    await asyncio.sleep(0.05)
+    frames = first.drain()
+    assert len(frames) == 1
+    assert b'"channel_id": "10"' in frames[0] and b'"20"' not in frames[0]
+    assert len(second.drain()) == 2
+
+
+@pytest.mark.asyncio
+async def test_filtered_subscriber_gets_only_matching_batch_updates():
+    """voice_batch урезается под фильтр подписчика по каналам; без фильтра — целиком, тот же id."""
+    b = SSEBroadcaster(coalesce_interval=0.01)
+    everything = b.subscribe()
+    by_channel = b.subscribe(event_filter=SSEFilter(channel_ids=frozenset({10})))
+    await b.broadcast({"type": "voice_update", "user_id": "1", "channel_id": "10"})
+    await b.broadcast({"type": "voice_update", "user_id": "2", "channel_id": "20"})
+
+    await asyncio.sleep(0.05)
+    full, = everything.drain()
+    filtered, = by_channel.drain()
+    assert full.count(b'"user_id"') == 2
+    assert filtered.count(b'"user_id"') == 1 and b'"20"' not in filtered
+    assert f"id: {b.event_id(1)}".encode() in filtered
+
+
+def test_pack_event_roundtrip_small_and_chunked():
+    """Упаковка для pg_notify: маленькое событие — один JSON, большое — части < 8000 байт."""
+    small = {"type": "action_log", "discord_id": "1"}
+    payloads = pack_event(small)
+    assert len(payloads) == 1 and payloads[0].startswith("j")
+    assert NotifyUnpacker().feed(payloads[0]) == small
+
+    rnd = random.Random(1)
+    big = {"type": "voice_batch", "updates": [{"user_id": str(rnd.getrandbits(64))} for _ in range(2000)]}
+    payloads = pack_event(big)
+    assert len(payloads) > 1
+    assert all(len(p.encode()) <= MAX_NOTIFY_PAYLOAD for p in payloads)
+    unpacker = NotifyUnpacker()
+    results = [unpacker.feed(p) for p in payloads]
+    assert results[:-1] == [None] * (len(payloads) - 1)
+    assert results[-1] == big
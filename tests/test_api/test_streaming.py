@@ -0,0 +1,64 @@
+"""
+Тесты потоковой выгрузки: CSV/NDJSON по блокам и gzip-поток.
+"""
+import gzip
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from src.api import streaming
+from src.api.streaming import encode_rows, gzip_stream
+
+
+async def _rows(n: int):
+    ts = datetime(2026, 3, 1, tzinfo=timezone.utc)
+    for i in range(n):
+        yield {"id": i, "discord_id": 2**60 + i, "details": '{"reason": "test"}', "executed_at": ts}
+
+
+async def _collect(chunks) -> bytes:
+    return b"".join([c async for c in chunks])
+
+
+@pytest.mark.asyncio
+async def test_ndjson_rows_keep_ids_as_strings_and_parse_details():
+    """NDJSON: одна строка на запись, Discord ID строкой, details — объект."""
+    cols = ["id", "discord_id", "details", "executed_at"]
+    data = await _collect(encode_rows(_rows(3), "ndjson", cols, frozenset({"discord_id"})))
+    lines = data.decode().splitlines()
+    assert len(lines) == 3
+    first = json.loads(lines[0])
+    assert first["discord_id"] == str(2**60)
+    assert first["details"] == {"reason": "test"}
+    assert first["executed_at"].startswith("2026-03-01")
+
+
+@pytest.mark.asyncio
+async def test_csv_is_chunked_and_gzip_roundtrips(monkeypatch):
+    """CSV отдаётся несколькими блоками; gzip-поток распаковывается в тот же CSV."""
+    monkeypatch.setattr(streaming, "EXPORT_CHUNK_SIZE", 256)
+    cols = ["id", "discord_id", "details"]
+    chunks = [c async for c in encode_rows(_rows(50), "csv", cols)]
+    assert len(chunks) > 1
+    plain = b"".join(chunks)
+    assert plain.decode().splitlines()[0] == "id,discord_id,details"
+
+    packed = await _collect(gzip_stream(encode_rows(_rows(50), "csv", cols)))
+    assert gzip.decompress(packed) == plain
+
+
+def test_json_response_gzips_only_large_bodies_for_accepting_clients():
+    """gzip — только при Accept-Encoding: gzip и теле больше порога."""
+    from starlette.requests import Request
+
+    def request(accept: str) -> Request:
+        return Request({"type": "http", "headers": [(b"accept-encoding", accept.encode())]})
+
+    data = {"items": ["x" * 10] * 500}
+    packed = streaming.json_response(request("gzip, br"), data)
+    assert packed.headers["content-encoding"] == "gzip"
+    assert json.loads(gzip.decompress(packed.body)) == data
+
+    assert "content-encoding" not in streaming.json_response(request("identity"), data).headers
+    assert "content-encoding" not in streaming.json_response(request("gzip"), {"a": 1}).headers
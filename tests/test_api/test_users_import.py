@@ -0,0 +1,67 @@
+"""
+Тесты импорта списков: потоковый разбор CSV и типизированный payload NOTIFY config_changed.
+"""
+import io
+import threading
+
+import pytest
+from starlette.datastructures import UploadFile
+
+from src.api.routers import users as users_router
+from src.db.database import ConfigChange, parse_config_change
+
+
+async def _entries(data: bytes, default_list_type=None) -> list[dict]:
+    upload = UploadFile(file=io.BytesIO(data))
+    return [e async for e in users_router._iter_csv_entries(upload, default_list_type)]
+
+
+@pytest.mark.asyncio
+async def test_csv_entries_bom_empty_lines_and_quoted_newlines():
+    """BOM и пустые строки игнорируются; поле в кавычках с переводом строки — одна запись."""
+    data = '\ufeffdiscord_id,list_type,reason\n111,blacklist,спам\n\n222,whitelist,"две\r\nстроки, с запятой"\n333,blacklist,\n'.encode()
+    entries = await _entries(data)
+    assert entries == [
+        {"discord_id": 111, "list_type": "blacklist", "username": None, "reason": "спам"},
+        {"discord_id": 222, "list_type": "whitelist", "username": None, "reason": "две\r\nстроки, с запятой"},
+        {"discord_id": 333, "list_type": "blacklist", "username": None, "reason": None},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_csv_default_list_type_and_line_errors():
+    """Без колонки list_type берётся значение по умолчанию; ошибка сообщает номер строки."""
+    entries = await _entries(b"discord_id\n333", default_list_type="blacklist")
+    assert entries[0]["list_type"] == "blacklist"
+
+    with pytest.raises(ValueError, match="line 3"):
+        await _entries(b"discord_id\n1\nabc\n", default_list_type="blacklist")
+
+
+@pytest.mark.asyncio
+async def test_csv_is_read_off_loop_in_batches(monkeypatch):
+    """Файл читается пачками в потоке, не в потоке loop; номера строк сквозные между пачками."""
+    threads = set()
+    read_rows = users_router._read_csv_rows
+
+    def tracking_read(reader, limit):
+        threads.add(threading.get_ident())
+        return read_rows(reader, limit)
+
+    monkeypatch.setattr(users_router, "CSV_BATCH_ROWS", 2)
+    monkeypatch.setattr(users_router, "_read_csv_rows", tracking_read)
+    data = b"discord_id,reason\n1,\"a\nb\"\n2,\n3,\n4,\n"
+    assert [e["discord_id"] for e in await _entries(data, "blacklist")] == [1, 2, 3, 4]
+    assert threads and threading.get_ident() not in threads
+
+    with pytest.raises(ValueError, match="line 7"):
+        await _entries(data + b"x,\n", "blacklist")
+
+
+def test_parse_config_change_payloads():
+    """Пустой или битый payload — «изменено всё», типизированный — kind и ids."""
+    assert parse_config_change("") == ConfigChange()
+    assert parse_config_change("not json").affects("rules")
+    change = parse_config_change('{"kind":"user_lists","ids":[1,2]}')
+    assert change == ConfigChange(kind="user_lists", ids=(1, 2))
+    assert not change.affects("stacking_pairs")
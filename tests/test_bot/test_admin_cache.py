@@ -0,0 +1,83 @@
+"""
+Тесты кэша admin-команд: одна загрузка на kind, сброс по config_changed,
+автодополнение правил без БД и пагинация по загруженным строкам.
+"""
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import discord
+import pytest
+
+from src.bot import admin_cache as admin_cache_module
+from src.bot.admin_cache import AdminCache
+from src.bot.cogs import admin_commands
+from src.bot.cogs.admin_commands import PagedEmbedView, rule_autocomplete
+from src.db.database import ConfigChange
+
+RULES = [
+    {"id": 1, "name": "Night kick", "is_active": True},
+    {"id": 12, "name": "Mute spam", "is_active": False},
+]
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    c = AdminCache()
+    get_rules = AsyncMock(return_value=RULES)
+    monkeypatch.setattr(admin_cache_module.rules_repo, "get_rules", get_rules)
+    monkeypatch.setattr(admin_commands, "admin_cache", c)
+    return c, get_rules
+
+
+@pytest.mark.asyncio
+async def test_rules_loaded_once_until_config_changed(cache):
+    """Повторные чтения — из памяти; config_changed для rules — перезагрузка, для других kind — нет."""
+    c, get_rules = cache
+    pool = object()
+    assert (await c.get_rule(pool, 123, 12))["name"] == "Mute spam"
+    await c.get_rules(pool, 123)
+    assert get_rules.await_count == 1
+
+    c.on_config_changed(ConfigChange(kind="schedules"))
+    await c.get_rules(pool, 123)
+    assert get_rules.await_count == 1
+
+    c.on_config_changed(ConfigChange(kind="rules", ids=[12]))
+    await c.get_rules(pool, 123)
+    assert get_rules.await_count == 2
+
+    # Другая гильдия — своя загрузка
+    await c.get_rules(pool, 456)
+    assert get_rules.await_args.args == (pool, 456)
+
+
+@pytest.mark.asyncio
+async def test_rule_autocomplete_and_paging(cache):
+    """Автодополнение по ID и названию; страницы листаются без новых запросов."""
+    interaction = SimpleNamespace(client=SimpleNamespace(pool=object()), guild_id=123)
+    assert [ch.value for ch in await rule_autocomplete(interaction, "#1")] == [1, 12]
+    assert [ch.value for ch in await rule_autocomplete(interaction, "spam")] == [12]
+
+    view = PagedEmbedView("Rules", [f"line {i}" for i in range(25)], discord.Color.blurple())
+    assert view.page_count == 3 and view.prev_page.disabled
+    view.page = 2
+    assert view.embed().description == "\n".join(f"line {i}" for i in range(20, 25))
+
+
+@pytest.mark.asyncio
+async def test_admin_cog_unload_removes_listener_and_groups(monkeypatch):
+    """Повторная загрузка cog'а не копит слушателей config_changed и не падает на группах команд."""
+    from src.bot.client import VoiceBot
+    from src.bot.cogs.admin_commands import AdminCommands
+    from src.db import database
+
+    monkeypatch.setattr(database, "_config_listeners", [])
+    monkeypatch.setattr(database, "_local_config_listeners", [])
+    bot = VoiceBot()
+    for _ in range(2):
+        await bot.add_cog(AdminCommands(bot))
+        assert database._config_listeners == database._local_config_listeners == [admin_cache_module.admin_cache.on_config_changed]
+        assert bot.tree.get_command("rule") is not None
+        await bot.remove_cog("AdminCommands")
+        assert database._config_listeners == database._local_config_listeners == []
+        assert bot.tree.get_command("rule") is None
@@ -0,0 +1,64 @@
+"""
+Тест синхронизации slash-команд: sync только при изменении хэша дерева, reconnect без sync.
+"""
+from unittest.mock import AsyncMock, MagicMock
+
+import discord
+import pytest
+
+from src.bot import client as client_module
+from src.bot.client import VoiceBot
+
+
+@pytest.mark.asyncio
+async def test_sync_commands_only_when_tree_changes(monkeypatch):
+    """Хэш совпал с сохранённым — sync пропускается; новая команда меняет хэш и вызывает sync."""
+    stored: dict[str, str] = {}
+
+    async def get_value(_pool, key):
+        return stored.get(key)
+
+    async def set_value(_pool, key, value):
+        stored[key] = value
+
+    monkeypatch.setattr(client_module.bot_state_repo, "get_value", get_value)
+    monkeypatch.setattr(client_module.bot_state_repo, "set_value", set_value)
+
+    bot = VoiceBot()
+    bot.pool = MagicMock()
+    bot.guild_id = 123
+    bot.tree.sync = AsyncMock()
+
+    @bot.tree.command(name="ping", description="ping")
+    async def ping(interaction: discord.Interaction) -> None:
+        pass
+
+    assert await bot.sync_commands() is True
+    assert await bot.sync_commands() is False
+    assert bot.tree.sync.await_count == 1
+
+    @bot.tree.command(name="pong", description="pong")
+    async def pong(interaction: discord.Interaction) -> None:
+        pass
+
+    assert await bot.sync_commands() is True
+    assert bot.tree.sync.await_count == 2
+
+    # Повторный on_ready (reconnect) не синхронизирует и не трогает БД
+    bot._first_ready_done = True
+    bot.sync_commands = AsyncMock()
+    await bot.on_ready()
+    bot.sync_commands.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_on_ready_retries_sync_after_failure():
+    """Упавший sync не помечает первый ready выполненным — следующий ready синхронизирует снова."""
+    bot = VoiceBot()
+    bot.sync_commands = AsyncMock(side_effect=[discord.DiscordException("rate limited"), True])
+    await bot.on_ready()
+    assert bot._first_ready_done is False
+    await bot.on_ready()
+    assert bot._first_ready_done is True
+    await bot.on_ready()
+    assert bot.sync_commands.await_count == 2
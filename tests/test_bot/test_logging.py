@@ -0,0 +1,64 @@
+"""
+Тесты async-режима и sampling логирования (src/utils/logging.py).
+"""
+import atexit
+import json
+
+import pytest
+import structlog
+
+from src.utils import logging as app_logging
+
+
+@pytest.fixture
+def restore_logging():
+    yield
+    app_logging._writer.stop()
+    app_logging.setup_logging(level="INFO")
+
+
+def test_async_output_with_sampling(capsys, restore_logging):
+    app_logging.setup_logging(
+        level="INFO",
+        async_output=True,
+        sampling={"voice_join": 0.0, "voice_move": 1.0},
+    )
+    log = structlog.get_logger("test")
+    for i in range(100):
+        log.info("voice_join", n=i)
+    log.warning("voice_join", n=-1)  # предупреждения не сэмплируются
+    log.info("voice_move", discord_id=123, ids={1: "a"})
+    log.info("other")
+    app_logging._writer.stop()
+
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [(r["event"], r["level"]) for r in lines] == [
+        ("voice_join", "warning"),
+        ("voice_move", "info"),
+        ("other", "info"),
+    ]
+    assert lines[1]["ids"] == {"1": "a"}
+    assert "timestamp" in lines[0]
+
+
+def test_writer_restart_registers_atexit_once(monkeypatch):
+    registered = []
+    monkeypatch.setattr(atexit, "register", registered.append)
+    writer = app_logging._LogWriter()
+    for _ in range(3):
+        writer.put("{}")
+        writer.stop()
+    assert registered == [writer.stop]
+
+
+def test_sampler_keeps_fraction():
+    sampler = app_logging.EventSampler({"voice_join": 0.25})
+    kept = 0
+    for _ in range(4000):
+        try:
+            sampler(None, "info", {"event": "voice_join"})
+            kept += 1
+        except structlog.DropEvent:
+            pass
+    assert 800 < kept < 1200
+    assert sampler(None, "error", {"event": "voice_join"}) == {"event": "voice_join"}
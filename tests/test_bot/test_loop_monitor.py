@@ -0,0 +1,77 @@
+"""
+Тесты LoopMonitor: задержка loop попадает в гистограмму, блокирующий callback — в loop.blocked со стеком.
+"""
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src.utils import loop_monitor as loop_monitor_module
+from src.utils.loop_monitor import LoopMonitor
+from src.utils.metrics import EVENT_LOOP_LAG_SECONDS
+
+
+async def _blocking_handler() -> None:
+    time.sleep(0.15)
+
+
+def _deep_sleep(depth: int) -> None:
+    if depth:
+        _deep_sleep(depth - 1)
+    else:
+        time.sleep(0.15)
+
+
+async def _deep_blocking_handler() -> None:
+    _deep_sleep(2 * loop_monitor_module.STACK_LIMIT)
+
+
+@pytest.mark.asyncio
+async def test_blocking_callback_is_detected(monkeypatch):
+    """Синхронный sleep внутри корутины: lag в метрике, событие с именем корутины."""
+    events = []
+    monkeypatch.setattr(
+        loop_monitor_module, "log", SimpleNamespace(warning=lambda event, **kw: events.append((event, kw))),
+    )
+    before = EVENT_LOOP_LAG_SECONDS.count()
+    monitor = LoopMonitor(interval=0.01, slow_callback_ms=50)
+    monitor.start()
+    try:
+        await asyncio.sleep(0.03)
+        await asyncio.get_running_loop().create_task(_blocking_handler())
+        await asyncio.sleep(0.03)
+    finally:
+        await monitor.stop()
+
+    assert EVENT_LOOP_LAG_SECONDS.count() > before
+    assert len(events) == 1
+    event, fields = events[0]
+    assert event == "loop.blocked"
+    assert fields["blocked_ms"] >= 50
+    assert fields["coroutine"].startswith("_blocking_handler")
+    assert "time.sleep(0.15)" in fields["stack"]
+    assert not monitor.running
+
+
+@pytest.mark.asyncio
+async def test_deep_blocking_call_still_names_coroutine(monkeypatch):
+    """Блокировка глубже STACK_LIMIT кадров: виновник найден, stack обрезан до STACK_LIMIT."""
+    events = []
+    monkeypatch.setattr(
+        loop_monitor_module, "log", SimpleNamespace(warning=lambda event, **kw: events.append((event, kw))),
+    )
+    monitor = LoopMonitor(interval=0.01, slow_callback_ms=50)
+    monitor.start()
+    try:
+        await asyncio.sleep(0.03)
+        await asyncio.get_running_loop().create_task(_deep_blocking_handler())
+        await asyncio.sleep(0.03)
+    finally:
+        await monitor.stop()
+
+    assert len(events) == 1
+    fields = events[0][1]
+    assert fields["coroutine"].startswith("_deep_blocking_handler")
+    assert "_deep_blocking_handler" not in fields["stack"]
+    assert "time.sleep(0.15)" in fields["stack"]
@@ -0,0 +1,110 @@
+"""
+Тесты записи голосовых событий (src/bot/recorder.py) и их воспроизведения (benchmarks/replay.py).
+"""
+import json
+
+import pytest
+
+from benchmarks import replay
+from benchmarks.fakes import FakeGuild, FakeVoiceState
+from src.bot.recorder import VoiceEventRecorder, rotated_paths
+from src.utils.metrics import VOICE_RECORDER_EVENTS
+
+
+def _record_session(recorder: VoiceEventRecorder, guild: FakeGuild, rounds: int) -> None:
+    """Каждый участник: вход, мьют, переход в другой канал, выход."""
+    first, second = guild.voice_channels
+    for _ in range(rounds):
+        for member in guild.members:
+            for after in (
+                FakeVoiceState(channel=first),
+                FakeVoiceState(channel=first, self_mute=True, self_deaf=True),
+                FakeVoiceState(channel=second, self_mute=True, self_deaf=True),
+                None,
+            ):
+                before = guild.set_voice(member, after)
+                recorder.record(member, before or FakeVoiceState(), after or FakeVoiceState())
+
+
+def test_recorder_writes_ndjson(tmp_path):
+    guild = FakeGuild(members=3, channels=2)
+    recorder = VoiceEventRecorder(tmp_path / "voice.ndjson")
+    recorder.record(guild.members[0], None, None)  # до start() — игнорируется
+    recorder.start()
+    _record_session(recorder, guild, rounds=1)
+    recorder.stop()
+
+    lines = (tmp_path / "voice.ndjson").read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 12
+    join, mute, move, leave = (json.loads(line) for line in lines[:4])
+    assert join["m"] == guild.members[0].id and join["g"] == guild.id
+    assert join["b"] is None and join["a"] == [guild.voice_channels[0].id, 0]
+    assert mute["a"] == [guild.voice_channels[0].id, 0b11]
+    assert move["a"][0] == guild.voice_channels[1].id
+    assert leave["a"] is None
+    assert [json.loads(line)["t"] for line in lines] == sorted(json.loads(line)["t"] for line in lines)
+
+
+def test_recorder_rotates_by_size(tmp_path):
+    guild = FakeGuild(members=10, channels=2)
+    path = tmp_path / "voice.ndjson"
+    recorder = VoiceEventRecorder(path, max_bytes=2048, backups=2)
+    recorder.start()
+    for _ in range(10):
+        _record_session(recorder, guild, rounds=1)
+        recorder.stop()  # пачка на диск: ротация проверяется после каждой записи пачки
+        recorder.start()
+    recorder.stop()
+
+    files = rotated_paths(path, backups=2)
+    assert files == [tmp_path / "voice.ndjson.2", tmp_path / "voice.ndjson.1", path]
+    assert not (tmp_path / "voice.ndjson.3").exists()
+    assert all(f.stat().st_size < 2048 + 4096 for f in files)
+
+
+def test_recorder_disables_itself_when_writer_fails(tmp_path):
+    """Поток записи упал (файл не открывается) — запись выключена, record() не копит очередь."""
+    guild = FakeGuild(members=1, channels=1)
+    path = tmp_path / "voice.ndjson"
+    path.mkdir()
+    recorder = VoiceEventRecorder(path)
+    recorder.start()
+    thread = recorder._thread
+    thread.join(timeout=5)
+    assert not thread.is_alive() and not recorder.enabled
+
+    dropped = VOICE_RECORDER_EVENTS.value(result="dropped")
+    recorder.record(guild.members[0], None, None)
+    assert recorder._queue.qsize() == 0
+    assert VOICE_RECORDER_EVENTS.value(result="dropped") == dropped
+    recorder.stop()
+
+
+@pytest.mark.asyncio
+async def test_replay_recording(tmp_path, clear_tracker_sessions):
+    guild = FakeGuild(members=5, channels=2)
+    path = tmp_path / "voice.ndjson"
+    recorder = VoiceEventRecorder(path)
+    recorder.start()
+    _record_session(recorder, guild, rounds=2)
+    recorder.stop()
+    path.open("a", encoding="utf-8").write('{"t": 1.0, "m"')  # обрезанная строка
+
+    records, invalid = replay.load_records([path])
+    assert (len(records), invalid) == (40, 1)
+    args = replay.build_parser().parse_args([str(path), "--speed", "0", "--concurrency", "1"])
+    result = await replay.run(args, records)
+    assert result["errors"] == 0
+    assert result["handled_events"] == 40
+    assert (result["members"], result["channels"]) == (5, 2)
+    assert result["schedule_lag"] is None
+
+
+def test_load_records_defaults_to_busiest_guild(tmp_path):
+    path = tmp_path / "voice.ndjson"
+    lines = [{"t": t, "g": g, "m": 1, "b": None, "a": [5, 0]} for t, g in [(3, 10), (1, 20), (2, 20), (4, 10), (5, 20)]]
+    path.write_text("".join(json.dumps(line) + "\n" for line in lines), encoding="utf-8")
+    records, _ = replay.load_records([path])
+    assert [(r["t"], r["g"]) for r in records] == [(1, 20), (2, 20), (5, 20)]
+    records, _ = replay.load_records([path], guild_id=10)
+    assert [r["t"] for r in records] == [3, 4]
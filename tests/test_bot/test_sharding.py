@@ -0,0 +1,117 @@
+"""
+Тесты шардирования: гильдии процесса по SHARD_IDS, фабрика бота, диапазоны run_shards
+и выполнение cron-задач расписаний только лидером.
+"""
+import json
+from unittest.mock import AsyncMock
+
+import pytest
+from discord.ext import commands
+
+from src.bot.client import ShardedVoiceBot, VoiceBot, create_bot
+from src.config.settings import Settings, shard_for_guild
+from src.run_shards import child_env, shard_ranges
+from src.scheduler import jobs
+from src.scheduler.leader import SchedulerLeader
+
+
+def test_local_guild_ids_follow_shard_ids(monkeypatch):
+    # (guild_id >> 22) % 4: шарды 0, 1, 2, 3
+    guilds = [0 << 22, 1 << 22, 2 << 22, 7 << 22]
+    monkeypatch.setenv("DISCORD_GUILD_ID", str(guilds[0]))
+    monkeypatch.setenv("DISCORD_GUILD_IDS", json.dumps(guilds[1:]))
+    assert [shard_for_guild(g, 4) for g in guilds] == [0, 1, 2, 3]
+
+    assert Settings().local_guild_ids == guilds
+    monkeypatch.setenv("SHARD_COUNT", "4")
+    monkeypatch.setenv("SHARD_IDS", "[2, 3]")
+    settings = Settings()
+    assert settings.sharded
+    assert settings.local_guild_ids == [guilds[2], guilds[3]]
+
+    monkeypatch.delenv("SHARD_COUNT")
+    with pytest.raises(ValueError, match="SHARD_COUNT"):
+        Settings()
+
+
+@pytest.mark.asyncio
+async def test_create_bot_sharded():
+    bot = create_bot(sharded=True, shard_count=4, shard_ids=[2, 3])
+    assert isinstance(bot, ShardedVoiceBot)
+    assert isinstance(bot, commands.AutoShardedBot)
+    assert (bot.shard_count, bot.shard_ids) == (4, [2, 3])
+    assert type(create_bot()) is VoiceBot
+
+
+def test_shard_ranges_are_contiguous_and_cover_all():
+    assert shard_ranges(10, 3) == [[0, 1, 2, 3], [4, 5, 6], [7, 8, 9]]
+    assert shard_ranges(2, 2) == [[0], [1]]
+
+
+def test_child_env_separates_record_files_and_metrics_ports(monkeypatch):
+    monkeypatch.setenv("API_PORT", "9000")
+    monkeypatch.setenv("VOICE_RECORD_PATH", "/data/voice.ndjson")
+    first, second = child_env(4, [0, 1], 0), child_env(4, [2, 3], 1)
+    assert (first["API_ENABLED"], second["API_ENABLED"]) == ("true", "false")
+    assert second["SHARD_IDS"] == "[2, 3]"
+    assert first["VOICE_RECORD_PATH"] == "/data/voice.p0.ndjson"
+    assert second["VOICE_RECORD_PATH"] == "/data/voice.p1.ndjson"
+    assert "METRICS_PORT" not in first and second["METRICS_PORT"] == "9001"
+
+    monkeypatch.delenv("VOICE_RECORD_PATH")
+    assert "VOICE_RECORD_PATH" not in child_env(4, [2, 3], 1)
+
+
+class _FakeConn:
+    def __init__(self, holders: set) -> None:
+        self._holders = holders
+
+    def is_closed(self) -> bool:
+        return False
+
+    async def fetchval(self, query: str, key: int) -> bool:
+        if self._holders:
+            return False
+        self._holders.add(self)
+        return True
+
+    async def execute(self, query: str, key: int) -> str:
+        self._holders.discard(self)
+        return "SELECT 1"
+
+
+class _FakePool:
+    """Пул с общей для всех «процессов» advisory-блокировкой."""
+
+    def __init__(self, holders: set) -> None:
+        self._holders = holders
+
+    async def acquire(self) -> _FakeConn:
+        return _FakeConn(self._holders)
+
+    async def release(self, conn: _FakeConn) -> None:
+        pass
+
+
+@pytest.mark.asyncio
+async def test_schedule_job_runs_only_on_leader(monkeypatch):
+    holders: set = set()
+    first, second = SchedulerLeader(_FakePool(holders)), SchedulerLeader(_FakePool(holders))
+    update_rule = AsyncMock(return_value={"id": 5, "is_active": True})
+    notify = AsyncMock()
+    monkeypatch.setattr(jobs.rules_repo, "update_rule", update_rule)
+    monkeypatch.setattr(jobs.database, "notify_config_changed", notify)
+    callback = jobs._make_schedule_callback(None, schedule_id=1, rule_id=5, action="enable")
+
+    for leader in (first, second):
+        monkeypatch.setattr(jobs, "_leader", leader)
+        await callback()
+    update_rule.assert_awaited_once_with(None, 5, {"is_active": True})
+    notify.assert_awaited_once_with(None, "rules", [5])
+    assert first.is_leader and not second.is_leader
+
+    # Лидер остановился — задачу подхватывает другой процесс
+    await first.release()
+    await callback()
+    assert second.is_leader
+    assert update_rule.await_count == 2
@@ -0,0 +1,35 @@
+"""
+Smoke-тест нагрузочного бенчмарка: прогон на MockPool через настоящий VoiceManager без ошибок.
+"""
+import random
+
+import pytest
+
+from benchmarks import voice_load
+from benchmarks.fakes import FakeGuild
+
+
+def test_event_generator_keeps_state_consistent():
+    """join — только вне войса, leave/move/mute — только в войсе; кэш каналов совпадает с member.voice."""
+    guild = FakeGuild(members=20, channels=3)
+    generator = voice_load.EventGenerator(guild, voice_load.parse_mix(voice_load.DEFAULT_MIX), random.Random(1))
+    for _ in range(500):
+        kind, member, before, after = generator.next()
+        assert (before is None or before.channel is None) == (kind == "join")
+        assert (after is None) == (kind == "leave")
+    in_channels = {m.id for c in guild.voice_channels for m in c.members}
+    assert in_channels == {m.id for m in guild.members if m.voice is not None}
+    assert len(generator.in_voice) + len(generator.idle) == 20
+
+
+@pytest.mark.asyncio
+async def test_run_on_mock_pool(clear_tracker_sessions):
+    args = voice_load.build_parser().parse_args(
+        ["--members", "50", "--channels", "4", "--events", "300", "--warmup", "20", "--concurrency", "8"],
+    )
+    result = await voice_load.run(args)
+    assert result["errors"] == 0
+    assert result["handled_events"] >= 300
+    assert result["events_per_sec"] > 0
+    assert set(result["by_type"]) >= {"join", "leave"}
+    assert result["latency"]["p50_ms"] <= result["latency"]["p99_ms"]
@@ -9,10 +9,11 @@ from src.bot.cogs.voice_manager import VoiceManager
 
 
 @pytest.fixture
-def mock_bot_with_tracker(pool):
+def mock_bot_with_tracker(pool, mock_guild):
     """Бот с моками pool и tracker (start_session, end_session — AsyncMock)."""
     bot = MagicMock()
     bot.pool = pool
+    bot.guild_ids = [mock_guild.id]
     tracker = MagicMock()
     tracker.start_session = AsyncMock()
     tracker.end_session = AsyncMock()
@@ -40,7 +41,7 @@ async def test_voice_state_update_join_calls_start_session(
     await cog.on_voice_state_update(mock_member, before, after)
 
     mock_bot_with_tracker.tracker.start_session.assert_called_once_with(
-        pool, mock_member.id, 999
+        pool, mock_member.guild.id, mock_member.id, 999
     )
     mock_bot_with_tracker.tracker.end_session.assert_not_called()
 
@@ -60,7 +61,7 @@ async def test_voice_state_update_leave_calls_end_session(
     await cog.on_voice_state_update(mock_member, before, after)
 
     mock_bot_with_tracker.tracker.end_session.assert_called_once_with(
-        pool, mock_member.id, 888
+        pool, mock_member.guild.id, mock_member.id, 888
     )
     mock_bot_with_tracker.tracker.start_session.assert_not_called()
 
@@ -82,3 +83,18 @@ async def test_voice_state_update_no_exception_when_pool_or_tracker_missing(mock
 
     # Не должно быть исключения; start_session не вызывается (нет tracker)
     assert bot.tracker is None
+
+
+@pytest.mark.asyncio
+async def test_voice_state_update_ignores_foreign_guild(mock_member, mock_bot_with_tracker):
+    """События гильдии не из bot.guild_ids (чужой шард, неподключённый сервер) не обрабатываются."""
+    mock_bot_with_tracker.guild_ids = [1]
+    cog = VoiceManager(mock_bot_with_tracker)
+    before = MagicMock()
+    before.channel = None
+    after = MagicMock()
+    after.channel = MagicMock()
+
+    await cog.on_voice_state_update(mock_member, before, after)
+
+    mock_bot_with_tracker.tracker.start_session.assert_not_called()
@@ -0,0 +1,55 @@
+"""
+Тесты MemberSearchIndex: префикс, подстрока через триграммы, ранжирование и обновления.
+"""
+from types import SimpleNamespace
+
+from src.engine.member_index import MemberSearchIndex
+
+
+def _member(user_id: int, name: str, nick: str | None = None, bot: bool = False) -> SimpleNamespace:
+    return SimpleNamespace(id=user_id, name=name, display_name=nick or name, bot=bot)
+
+
+def _index() -> MemberSearchIndex:
+    index = MemberSearchIndex()
+    index.rebuild([
+        _member(1, "alexander"),
+        _member(2, "xander_k", nick="Sasha"),
+        _member(3, "bob", nick="Alex"),
+        _member(4, "alexbot", bot=True),
+        _member(5, "al"),
+    ])
+    return index
+
+
+def test_prefix_then_substring_ranking():
+    """Совпадения по началу имени раньше подстрочных; среди них с ником — первыми; боты исключены."""
+    index = _index()
+    assert index.search("alex", 10) == [3, 1]
+    assert index.search("ander", 10) == [2, 1]
+    assert index.search("ALEX ", 1) == [3]
+    # Короткий запрос — только префикс
+    assert index.search("xa", 10) == [2]
+    assert index.search("", 10) == [3, 2, 5, 1]
+
+
+def test_update_and_remove():
+    """Смена ника переиндексирует участника, удаление убирает его из префиксов и триграмм."""
+    index = _index()
+    index.upsert(_member(1, "alexander", nick="Zed"))
+    assert index.search("zed", 10) == [1]
+    assert index.search("alexa", 10) == [1]  # username остаётся в индексе
+
+    index.remove(1)
+    assert index.search("alexa", 10) == []
+    assert index.search("and", 10) == [2]
+    assert 1 not in index and len(index) == 3
+
+
+def test_built_flag_set_by_rebuild_only():
+    """Пустая гильдия после rebuild считается собранной; upsert до сборки — нет."""
+    index = MemberSearchIndex()
+    index.upsert(_member(1, "alice"))
+    assert len(index) and not index.built
+    index.rebuild([])
+    assert index.built and not len(index)
@@ -0,0 +1,34 @@
+"""
+Тесты микробенчмарков: прогон выбранных бенчмарков и пометка регрессий относительно базовой линии.
+"""
+import json
+
+from benchmarks import micro
+
+
+def test_run_filtered_benchmarks():
+    result = micro.run(name_filter="rules_from_dicts", repeat=1)
+    assert list(result["benchmarks"]) == ["rules_from_dicts[1k rows]"]
+    entry = result["benchmarks"]["rules_from_dicts[1k rows]"]
+    assert entry["time_us"] > 0 and entry["relative"] > 0
+
+
+def test_compare_flags_relative_slowdown():
+    """Сравнение по relative: абсолютное время на медленной машине само по себе не регрессия."""
+    baseline = {"benchmarks": {
+        "a": {"time_us": 10.0, "relative": 1.0},
+        "b": {"time_us": 10.0, "relative": 1.0},
+    }}
+    result = {"benchmarks": {
+        "a": {"time_us": 20.0, "relative": 1.05},
+        "b": {"time_us": 13.0, "relative": 1.3},
+        "c": {"time_us": 1.0, "relative": 0.1},
+    }}
+    lines, regressions = micro.compare(result, baseline, threshold=0.2)
+    assert regressions == ["b"]
+    assert any(line.startswith("c") and "new" in line for line in lines)
+
+
+def test_baselines_cover_all_benchmarks():
+    baseline = json.loads(micro.BASELINE_PATH.read_text(encoding="utf-8"))
+    assert {b.name for b in micro.BENCHMARKS} <= set(baseline["benchmarks"])
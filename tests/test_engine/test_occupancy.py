@@ -0,0 +1,49 @@
+"""
+Тесты VoiceOccupancy: инкрементальные обновления по каналам, мут-состояние и журнал дельт.
+"""
+from unittest.mock import MagicMock
+
+from src.engine.occupancy import VoiceOccupancy
+
+
+def _member(user_id: int, self_mute: bool = False, self_deaf: bool = False) -> MagicMock:
+    member = MagicMock()
+    member.id = user_id
+    member.display_name = f"user{user_id}"
+    member.voice.self_mute = self_mute
+    member.voice.self_deaf = self_deaf
+    member.voice.mute = False
+    member.voice.deaf = False
+    member.voice.self_stream = False
+    return member
+
+
+def test_join_move_update_leave():
+    """Вход, перемещение, мут в том же канале и выход меняют снимок и версию."""
+    occ = VoiceOccupancy()
+    occ.apply(_member(1), 100)
+    occ.apply(_member(2), 100)
+    occ.apply(_member(1), 200)
+    assert occ.count() == 2
+    assert [o.user_id for o in occ.channel_members(200)] == [1]
+
+    occ.apply(_member(2, self_mute=True, self_deaf=True), 100)
+    assert occ.get(2).self_deaf is True
+    occ.apply(_member(2, self_mute=True, self_deaf=True), 100)  # без изменений — без дельты
+
+    occ.apply(_member(1), None)
+    snap = occ.snapshot()
+    assert snap["count"] == 1 and list(snap["channels"]) == ["100"]
+    assert [d["op"] for d in occ.deltas_since(0)] == ["join", "join", "move", "update", "leave"]
+    assert occ.version == 5
+
+
+def test_deltas_since_old_version_requires_snapshot():
+    """Версия, выпавшая из журнала или из будущего, — None (нужен snapshot)."""
+    occ = VoiceOccupancy(delta_log_size=2)
+    for uid in range(4):
+        occ.apply(_member(uid), 100)
+    assert occ.deltas_since(occ.version) == []
+    assert [d["version"] for d in occ.deltas_since(2)] == [3, 4]
+    assert occ.deltas_since(1) is None
+    assert occ.deltas_since(99) is None
@@ -1,5 +1,6 @@
 """
-Тесты трекера голосовых сессий: start_session, end_session, get_current_sessions, get_overtime_users.
+Тесты трекера голосовых сессий: start_session, end_session, get_current_sessions, get_overtime_users,
+изоляция сессий разных гильдий.
 """
 from datetime import datetime, timedelta, timezone
 
@@ -7,24 +8,27 @@ import pytest
 
 from src.engine import tracker as tracker_mod
 
+GUILD = 123
+
 
 @pytest.mark.asyncio
 async def test_start_session_adds_record_with_left_at_null(pool, clear_tracker_sessions):
-    """После start_session(pool, discord_id, channel_id) в voice_sessions есть запись с left_at=NULL."""
-    await tracker_mod.start_session(pool, 111, 222)
+    """После start_session(pool, guild_id, discord_id, channel_id) в voice_sessions есть запись с left_at=NULL."""
+    await tracker_mod.start_session(pool, GUILD, 111, 222)
     assert len(pool.voice_sessions) == 1
     assert pool.voice_sessions[0]["discord_id"] == 111
     assert pool.voice_sessions[0]["channel_id"] == 222
     assert pool.voice_sessions[0]["left_at"] is None
     assert pool.voice_sessions[0]["joined_at"] is not None
+    assert pool.voice_sessions[0]["guild_id"] == GUILD
 
 
 @pytest.mark.asyncio
 async def test_end_session_updates_left_at(pool, clear_tracker_sessions):
     """После end_session запись обновлена: left_at установлен."""
-    await tracker_mod.start_session(pool, 333, 444)
+    await tracker_mod.start_session(pool, GUILD, 333, 444)
     assert pool.voice_sessions[0]["left_at"] is None
-    await tracker_mod.end_session(pool, 333, 444)
+    await tracker_mod.end_session(pool, GUILD, 333, 444)
     assert len(pool.voice_sessions) == 1
     assert pool.voice_sessions[0]["left_at"] is not None
 
@@ -32,16 +36,16 @@ async def test_end_session_updates_left_at(pool, clear_tracker_sessions):
 @pytest.mark.asyncio
 async def test_get_current_sessions_returns_active(pool, clear_tracker_sessions):
     """get_current_sessions возвращает только активные сессии (из памяти)."""
-    assert tracker_mod.get_current_sessions() == []
-    await tracker_mod.start_session(pool, 1, 10)
-    await tracker_mod.start_session(pool, 2, 10)
-    sessions = tracker_mod.get_current_sessions()
+    assert tracker_mod.get_current_sessions(GUILD) == []
+    await tracker_mod.start_session(pool, GUILD, 1, 10)
+    await tracker_mod.start_session(pool, GUILD, 2, 10)
+    sessions = tracker_mod.get_current_sessions(GUILD)
     assert len(sessions) == 2
     ids_channels = {(s[0], s[1]) for s in sessions}
     assert (1, 10) in ids_channels
     assert (2, 10) in ids_channels
-    await tracker_mod.end_session(pool, 1, 10)
-    sessions2 = tracker_mod.get_current_sessions()
+    await tracker_mod.end_session(pool, GUILD, 1, 10)
+    sessions2 = tracker_mod.get_current_sessions(GUILD)
     assert len(sessions2) == 1
     assert sessions2[0][0] == 2 and sessions2[0][1] == 10
 
@@ -49,20 +53,34 @@ async def test_get_current_sessions_returns_active(pool, clear_tracker_sessions)
 @pytest.mark.asyncio
 async def test_get_overtime_users_returns_list_when_over_max_time(pool, clear_tracker_sessions):
     """get_overtime_users при переданных rules с max_time_sec возвращает список при превышении времени."""
-    await tracker_mod.start_session(pool, 555, 666)
+    await tracker_mod.start_session(pool, GUILD, 555, 666)
     # Подменить joined_at в памяти трекера на "давно", чтобы длительность >= max_time_sec
     key = (555, 666)
-    assert key in tracker_mod._sessions
+    assert key in tracker_mod._sessions[GUILD]
     old_time = datetime.now(timezone.utc) - timedelta(seconds=100)
-    tracker_mod._sessions[key] = old_time
+    tracker_mod._sessions[GUILD][key] = old_time
 
     rules = [
         {"max_time_sec": 60, "channel_ids": [666], "id": 1, "action_type": "mute", "action_params": {}},
     ]
-    result = await tracker_mod.get_overtime_users(pool, rules)
+    result = await tracker_mod.get_overtime_users(pool, GUILD, rules)
     assert len(result) >= 1
     entry = result[0]
     assert entry["discord_id"] == 555
     assert entry["channel_id"] == 666
     assert entry["rule"] == rules[0]
     assert entry["overtime_seconds"] >= 39
+
+
+@pytest.mark.asyncio
+async def test_sessions_are_isolated_per_guild(pool, clear_tracker_sessions):
+    """Сессия в одной гильдии не видна другой и не закрывается её end_session."""
+    await tracker_mod.start_session(pool, GUILD, 7, 70)
+    await tracker_mod.start_session(pool, 456, 8, 80)
+
+    assert [s[:2] for s in tracker_mod.get_current_sessions(GUILD)] == [(7, 70)]
+    assert [s[:2] for s in tracker_mod.get_current_sessions(456)] == [(8, 80)]
+
+    await tracker_mod.end_session(pool, 456, 7, 70)
+    assert tracker_mod.get_joined_at(GUILD, 7, 70) is not None
+    assert pool.voice_sessions[0]["left_at"] is None